@@ -0,0 +1,80 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Measures how long the "most recorded process" lookup takes at clip saving time
+# depending on the replay buffer length.
+#
+# Usage: python benchmarks/exe_history_benchmark.py
+
+import random
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular.exe_history import ExeHistory, ExeInterner
+
+
+BUFFER_LENGTHS = (60, 300, 1200, 3600, 7200)
+OLD_APPROACH_MAX_LENGTH = 3600  # the old approach is too slow to wait for on bigger buffers
+EXECUTABLES = [Path(f"C:\\Games\\Game{i}\\game{i}.exe") for i in range(8)]
+
+
+def gen_samples(amount: int) -> list[Path]:
+    """
+    Generates foreground executable samples: the active app changes every 1-300 seconds.
+    """
+    rnd = random.Random(amount)
+    samples = []
+    while len(samples) < amount:
+        samples.extend([rnd.choice(EXECUTABLES)] * rnd.randint(1, 300))
+    return samples[:amount]
+
+
+def measure(func, repeat: int = 5) -> float:
+    """
+    Returns the best time of `repeat` runs (in ms).
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    print(f"{'buffer (s)':>10} | {'old max(count) (ms)':>20} | {'ExeHistory (ms)':>16}")
+    for length in BUFFER_LENGTHS:
+        samples = gen_samples(length)
+
+        old_history = deque([], maxlen=length)
+        new_history = ExeHistory(maxlen=length)
+        interner = ExeInterner()
+        for sample in samples:
+            old_history.appendleft(sample)
+            new_history.append(interner.intern(sample))
+
+        if length <= OLD_APPROACH_MAX_LENGTH:
+            old_time = f"{measure(lambda: max(old_history, key=old_history.count)):20.3f}"
+        else:
+            old_time = f"{'skipped':>20}"
+        new_time = measure(new_history.most_common)
+        print(f"{length:>10} | {old_time} | {new_time:16.5f}")
+
+
+if __name__ == '__main__':
+    main()
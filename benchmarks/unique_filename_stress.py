@@ -0,0 +1,73 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+
+# Saves hundreds of same-second clips into one folder from several threads at once
+# and checks that every clip got its own file name.
+#
+# Usage: python benchmarks/unique_filename_stress.py
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from threading import Thread
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular.filename_reserver import FilenameReserver
+
+
+THREADS = 8
+CLIPS_PER_THREAD = 100
+CLIP_NAME = "Game_01.01.2025_12-00-00.mp4"
+
+
+def save_clips(reserver: FilenameReserver, source_folder: Path, target_folder: Path, results: list[Path]):
+    for i in range(CLIPS_PER_THREAD):
+        source = source_folder / f"{id(results)}_{i}.mp4"
+        source.write_bytes(b"clip")
+        new_path = reserver.reserve(target_folder / CLIP_NAME)
+        os.replace(source, new_path)
+        results.append(new_path)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as source_folder, tempfile.TemporaryDirectory() as target_folder:
+        source_folder, target_folder = Path(source_folder), Path(target_folder)
+        (target_folder / CLIP_NAME).write_bytes(b"old clip")
+
+        # Two reservers simulate a second writer that doesn't share the in-memory state.
+        reservers = [FilenameReserver(), FilenameReserver()]
+        results = [[] for _ in range(THREADS)]
+        threads = [Thread(target=save_clips, args=(reservers[i % 2], source_folder, target_folder, results[i]))
+                   for i in range(THREADS)]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        paths = [path for thread_results in results for path in thread_results]
+        files = os.listdir(target_folder)
+        assert len(paths) == len(set(paths)) == THREADS * CLIPS_PER_THREAD, "Some clips got the same name."
+        assert len(files) == len(paths) + 1, "Some clips were overwritten."
+        print(f"{len(paths)} clips saved in {elapsed * 1000:.1f} ms, all names are unique.")
+
+
+if __name__ == '__main__':
+    main()
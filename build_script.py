@@ -132,13 +132,32 @@ def find_imports(file_name: str) -> tuple[Imports, int]:
     return imports, code_starts_from_line_no
 
 
-FILES_ORDER = ['ui',
+FILES_ORDER = ['logs',
+               'ui',
+               'exe_history',
+               'platform_backends',
+               'exe_path_cache',
+               'alias_index',
+               'filename_reserver',
+               'clip_finalizer',
+               'save_requests',
+               'scheduler',
+               'notification_client',
+               'config_cache',
+               'tracing',
+               'file_mover',
+               'link_strategies',
+               'clip_journal',
+               'clip_index',
+               'retention',
                'globals',
                'exceptions',
+               'settings_snapshot',
                'updates_check',
                'properties',
                'properties_callbacks',
                'tech',
+               'filename_template',
                'obs_related',
                'script_helpers',
                'clipname_gen',
@@ -0,0 +1,235 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from pathlib import Path, PureWindowsPath
+from threading import Lock
+import re
+
+
+PATTERN_GROUP_PREFIX = "_smart_replays_pattern_"  # names of the groups patterns are wrapped with
+LEADING_GLOBAL_FLAGS_RE = re.compile(r"\(\?([aiLmsux]+)\)")
+NUMBERED_BACKREFERENCE_RE = re.compile(r"(?:^|[^\\])(?:\\\\)*\\[1-9]|\(\?\(\d+\)")
+
+
+class AliasTrieNode:
+    __slots__ = ("children", "alias")
+
+    def __init__(self):
+        self.children: dict[str, AliasTrieNode] = {}
+        self.alias: str | None = None
+
+
+class AliasIndex:
+    """
+    Case-insensitive trie of path components for aliases lookup.
+
+    Finds the alias of the executable itself or of its closest parent folder (longest prefix)
+    in a single walk. Results are memoized per executable path.
+
+    Also supports wildcard (`*\\steamapps\\common\\*\\*.exe`) and regex (`re:...`) patterns.
+    All patterns are compiled into one regex, the first matching pattern (in the order they were added) wins.
+    If the patterns cannot be combined (e.g. several regex patterns use the same group name),
+    they are checked one by one.
+    Patterns are checked only if there is no path alias for the executable.
+
+    Aliases are changed in the OBS thread and matched in the clip finalizer thread,
+    so all the methods are guarded with one lock.
+    """
+    def __init__(self, aliases: dict[Path, str] | None = None, patterns: dict[str, str] | None = None):
+        """
+        :param aliases: {Path(path/to/executable/or/folder): alias}
+        :param patterns: {pattern: alias}
+        """
+        self._root = AliasTrieNode()
+        self._patterns: list[tuple[str, str]] = []  # [(regex source, alias), ...]
+        self._pattern_sources: dict[str, str] = {}  # {pattern: regex source}
+        self._matcher: re.Pattern | None = None
+        self._pattern_matchers: list[re.Pattern] = []  # used if patterns cannot be combined into one regex
+        self._compiled = False
+        self._memo: dict[str, str | None] = {}  # {path/to/executable: alias}
+        self._lock = Lock()
+        for path, alias in (aliases or {}).items():
+            self.add(path, alias)
+        for pattern, alias in (patterns or {}).items():
+            self.add_pattern(pattern, alias)
+        self._compile_patterns()
+
+    @staticmethod
+    def split_path(path: str | Path) -> list[str]:
+        """
+        Splits path into normalized (case-folded) components.
+        """
+        return [part for part in str(path).replace("/", "\\").casefold().split("\\") if part]
+
+    @classmethod
+    def normalize_path(cls, path: str | Path) -> PureWindowsPath:
+        """
+        Normalizes path the way the trie does, so paths that lead to the same trie node are equal.
+        """
+        return PureWindowsPath("\\".join(cls.split_path(path)))
+
+    @staticmethod
+    def is_pattern(path: str) -> bool:
+        """
+        Checks whether the alias path is a wildcard or regex pattern.
+        """
+        return path.startswith("re:") or "*" in path or "?" in path
+
+    @staticmethod
+    def compile_pattern(pattern: str) -> str:
+        """
+        Converts wildcard or regex (`re:` prefix) pattern to regex source.
+        `*` matches any characters within one path component, `**` matches any characters,
+        `**\\` matches zero or more folders, `?` matches one character.
+        Wildcard patterns without a drive (e.g. `*\\steamapps\\*.exe`) match the end of the path at any depth.
+        Leading global flags of regex patterns (`(?i)...`) are turned into scoped flags (`(?i:...)`).
+        Raises `re.error` if the pattern is invalid or cannot be combined with other patterns
+        (global flags not at the start, numbered backreferences, reserved group names).
+        """
+        if pattern.startswith("re:"):
+            source = pattern[3:]
+            if match := LEADING_GLOBAL_FLAGS_RE.match(source):
+                source = f"(?{match.group(1)}:{source[match.end():]})"
+            # Group numbers change when patterns are combined, so numbered references would refer to other groups.
+            if NUMBERED_BACKREFERENCE_RE.search(source):
+                raise re.error("numbered backreferences are not supported, use named groups")
+            if any(name.startswith(PATTERN_GROUP_PREFIX) for name in re.compile(source, re.IGNORECASE).groupindex):
+                raise re.error(f"group names starting with {PATTERN_GROUP_PREFIX} are reserved")
+        else:
+            is_absolute = re.match(r"[a-zA-Z]:|[\\/]", pattern) is not None
+            source = "" if is_absolute else r"(?:.*\\)?"
+            i = 0
+            while i < len(pattern):
+                char = pattern[i]
+                if pattern.startswith(("**\\", "**/"), i):
+                    source += r"(?:.*\\)?"
+                    i += 2
+                elif pattern.startswith("**", i):
+                    source += ".*"
+                    i += 1
+                elif char == "*":
+                    source += r"[^\\]*"
+                elif char == "?":
+                    source += r"[^\\]"
+                elif char in "\\/":
+                    source += r"\\"
+                else:
+                    source += re.escape(char)
+                i += 1
+
+        re.compile(AliasIndex.wrap_pattern(source, 0), re.IGNORECASE)
+        return source
+
+    @staticmethod
+    def wrap_pattern(source: str, index: int) -> str:
+        """
+        Wraps pattern regex source with the named group it's combined with other patterns in.
+        """
+        return f"(?P<{PATTERN_GROUP_PREFIX}{index}>{source})"
+
+    def add_pattern(self, pattern: str, alias: str):
+        with self._lock:
+            self._add_pattern(pattern, alias)
+
+    def _add_pattern(self, pattern: str, alias: str):
+        if pattern not in self._pattern_sources:
+            self._pattern_sources[pattern] = self.compile_pattern(pattern)
+        self._patterns.append((self._pattern_sources[pattern], alias))
+        self._compiled = False
+        self._memo.clear()
+
+    def set_patterns(self, patterns: dict[str, str]):
+        """
+        Replaces all patterns and recompiles the matcher.
+        Patterns that were already added before are not converted again.
+
+        :param patterns: {pattern: alias}
+        """
+        with self._lock:
+            self._patterns = []
+            self._pattern_sources = {pattern: self._pattern_sources[pattern]
+                                     for pattern in patterns if pattern in self._pattern_sources}
+            for pattern, alias in patterns.items():
+                self._add_pattern(pattern, alias)
+            self._memo.clear()  # `_add_pattern` is not called if all patterns were removed
+            self._compile_patterns()
+
+    def add(self, path: str | Path, alias: str):
+        with self._lock:
+            node = self._root
+            for part in self.split_path(path):
+                node = node.children.setdefault(part, AliasTrieNode())
+            node.alias = alias
+            self._memo.clear()
+
+    def remove(self, path: str | Path):
+        with self._lock:
+            node = self._root
+            for part in self.split_path(path):
+                node = node.children.get(part)
+                if node is None:
+                    return
+            node.alias = None
+            self._memo.clear()
+
+    def match(self, executable_path: str | Path) -> str | None:
+        """
+        Returns alias of the executable or of its closest parent folder. If there is no alias, returns None.
+        """
+        key = str(executable_path)
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+
+            alias = None
+            node = self._root
+            for part in self.split_path(key):
+                node = node.children.get(part)
+                if node is None:
+                    break
+                if node.alias is not None:
+                    alias = node.alias
+
+            if alias is None and self._patterns:
+                alias = self._match_pattern(key)
+
+            self._memo[key] = alias
+            return alias
+
+    def _compile_patterns(self):
+        try:
+            self._matcher = re.compile("|".join(self.wrap_pattern(source, index)
+                                                for index, (source, _) in enumerate(self._patterns)),
+                                       re.IGNORECASE)
+            self._pattern_matchers = []
+        except re.error:
+            self._matcher = None
+            self._pattern_matchers = [re.compile(source, re.IGNORECASE) for source, _ in self._patterns]
+        self._compiled = True
+
+    def _match_pattern(self, executable_path: str) -> str | None:
+        if not self._compiled:
+            self._compile_patterns()
+
+        executable_path = executable_path.replace("/", "\\")
+        if self._matcher is None:
+            for matcher, (_, alias) in zip(self._pattern_matchers, self._patterns):
+                if matcher.fullmatch(executable_path):
+                    return alias
+            return None
+
+        match = self._matcher.fullmatch(executable_path)
+        if match is None:
+            return None
+        return self._patterns[int(match.lastgroup[len(PATTERN_GROUP_PREFIX):])][1]
@@ -0,0 +1,141 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from .logs import _print
+
+from datetime import datetime
+from pathlib import Path
+from queue import Queue
+from threading import Lock, Thread
+from typing import Any, Callable
+import traceback
+
+
+class ClipSaveJob:
+    """
+    Everything that is needed to name and move a saved clip.
+    Collected in the OBS thread at the moment of saving, so the clip is named after the moment it was saved,
+    not after the moment it was finalized.
+    """
+    __slots__ = ("old_file_path", "mode", "filename_template", "executable_path", "scene_name", "save_time",
+                 "settings", "duration", "clips_base_path", "python_exe")
+
+    def __init__(self,
+                 old_file_path: str,
+                 mode: Any,
+                 filename_template: str,
+                 executable_path: Path | None,
+                 scene_name: str,
+                 save_time: datetime,
+                 settings: Any = None,
+                 duration: float | None = None,
+                 clips_base_path: Path | None = None,
+                 python_exe: str | None = None):
+        """
+        :param old_file_path: Path of the clip saved by OBS.
+        :param mode: Clip naming mode.
+        :param filename_template: Clip file name template.
+        :param executable_path: Executable the clip is related to (None if it's not needed).
+        :param scene_name: Current scene name.
+        :param save_time: Clip saving time.
+        :param settings: Script settings snapshot at the moment of saving.
+        :param duration: Approximate clip duration in seconds (None if unknown).
+        :param clips_base_path: Clips base folder (resolved in the OBS thread).
+        :param python_exe: pythonw.exe path for popup notifications (None if they are disabled).
+        """
+        self.old_file_path = old_file_path
+        self.mode = mode
+        self.filename_template = filename_template
+        self.executable_path = executable_path
+        self.scene_name = scene_name
+        self.save_time = save_time
+        self.settings = settings
+        self.duration = duration
+        self.clips_base_path = clips_base_path
+        self.python_exe = python_exe
+
+
+class ClipFinalizer:
+    """
+    Background worker with a jobs queue.
+    Finalizes saved clips (file system work and notifications) off the OBS main thread.
+
+    The queue is unbounded: jobs are submitted from the OBS thread, which must never wait,
+    and a clip saved by OBS must never be left unnamed. If jobs pile up (e.g. clips are copied to a slow disk),
+    `submit` reports the backlog so it can be shown in the logs.
+    If the worker is still busy when `stop` times out, it keeps running, and `start` doesn't start another one
+    (the running worker takes the new jobs instead of stopping).
+    """
+    def __init__(self, handler: Callable[[ClipSaveJob], Any], backlog_warning: int = 16):
+        """
+        :param handler: Function that finalizes the clip. Called in the worker thread.
+        :param backlog_warning: Amount of queued jobs from which `submit` reports the backlog.
+        """
+        self.handler = handler
+        self.backlog_warning = backlog_warning
+        self._queue: Queue[ClipSaveJob | Callable[[], Any] | int] = Queue()  # int: stop request ID
+        self._thread: Thread | None = None
+        self._stop_id: int | None = None  # ID of the last stop request (None if started again after it)
+        self._stop_counter = 0
+        self._lock = Lock()
+
+    def start(self):
+        with self._lock:
+            self._stop_id = None
+            if self._thread is not None:
+                return
+            self._thread = Thread(target=self._run, name="SmartReplaysClipFinalizer", daemon=True)
+            self._thread.start()
+
+    def submit(self, job: ClipSaveJob | Callable[[], Any]) -> bool:
+        """
+        Adds job (or a function, which is called in the worker thread in order with the jobs) to the queue.
+        Never blocks.
+
+        :return: False if there are `backlog_warning` or more jobs waiting in the queue.
+        """
+        self.start()
+        self._queue.put_nowait(job)
+        return self._queue.qsize() < self.backlog_warning
+
+    def stop(self, timeout: float = 5):
+        """
+        Finishes queued jobs and stops the worker.
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stop_counter += 1
+            self._stop_id = stop_id = self._stop_counter
+        self._queue.put(stop_id)
+        thread.join(timeout)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if isinstance(job, int):
+                with self._lock:
+                    if job == self._stop_id:  # the last stop request, and not started again after it
+                        self._thread = None
+                        break
+                continue
+
+            try:
+                if isinstance(job, ClipSaveJob):
+                    self.handler(job)
+                else:
+                    job()
+            except:
+                _print(traceback.format_exc())
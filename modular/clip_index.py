@@ -0,0 +1,295 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from .logs import _print
+
+from pathlib import Path
+from queue import Queue, Empty
+from threading import Thread
+from typing import Any, Callable
+import os
+import time
+import traceback
+
+
+CLIP_EXTENSIONS = (".mkv", ".mp4", ".mov", ".flv", ".ts")
+
+
+class ClipRecord:
+    """
+    A row of the clips index.
+    """
+    __slots__ = ("path", "alias", "exe_path", "scene", "mode", "saved_at", "size", "mtime_ns", "duration", "link")
+
+    def __init__(self,
+                 path: str,
+                 alias: str | None,
+                 exe_path: str | None,
+                 scene: str | None,
+                 mode: str | None,
+                 saved_at: float,
+                 size: int,
+                 mtime_ns: int,
+                 duration: float | None,
+                 link: str | None = None):
+        """
+        :param path: Clip file path.
+        :param alias: Clip name (alias, executable name or scene name).
+        :param exe_path: Executable the clip is related to.
+        :param scene: Scene name at the moment of saving.
+        :param mode: Clip naming mode name.
+        :param saved_at: Saving time (unix timestamp).
+        :param size: File size in bytes.
+        :param mtime_ns: File modification time (used by reconciliation).
+        :param duration: Clip duration in seconds (approximate).
+        :param link: Path of the clip link (in the links folder).
+        """
+        self.path = path
+        self.alias = alias
+        self.exe_path = exe_path
+        self.scene = scene
+        self.mode = mode
+        self.saved_at = saved_at
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.duration = duration
+        self.link = link
+
+    def as_tuple(self) -> tuple:
+        return tuple(getattr(self, i) for i in self.__slots__)
+
+
+class ClipIndex:
+    """
+    SQLite index of saved clips.
+
+    Records are written by a background thread in batched transactions
+    (everything added within `flush_interval`, up to `batch_size` records, is one transaction),
+    so saving a clip only puts a record in the queue.
+    `sqlite3` is imported in the worker thread, not at script load.
+    """
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    path TEXT PRIMARY KEY,
+    alias TEXT,
+    exe_path TEXT,
+    scene TEXT,
+    mode TEXT,
+    saved_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    duration REAL,
+    link TEXT
+);
+CREATE INDEX IF NOT EXISTS clips_alias_saved_at ON clips (alias, saved_at);
+CREATE INDEX IF NOT EXISTS clips_exe_path ON clips (exe_path);
+CREATE INDEX IF NOT EXISTS clips_saved_at ON clips (saved_at);
+"""
+
+    def __init__(self, path: str | Path, batch_size: int = 64, flush_interval: float = 0.5):
+        """
+        :param path: Database file path.
+        :param batch_size: Max amount of records written in one transaction.
+        :param flush_interval: Max time (in seconds) a record waits for other records before being written.
+        """
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Queue[ClipRecord | tuple | None] = Queue()
+        self._thread: Thread | None = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = Thread(target=self._run, name="SmartReplaysClipIndex", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """
+        Writes queued records and stops the worker.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def add(self, record: ClipRecord):
+        self.start()
+        self._queue.put(record)
+
+    def remove(self, paths: list[str | Path]):
+        """
+        Queues removing of the records of deleted clips.
+        """
+        self.start()
+        self._queue.put(("remove", [str(i) for i in paths]))
+
+    def reconcile(self,
+                  roots: list[str | Path],
+                  exclude: list[str | Path] = (),
+                  on_done: Callable[[dict[str, Any]], Any] | None = None):
+        """
+        Queues re-syncing of the index with the clip files:
+        new files are added, changed files (size / mtime) are updated, records of removed files are deleted.
+        Files with unchanged size and mtime are not touched.
+
+        New files are searched only in the clip folders - subfolders of `roots` (recursively).
+        Loose files in `roots` are never added: a clips folder can be the OBS recording folder,
+        so they can be recordings. Already indexed clips outside the clip folders are only checked.
+        The clip name of new files is unknown (folder names don't have to be clip names), so it's NULL.
+
+        :param roots: Clips base folders.
+        :param exclude: Folders to skip (e.g. links folder).
+        :param on_done: Called in the worker thread with reconciliation stats.
+        """
+        self.start()
+        self._queue.put(("reconcile", [str(i) for i in roots], [str(i) for i in exclude], on_done))
+
+    def query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        """
+        Executes a read query in the calling thread (using a separate connection).
+        """
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        import sqlite3
+
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(self.SCHEMA)
+        if "link" not in {row[1] for row in conn.execute("PRAGMA table_info(clips)")}:  # created by older versions
+            try:
+                conn.execute("ALTER TABLE clips ADD COLUMN link TEXT")
+            except sqlite3.OperationalError:  # added by another connection
+                pass
+        return conn
+
+    def _run(self):
+        try:
+            conn = self._connect()
+        except:
+            _print(traceback.format_exc())
+            return
+
+        running = True
+        while running:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while items[-1] is not None and len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except Empty:
+                    break
+
+            records = []
+            for item in items:
+                if item is None:
+                    running = False
+                elif isinstance(item, ClipRecord):
+                    records.append(item)
+                else:
+                    self._write(conn, records)
+                    records = []
+                    try:
+                        if item[0] == "remove":
+                            with conn:
+                                conn.executemany("DELETE FROM clips WHERE path = ?", [(i,) for i in item[1]])
+                        else:
+                            _, roots, exclude, on_done = item
+                            stats = self._reconcile(conn, roots, exclude)
+                            if on_done is not None:
+                                on_done(stats)
+                    except:
+                        _print(traceback.format_exc())
+            self._write(conn, records)
+        conn.close()
+
+    @staticmethod
+    def _write(conn, records: list[ClipRecord]):
+        if not records:
+            return
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [i.as_tuple() for i in records])
+        except:
+            _print(traceback.format_exc())
+
+    @staticmethod
+    def _scan(root: str, exclude: set[str]):
+        """
+        Yields clip files in the subfolders of the root (recursively). Files in the root itself are skipped.
+        """
+        folders = [root]
+        while folders:
+            folder = folders.pop()
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if os.path.normcase(entry.path) not in exclude:
+                                folders.append(entry.path)
+                        elif (folder != root and entry.name.lower().endswith(CLIP_EXTENSIONS)
+                              and entry.is_file(follow_symlinks=False)):
+                            yield entry
+            except OSError:
+                continue
+
+    def _reconcile(self, conn, roots: list[str], exclude: list[str]) -> dict[str, Any]:
+        start = time.perf_counter()
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in conn.execute("SELECT path, size, mtime_ns FROM clips")}
+        exclude = {os.path.normcase(os.path.abspath(i)) for i in exclude}
+
+        seen = set()
+        new, changed, removed = [], [], []
+        for root in roots:
+            for entry in self._scan(os.path.abspath(root), exclude):
+                seen.add(entry.path)
+                stat = entry.stat(follow_symlinks=False)
+                state = known.get(entry.path)
+                if state is None:
+                    new.append(ClipRecord(path=entry.path, alias=None, exe_path=None, scene=None, mode=None,
+                                          saved_at=stat.st_mtime, size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                                          duration=None))
+                elif state != (stat.st_size, stat.st_mtime_ns):
+                    changed.append((stat.st_size, stat.st_mtime_ns, entry.path))
+
+        # Indexed clips that are not in the clip folders (e.g. saved without a folder).
+        for path, state in known.items():
+            if path in seen:
+                continue
+            try:
+                stat = os.stat(path, follow_symlinks=False)
+            except FileNotFoundError:
+                removed.append((path,))
+                continue
+            except OSError:
+                continue
+            if state != (stat.st_size, stat.st_mtime_ns):
+                changed.append((stat.st_size, stat.st_mtime_ns, path))
+
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             [i.as_tuple() for i in new])
+            conn.executemany("UPDATE clips SET size = ?, mtime_ns = ? WHERE path = ?", changed)
+            conn.executemany("DELETE FROM clips WHERE path = ?", removed)
+
+        return {"scanned": len(seen), "added": len(new), "updated": len(changed), "removed": len(removed),
+                "time": time.perf_counter() - start}
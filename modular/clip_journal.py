@@ -0,0 +1,154 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from pathlib import Path
+from threading import Lock
+from typing import Any
+import json
+import os
+
+
+class ClipJournal:
+    """
+    Append-only write-ahead journal of clip moves (JSON lines, every line is fsynced).
+
+    Every clip move is an entry with steps:
+    PLANNED (source, destination and links folder are known) -> MOVED -> LINKING (link path is reserved)
+    -> DONE (link is created), or PLANNED -> FAILED.
+    Entries that are not DONE / FAILED after a crash are returned by `pending` and can be finished.
+    The journal is rewritten with pending entries only (compacted) every `compact_every` finished entries.
+    """
+    PLANNED = "planned"
+    MOVED = "moved"
+    LINKING = "linking"
+    DONE = "done"
+    FAILED = "failed"
+    FINISHED_STEPS = (DONE, FAILED)
+
+    def __init__(self, path: str | Path, compact_every: int = 500):
+        """
+        :param path: Journal file path.
+        :param compact_every: Amount of finished entries after which the journal is compacted.
+        """
+        self.path = Path(path)
+        self.compact_every = compact_every
+        self.errors = 0
+        self._finished_since_compact = 0
+        self._lock = Lock()
+        self._entries, last_id = self._read()  # {entry id: last record}, only pending ones
+        self._next_id = last_id + 1  # finished entries can still be in the journal (e.g. if compaction failed)
+        self._fd: int | None = None
+
+    def _read(self) -> tuple[dict[int, dict[str, Any]], int]:
+        """
+        Reads the journal.
+
+        :return: Pending entries and the highest entry ID in the journal (0 if it's empty).
+        """
+        entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:  # the last line can be incomplete after a crash
+                        continue
+                    entries[record["id"]] = {**entries.get(record["id"], {}), **record}
+        except FileNotFoundError:
+            pass
+        return ({entry_id: record for entry_id, record in entries.items()
+                 if record["step"] not in self.FINISHED_STEPS},
+                max(entries, default=0))
+
+    def _write(self, record: dict[str, Any]) -> bool:
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0))
+            os.write(self._fd, (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            os.fsync(self._fd)
+            return True
+        except OSError:
+            self.errors += 1
+            return False
+
+    def begin(self, src: str | Path, dst: str | Path, links_folder: str | Path | None, **data: Any) -> int:
+        """
+        Writes PLANNED step of a new entry.
+
+        :param src: Clip file path (saved by OBS).
+        :param dst: Reserved clip destination path.
+        :param links_folder: Folder for the clip link (None if links are disabled).
+        :param data: Additional entry fields (e.g. clip naming info to index the recovered clip).
+        :return: Entry ID.
+        """
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            record = {"id": entry_id, "step": self.PLANNED, "src": str(src), "dst": str(dst),
+                      "links_folder": str(links_folder) if links_folder else None, **data}
+            self._entries[entry_id] = record
+            self._write(record)
+        return entry_id
+
+    def step(self, entry_id: int, step: str, **data: str):
+        """
+        Writes the next step of the entry.
+
+        :param data: Additional entry fields (e.g. `link` for LINKING step).
+        """
+        with self._lock:
+            if entry_id not in self._entries:
+                return
+            self._write({"id": entry_id, "step": step, **data})
+            if step in self.FINISHED_STEPS:
+                del self._entries[entry_id]
+                self._finished_since_compact += 1
+                if self._finished_since_compact >= self.compact_every:
+                    self._compact()
+            else:
+                self._entries[entry_id].update(step=step, **data)
+
+    def pending(self) -> list[dict[str, Any]]:
+        """
+        Returns unfinished entries (records with the fields of PLANNED step and the last step).
+        """
+        with self._lock:
+            return [dict(record) for record in self._entries.values()]
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in self._entries.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._close()
+            os.replace(tmp_path, self.path)
+            self._finished_since_compact = 0
+        except OSError:
+            self.errors += 1
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
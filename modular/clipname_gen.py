@@ -13,9 +13,11 @@
 #  GNU Affero General Public License for more details.
 
 from .globals import VARIABLES, CONSTANTS, PN, ClipNamingModes
+from .alias_index import AliasIndex
 
 from .tech import get_active_window_pid, get_executable_path, _print
 from .obs_related import get_current_scene_name
+from .filename_template import compile_filename_template
 
 import obspython as obs
 from pathlib import Path
@@ -23,37 +25,51 @@ from datetime import datetime
 import traceback
 
 
-def gen_clip_base_name(mode: ClipNamingModes | None = None) -> str:
+def get_clip_executable_path(mode: ClipNamingModes) -> Path:
+    """
+    Returns the executable the clip is related to:
+    the one that was active most of the time during the clip recording for MOST_RECORDED_PROCESS mode,
+    the one of an active window for other modes.
+
+    :param mode: Clip naming mode.
+    """
+    if mode is ClipNamingModes.MOST_RECORDED_PROCESS and VARIABLES.clip_exe_history:
+        return VARIABLES.exe_interner.get_path(VARIABLES.clip_exe_history.most_common())
+
+    pid = get_active_window_pid()
+    executable_path = get_executable_path(pid)
+    _print(f"Current active window process ID: {pid}")
+    _print(f"Current active window executable: {executable_path}")
+    return executable_path
+
+
+def gen_clip_base_name(mode: ClipNamingModes | None = None,
+                       executable_path: Path | None = None,
+                       scene_name: str | None = None) -> str:
     """
     Generates the base name of the clip based on the selected naming mode.
     It does NOT generate a new path for the clip or filename, only its base name.
 
     :param mode: Clip naming mode. If None, the mode is fetched from the script config.
                  If a value is provided, it overrides the configs value.
+    :param executable_path: Executable the clip is related to (see `get_clip_executable_path`).
+                            If None, it is fetched when needed.
+    :param scene_name: Current scene name. If None, it is fetched when needed.
     :return: The base name of the clip based on the selected naming mode.
     """
     _print("Generating clip base name...")
-    mode = obs.obs_data_get_int(VARIABLES.script_settings, PN.PROP_CLIPS_NAMING_MODE) if mode is None else mode
-    mode = ClipNamingModes(mode)
+    mode = ClipNamingModes(VARIABLES.settings.clips_naming_mode if mode is None else mode)
 
     if mode in [ClipNamingModes.CURRENT_PROCESS, ClipNamingModes.MOST_RECORDED_PROCESS]:
         if mode is ClipNamingModes.CURRENT_PROCESS:
             _print("Clip file name depends on the name of an active app (.exe file name) at the moment of clip saving.")
-            pid = get_active_window_pid()
-            executable_path = get_executable_path(pid)
-            _print(f"Current active window process ID: {pid}")
-            _print(f"Current active window executable: {executable_path}")
-
         else:
             _print("Clip file name depends on the name of an app (.exe file name) "
                    "that was active most of the time during the clip recording.")
-            if VARIABLES.clip_exe_history:
-                executable_path = max(VARIABLES.clip_exe_history, key=VARIABLES.clip_exe_history.count)
-            else:
-                executable_path = get_executable_path(get_active_window_pid())
+        executable_path = executable_path or get_clip_executable_path(mode)
 
         _print(f'Searching for {executable_path} in aliases list...')
-        if alias := get_alias(executable_path, VARIABLES.aliases):
+        if alias := get_alias(executable_path, VARIABLES.aliases_index):
             _print(f'Alias found: {alias}.')
             return alias
         else:
@@ -63,73 +79,57 @@ def gen_clip_base_name(mode: ClipNamingModes | None = None) -> str:
 
     else:
         _print("Clip filename depends on the name of the current scene name.")
-        return get_current_scene_name()
+        return scene_name or get_current_scene_name()
 
 
-def get_alias(executable_path: str | Path, aliases_dict: dict[Path, str]) -> str | None:
+def get_alias(executable_path: str | Path, aliases_index: AliasIndex) -> str | None:
     """
-    Retrieves an alias for the given executable path from the provided dictionary.
+    Retrieves an alias for the given executable path from the provided aliases index.
 
-    The function first checks if the exact `executable_path` exists in `aliases_dict`.
-    If not, it searches for the closest parent directory that is present in the dictionary.
+    If the exact `executable_path` has an alias, returns it.
+    If not, returns the alias of the closest parent directory that is present in the index.
 
     :param executable_path: A file path or string representing the executable.
-    :param aliases_dict: A dictionary where keys are `Path` objects representing executable file paths
-                         or directories, and values are their corresponding aliases.
+    :param aliases_index: Aliases index built by `load_aliases`.
     :return: The corresponding alias if found, otherwise `None`.
     """
-    exe_path = Path(executable_path)
-    if exe_path in aliases_dict:
-        return aliases_dict[exe_path]
+    return aliases_index.match(executable_path)
 
-    for parent in exe_path.parents:
-        if parent in aliases_dict:
-            return aliases_dict[parent]
 
-
-
-def gen_filename(base_name: str, template: str, dt: datetime | None = None) -> str:
+def gen_filename(base_name: str,
+                 template: str,
+                 dt: datetime | None = None,
+                 scene: str = "",
+                 exe: str = "",
+                 counter: int = 0) -> str:
     """
     Generates a file name based on the template.
     If the template is invalid or formatting fails, raises ValueError.
     If the generated name contains prohibited characters, raises SyntaxError.
 
-    :param base_name: Base name for the file.
+    :param base_name: Base name for the file (%NAME).
     :param template: Template for generating the file name.
     :param dt: Optional datetime object; uses current time if None.
+    :param scene: Current scene name (%SCENE).
+    :param exe: Executable name (%EXE).
+    :param counter: Clip number (%COUNTER).
     :return: Formatted file name.
     """
-    if not template:
-        raise ValueError
-
-    dt = dt or datetime.now()
-    filename = template.replace("%NAME", base_name)
-
     try:
-        filename = dt.strftime(filename)
-    except Exception as e:
+        compiled_template = compile_filename_template(template)
+    except ValueError:
         _print(f"An error occurred while generating the file name using the template {template}.")
         _print(traceback.format_exc())
-        raise ValueError from e
+        raise
+    return compiled_template.render(dt, name=base_name, scene=scene, exe=exe, counter=counter)
 
-    if any(i in filename for i in CONSTANTS.FILENAME_PROHIBITED_CHARS):
-        raise SyntaxError
-    return filename
 
-
-def ensure_unique_filename(file_path: str | Path) -> Path:
+def reserve_unique_filename(file_path: str | Path) -> Path:
     """
-    Generates a unique filename by adding a numerical suffix if the file already exists.
+    Reserves a unique filename by adding a numerical suffix if the file already exists.
+    The name is reserved by creating an empty file, which should be replaced with the clip.
 
     :param file_path: A string or Path object representing the target file.
     :return: A unique Path object with a modified name if necessary.
     """
-    file_path = Path(file_path)
-    parent, stem, suffix = file_path.parent, file_path.stem, file_path.suffix
-    counter = 1
-
-    while file_path.exists():
-        file_path = parent / f"{stem} ({counter}){suffix}"
-        counter += 1
-
-    return file_path
+    return VARIABLES.filename_reserver.reserve(file_path)
@@ -0,0 +1,64 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from threading import Lock
+from typing import Any, Callable, Hashable, Iterable
+
+
+class ConfigCache:
+    """
+    Cache of OBS config values.
+
+    Keys are tuples, which second item is the config section name: (config type, section, param, value type),
+    so the values can be invalidated per section.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._values: dict[tuple[Hashable, ...], Any] = {}
+        self._generation = 0  # increased on every invalidation
+        self._lock = Lock()
+
+    def get(self, key: tuple[Hashable, ...], loader: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value. If it's not cached, loads it with `loader` and caches it.
+        """
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                return self._values[key]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+        with self._lock:
+            if generation == self._generation:  # don't cache the value if it was invalidated while loading
+                self._values[key] = value
+        return value
+
+    def invalidate(self, sections: Iterable[str] | None = None):
+        """
+        Removes cached values.
+
+        :param sections: Config sections to invalidate. If None, invalidates everything.
+        """
+        with self._lock:
+            self._generation += 1
+            if sections is None:
+                self._values.clear()
+                return
+
+            sections = set(sections)
+            for key in [key for key in self._values if key[1] in sections]:
+                del self._values[key]
@@ -40,3 +40,9 @@ class AliasInvalidFormat(AliasParsingError):
     """
     Exception raised when an alias is invalid format.
     """
+
+
+class AliasInvalidPattern(AliasInvalidFormat):
+    """
+    Exception raised when an alias wildcard or regex pattern cannot be compiled.
+    """
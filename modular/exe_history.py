@@ -0,0 +1,201 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from array import array
+from pathlib import Path
+
+
+class ExeInterner:
+    """
+    Interning table of executable paths.
+
+    Every unique executable path gets a small int ID, so the history stores integers
+    instead of thousands of `Path` objects. `Path` object is created only once per executable.
+    """
+    def __init__(self):
+        self._ids: dict[str, int] = {}  # {path/to/executable: ID}
+        self._paths: list[Path] = []  # ID -> Path(path/to/executable)
+
+    def intern(self, path: str | Path) -> int:
+        """
+        Returns ID of the executable path. Assigns a new one if the path is not interned yet.
+        """
+        path = str(path)
+        exe_id = self._ids.get(path)
+        if exe_id is None:
+            exe_id = len(self._paths)
+            self._ids[path] = exe_id
+            self._paths.append(Path(path))
+        return exe_id
+
+    def get_path(self, exe_id: int) -> Path:
+        return self._paths[exe_id]
+
+    def __len__(self):
+        return len(self._paths)
+
+
+class ExeHistory:
+    """
+    Sliding window of the executables (interned IDs) that were active during the replay buffer recording.
+
+    Works like `deque(maxlen=...)`, but also keeps per-executable counts up to date on every append / evict,
+    so the most recorded executable is available without scanning the window.
+
+    Samples are stored as a run-length encoded timeline: consecutive samples of the same executable
+    are merged into one run `(executable ID, start tick, duration)`, so memory usage depends on the amount
+    of app switches rather than on the buffer length.
+    Runs are kept in a ring of compact `array`s that grows only when it's full.
+    """
+    INITIAL_CAPACITY = 16
+
+    def __init__(self, maxlen: int):
+        """
+        :param maxlen: Max amount of samples in the window (replay buffer length in seconds).
+        """
+        self.maxlen = max(maxlen, 0)
+        self._capacity = self.INITIAL_CAPACITY
+        self._run_exes = array('I', [0]) * self._capacity
+        self._run_starts = array('I', [0]) * self._capacity
+        self._run_durations = array('I', [0]) * self._capacity
+        self._head = 0  # ring index of the oldest run
+        self._runs_amount = 0
+        self._length = 0
+        self._tick = 0  # tick of the next sample
+        self._counts = array('I')  # executable ID -> samples amount
+        self._last_seen = array('I')  # executable ID -> tick of the latest sample
+        self._buckets: dict[int, dict[int, None]] = {}  # {samples amount: {executable ID: None}} (ordered set)
+        self._max_count = 0
+
+    def append(self, exe_id: int):
+        """
+        Adds a new sample to the window. If the window is full, the oldest sample is evicted.
+        """
+        if not self.maxlen:
+            return
+
+        if self._length == self.maxlen:
+            self._evict_oldest()
+
+        last = (self._head + self._runs_amount - 1) % self._capacity
+        if self._runs_amount and self._run_exes[last] == exe_id:
+            self._run_durations[last] += 1
+        else:
+            if self._runs_amount == self._capacity:
+                self._grow()
+            index = (self._head + self._runs_amount) % self._capacity
+            self._run_exes[index] = exe_id
+            self._run_starts[index] = self._tick
+            self._run_durations[index] = 1
+            self._runs_amount += 1
+
+        self._increment(exe_id)
+        self._last_seen[exe_id] = self._tick
+        self._tick += 1
+        self._length += 1
+
+    def most_common(self) -> int | None:
+        """
+        Returns the executable ID with the most samples in the window.
+        If several executables have the same amount of samples, returns the one that was active most recently.
+        """
+        if not self._max_count:
+            return None
+        top = self._buckets[self._max_count]
+        if len(top) == 1:
+            return next(iter(top))
+        return max(top, key=self._last_seen.__getitem__)
+
+    def count(self, exe_id: int) -> int:
+        return self._counts[exe_id] if exe_id < len(self._counts) else 0
+
+    def runs(self) -> list[tuple[int, int, int]]:
+        """
+        Returns the timeline as a list of runs `(executable ID, start tick, duration)`, oldest first.
+        """
+        result = []
+        for i in range(self._runs_amount):
+            index = (self._head + i) % self._capacity
+            result.append((self._run_exes[index], self._run_starts[index], self._run_durations[index]))
+        return result
+
+    def clear(self):
+        self._head = 0
+        self._runs_amount = 0
+        self._length = 0
+        self._tick = 0
+        self._counts = array('I')
+        self._last_seen = array('I')
+        self._buckets.clear()
+        self._max_count = 0
+
+    def _grow(self):
+        order = [(self._head + i) % self._capacity for i in range(self._runs_amount)]
+        extra = array('I', [0]) * self._capacity
+        self._run_exes = array('I', (self._run_exes[i] for i in order)) + extra
+        self._run_starts = array('I', (self._run_starts[i] for i in order)) + extra
+        self._run_durations = array('I', (self._run_durations[i] for i in order)) + extra
+        self._head = 0
+        self._capacity *= 2
+
+    def _evict_oldest(self):
+        exe_id = self._run_exes[self._head]
+        self._run_starts[self._head] += 1
+        self._run_durations[self._head] -= 1
+        if not self._run_durations[self._head]:
+            self._head = (self._head + 1) % self._capacity
+            self._runs_amount -= 1
+        self._length -= 1
+        self._decrement(exe_id)
+
+    def _increment(self, exe_id: int):
+        if exe_id >= len(self._counts):
+            self._counts.extend([0] * (exe_id + 1 - len(self._counts)))
+            self._last_seen.extend([0] * (exe_id + 1 - len(self._last_seen)))
+
+        old_count = self._counts[exe_id]
+        new_count = old_count + 1
+        self._counts[exe_id] = new_count
+
+        if old_count:
+            self._remove_from_bucket(exe_id, old_count)
+        self._buckets.setdefault(new_count, {})[exe_id] = None
+
+        if new_count > self._max_count:
+            self._max_count = new_count
+
+    def _decrement(self, exe_id: int):
+        old_count = self._counts[exe_id]
+        new_count = old_count - 1
+        self._counts[exe_id] = new_count
+        self._remove_from_bucket(exe_id, old_count)
+
+        if new_count:
+            self._buckets.setdefault(new_count, {})[exe_id] = None
+
+        # Counts change by one at a time, so if the top bucket is gone, the next one is exactly one below.
+        if old_count == self._max_count and old_count not in self._buckets:
+            self._max_count = new_count
+
+    def _remove_from_bucket(self, exe_id: int, count: int):
+        bucket = self._buckets[count]
+        del bucket[exe_id]
+        if not bucket:
+            del self._buckets[count]
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return bool(self._length)
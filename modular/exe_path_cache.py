@@ -0,0 +1,63 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from collections import OrderedDict
+from typing import Any
+
+
+class ExePathCache:
+    """
+    Bounded LRU cache of process executable paths.
+
+    Entries are keyed by (PID, process start time), so a reused PID never returns a stale path,
+    and repeated lookups of the same process cost one cheap identity check instead of a full path query.
+    """
+    def __init__(self, backend: Any, maxsize: int = 64):
+        """
+        :param backend: Platform backend with `get_process_start_time(pid)` and `get_executable_path(pid)` methods.
+        :param maxsize: Max amount of cached processes.
+        """
+        self.backend = backend
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[tuple[int, int], str] = OrderedDict()
+
+    def get(self, pid: int) -> str:
+        """
+        Returns path of process's executable.
+
+        :param pid: process ID.
+        """
+        key = (pid, self.backend.get_process_start_time(pid))
+        path = self._cache.get(key)
+        if path is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return path
+
+        self.misses += 1
+        path = self.backend.get_executable_path(pid)
+        self._cache[key] = path
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return path
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._cache)
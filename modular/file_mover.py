@@ -0,0 +1,113 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from pathlib import Path
+import errno
+import os
+import sys
+
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024  # bytes
+
+
+def is_same_device(src: str | Path, dst_folder: str | Path) -> bool:
+    """
+    Checks whether the file and the folder are on the same device (so the file can be renamed into the folder).
+    """
+    return os.stat(src).st_dev == os.stat(dst_folder).st_dev
+
+
+def copy_file_data(src: str | Path, dst: str | Path, chunk_size: int = COPY_CHUNK_SIZE) -> int:
+    """
+    Copies file data and permission bits chunk by chunk and flushes it to the disk (fsync).
+    Uses zero-copy `os.copy_file_range` / `os.sendfile` where available, otherwise plain reads and writes.
+    If the destination file size doesn't match the source file size after copying, raises OSError.
+
+    :param src: Source file path.
+    :param dst: Destination file path (overwritten if exists).
+    :param chunk_size: Max amount of bytes copied at once.
+    :return: Amount of copied bytes.
+    """
+    fd_in = os.open(src, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        stat = os.fstat(fd_in)
+        size = stat.st_size
+        mode = stat.st_mode & 0o777
+        fd_out = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), mode)
+        try:
+            if hasattr(os, "fchmod"):  # the destination can be an existing (reserved) file with other permissions
+                os.fchmod(fd_out, mode)
+            copied = 0
+            if hasattr(os, "copy_file_range"):
+                try:
+                    while copied < size:
+                        n = os.copy_file_range(fd_in, fd_out, min(chunk_size, size - copied), copied, copied)
+                        if not n:
+                            break
+                        copied += n
+                except OSError:  # not supported for these file systems, try the next method
+                    pass
+
+            if copied < size and hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+                try:
+                    os.lseek(fd_out, copied, os.SEEK_SET)
+                    while copied < size:
+                        n = os.sendfile(fd_out, fd_in, copied, min(chunk_size, size - copied))
+                        if not n:
+                            break
+                        copied += n
+                except OSError:
+                    pass
+
+            if copied < size:
+                os.lseek(fd_in, copied, os.SEEK_SET)
+                os.lseek(fd_out, copied, os.SEEK_SET)
+                while chunk := os.read(fd_in, chunk_size):
+                    view = memoryview(chunk)
+                    while view:
+                        view = view[os.write(fd_out, view):]
+                    copied += len(chunk)
+
+            os.fsync(fd_out)
+            if os.fstat(fd_out).st_size != size:
+                raise OSError(f"Copied file size mismatch: {src} -> {dst}.")
+        finally:
+            os.close(fd_out)
+        os.utime(dst, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    finally:
+        os.close(fd_in)
+    return copied
+
+
+def move_file(src: str | Path, dst: str | Path, chunk_size: int = COPY_CHUNK_SIZE) -> str:
+    """
+    Moves the file. If the destination is on the same device, renames the file,
+    otherwise copies it (see `copy_file_data`) and removes the source file.
+
+    :param src: Source file path.
+    :param dst: Destination file path (replaced if exists).
+    :param chunk_size: Max amount of bytes copied at once.
+    :return: Used method: "rename" or "copy".
+    """
+    if is_same_device(src, Path(dst).parent):
+        try:
+            os.replace(src, dst)
+            return "rename"
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+
+    copy_file_data(src, dst, chunk_size)
+    os.remove(src)
+    return "copy"
@@ -0,0 +1,142 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+import os
+
+
+class FolderListing:
+    __slots__ = ("mtime_ns", "names", "counters")
+
+    def __init__(self, mtime_ns: int | None, names: set[str]):
+        self.mtime_ns = mtime_ns  # folder modification time the listing is valid for (None if there is no folder)
+        self.names = names  # {casefolded file name, ...}
+        self.counters: dict[tuple[str, str], int] = {}  # {(stem, suffix): next number to try}
+
+
+class FilenameReserver:
+    """
+    Allocates unique file names: `name.ext`, `name (1).ext`, `name (2).ext`, etc. (the lowest free number).
+
+    Each folder is listed with a single `os.scandir`, after that the names that are already taken
+    and the next number to try for every name are kept in memory, so allocation doesn't check names one by one.
+    The listing is only reused while the folder modification time is the one seen after the last reservation,
+    so names freed by deletion (by the user or the retention) are reused, as if the folder was checked every time.
+    Changes made by the script itself (replacing a reserved file with the clip) are marked with `changing`,
+    so saving clips into the same folder doesn't list it again.
+    At most `max_folders` listings are kept (least recently used ones are dropped).
+    The name is reserved by creating an empty file exclusively (O_CREAT | O_EXCL), so two saves
+    can never get the same name, even if files were added to the folder by someone else.
+    """
+    def __init__(self, max_folders: int = 32):
+        self.max_folders = max_folders
+        self._lock = Lock()
+        self._listings: OrderedDict[str, FolderListing] = OrderedDict()  # {folder: listing}
+
+    def reserve(self, file_path: str | Path) -> Path:
+        """
+        Reserves a unique file name by creating an empty file.
+        The caller should replace the file (`os.replace`) or remove it.
+
+        :param file_path: Desired file path.
+        :return: Reserved file path.
+        """
+        file_path = Path(file_path)
+        folder, stem, suffix = str(file_path.parent), file_path.stem, file_path.suffix
+        key = (stem.casefold(), suffix.casefold())
+
+        with self._lock:
+            listing = self._get_listing(folder)
+            counter = listing.counters.get(key, 0)
+
+            while True:
+                name = f"{stem}{suffix}" if not counter else f"{stem} ({counter}){suffix}"
+                counter += 1
+                if name.casefold() in listing.names:
+                    continue
+
+                path = file_path.parent / name
+                try:
+                    os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+                except FileExistsError:
+                    listing.names.add(name.casefold())
+                    continue
+
+                listing.names.add(name.casefold())
+                listing.counters[key] = counter
+                listing.mtime_ns = self._get_mtime(folder)  # changed by the file just created
+                return path
+
+    def release(self, file_path: str | Path):
+        """
+        Removes the reserved file (if it still exists).
+        """
+        file_path = Path(file_path)
+        with self._lock:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            if (listing := self._listings.get(str(file_path.parent))) is not None:
+                listing.names.discard(file_path.name.casefold())
+                listing.counters.clear()  # the freed number can be lower than the next ones
+
+    @contextmanager
+    def changing(self, folder: str | Path):
+        """
+        Marks the changes made to the folder within the block (e.g. replacing reserved files) as known,
+        so the folder listing stays valid. If the folder was changed by something else before the block
+        (or other names were reserved in it during the block), it will be listed again as usual.
+        """
+        folder = str(folder)
+        with self._lock:
+            listing = self._listings.get(folder)
+            valid = listing is not None and listing.mtime_ns is not None and listing.mtime_ns == self._get_mtime(folder)
+            mtime_ns = listing.mtime_ns if valid else None
+        try:
+            yield
+        finally:
+            if mtime_ns is not None:
+                with self._lock:
+                    if self._listings.get(folder) is listing and listing.mtime_ns == mtime_ns:
+                        listing.mtime_ns = self._get_mtime(folder)
+
+    @staticmethod
+    def _get_mtime(folder: str) -> int | None:
+        try:
+            return os.stat(folder).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _get_listing(self, folder: str) -> FolderListing:
+        mtime_ns = self._get_mtime(folder)
+        listing = self._listings.get(folder)
+        if listing is not None and listing.mtime_ns == mtime_ns:
+            self._listings.move_to_end(folder)
+            return listing
+
+        # The folder was changed by something else: list it again, numbers are searched from the start.
+        try:
+            with os.scandir(folder) as entries:
+                names = {entry.name.casefold() for entry in entries}
+        except FileNotFoundError:
+            names = set()
+        listing = self._listings[folder] = FolderListing(mtime_ns, names)
+        self._listings.move_to_end(folder)
+        while len(self._listings) > self.max_folders:
+            self._listings.popitem(last=False)
+        return listing
@@ -0,0 +1,148 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from .globals import CONSTANTS
+
+from datetime import datetime
+from functools import lru_cache
+
+
+class FilenameTemplate:
+    """
+    File name template parsed into a list of parts: literal chunks, strftime chunks and script variables.
+
+    The template is parsed and validated once, rendering just joins the parts.
+    strftime directives are validated by the platform's strftime, so platform-specific directives and flags
+    (`%#d` on Windows, `%-d`, `%e` on Linux / macOS) are accepted where they work, as with plain strftime.
+    If the template is invalid, raises ValueError.
+    If the template generates names with prohibited characters, raises SyntaxError.
+    """
+    TOKENS = ("%NAME", "%SCENE", "%EXE", "%COUNTER")
+    STRFTIME_FLAGS = "#-_0^"  # Windows (#) and glibc / BSD (-_0^) directive modifiers
+
+    LITERAL = 0
+    STRFTIME = 1
+    TOKEN = 2
+
+    def __init__(self, template: str):
+        if not template:
+            raise ValueError
+
+        self.template = template
+        self.parts: list[tuple[int, str]] = []  # [(part type, value), ...]
+        self.tokens: set[str] = set()
+
+        chunk = ""
+        chunk_has_directives = False
+        i = 0
+        while i < len(template):
+            token = next((t for t in self.TOKENS if template.startswith(t, i)), None)
+            if token is not None:
+                self._add_chunk(chunk, chunk_has_directives)
+                chunk, chunk_has_directives = "", False
+                self.parts.append((self.TOKEN, token))
+                self.tokens.add(token)
+                i += len(token)
+                continue
+
+            if template[i] == "%":
+                end = i + 2 if template.startswith(tuple(self.STRFTIME_FLAGS), i + 1) else i + 1
+                if template.startswith("%%", i):
+                    directive = "%%"
+                elif end < len(template) and template[end].isascii() and template[end].isalpha():
+                    directive = template[i:end + 1]
+                    self._check_directive(directive)
+                else:
+                    raise ValueError
+                chunk += directive
+                chunk_has_directives = True
+                i += len(directive)
+                continue
+
+            chunk += template[i]
+            i += 1
+        self._add_chunk(chunk, chunk_has_directives)
+
+    @staticmethod
+    def _check_directive(directive: str):
+        """
+        Raises ValueError if the platform's strftime doesn't support the directive
+        (it raises an error or leaves the directive as is).
+        """
+        try:
+            value = datetime.now().strftime(directive)
+        except Exception as e:
+            raise ValueError from e
+        if value == directive:
+            raise ValueError
+
+    def _add_chunk(self, chunk: str, has_directives: bool):
+        if not chunk:
+            return
+
+        if has_directives:
+            try:
+                sample = datetime.now().strftime(chunk)
+            except Exception as e:
+                raise ValueError from e
+            self.parts.append((self.STRFTIME, chunk))
+        else:
+            sample = chunk
+            self.parts.append((self.LITERAL, chunk))
+
+        if any(i in sample for i in CONSTANTS.FILENAME_PROHIBITED_CHARS):
+            raise SyntaxError
+
+    def uses(self, token: str) -> bool:
+        return token in self.tokens
+
+    def render(self,
+               dt: datetime | None = None,
+               name: str = "",
+               scene: str = "",
+               exe: str = "",
+               counter: int = 0) -> str:
+        """
+        Generates a file name.
+        If a variable value contains prohibited characters, raises SyntaxError.
+
+        :param dt: Optional datetime object; uses current time if None.
+        :param name: %NAME value.
+        :param scene: %SCENE value.
+        :param exe: %EXE value.
+        :param counter: %COUNTER value.
+        """
+        dt = dt or datetime.now()
+        values = {"%NAME": name, "%SCENE": scene, "%EXE": exe, "%COUNTER": str(counter)}
+
+        result = []
+        for part_type, value in self.parts:
+            if part_type == self.LITERAL:
+                result.append(value)
+            elif part_type == self.STRFTIME:
+                result.append(dt.strftime(value))
+            else:
+                value = values[value]
+                if any(i in value for i in CONSTANTS.FILENAME_PROHIBITED_CHARS):
+                    raise SyntaxError
+                result.append(value)
+        return "".join(result)
+
+
+@lru_cache(maxsize=32)
+def compile_filename_template(template: str) -> FilenameTemplate:
+    """
+    Returns compiled file name template. Compiled templates are cached per template string.
+    """
+    return FilenameTemplate(template)
@@ -12,27 +12,55 @@
 #  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 #  GNU Affero General Public License for more details.
 
+from .exe_history import ExeHistory, ExeInterner
+from .exe_path_cache import ExePathCache
+from .platform_backends import get_platform_backend
+from .alias_index import AliasIndex
+from .filename_reserver import FilenameReserver
+from .clip_journal import ClipJournal
+from .clip_index import ClipIndex
+from .retention import RetentionEngine
+from .link_strategies import LinkCreator
+from .clip_finalizer import ClipFinalizer
+from .save_requests import SaveRequestQueue
+from .scheduler import Scheduler
+from .notification_client import NotificationDaemonClient
+from .config_cache import ConfigCache
+from .tracing import Tracer
+
+import os
 import sys
 from enum import Enum
-import ctypes
 from threading import Lock
-from pathlib import Path
-from collections import deque, defaultdict
+from pathlib import Path, PurePath
+from collections import defaultdict
 import obspython as obs
 import re
 
-user32 = ctypes.windll.user32
-
 
 class CONSTANTS:
     VERSION = "1.0.8.2"
     OBS_VERSION_STRING = obs.obs_get_version_string()
     OBS_VERSION_RE = re.compile(r'(\d+)\.(\d+)\.(\d+)')
     OBS_VERSION = [int(i) for i in OBS_VERSION_RE.match(OBS_VERSION_STRING).groups()]
-    CLIPS_FORCE_MODE_LOCK = Lock()
     VIDEOS_FORCE_MODE_LOCK = Lock()
+    PLATFORM_BACKEND = get_platform_backend()
     FILENAME_PROHIBITED_CHARS = r'/\:"<>*?|%'
     PATH_PROHIBITED_CHARS = r'"<>*?|%'
+    PATTERN_PROHIBITED_CHARS = r'"<>|%'
+    SAVE_REQUEST_TIMEOUT = 30  # seconds
+    SCHEDULER_TICK = 50  # ms, used while a job is due within SCHEDULER_COARSE_TICK / 2
+    SCHEDULER_COARSE_TICK = 1000  # ms
+    SCRIPT_LOAD_TIME_BUDGET = 50  # ms
+    TRACE_ENV_ENABLED = bool(os.getenv("SMART_REPLAYS_TRACE"))
+    CLIP_JOURNAL_FILENAME = "clip_journal.jsonl"
+    CLIP_JOURNAL_COMPACT_EVERY = 500  # finished clip moves
+    CLIP_INDEX_FILENAME = "clips.sqlite3"
+    LAZY_MODULES = ("tkinter", "urllib.request", "webbrowser", "subprocess", "winsound", "sqlite3")  # imported on first use
+    RESTART_TIMEOUT = 10  # seconds
+    OUTPUT_CONFIG_SECTIONS = ("Output", "SimpleOutput", "AdvOut")
+    RESTART_RETRY_MIN_DELAY = 50  # ms
+    RESTART_RETRY_MAX_DELAY = 1000  # ms
     DEFAULT_FILENAME_FORMAT = "%NAME_%d.%m.%Y_%H-%M-%S"
     DEFAULT_ALIASES = (
         {"value": "C:\\Windows\\explorer.exe > Desktop", "selected": False, "hidden": False},
@@ -42,13 +70,39 @@ class CONSTANTS:
 
 class VARIABLES:
     update_available: bool = False
-    clip_exe_history: deque[Path, ...] | None = None
+    obs_config_cache: ConfigCache = ConfigCache()
+    tracer: Tracer = Tracer(enabled=CONSTANTS.TRACE_ENV_ENABLED)
+    exe_path_cache: ExePathCache = ExePathCache(CONSTANTS.PLATFORM_BACKEND)
+    exe_interner: ExeInterner = ExeInterner()
+    clip_exe_history: ExeHistory | None = None  # history of interned executable IDs
     video_exe_history: defaultdict[Path, int] | None = None  # {Path(path/to/executable): active_seconds_amount
     exe_path_on_video_stopping_event: Path | None = None
-    aliases: dict[Path, str] = {}
+    aliases: dict[PurePath, str] = {}  # {AliasIndex.normalize_path(path): alias}
+    alias_patterns: dict[str, str] = {}
+    alias_rows: list[tuple[str, PurePath | str, str]] = []  # [(alias row, normalized path or pattern, name), ...]
+    aliases_index: AliasIndex = AliasIndex()
     script_settings = None
+    settings = None  # ScriptSettings snapshot, rebuilt in script_load / script_update
     hotkey_ids: dict = {}
-    force_mode = None
+    scheduler: Scheduler = Scheduler()
+    scheduler_timer = None  # OBS timer callback that currently drives the scheduler
+    save_requests: SaveRequestQueue = SaveRequestQueue(timeout=CONSTANTS.SAVE_REQUEST_TIMEOUT)
+    filename_reserver: FilenameReserver = FilenameReserver()
+    link_creator: LinkCreator = LinkCreator(filename_reserver)
+    clip_journal: ClipJournal | None = None
+    clip_index: ClipIndex | None = None
+    retention: RetentionEngine = RetentionEngine()
+    clip_finalizer: ClipFinalizer | None = None
+    notification_daemon: NotificationDaemonClient = NotificationDaemonClient(__file__)
+    clip_counter: int = 0  # amount of clips saved since the script was loaded (%COUNTER)
+    restart_deadline: float | None = None  # time.monotonic() deadline of the restart in progress
+    replay_buffer_started_at: float | None = None  # time.monotonic() of the last replay buffer start
+    restart_stopped_at: float | None = None
+    restart_start_on_stop: bool = False  # the restart timed out while stopping, start the buffer when it's stopped
+    restart_retry_delay: int = CONSTANTS.RESTART_RETRY_MIN_DELAY
+    restart_count: int = 0
+    last_restart_gap: float | None = None  # stop -> start gap of the last restart (ms)
+    max_restart_gap: float = 0
 
 
 class ConfigTypes(Enum):
@@ -83,6 +137,7 @@ class PropertiesNames:
     GR_SOUND_NOTIFICATION_SETTINGS = "sound_notification_settings"
     GR_POPUP_NOTIFICATION_SETTINGS = "popup_notification_settings"
     GR_ALIASES_SETTINGS = "aliases_settings"
+    GR_RETENTION_SETTINGS = "retention_settings"
     GR_OTHER_SETTINGS = "other_settings"
 
     # Clips path settings
@@ -138,10 +193,23 @@ class PropertiesNames:
     PROP_ALIASES_IMPORT_PATH = "aliases_import_path"
     BTN_ALIASES_IMPORT = "aliases_import_btn"
 
+    # Retention settings
+    TXT_RETENTION_DESC = "retention_desc"
+    PROP_RETENTION_MAX_AGE = "retention_max_age"
+    PROP_RETENTION_MAX_SIZE = "retention_max_size"
+    PROP_RETENTION_MAX_COUNT = "retention_max_count"
+    PROP_RETENTION_POLICIES = "retention_policies"
+    TXT_RETENTION_POLICIES_ERR = "retention_policies_err"
+
     # Other section
     PROP_RESTART_BUFFER = "restart_buffer"
     PROP_RESTART_BUFFER_LOOP = "restart_buffer_loop"
     TXT_RESTART_BUFFER_LOOP = "restart_buffer_loop_desc"
+    PROP_SAVE_COALESCE_WINDOW = "save_coalesce_window"
+    TXT_SAVE_COALESCE_WINDOW = "save_coalesce_window_desc"
+    PROP_TRACING = "tracing"
+    BTN_EXPORT_TRACE = "export_trace_btn"
+    BTN_RECONCILE_CLIP_INDEX = "reconcile_clip_index_btn"
 
     # Hotkeys
     HK_SAVE_BUFFER_MODE_1 = "save_buffer_force_mode_1"
@@ -0,0 +1,128 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from .filename_reserver import FilenameReserver
+from .file_mover import copy_file_data
+
+from pathlib import Path
+from threading import Lock
+import errno
+import itertools
+import os
+import sys
+
+
+class LinkCreator:
+    """
+    Creates "links" to clips in the links folder using the first strategy that works:
+    hard link -> reflink (copy-on-write clone, Linux FICLONE) -> symbolic link -> copy.
+
+    The strategy that worked is cached per (clip device, links folder device),
+    so in the common case creating a link costs one syscall.
+    The cache only moves to a fallback strategy if the previous ones failed because of the devices
+    (not supported, cross-device, not permitted), not because of the file itself.
+    Link names are reserved with `FilenameReserver`, so existing files are never overwritten.
+    """
+    HARDLINK = "hardlink"
+    REFLINK = "reflink"
+    SYMLINK = "symlink"
+    COPY = "copy"
+    STRATEGIES = (HARDLINK, REFLINK, SYMLINK, COPY)
+
+    FICLONE = 0x40049409  # linux/fs.h
+    DEVICE_ERRNOS = {errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOSYS, errno.ENOTTY}
+    ERROR_PRIVILEGE_NOT_HELD = 1314  # Windows: symbolic links require a privilege
+
+    def __init__(self, reserver: FilenameReserver):
+        self.reserver = reserver
+        self._strategies: dict[tuple[int, int], str] = {}  # {(clip device, links folder device): strategy}
+        self._lock = Lock()
+        self._tmp_counter = itertools.count()
+
+    @classmethod
+    def is_device_error(cls, error: OSError) -> bool:
+        """
+        Checks whether the error means the strategy doesn't work for these devices at all.
+        """
+        return error.errno in cls.DEVICE_ERRNOS or getattr(error, "winerror", None) == cls.ERROR_PRIVILEGE_NOT_HELD
+
+    def create(self,
+               file_path: str | Path,
+               links_folder: str | Path,
+               link_path: str | Path | None = None) -> tuple[Path, str]:
+        """
+        Creates a link for `file_path` in `links_folder`.
+        If all strategies fail, raises OSError (and releases the link path).
+
+        :param link_path: Already reserved link path. If None, a unique name in `links_folder` is reserved.
+        :return: Link path and the strategy used.
+        """
+        file_path, links_folder = Path(file_path), Path(links_folder)
+        os.makedirs(links_folder, exist_ok=True)
+        devices = (os.stat(file_path).st_dev, os.stat(links_folder).st_dev)
+
+        with self._lock:
+            cached = self._strategies.get(devices)
+        strategies = self.STRATEGIES if cached is None else self.STRATEGIES[self.STRATEGIES.index(cached):]
+
+        link_path = Path(link_path) if link_path else self.reserver.reserve(links_folder / file_path.name)
+        errors: list[tuple[str, OSError]] = []
+        for strategy in strategies:
+            try:
+                with self.reserver.changing(link_path.parent):
+                    getattr(self, f"_create_{strategy}")(file_path, link_path)
+            except OSError as e:
+                errors.append((strategy, e))
+                continue
+
+            # Per-file errors (e.g. a locked file) don't make the fallback the strategy for these devices.
+            if strategy != cached and all(self.is_device_error(e) for _, e in errors):
+                with self._lock:
+                    self._strategies[devices] = strategy
+            return link_path, strategy
+
+        self.reserver.release(link_path)
+        raise OSError(f"Cannot create link for {file_path} ({'; '.join(f'{s}: {e}' for s, e in errors)}).")
+
+    def _replace_with(self, link_path: Path, create):
+        """
+        Creates a link with a unique temporary name and atomically replaces the reserved (empty) file with it.
+        """
+        tmp_path = link_path.with_name(f".{link_path.name}.{os.getpid()}-{next(self._tmp_counter)}.tmp")
+        create(tmp_path)
+        try:
+            os.replace(tmp_path, link_path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+
+    def _create_hardlink(self, file_path: Path, link_path: Path):
+        self._replace_with(link_path, lambda tmp_path: os.link(file_path, tmp_path))
+
+    def _create_reflink(self, file_path: Path, link_path: Path):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOTSUP, "Reflinks are only supported on Linux.")
+
+        import fcntl
+
+        with open(file_path, "rb") as src, open(link_path, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), self.FICLONE, src.fileno())
+        st = os.stat(file_path)
+        os.utime(link_path, ns=(st.st_atime_ns, st.st_mtime_ns))  # as copies, so retention can recognize it
+
+    def _create_symlink(self, file_path: Path, link_path: Path):
+        self._replace_with(link_path, lambda tmp_path: os.symlink(file_path, tmp_path))
+
+    def _create_copy(self, file_path: Path, link_path: Path):
+        copy_file_data(file_path, link_path)
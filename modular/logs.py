@@ -0,0 +1,20 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from datetime import datetime
+
+
+def _print(*values, sep: str | None = None, end: str | None = None, file=None, flush: bool = False):
+    str_time = datetime.now().strftime(f"%d.%m.%Y %H:%M:%S")
+    print(f"[{str_time}]", *values, sep=sep, end=end, file=file, flush=flush)
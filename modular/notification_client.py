@@ -0,0 +1,75 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from threading import Lock
+import json
+
+
+class NotificationDaemonClient:
+    """
+    Sends pop-up notifications to the long-lived notification process (`smart_replays.py --daemon`).
+
+    The process is started on the first notification and restarted if it has exited
+    (e.g. after its idle timeout). Notifications are sent as JSON lines over its stdin.
+    If the process cannot be started (or exits right away), the notification is shown
+    by a separate one-shot process, as before the notification process existed.
+    """
+    def __init__(self, script_path: str):
+        """
+        :param script_path: Path of the script file that runs the notification process.
+        """
+        self.script_path = script_path
+        self.starts = 0
+        self.fallbacks = 0
+        self._process: "subprocess.Popen | None" = None
+        self._lock = Lock()
+
+    def send(self, python_exe: str, title: str, message: str, color: str = "#76B900"):
+        """
+        Shows a notification. Starts the notification process if it's not running.
+
+        :param python_exe: Python executable to run the notification process with.
+        """
+        import subprocess
+
+        data = (json.dumps({"title": title, "message": message, "color": color}) + "\n").encode("utf-8")
+
+        with self._lock:
+            for _ in range(2):  # the process may exit right before writing, then it's restarted once
+                try:
+                    if self._process is None or self._process.poll() is not None:
+                        self._process = subprocess.Popen([python_exe, self.script_path, "--daemon"],
+                                                         stdin=subprocess.PIPE)
+                        self.starts += 1
+
+                    self._process.stdin.write(data)
+                    self._process.stdin.flush()
+                    return
+                except OSError:
+                    self._process = None
+
+            self.fallbacks += 1
+        subprocess.Popen([python_exe, self.script_path, title, message, color])
+
+    def stop(self):
+        """
+        Closes the notification process stdin. The process exits after showing queued notifications.
+        """
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                try:
+                    self._process.stdin.close()
+                except OSError:
+                    pass
+            self._process = None
@@ -14,15 +14,17 @@
 
 from .globals import VARIABLES, PN, CONSTANTS, PopupPathDisplayModes
 from .tech import _print
-from .obs_related import get_replay_buffer_max_time, restart_replay_buffering
+from .obs_related import get_replay_buffer_max_time, start_replay_buffering_after_restart, finish_replay_buffering_restart
 from .script_helpers import notify
-from .other_callbacks import restart_replay_buffering_callback, append_clip_exe_history, append_video_exe_history
-from .save_buffer import move_clip_file
+from .other_callbacks import (restart_replay_buffering_callback, restart_replay_buffering_after_save, append_clip_exe_history,
+                              append_video_exe_history)
+from .save_buffer import create_clip_save_job, send_next_save_request
+from .exe_history import ExeHistory
 from pathlib import Path
 
 import obspython as obs
-from collections import deque, defaultdict
-from threading import Thread
+from collections import defaultdict
+import time
 import traceback
 
 
@@ -34,14 +36,20 @@ def on_buffer_recording_started_callback(event):
     if event is not obs.OBS_FRONTEND_EVENT_REPLAY_BUFFER_STARTED:
         return
 
+    VARIABLES.replay_buffer_started_at = time.monotonic()
+
     # Reset and restart exe history
-    VARIABLES.clip_exe_history = deque([], maxlen=get_replay_buffer_max_time())
-    _print(f"Exe history deque created. Maxlen={VARIABLES.clip_exe_history.maxlen}.")
-    obs.timer_add(append_clip_exe_history, 1000)
+    VARIABLES.clip_exe_history = ExeHistory(maxlen=get_replay_buffer_max_time())
+    _print(f"Exe history created. Maxlen={VARIABLES.clip_exe_history.maxlen}.")
+    VARIABLES.scheduler.add(append_clip_exe_history, 1000)
 
     # Start replay buffer auto restart loop.
-    if restart_loop_time := obs.obs_data_get_int(VARIABLES.script_settings, PN.PROP_RESTART_BUFFER_LOOP):
-        obs.timer_add(restart_replay_buffering_callback, restart_loop_time * 1000)
+    if restart_loop_time := VARIABLES.settings.restart_buffer_loop:
+        VARIABLES.scheduler.add_once(restart_replay_buffering_callback, restart_loop_time * 1000)
+
+    finish_replay_buffering_restart()
+    if VARIABLES.save_requests:  # hotkeys pressed while replay buffering was restarting
+        send_next_save_request()
 
 
 def on_buffer_recording_stopped_callback(event):
@@ -52,54 +60,90 @@ def on_buffer_recording_stopped_callback(event):
     if event is not obs.OBS_FRONTEND_EVENT_REPLAY_BUFFER_STOPPED:
         return
 
-    obs.timer_remove(append_clip_exe_history)
-    obs.timer_remove(restart_replay_buffering_callback)
+    VARIABLES.replay_buffer_started_at = None
+    VARIABLES.scheduler.remove(append_clip_exe_history)
+    VARIABLES.scheduler.remove(restart_replay_buffering_callback)
     VARIABLES.clip_exe_history.clear()
+    VARIABLES.scheduler.remove(send_next_save_request)
+    if VARIABLES.restart_deadline is not None or VARIABLES.restart_start_on_stop:
+        VARIABLES.save_requests.unsend()  # the clip is not saved, the request is sent again after the restart
+    else:
+        VARIABLES.save_requests.clear()
+    _print(f"Exe path cache stats: {VARIABLES.exe_path_cache.hits} hits, {VARIABLES.exe_path_cache.misses} misses.")
+    _print(f"OBS config cache stats: {VARIABLES.obs_config_cache.hits} hits, "
+           f"{VARIABLES.obs_config_cache.misses} misses.")
+    _print(f"Scheduler stats: {VARIABLES.scheduler.format_stats()}")
+
+    # Start replay buffering again if it was stopped by the script restart.
+    # It's started by a one-shot timer, not inside this event callback (OBS can hang in "stopping" state).
+    if VARIABLES.restart_deadline is not None or VARIABLES.restart_start_on_stop:
+        if VARIABLES.restart_deadline is not None and VARIABLES.restart_stopped_at is None:
+            VARIABLES.restart_stopped_at = time.monotonic()
+            _print("Replay buffering stopped.")
+        VARIABLES.scheduler.add_once(start_replay_buffering_after_restart, 0)
 
 
 def on_buffer_save_callback(event):
+    """
+    Collects clip info and passes the clip to the finalizer worker.
+    File system work and notifications are done off the OBS thread.
+    """
     if event is not obs.OBS_FRONTEND_EVENT_REPLAY_BUFFER_SAVED:
         return
 
-    path_display_type = obs.obs_data_get_int(VARIABLES.script_settings,
-                                             PN.PROP_POPUP_PATH_DISPLAY_MODE)
-    path_display_type = PopupPathDisplayModes(path_display_type)
-
     _print(f"{'SAVING BUFFER':->50}")
 
+    request = VARIABLES.save_requests.pop()
     try:
-        clip_name, path = move_clip_file(mode=VARIABLES.force_mode)
-        if obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_RESTART_BUFFER):
-            # IMPORTANT
-            # I don't know why, but it seems like stopping and starting replay buffering should be in the separate thread.
-            # Otherwise it can "stuck" on stopping.
-            Thread(target=restart_replay_buffering, daemon=True).start()
-
-        if VARIABLES.force_mode:
-            VARIABLES.force_mode = None
-            CONSTANTS.CLIPS_FORCE_MODE_LOCK.release()
-
-        notify(True, path, path_display_mode=path_display_type)
+        with VARIABLES.tracer.span("create_clip_save_job"):
+            job = create_clip_save_job(mode=request.mode if request else None)
     except:
-        _print("An error occurred while moving file to the new destination.")
+        _print("An error occurred while collecting clip info.")
         _print(traceback.format_exc())
-        notify(False, Path(), path_display_mode=path_display_type)
+        notify(False, Path())
+        job = None
+
+    send_next_save_request()  # the info of this clip is already collected
+
+    if job is not None:
+        if VARIABLES.settings.restart_buffer and not VARIABLES.save_requests:
+            # The buffer is stopped by a one-shot timer, not inside this event callback.
+            # Restarted only after the last queued clip is saved, so queued requests are not lost.
+            # Doesn't wait for the clip to be moved: OBS has already written the file, the restart doesn't touch it.
+            VARIABLES.scheduler.add_once(restart_replay_buffering_after_save, 0)
+
+        # Never finalized in the OBS thread: moving the clip can take long (copying to another disk).
+        if not VARIABLES.clip_finalizer.submit(job):
+            _print("WARNING: many clips are waiting to be finalized (renamed and moved), it can take a while.")
     _print("-" * 50)
 
 
+def on_config_changed_callback(event):
+    """
+    Invalidates cached OBS config values.
+    Everything is invalidated on profile change, output settings are invalidated when an output is starting
+    (OBS applies changed output settings on start).
+    """
+    if event in (obs.OBS_FRONTEND_EVENT_PROFILE_CHANGED, obs.OBS_FRONTEND_EVENT_PROFILE_RENAMED):
+        VARIABLES.obs_config_cache.invalidate()
+        _print("Profile changed, OBS config cache is cleared.")
+    elif event in (obs.OBS_FRONTEND_EVENT_REPLAY_BUFFER_STARTING, obs.OBS_FRONTEND_EVENT_RECORDING_STARTING):
+        VARIABLES.obs_config_cache.invalidate(CONSTANTS.OUTPUT_CONFIG_SECTIONS)
+
+
 def on_video_recording_started_callback(event):  # todo: for future updates
     if event is not obs.OBS_FRONTEND_EVENT_RECORDING_STARTED:
         return
 
     VARIABLES.video_exe_history = defaultdict(int)
-    obs.timer_add(append_video_exe_history, 1000)
+    VARIABLES.scheduler.add(append_video_exe_history, 1000)
 
 
 def on_video_recording_stopping_callback(event):  # todo: for future updates
     if event is not obs.OBS_FRONTEND_EVENT_RECORDING_STOPPING:
         return
 
-    obs.timer_remove(append_video_exe_history)
+    VARIABLES.scheduler.remove(append_video_exe_history)
 
 
 def on_video_recording_stopped_callback(event):  # todo: for future updates
@@ -12,7 +12,7 @@
 #  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 #  GNU Affero General Public License for more details.
 
-from .globals import PN, CONSTANTS, ConfigTypes
+from .globals import PN, CONSTANTS, VARIABLES, ConfigTypes
 from .tech import _print
 
 from pathlib import Path
@@ -24,17 +24,27 @@ import time
 def get_obs_config(section_name: str | None = None,
                    param_name: str | None = None,
                    value_type: type[str, int, bool, float] = str,
-                   config_type: ConfigTypes = ConfigTypes.PROFILE):
+                   config_type: ConfigTypes = ConfigTypes.PROFILE,
+                   use_cache: bool = True):
     """
     Gets a value from OBS config.
     If the value is not set, it will use the default value. If there is no default value, it will return NULL.
     If section_name or param_name are not specified, returns OBS config obj.
 
+    Values are cached in `VARIABLES.obs_config_cache` (it's invalidated on profile change and output start).
+
     :param section_name: Section name. If not specified, returns the OBS config.
     :param param_name: Parameter name. If not specified, returns the OBS config.
     :param value_type: Type of value (str, int, bool, float).
     :param config_type: Which config search in? (global / profile / user (obs v31 or higher)
+    :param use_cache: Whether to use cached value.
     """
+    if section_name and param_name and use_cache:
+        return VARIABLES.obs_config_cache.get(
+            (config_type, section_name, param_name, value_type),
+            lambda: get_obs_config(section_name, param_name, value_type, config_type, use_cache=False)
+        )
+
     if config_type is ConfigTypes.PROFILE:
         cfg = obs.obs_frontend_get_profile_config()
     elif config_type is ConfigTypes.APP:
@@ -117,17 +127,111 @@ def get_base_path(script_settings: Any | None = None) -> Path:
         return Path(get_obs_config("AdvOut", "RecFilePath"))
 
 
-def restart_replay_buffering():
+def restart_replay_buffering() -> bool:
     """
     Restarts replay buffering, obviously -_-
+
+    Only stops replay buffering here, it is started again when OBS reports it stopped
+    (see `start_replay_buffering_after_restart`). Only one restart can be in progress.
+    If the restart isn't finished within `CONSTANTS.RESTART_TIMEOUT` seconds, it's cancelled
+    and replay buffering is started one last time (see `restart_replay_buffering_timeout_callback`).
+
+    Called directly from scheduler jobs (OBS timer callbacks), not from a separate thread:
+    replay buffering used to get stuck at stopping because the callback waited for the output to stop,
+    blocking the thread that stops it. Here nothing waits: stopping is only requested,
+    and starting is done by a later job after OBS reports the buffer stopped.
+
+    :return: False if another restart is already in progress.
     """
+    if VARIABLES.restart_deadline is not None:
+        _print("Replay buffering restart is already in progress.")
+        return False
+
+    VARIABLES.restart_deadline = time.monotonic() + CONSTANTS.RESTART_TIMEOUT
+    VARIABLES.restart_stopped_at = None
+    VARIABLES.restart_start_on_stop = False
+    VARIABLES.restart_retry_delay = CONSTANTS.RESTART_RETRY_MIN_DELAY
+    VARIABLES.scheduler.add_once(restart_replay_buffering_timeout_callback, CONSTANTS.RESTART_TIMEOUT * 1000)
+
     _print("Stopping replay buffering...")
-    replay_output = obs.obs_frontend_get_replay_buffer_output()
     obs.obs_frontend_replay_buffer_stop()
+    return True
+
+
+def start_replay_buffering_after_restart():
+    """
+    Starts replay buffering stopped by `restart_replay_buffering`.
+    Scheduled (once) by replay buffer stopped event callback. If the output is not ready yet,
+    retries itself by the scheduler with exponential backoff.
+    """
+    VARIABLES.scheduler.remove(start_replay_buffering_after_restart)
+    if VARIABLES.restart_deadline is None:
+        if VARIABLES.restart_start_on_stop:
+            VARIABLES.restart_start_on_stop = False
+            _print("Replay buffering stopped after the restart timeout. Starting replay buffering...")
+            obs.obs_frontend_replay_buffer_start()
+        return
+
+    if VARIABLES.restart_stopped_at is None:
+        VARIABLES.restart_stopped_at = time.monotonic()
+        _print("Replay buffering stopped.")
+
+    replay_output = obs.obs_frontend_get_replay_buffer_output()
+    can_start = obs.obs_output_can_begin_data_capture(replay_output, 0)
+    obs.obs_output_release(replay_output)
+
+    if not can_start:
+        delay = VARIABLES.restart_retry_delay
+        VARIABLES.restart_retry_delay = min(delay * 2, CONSTANTS.RESTART_RETRY_MAX_DELAY)
+        _print(f"Replay buffer output is not ready yet. Next try in {delay} ms.")
+        VARIABLES.scheduler.add_once(start_replay_buffering_after_restart, delay)
+        return
 
-    while not obs.obs_output_can_begin_data_capture(replay_output, 0):
-        time.sleep(0.1)
-    _print("Replay buffering stopped.")
     _print("Starting replay buffering...")
     obs.obs_frontend_replay_buffer_start()
-    _print("Replay buffering started.")
+
+
+def finish_replay_buffering_restart():
+    """
+    Finishes the restart in progress and measures stop -> start gap.
+    Called from replay buffer started event callback.
+    """
+    VARIABLES.restart_start_on_stop = False
+    if VARIABLES.restart_deadline is None:
+        return
+
+    VARIABLES.scheduler.remove(restart_replay_buffering_timeout_callback)
+    if VARIABLES.restart_stopped_at is not None:
+        gap = (time.monotonic() - VARIABLES.restart_stopped_at) * 1000
+        VARIABLES.last_restart_gap = gap
+        VARIABLES.max_restart_gap = max(VARIABLES.max_restart_gap, gap)
+        VARIABLES.restart_count += 1
+        _print(f"Replay buffering restarted. Stop -> start gap: {gap:.1f} ms "
+               f"(max {VARIABLES.max_restart_gap:.1f} ms, {VARIABLES.restart_count} restarts).")
+    VARIABLES.restart_deadline = None
+    VARIABLES.restart_stopped_at = None
+
+
+def restart_replay_buffering_timeout_callback():
+    """
+    Cancels the restart in progress if it wasn't finished in time
+    and makes the last attempt to start replay buffering, so the restart never leaves it stopped:
+    if it's still stopping, it's started when OBS reports it stopped.
+
+    This callback is only called by the scheduler (once).
+    """
+    VARIABLES.scheduler.remove(start_replay_buffering_after_restart)
+    if VARIABLES.restart_deadline is None:
+        return
+
+    stage = "stopping" if VARIABLES.restart_stopped_at is None else "starting"
+    _print(f"Replay buffering restart timed out at {stage} stage.")
+    VARIABLES.restart_deadline = None
+    VARIABLES.restart_stopped_at = None
+
+    if obs.obs_frontend_replay_buffer_active():
+        _print("Replay buffering is still stopping, it will be started when it's stopped.")
+        VARIABLES.restart_start_on_stop = True
+    else:
+        _print("Starting replay buffering (last attempt)...")
+        obs.obs_frontend_replay_buffer_start()
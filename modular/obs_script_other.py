@@ -14,21 +14,30 @@
 
 from .globals import VARIABLES, CONSTANTS, ClipNamingModes, VideoNamingModes, PopupPathDisplayModes, PN
 
-from .tech import _print
+from .tech import _print, export_trace, get_script_data_dir
+from .settings_snapshot import ScriptSettings
 from .obs_related import get_base_path
-from .other_callbacks import restart_replay_buffering_callback, append_clip_exe_history
+from .other_callbacks import update_scheduler_timer, stop_scheduler_timer
 from .obs_events_callbacks import (on_buffer_save_callback,
                                    on_buffer_recording_started_callback,
                                    on_buffer_recording_stopped_callback,
+                                   on_config_changed_callback,
                                    on_video_recording_started_callback,
                                    on_video_recording_stopping_callback,
                                    on_video_recording_stopped_callback)
 from .updates_check import check_updates
 from .script_helpers import load_aliases
 from .hotkeys import load_hotkeys
+from .save_buffer import finalize_clip, finish_interrupted_clip_moves, configure_retention, load_retention_clips
+from .clip_journal import ClipJournal
+from .clip_index import ClipIndex
+from .clip_finalizer import ClipFinalizer
 
 import obspython as obs
+from functools import partial
 import json
+import sys
+import traceback
 
 
 def script_defaults(s):
@@ -51,6 +60,7 @@ def script_defaults(s):
 
     obs.obs_data_set_default_int(s, PN.PROP_RESTART_BUFFER_LOOP, 3600)
     obs.obs_data_set_default_bool(s, PN.PROP_RESTART_BUFFER, True)
+    obs.obs_data_set_default_int(s, PN.PROP_SAVE_COALESCE_WINDOW, 500)
 
     arr = obs.obs_data_array_create()
     for index, i in enumerate(CONSTANTS.DEFAULT_ALIASES):
@@ -61,10 +71,40 @@ def script_defaults(s):
     _print("The default values are set.")
 
 
+def apply_script_settings(settings):
+    """
+    Rebuilds the settings snapshot and applies the settings that are kept outside of it.
+    Nothing is rebuilt if the settings are unchanged.
+    """
+    VARIABLES.script_settings = settings
+    snapshot = ScriptSettings.from_obs_data_if_changed(settings, VARIABLES.settings)
+    if snapshot is VARIABLES.settings:
+        return
+    VARIABLES.settings = snapshot
+    VARIABLES.save_requests.coalesce_window = VARIABLES.settings.save_coalesce_window / 1000
+    VARIABLES.tracer.enabled = CONSTANTS.TRACE_ENV_ENABLED or VARIABLES.settings.tracing
+    configure_retention(VARIABLES.settings)
+
+
+def load_clip_journal():
+    """
+    Opens the clip moves journal. Interrupted moves are finished (and the journal is compacted)
+    by the clip finalizer worker, so it must be started already.
+    """
+    try:
+        journal = ClipJournal(get_script_data_dir() / CONSTANTS.CLIP_JOURNAL_FILENAME,
+                              compact_every=CONSTANTS.CLIP_JOURNAL_COMPACT_EVERY)
+        VARIABLES.clip_journal = journal
+        VARIABLES.clip_finalizer.submit(partial(finish_interrupted_clip_moves, journal, journal.pending()))
+    except:
+        _print("An error occurred while loading clip journal. Clip moves won't be journaled.")
+        _print(traceback.format_exc())
+
+
 def script_update(settings):
     _print("Updating script...")
 
-    VARIABLES.script_settings = settings
+    apply_script_settings(settings)
     _print(obs.obs_data_get_json(VARIABLES.script_settings))
     _print("Script updated")
 
@@ -80,30 +120,60 @@ def script_save(settings):
 
 def script_load(script_settings):
     _print("Loading script...")
-    VARIABLES.script_settings = script_settings
-    # VARIABLES.update_available = check_updates(CONSTANTS.VERSION)  # todo: for future updates
-
-    json_settings = json.loads(obs.obs_data_get_json(script_settings))
-    load_aliases(json_settings)
-
-    obs.obs_frontend_add_event_callback(on_buffer_save_callback)
-    obs.obs_frontend_add_event_callback(on_buffer_recording_started_callback)
-    obs.obs_frontend_add_event_callback(on_buffer_recording_stopped_callback)
-
-    # obs.obs_frontend_add_event_callback(on_video_recording_started_callback)  # todo: for future updates
-    # obs.obs_frontend_add_event_callback(on_video_recording_stopping_callback)  # todo: for future updates
-    # obs.obs_frontend_add_event_callback(on_video_recording_stopped_callback)  # todo: for future updates
-    load_hotkeys()
-
-    if obs.obs_frontend_replay_buffer_active():
-        on_buffer_recording_started_callback(obs.OBS_FRONTEND_EVENT_REPLAY_BUFFER_STARTED)
-
-    _print("Script loaded.")
+    timings = {}
+    with VARIABLES.tracer.span("script_load", timings):
+        apply_script_settings(script_settings)
+        # VARIABLES.update_available = check_updates(CONSTANTS.VERSION)  # todo: for future updates
+
+        json_settings = json.loads(obs.obs_data_get_json(script_settings))
+        with VARIABLES.tracer.span("load_aliases"):
+            load_aliases(json_settings)
+
+        VARIABLES.clip_index = ClipIndex(get_script_data_dir() / CONSTANTS.CLIP_INDEX_FILENAME)
+        VARIABLES.retention.load_clips = load_retention_clips
+
+        VARIABLES.clip_finalizer = ClipFinalizer(finalize_clip)
+        VARIABLES.clip_finalizer.start()
+        with VARIABLES.tracer.span("load_clip_journal"):
+            load_clip_journal()
+        VARIABLES.scheduler.on_change = update_scheduler_timer
+        update_scheduler_timer()
+
+        obs.obs_frontend_add_event_callback(on_buffer_save_callback)
+        obs.obs_frontend_add_event_callback(on_buffer_recording_started_callback)
+        obs.obs_frontend_add_event_callback(on_buffer_recording_stopped_callback)
+        obs.obs_frontend_add_event_callback(on_config_changed_callback)
+
+        # obs.obs_frontend_add_event_callback(on_video_recording_started_callback)  # todo: for future updates
+        # obs.obs_frontend_add_event_callback(on_video_recording_stopping_callback)  # todo: for future updates
+        # obs.obs_frontend_add_event_callback(on_video_recording_stopped_callback)  # todo: for future updates
+        with VARIABLES.tracer.span("load_hotkeys"):
+            load_hotkeys()
+
+        if obs.obs_frontend_replay_buffer_active():
+            on_buffer_recording_started_callback(obs.OBS_FRONTEND_EVENT_REPLAY_BUFFER_STARTED)
+
+    load_time = timings["script_load"]
+    _print(f"Script loaded in {load_time:.1f} ms (budget {CONSTANTS.SCRIPT_LOAD_TIME_BUDGET} ms).")
+    if load_time > CONSTANTS.SCRIPT_LOAD_TIME_BUDGET:
+        _print("WARNING: script loading took longer than expected.")
+    if loaded := [i for i in CONSTANTS.LAZY_MODULES if i in sys.modules]:
+        _print(f"Lazy modules already imported: {', '.join(loaded)}.")
 
 
 def script_unload():
-    obs.timer_remove(append_clip_exe_history)
-    obs.timer_remove(restart_replay_buffering_callback)
+    VARIABLES.scheduler.on_change = None
+    VARIABLES.scheduler.clear()
+    stop_scheduler_timer()
+    if VARIABLES.clip_finalizer is not None:
+        VARIABLES.clip_finalizer.stop()
+    if VARIABLES.clip_journal is not None:
+        VARIABLES.clip_journal.close()
+    if VARIABLES.clip_index is not None:
+        VARIABLES.clip_index.stop()
+    VARIABLES.notification_daemon.stop()
+    if VARIABLES.tracer.events:
+        export_trace()
 
     _print("Script unloaded.")
 
@@ -13,23 +13,71 @@
 #  GNU Affero General Public License for more details.
 
 
-from .globals import VARIABLES
+from .globals import VARIABLES, CONSTANTS
 from .obs_related import get_replay_buffer_max_time, restart_replay_buffering
-from .tech import get_time_since_last_input, get_active_window_pid, get_executable_path, _print
+from .tech import (get_time_since_last_input, get_active_window_pid, get_executable_path, get_executable_path_str,
+                   _print)
 
-import obspython as obs
-from threading import Thread
 from contextlib import suppress
+import obspython as obs
+
+
+def scheduler_tick_callback():
+    """
+    Runs scheduled script jobs. OBS timer, used while a job is due soon.
+    The timer is re-armed by the scheduler (see `update_scheduler_timer`).
+    """
+    VARIABLES.scheduler.tick()
+
+
+def scheduler_coarse_tick_callback():
+    """
+    Runs scheduled script jobs. OBS timer, used while no job is due soon.
+    """
+    VARIABLES.scheduler.tick(tolerance=CONSTANTS.SCHEDULER_COARSE_TICK / 2000)
+
+
+def update_scheduler_timer():
+    """
+    Switches the OBS timer that drives the scheduler depending on the nearest job deadline:
+    no timer if there are no jobs, fine timer if a job is due soon, coarse timer otherwise.
+    Called by the scheduler (`Scheduler.on_change`) after jobs are added or removed, and after each tick.
+    The scheduler never runs it in two threads at once, so only one OBS timer is armed.
+    """
+    interval = VARIABLES.scheduler.timer_interval(CONSTANTS.SCHEDULER_TICK, CONSTANTS.SCHEDULER_COARSE_TICK)
+    if interval is None:
+        timer = None
+    elif interval == CONSTANTS.SCHEDULER_TICK:
+        timer = scheduler_tick_callback
+    else:
+        timer = scheduler_coarse_tick_callback
+
+    if timer is VARIABLES.scheduler_timer:
+        return
+    stop_scheduler_timer()
+    if timer is not None:
+        obs.timer_add(timer, interval)
+        VARIABLES.scheduler_timer = timer
+
+
+def stop_scheduler_timer():
+    if VARIABLES.scheduler_timer is not None:
+        obs.timer_remove(VARIABLES.scheduler_timer)
+        VARIABLES.scheduler_timer = None
 
 
 def restart_replay_buffering_callback():
     """
-    Restarts replay buffering and adds itself to obs timer.
+    Restarts replay buffering or reschedules itself.
 
-    This callback is only called by the obs timer.
+    This callback is only called by the scheduler (once).
     """
     _print("Restart replay buffering callback.")
-    obs.timer_remove(restart_replay_buffering_callback)
+
+    if VARIABLES.save_requests:
+        _print("Queued clips are not saved yet. Next call in 2s.")
+        VARIABLES.scheduler.add_once(restart_replay_buffering_callback, 2000)
+        return
 
     replay_length = get_replay_buffer_max_time()
     last_input_time = get_time_since_last_input()
@@ -38,24 +86,33 @@ def restart_replay_buffering_callback():
         next_call = next_call if next_call >= 2000 else 2000
 
         _print(f"Replay length ({replay_length}s) is greater then time since last input ({last_input_time}s). Next call in {next_call / 1000}s.")
-        obs.timer_add(restart_replay_buffering_callback, next_call)
+        VARIABLES.scheduler.add_once(restart_replay_buffering_callback, next_call)
         return
 
-    # IMPORTANT
-    # I don't know why, but it seems like stopping and starting replay buffering should be in the separate thread.
-    # Otherwise it can "stuck" at stopping state.
-    Thread(target=restart_replay_buffering, daemon=True).start()
+    restart_replay_buffering()
     # I don't re-add this callback to timer again, cz it will be automatically added in on buffering start callback.
 
 
+def restart_replay_buffering_after_save():
+    """
+    Restarts replay buffering after clip saving.
+    Skipped if a clip was requested after the saved one: the restart is scheduled again when that clip is saved.
+
+    This callback is only called by the scheduler (once).
+    """
+    if VARIABLES.save_requests:
+        return
+    restart_replay_buffering()
+
+
 def append_clip_exe_history():
     """
     Adds current active executable path in clip exe history.
     """
     with suppress(Exception):
         pid = get_active_window_pid()
-        exe = get_executable_path(pid)
-        VARIABLES.clip_exe_history.appendleft(exe)
+        exe_id = VARIABLES.exe_interner.intern(get_executable_path_str(pid))
+        VARIABLES.clip_exe_history.append(exe_id)
 
 
 def append_video_exe_history():
@@ -0,0 +1,229 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+import ctypes
+from ctypes import wintypes
+from pathlib import Path
+from contextlib import suppress
+import os
+import sys
+
+
+# Every backend implements the same set of primitives:
+#   get_active_window_pid() -> int
+#   get_process_start_time(pid) -> int
+#   get_executable_path(pid) -> str
+#   get_time_since_last_input() -> int
+#   play_sound(path)
+#
+# The backend is selected once, when the script is loaded, and its bound methods are used directly
+# (see tech.py), so per-sample calls don't pay for any dispatching.
+class WindowsBackend:
+    """
+    Platform primitives using WinAPI.
+    """
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    PROCESS_QUERY_INFORMATION = 0x0400
+    PROCESS_VM_READ = 0x0010
+
+    class LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.UINT),
+                    ("dwTime", wintypes.DWORD)]
+
+    def __init__(self):
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        self.psapi = ctypes.windll.psapi
+        self.kernel32.GetTickCount64.restype = ctypes.c_ulonglong
+
+    def get_active_window_pid(self) -> int:
+        """
+        Gets process ID of the current active window.
+        """
+        hwnd = self.user32.GetForegroundWindow()
+        pid = wintypes.DWORD()
+        self.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        return pid.value
+
+    def get_process_start_time(self, pid: int) -> int:
+        """
+        Gets process creation time (FILETIME as int). Together with PID it identifies the process.
+
+        :param pid: process ID.
+        """
+        process_handle = self.kernel32.OpenProcess(self.PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not process_handle:
+            raise OSError(f"Process {pid} does not exist.")
+
+        creation_time, exit_time, kernel_time, user_time = (wintypes.FILETIME() for _ in range(4))
+        result = self.kernel32.GetProcessTimes(process_handle,
+                                               ctypes.byref(creation_time),
+                                               ctypes.byref(exit_time),
+                                               ctypes.byref(kernel_time),
+                                               ctypes.byref(user_time))
+        self.kernel32.CloseHandle(process_handle)
+        if not result:
+            raise RuntimeError(f"Cannot get creation time for process {pid}.")
+        return (creation_time.dwHighDateTime << 32) | creation_time.dwLowDateTime
+
+    def get_executable_path(self, pid: int) -> str:
+        """
+        Gets path of process's executable.
+
+        :param pid: process ID.
+        """
+        process_handle = self.kernel32.OpenProcess(self.PROCESS_QUERY_INFORMATION | self.PROCESS_VM_READ,
+                                                   False, pid)
+        if not process_handle:
+            raise OSError(f"Process {pid} does not exist.")
+
+        filename_buffer = ctypes.create_unicode_buffer(260)  # Windows path is 260 characters max.
+        result = self.psapi.GetModuleFileNameExW(process_handle, None, filename_buffer, 260)
+        self.kernel32.CloseHandle(process_handle)
+        if result:
+            return filename_buffer.value
+        else:
+            raise RuntimeError(f"Cannot get executable path for process {pid}.")
+
+    def get_time_since_last_input(self) -> int:
+        """
+        Gets the time (in seconds) since the last mouse or keyboard input.
+        """
+        last_input_info = self.LASTINPUTINFO()
+        last_input_info.cbSize = ctypes.sizeof(self.LASTINPUTINFO)
+
+        if self.user32.GetLastInputInfo(ctypes.byref(last_input_info)):
+            current_time = self.kernel32.GetTickCount64()
+            idle_time_ms = current_time - last_input_info.dwTime
+            return idle_time_ms // 1000
+        return 0
+
+    def play_sound(self, path: str | Path):
+        """
+        Plays sound using windows engine.
+
+        :param path: path to sound (.wav)
+        """
+        import winsound
+
+        with suppress(Exception):
+            winsound.PlaySound(str(path), winsound.SND_ASYNC)
+
+
+class LinuxBackend:
+    """
+    Platform primitives using /proc.
+    Only process lookups are supported, active window and input tracking are not available.
+    """
+    def get_active_window_pid(self) -> int:
+        raise OSError("Active window lookup is not supported on this platform.")
+
+    def get_process_start_time(self, pid: int) -> int:
+        """
+        Gets process start time (in clock ticks since boot). Together with PID it identifies the process.
+
+        :param pid: process ID.
+        """
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read()
+        except FileNotFoundError:
+            raise OSError(f"Process {pid} does not exist.")
+
+        # Process name (2nd field) can contain spaces and brackets, so fields are counted from the last ')'.
+        # starttime is the 22nd field, i.e. the 20th one after the process name.
+        return int(stat[stat.rindex(b")") + 2:].split()[19])
+
+    def get_executable_path(self, pid: int) -> str:
+        """
+        Gets path of process's executable.
+
+        :param pid: process ID.
+        """
+        try:
+            return os.readlink(f"/proc/{pid}/exe")
+        except FileNotFoundError:
+            raise OSError(f"Process {pid} does not exist.")
+        except PermissionError:
+            raise RuntimeError(f"Cannot get executable path for process {pid}.")
+
+    def get_time_since_last_input(self) -> int:
+        return 0
+
+    def play_sound(self, path: str | Path):
+        pass
+
+
+class SyntheticBackend:
+    """
+    Deterministic backend for benchmarks and debugging.
+
+    Simulates a set of processes and switches the active one in a fixed order
+    every `switch_every` calls of `get_active_window_pid`.
+    """
+    def __init__(self,
+                 executables: list[str] | tuple[str, ...] = ("C:\\Windows\\explorer.exe",
+                                                            "C:\\Games\\Game\\game.exe",
+                                                            "C:\\Program Files\\Browser\\browser.exe"),
+                 switch_every: int = 60,
+                 idle_time: int = 0):
+        """
+        :param executables: Executable paths of the simulated processes. PIDs are assigned as 1000, 1001, ...
+        :param switch_every: Amount of active window lookups after which the next process becomes active.
+        :param idle_time: Value returned by `get_time_since_last_input`.
+        """
+        self.processes = {1000 + index: path for index, path in enumerate(executables)}
+        self.pids = list(self.processes)
+        self.switch_every = max(switch_every, 1)
+        self.idle_time = idle_time
+        self.calls = 0
+        self.played_sounds: list[str] = []
+
+    def get_active_window_pid(self) -> int:
+        pid = self.pids[(self.calls // self.switch_every) % len(self.pids)]
+        self.calls += 1
+        return pid
+
+    def get_process_start_time(self, pid: int) -> int:
+        if pid not in self.processes:
+            raise OSError(f"Process {pid} does not exist.")
+        return pid
+
+    def get_executable_path(self, pid: int) -> str:
+        if pid not in self.processes:
+            raise OSError(f"Process {pid} does not exist.")
+        return self.processes[pid]
+
+    def get_time_since_last_input(self) -> int:
+        return self.idle_time
+
+    def play_sound(self, path: str | Path):
+        self.played_sounds.append(str(path))
+
+
+def get_platform_backend() -> WindowsBackend | LinuxBackend | SyntheticBackend:
+    """
+    Returns backend for the current platform.
+    The backend can be overridden with SMART_REPLAYS_BACKEND environment variable (windows / linux / synthetic).
+    """
+    backends = {
+        "windows": WindowsBackend,
+        "linux": LinuxBackend,
+        "synthetic": SyntheticBackend
+    }
+
+    name = os.getenv("SMART_REPLAYS_BACKEND", "").lower()
+    if name not in backends:
+        name = "windows" if sys.platform == "win32" else "linux"
+    return backends[name]()
@@ -12,7 +12,7 @@
 #  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 #  GNU Affero General Public License for more details.
 
-from .globals import VARIABLES, PN, ClipNamingModes, VideoNamingModes, PopupPathDisplayModes
+from .globals import VARIABLES, CONSTANTS, PN, ClipNamingModes, VideoNamingModes, PopupPathDisplayModes
 from .properties_callbacks import (open_github_callback,
                                    update_notifications_menu_callback,
                                    import_aliases_from_json_callback,
@@ -21,7 +21,10 @@ from .properties_callbacks import (open_github_callback,
                                    check_filename_template_callback,
                                    update_aliases_callback,
                                    update_links_path_prop_visibility,
-                                   check_clips_links_folder_path_callback)
+                                   check_clips_links_folder_path_callback,
+                                   export_trace_callback,
+                                   reconcile_clip_index_callback,
+                                   update_retention_policies_callback)
 from .obs_related import get_base_path
 
 import obspython as obs
@@ -31,6 +34,12 @@ import sys
 variables_tip = """<table>
 <tr><th align='left'>%NAME</th><td> - name of the clip.</td></tr>
 
+<tr><th align='left'>%SCENE</th><td> - name of the current scene.</td></tr>
+
+<tr><th align='left'>%EXE</th><td> - name of the executable (.exe file name without extension).</td></tr>
+
+<tr><th align='left'>%COUNTER</th><td> - number of the clip since the script was loaded.</td></tr>
+
 <tr><th align='left'>%a</th><td> - Weekday as locale’s abbreviated name.<br/>
 Example: Sun, Mon, …, Sat (en_US); So, Mo, …, Sa (de_DE)</td></tr>
 
@@ -109,9 +118,9 @@ def setup_clip_paths_settings(group_obj):
     t = obs.obs_properties_add_text(
         props=group_obj,
         name=PN.TXT_CLIPS_BASE_PATH_WARNING,
-        description="The path must be on the same disk as the path for OBS records "
+        description="The path is not on the same disk as the path for OBS records "
                     "(File -> Settings -> Output -> Recording -> Recording Path).\n"
-                    "Otherwise, the script will not be able to move the clip to the correct folder.",
+                    "Clips will be copied to this disk, which takes longer than moving (OBS is not blocked).",
         type=obs.OBS_TEXT_INFO
     )
 
@@ -193,9 +202,9 @@ def setup_clip_paths_settings(group_obj):
     links_path_warn = obs.obs_properties_add_text(
         props=group_obj,
         name=PN.TXT_CLIPS_LINKS_FOLDER_PATH_WARNING,
-        description="The path must be on the same disk as the path for OBS records "
-                    "(File -> Settings -> Output -> Recording -> Recording Path).\n"
-                    "Otherwise, the script will not be able to create link to the file.",
+        description="Hard links can only be created on the same disk as the clips. "
+                    "Otherwise, the script creates a copy-on-write clone (if the file system supports it), "
+                    "a symbolic link or a copy of the clip.",
         type=obs.OBS_TEXT_INFO
     )
     obs.obs_property_text_set_info_type(links_path_warn, obs.OBS_TEXT_INFO_WARNING)
@@ -401,7 +410,10 @@ def setup_aliases_settings(group_obj):
     <div style="font-size: 14px">
     <span style="color: red">Invalid format.<br></span>
     <span style="color: orange">Required format: DISK:\\path\\to\\folder\\or\\executable > ClipName<br></span>
-    <span style="color: lightgreen">Example: C:\\Program Files\\Minecraft > Minecraft</span>
+    <span style="color: lightgreen">Example: C:\\Program Files\\Minecraft > Minecraft</span><br>
+    <span style="color: orange">Wildcard pattern: <code style="color: cyan">*</code> - any characters inside one folder name, <code style="color: cyan">**</code> - any characters, <code style="color: cyan">?</code> - one character.<br></span>
+    <span style="color: lightgreen">Example: *\\steamapps\\common\\*\\*.exe > SteamGames<br></span>
+    <span style="color: orange">Regex pattern: re:regular expression > ClipName</span>
     </div>""",
         type=obs.OBS_TEXT_INFO
     )
@@ -423,7 +435,9 @@ def setup_aliases_settings(group_obj):
         props=group_obj,
         name="temp",
         description="Format:  DISK:\\path\\to\\folder\\or\\executable > ClipName\n"
-                    f"Example: {sys.executable} > OBS",
+                    f"Example: {sys.executable} > OBS\n"
+                    "Wildcard and regex patterns are also supported: *\\steamapps\\common\\*\\*.exe > SteamGames, "
+                    "re:.*\\\\Epic Games\\\\.* > EpicGames",
         type=obs.OBS_TEXT_INFO
     )
     obs.obs_property_text_set_info_type(t, obs.OBS_TEXT_INFO_WARNING)
@@ -464,6 +478,75 @@ def setup_aliases_settings(group_obj):
     obs.obs_property_set_modified_callback(aliases_list, update_aliases_callback)
 
 
+def setup_retention_settings(group_obj):
+    obs.obs_properties_add_text(
+        props=group_obj,
+        name=PN.TXT_RETENTION_DESC,
+        description="The oldest clips are deleted after saving a new clip if the limits are exceeded "
+                    "(0 - no limit). Clip links are deleted together with the clips. "
+                    "The newest clip of each folder is never deleted.",
+        type=obs.OBS_TEXT_INFO
+    )
+
+    obs.obs_properties_add_int(
+        props=group_obj,
+        name=PN.PROP_RETENTION_MAX_AGE,
+        description="Max clip age (days)",
+        min=0, max=36500,
+        step=1
+    )
+
+    obs.obs_properties_add_int(
+        props=group_obj,
+        name=PN.PROP_RETENTION_MAX_SIZE,
+        description="Max total size of all clips (GB)",
+        min=0, max=1000000,
+        step=1
+    )
+
+    obs.obs_properties_add_int(
+        props=group_obj,
+        name=PN.PROP_RETENTION_MAX_COUNT,
+        description="Max amount of clips in a folder",
+        min=0, max=1000000,
+        step=1
+    )
+
+    err_text = obs.obs_properties_add_text(
+        props=group_obj,
+        name=PN.TXT_RETENTION_POLICIES_ERR,
+        description="""
+    <div style="font-size: 14px">
+    <span style="color: red">Invalid format.<br></span>
+    <span style="color: orange">Required format: ClipName > limits<br></span>
+    <span style="color: lightgreen">Example: Valorant > 7d 20GB 100</span>
+    </div>""",
+        type=obs.OBS_TEXT_INFO
+    )
+    obs.obs_property_set_visible(err_text, False)
+
+    policies_list = obs.obs_properties_add_editable_list(
+        props=group_obj,
+        name=PN.PROP_RETENTION_POLICIES,
+        description="",
+        type=obs.OBS_EDITABLE_LIST_TYPE_STRINGS,
+        filter=None,
+        default_path=None
+    )
+
+    obs.obs_properties_add_text(
+        props=group_obj,
+        name="retention_policies_format",
+        description="Own limits of clip folders: ClipName > limits\n"
+                    "Limits: 30d - max age (days), 20GB - max folder size (KB, MB, GB, TB), 100 - max amount of clips.\n"
+                    "Example: Valorant > 7d 20GB 100",
+        type=obs.OBS_TEXT_INFO
+    )
+
+    # ----- Callbacks -----
+    obs.obs_property_set_modified_callback(policies_list, update_retention_policies_callback)
+
+
 def setup_other_settings(group_obj):
     obs.obs_properties_add_text(
         props=group_obj,
@@ -488,44 +571,86 @@ To disable scheduled restarts, set the value to 0.""",
         description="Restart replay buffer after clip saving"
     )
 
+    obs.obs_properties_add_text(
+        props=group_obj,
+        name=PN.TXT_SAVE_COALESCE_WINDOW,
+        description="""Repeated presses of the same save hotkey within this time are merged into one clip.
+Presses of different hotkeys are never merged: each of them saves its own clip.""",
+        type=obs.OBS_TEXT_INFO
+    )
+
+    obs.obs_properties_add_int(
+        props=group_obj,
+        name=PN.PROP_SAVE_COALESCE_WINDOW,
+        description="Merge hotkey presses within (ms)",
+        min=0, max=5000,
+        step=50
+    )
 
-def script_properties():
-    p = obs.obs_properties_create()  # main properties object
+    obs.obs_properties_add_bool(
+        props=group_obj,
+        name=PN.PROP_TRACING,
+        description="Record performance trace (also enabled by SMART_REPLAYS_TRACE environment variable)"
+    )
 
-    # ----- Ungrouped properties -----
-    # Updates text
-    t = obs.obs_properties_add_text(p, 'check_updates', 'New update available', obs.OBS_TEXT_INFO)
-    obs.obs_property_set_visible(t, VARIABLES.update_available)
+    obs.obs_properties_add_button(
+        group_obj,
+        PN.BTN_EXPORT_TRACE,
+        "Export performance trace",
+        export_trace_callback,
+    )
 
-    # Like btn
     obs.obs_properties_add_button(
-        p,
-        "like_btn",
-        "🌟 Like this script? Star it! 🌟",
-        open_github_callback
-    )
-
-    # ----- Groups -----
-    clip_path_gr = obs.obs_properties_create()
-    # video_path_gr = obs.obs_properties_create()  # todo: for future updates
-    notification_gr = obs.obs_properties_create()
-    popup_gr = obs.obs_properties_create()
-    aliases_gr = obs.obs_properties_create()
-    other_gr = obs.obs_properties_create()
-
-    obs.obs_properties_add_group(p, PN.GR_CLIPS_PATH_SETTINGS, "Clip path settings", obs.OBS_GROUP_NORMAL, clip_path_gr)
-    # obs.obs_properties_add_group(p, PN.GR_VIDEOS_PATH_SETTINGS, "Video path settings", obs.OBS_GROUP_NORMAL, video_path_gr)   # todo: for future updates
-    obs.obs_properties_add_group(p, PN.GR_SOUND_NOTIFICATION_SETTINGS, "Sound notifications", obs.OBS_GROUP_CHECKABLE, notification_gr)
-    obs.obs_properties_add_group(p, PN.GR_POPUP_NOTIFICATION_SETTINGS, "Popup notifications", obs.OBS_GROUP_CHECKABLE, popup_gr)
-    obs.obs_properties_add_group(p, PN.GR_ALIASES_SETTINGS, "Aliases", obs.OBS_GROUP_NORMAL, aliases_gr)
-    obs.obs_properties_add_group(p, PN.GR_OTHER_SETTINGS, "Other", obs.OBS_GROUP_NORMAL, other_gr)
-
-    # ------ Setup properties ------
-    setup_clip_paths_settings(clip_path_gr)
-    # setup_video_paths_settings(video_path_gr)   # todo: for future updates
-    setup_notifications_settings(notification_gr)
-    setup_popup_notification_settings(popup_gr)
-    setup_aliases_settings(aliases_gr)
-    setup_other_settings(other_gr)
+        group_obj,
+        PN.BTN_RECONCILE_CLIP_INDEX,
+        "Reconcile clips index",
+        reconcile_clip_index_callback,
+    )
+
+
+def script_properties():
+    with VARIABLES.tracer.span("script_properties"):
+        # Output settings could be changed in OBS settings since the last time.
+        VARIABLES.obs_config_cache.invalidate(CONSTANTS.OUTPUT_CONFIG_SECTIONS)
+        p = obs.obs_properties_create()  # main properties object
+
+        # ----- Ungrouped properties -----
+        # Updates text
+        t = obs.obs_properties_add_text(p, 'check_updates', 'New update available', obs.OBS_TEXT_INFO)
+        obs.obs_property_set_visible(t, VARIABLES.update_available)
+
+        # Like btn
+        obs.obs_properties_add_button(
+            p,
+            "like_btn",
+            "🌟 Like this script? Star it! 🌟",
+            open_github_callback
+        )
+
+        # ----- Groups -----
+        clip_path_gr = obs.obs_properties_create()
+        # video_path_gr = obs.obs_properties_create()  # todo: for future updates
+        notification_gr = obs.obs_properties_create()
+        popup_gr = obs.obs_properties_create()
+        aliases_gr = obs.obs_properties_create()
+        retention_gr = obs.obs_properties_create()
+        other_gr = obs.obs_properties_create()
+
+        obs.obs_properties_add_group(p, PN.GR_CLIPS_PATH_SETTINGS, "Clip path settings", obs.OBS_GROUP_NORMAL, clip_path_gr)
+        # obs.obs_properties_add_group(p, PN.GR_VIDEOS_PATH_SETTINGS, "Video path settings", obs.OBS_GROUP_NORMAL, video_path_gr)   # todo: for future updates
+        obs.obs_properties_add_group(p, PN.GR_SOUND_NOTIFICATION_SETTINGS, "Sound notifications", obs.OBS_GROUP_CHECKABLE, notification_gr)
+        obs.obs_properties_add_group(p, PN.GR_POPUP_NOTIFICATION_SETTINGS, "Popup notifications", obs.OBS_GROUP_CHECKABLE, popup_gr)
+        obs.obs_properties_add_group(p, PN.GR_ALIASES_SETTINGS, "Aliases", obs.OBS_GROUP_NORMAL, aliases_gr)
+        obs.obs_properties_add_group(p, PN.GR_RETENTION_SETTINGS, "Clips retention", obs.OBS_GROUP_CHECKABLE, retention_gr)
+        obs.obs_properties_add_group(p, PN.GR_OTHER_SETTINGS, "Other", obs.OBS_GROUP_NORMAL, other_gr)
+
+        # ------ Setup properties ------
+        setup_clip_paths_settings(clip_path_gr)
+        # setup_video_paths_settings(video_path_gr)   # todo: for future updates
+        setup_notifications_settings(notification_gr)
+        setup_popup_notification_settings(popup_gr)
+        setup_aliases_settings(aliases_gr)
+        setup_retention_settings(retention_gr)
+        setup_other_settings(other_gr)
 
     return p
\ No newline at end of file
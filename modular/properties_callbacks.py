@@ -14,14 +14,15 @@
 
 from .exceptions import *
 from .globals import VARIABLES, CONSTANTS, PN
-from .clipname_gen import gen_filename
+from .filename_template import compile_filename_template
 from .obs_related import get_base_path
-from .script_helpers import load_aliases
+from .script_helpers import update_aliases
+from .tech import export_trace, _print
+from .retention import parse_retention_policy
 
 from datetime import datetime
 from pathlib import Path
 import obspython as obs
-import webbrowser
 import json
 import os
 
@@ -32,59 +33,92 @@ import os
 # data: script settings
 # Usually I don't use `data`, cuz we have script_settings global variable.
 def open_github_callback(*args):
+    import webbrowser
+
     webbrowser.open("https://github.com/qvvonk/smart_replays", 1)
 
 
+def export_trace_callback(*args):
+    """
+    Exports recorded trace spans (Chrome trace event format) to the script data folder.
+    """
+    export_trace()
+
+
+def reconcile_clip_index_callback(*args):
+    """
+    Re-syncs the clips index with the clip folders (in the background).
+    """
+    if VARIABLES.clip_index is None:
+        return
+
+    base_path = Path(VARIABLES.settings.clips_base_path) if VARIABLES.settings.clips_base_path else get_base_path()
+    exclude = [VARIABLES.settings.clips_links_folder_path] if VARIABLES.settings.clips_links_folder_path else []
+
+    def on_done(stats):
+        _print(f"Clips index reconciled in {stats['time']:.2f} s: {stats['scanned']} files scanned, "
+               f"{stats['added']} added, {stats['updated']} updated, {stats['removed']} removed.")
+
+    _print(f"Reconciling clips index with {base_path}...")
+    VARIABLES.clip_index.reconcile([base_path], exclude, on_done)
+
+
 def update_aliases_callback(p, prop, data):
     """
     Checks the list of aliases and updates aliases menu (shows / hides error texts).
+    Only changed aliases are validated, invalid ones are removed from the list.
     """
     invalid_format_err_text = obs.obs_properties_get(p, PN.TXT_ALIASES_INVALID_FORMAT)
     invalid_chars_err_text = obs.obs_properties_get(p, PN.TXT_ALIASES_INVALID_CHARACTERS)
     path_exists_err_text = obs.obs_properties_get(p, PN.TXT_ALIASES_PATH_EXISTS)
 
-    settings_json: dict = json.loads(obs.obs_data_get_json(data))
-    if not settings_json:
+    aliases_array = obs.obs_data_get_array(data, PN.PROP_ALIASES_LIST)
+    if aliases_array is None:
         return False
 
-    try:
-        load_aliases(settings_json)
-        obs.obs_property_set_visible(invalid_format_err_text, False)
-        obs.obs_property_set_visible(invalid_chars_err_text, False)
-        obs.obs_property_set_visible(path_exists_err_text, False)
-        return True
-
-    except AliasInvalidCharacters as e:
-        obs.obs_property_set_visible(invalid_format_err_text, False)
-        obs.obs_property_set_visible(invalid_chars_err_text, True)
-        obs.obs_property_set_visible(path_exists_err_text, False)
-        index = e.index
-
-    except AliasInvalidFormat as e:
-        obs.obs_property_set_visible(invalid_format_err_text, True)
-        obs.obs_property_set_visible(invalid_chars_err_text, False)
-        obs.obs_property_set_visible(path_exists_err_text, False)
-        index = e.index
-
-    except AliasPathAlreadyExists as e:
-        obs.obs_property_set_visible(invalid_format_err_text, False)
-        obs.obs_property_set_visible(invalid_chars_err_text, False)
-        obs.obs_property_set_visible(path_exists_err_text, True)
-        index = e.index
-
-    except AliasParsingError as e:
-        index = e.index
+    values = []
+    for index in range(obs.obs_data_array_count(aliases_array)):
+        alias_data = obs.obs_data_array_item(aliases_array, index)
+        values.append(obs.obs_data_get_string(alias_data, "value"))
+        obs.obs_data_release(alias_data)
 
+    errors = update_aliases(values)
     # If error in parsing
-    settings_json[PN.PROP_ALIASES_LIST].pop(index)
-    new_aliases_array = obs.obs_data_array_create()
+    for error in reversed(errors):
+        obs.obs_data_array_erase(aliases_array, error.index)
+    obs.obs_data_array_release(aliases_array)
+
+    error = errors[0] if errors else None
+    obs.obs_property_set_visible(invalid_format_err_text, isinstance(error, AliasInvalidFormat))
+    obs.obs_property_set_visible(invalid_chars_err_text, isinstance(error, AliasInvalidCharacters))
+    obs.obs_property_set_visible(path_exists_err_text, isinstance(error, AliasPathAlreadyExists))
+    return True
+
+
+def update_retention_policies_callback(p, prop, data):
+    """
+    Checks the list of retention policies. Invalid ones are removed from the list, error text is shown.
+    """
+    err_text = obs.obs_properties_get(p, PN.TXT_RETENTION_POLICIES_ERR)
+
+    policies_array = obs.obs_data_get_array(data, PN.PROP_RETENTION_POLICIES)
+    if policies_array is None:
+        return False
 
-    for index, alias in enumerate(settings_json[PN.PROP_ALIASES_LIST]):
-        alias_data = obs.obs_data_create_from_json(json.dumps(alias))
-        obs.obs_data_array_insert(new_aliases_array, index, alias_data)
+    invalid = []
+    for index in range(obs.obs_data_array_count(policies_array)):
+        policy_data = obs.obs_data_array_item(policies_array, index)
+        try:
+            parse_retention_policy(obs.obs_data_get_string(policy_data, "value"))
+        except ValueError:
+            invalid.append(index)
+        obs.obs_data_release(policy_data)
 
-    obs.obs_data_set_array(data, PN.PROP_ALIASES_LIST, new_aliases_array)
-    obs.obs_data_array_release(new_aliases_array)
+    for index in reversed(invalid):
+        obs.obs_data_array_erase(policies_array, index)
+    obs.obs_data_array_release(policies_array)
+
+    obs.obs_property_set_visible(err_text, bool(invalid))
     return True
 
 
@@ -96,7 +130,7 @@ def check_filename_template_callback(p, prop, data):
     error_text = obs.obs_properties_get(p, PN.TXT_CLIPS_FILENAME_TEMPLATE_ERR)
 
     try:
-        gen_filename("clipname", obs.obs_data_get_string(data, PN.PROP_CLIPS_FILENAME_TEMPLATE))
+        compile_filename_template(obs.obs_data_get_string(data, PN.PROP_CLIPS_FILENAME_TEMPLATE))
         obs.obs_property_set_visible(error_text, False)
     except:
         obs.obs_property_set_visible(error_text, True)
@@ -116,7 +150,7 @@ def update_links_path_prop_visibility(p, prop, data):
 def check_clips_links_folder_path_callback(p, prop, data):
     """
     Checks clips links folder path is in the same disk as OBS recordings path.
-    If it's not - sets OBS records path as base path for clips + '_links' and shows warning.
+    If it's not - shows warning (hard links are not possible, so other link types or copies are created).
     """
     warn_text = obs.obs_properties_get(p, PN.TXT_CLIPS_LINKS_FOLDER_PATH_WARNING)
 
@@ -124,12 +158,9 @@ def check_clips_links_folder_path_callback(p, prop, data):
     curr_path = Path(obs.obs_data_get_string(data, PN.PROP_CLIPS_LINKS_FOLDER_PATH))
 
     if not len(curr_path.parts) or obs_records_path.parts[0] == curr_path.parts[0]:
-        obs.obs_property_text_set_info_type(warn_text, obs.OBS_TEXT_INFO_WARNING)
+        obs.obs_property_text_set_info_type(warn_text, obs.OBS_TEXT_INFO_NORMAL)
     else:
-        obs.obs_property_text_set_info_type(warn_text, obs.OBS_TEXT_INFO_ERROR)
-        obs.obs_data_set_string(data,
-                                PN.PROP_CLIPS_LINKS_FOLDER_PATH,
-                                str(obs_records_path / '_links'))
+        obs.obs_property_text_set_info_type(warn_text, obs.OBS_TEXT_INFO_WARNING)
     return True
 
 
@@ -152,19 +183,15 @@ def update_notifications_menu_callback(p, prop, data):
 def check_base_path_callback(p, prop, data):
     """
     Checks base path is in the same disk as OBS recordings path.
-    If it's not - sets OBS records path as base path for clips and shows warning.
+    If it's not - shows warning (clips will be copied to the other disk instead of moving, which takes longer).
     """
     warn_text = obs.obs_properties_get(p, PN.TXT_CLIPS_BASE_PATH_WARNING)
 
     obs_records_path = Path(get_base_path())
     curr_path = Path(obs.obs_data_get_string(data, PN.PROP_CLIPS_BASE_PATH))
 
-    if not len(curr_path.parts) or obs_records_path.parts[0] == curr_path.parts[0]:
-        obs.obs_property_text_set_info_type(warn_text, obs.OBS_TEXT_INFO_WARNING)
-    else:
-        obs.obs_property_text_set_info_type(warn_text, obs.OBS_TEXT_INFO_ERROR)
-        obs.obs_data_set_string(data, PN.PROP_CLIPS_BASE_PATH, str(obs_records_path))
-        print("WARN")
+    same_disk = not len(curr_path.parts) or obs_records_path.parts[0] == curr_path.parts[0]
+    obs.obs_property_set_visible(warn_text, not same_disk)
     return True
 
 
@@ -0,0 +1,312 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from bisect import insort
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Iterable
+import os
+import re
+import stat
+import time
+
+
+SIZE_UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+RETENTION_TOKEN_RE = re.compile(r"^(\d+(?:\.\d+)?)(d|KB|MB|GB|TB)?$", re.IGNORECASE)
+
+
+class RetentionPolicy:
+    """
+    Clips retention limits. 0 means no limit.
+    """
+    __slots__ = ("max_age", "max_bytes", "max_count")
+
+    def __init__(self, max_age: float = 0, max_bytes: int = 0, max_count: int = 0):
+        """
+        :param max_age: Max clip age in seconds.
+        :param max_bytes: Max total size of clips in bytes.
+        :param max_count: Max amount of clips in a folder.
+        """
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.max_count = max_count
+
+    def __bool__(self):
+        return bool(self.max_age or self.max_bytes or self.max_count)
+
+    def __repr__(self):
+        return f"RetentionPolicy(max_age={self.max_age}, max_bytes={self.max_bytes}, max_count={self.max_count})"
+
+
+def parse_retention_policy(row: str) -> tuple[str, RetentionPolicy]:
+    """
+    Parses a folder policy row: `<clip name> > <limits>`, where limits are separated by spaces:
+    `30d` - max age in days, `20GB` (KB, MB, GB, TB) - max total size, `100` - max amount of clips.
+    If the row is invalid, raises ValueError.
+
+    :return: Clip name (folder name) and the policy.
+    """
+    name, sep, limits = row.rpartition(">")
+    name = name.strip()
+    if not sep or not name or not limits.strip():
+        raise ValueError(f"Invalid retention policy format: {row}.")
+
+    policy = RetentionPolicy()
+    for token in limits.split():
+        match = RETENTION_TOKEN_RE.match(token)
+        if match is None:
+            raise ValueError(f"Invalid retention limit: {token}.")
+        value, unit = float(match.group(1)), (match.group(2) or "").upper()
+        if unit == "D":
+            policy.max_age = value * 86400
+        elif unit:
+            policy.max_bytes = int(value * SIZE_UNITS[unit])
+        else:
+            policy.max_count = int(value)
+    return name, policy
+
+
+class RetentionEngine:
+    """
+    Deletes the oldest clips when folder or global limits are exceeded.
+
+    Only clips saved by the script are tracked: the clips folder can be the OBS recording folder,
+    so it's never scanned. The engine is seeded once (on the first `enforce`) with `load_clips` (the clips index),
+    then it's kept up to date with `note_clip` / `note_link`, so it keeps running per-folder totals.
+    Links are tracked by the clip they were made for and deleted together with the clip:
+    a hard link (or a copy) left in the links folder would keep the clip data on the disk.
+    A link is deleted only if it's still a link of the clip (a symlink to the clip, the same file or a copy).
+    The newest clip of each folder is never deleted.
+    Clips that cannot be deleted (e.g. opened in a player) stay tracked and are retried on the next `enforce`.
+    """
+    def __init__(self,
+                 delete: Callable[[str], object] = os.remove,
+                 load_clips: Callable[[], Iterable[tuple[str, float, int, str | None]]] | None = None):
+        """
+        :param delete: Function that deletes a file.
+        :param load_clips: Returns clips saved before: [(clip path, mtime, size, link path or None), ...].
+        """
+        self.delete = delete
+        self.load_clips = load_clips
+        self.root: str | None = None
+        self.global_policy = RetentionPolicy()
+        self.folder_policies: dict[str, RetentionPolicy] = {}
+        self.deleted_count = 0
+        self.freed_bytes = 0
+
+        self._lock = Lock()
+        self._loaded = False
+        self._clips: set[str] = set()
+        self._folders: dict[str, list[tuple[float, str, int]]] = {}  # {folder: [(mtime, path, size), ...] (oldest first)}
+        self._totals: dict[str, int] = {}  # {folder: total size}
+        self._links: dict[str, list[str]] = {}  # {clip path: [link path, ...]}
+
+    def configure(self,
+                  root: str | Path,
+                  global_policy: RetentionPolicy,
+                  folder_policies: dict[str, RetentionPolicy]):
+        """
+        Sets the clips folder and the policies. If the folder is changed, clips are reloaded on the next `enforce`.
+
+        :param root: Clips folder. Clips outside of it are not deleted.
+        :param global_policy: Max age and max amount of clips in a folder (used if the folder has no own limits)
+            and max total size of all clips.
+        :param folder_policies: Policies of clip folders {folder name: policy}.
+        """
+        root = os.path.abspath(root)
+        with self._lock:
+            if root != self.root:
+                self.root = root
+                self._reset()
+            self.global_policy = global_policy
+            self.folder_policies = folder_policies
+
+    def reset(self):
+        """
+        Forgets tracked clips, they are reloaded on the next `enforce`.
+        Should be called when clips are saved without `note_clip` (e.g. retention is disabled).
+        """
+        with self._lock:
+            self._reset()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._totals.values())
+
+    def folder_policy(self, folder: str) -> RetentionPolicy:
+        own = self.folder_policies.get(os.path.basename(folder), RetentionPolicy())
+        return RetentionPolicy(max_age=own.max_age or self.global_policy.max_age,
+                               max_bytes=own.max_bytes,
+                               max_count=own.max_count or self.global_policy.max_count)
+
+    def note_clip(self, path: str | Path):
+        """
+        Adds a new clip to the folder totals.
+        """
+        st = os.stat(path)
+        with self._lock:
+            self._add_clip(os.path.abspath(path), st.st_mtime, st.st_size)
+
+    def note_link(self, link_path: str | Path, clip_path: str | Path):
+        """
+        Adds a new link of the clip.
+        """
+        with self._lock:
+            self._add_link(os.path.abspath(link_path), os.path.abspath(clip_path))
+
+    def enforce(self, now: float | None = None) -> list[tuple[str, int, str | None]]:
+        """
+        Deletes the oldest clips until every limit is met.
+
+        :param now: Current time (unix timestamp).
+        :return: [(deleted clip path, freed bytes, error or None), ...]
+        """
+        now = time.time() if now is None else now
+        results = []
+        with self._lock:
+            if self.root is None:
+                return results
+            if not self._loaded:
+                self._load()
+
+            failed: dict[str, int] = {}  # {folder: amount of the oldest clips that cannot be deleted now}
+            for folder, entries in self._folders.items():
+                policy = self.folder_policy(folder)
+                # Clips that cannot be deleted stay in the folder, so only removed clips count towards the limit.
+                over_count = len(entries) - policy.max_count if policy.max_count else 0
+                while len(entries) - failed.get(folder, 0) > 1 and (
+                        (policy.max_age and now - entries[failed.get(folder, 0)][0] > policy.max_age) or
+                        over_count > 0 or
+                        (policy.max_bytes and self._totals[folder] > policy.max_bytes)):
+                    result = self._delete_oldest(folder, failed)
+                    results.append(result)
+                    if result[2] is None:
+                        over_count -= 1
+
+            if max_bytes := self.global_policy.max_bytes:
+                while self.total_bytes > max_bytes:
+                    candidates = [(entries[failed.get(folder, 0)][0], folder) for folder, entries in self._folders.items()
+                                  if len(entries) - failed.get(folder, 0) > 1]
+                    if not candidates:
+                        break
+                    results.append(self._delete_oldest(min(candidates)[1], failed))
+        return results
+
+    def _reset(self):
+        self._loaded = False
+        self._clips.clear()
+        self._folders.clear()
+        self._totals.clear()
+        self._links.clear()
+
+    def _load(self):
+        if self.load_clips is not None:
+            for path, mtime, size, link in self.load_clips():
+                path = os.path.abspath(path)
+                self._add_clip(path, mtime, size)
+                if link:
+                    self._add_link(os.path.abspath(link), path)
+        self._loaded = True
+
+    def _add_clip(self, path: str, mtime: float, size: int):
+        folder = os.path.dirname(path)
+        if path in self._clips or not os.path.normcase(folder + os.sep).startswith(os.path.normcase(self.root + os.sep)):
+            return
+        self._clips.add(path)
+        insort(self._folders.setdefault(folder, []), (mtime, path, size))
+        self._totals[folder] = self._totals.get(folder, 0) + size
+
+    def _add_link(self, link_path: str, clip_path: str):
+        links = self._links.setdefault(clip_path, [])
+        if link_path not in links:
+            links.append(link_path)
+
+    @staticmethod
+    def _is_link_of(link_path: str, link_st: os.stat_result, clip_path: str, clip_st: os.stat_result) -> bool:
+        """
+        Checks whether the file is still a link of the clip: a symlink to it, the same file (hard link) or a copy.
+        Copies (and reflinks) are made with the clip modification time, so a file is a copy only if both
+        its size and modification time match the clip (with FAT 2 seconds precision).
+        """
+        if stat.S_ISLNK(link_st.st_mode):
+            target = os.path.join(os.path.dirname(link_path), os.readlink(link_path))
+            return os.path.normcase(os.path.abspath(target)) == os.path.normcase(clip_path)
+        if not stat.S_ISREG(link_st.st_mode):
+            return False
+        if (link_st.st_dev, link_st.st_ino) == (clip_st.st_dev, clip_st.st_ino):
+            return True
+        return link_st.st_size == clip_st.st_size and abs(link_st.st_mtime - clip_st.st_mtime) <= 2
+
+    def _delete_oldest(self, folder: str, failed: dict[str, int]) -> tuple[str, int, str | None]:
+        """
+        Deletes the oldest clip of the folder (skipping the ones that failed to be deleted) and its links.
+        If the clip cannot be deleted (e.g. it's opened in a player), it's kept tracked
+        and skipped until the next `enforce`.
+
+        :param failed: {folder: amount of the oldest clips that cannot be deleted now}, updated on failure.
+        :return: Clip path, freed bytes and error (None if the clip is deleted).
+        """
+        index = failed.get(folder, 0)
+        mtime, path, size = self._folders[folder][index]
+
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:  # deleted by the user
+            self._forget_clip(folder, index)
+            return path, 0, None
+        except OSError as e:
+            failed[folder] = index + 1
+            return path, 0, str(e)
+
+        clip_links = []
+        for link in self._links.get(path, []):
+            try:
+                link_st = os.lstat(link)
+                if self._is_link_of(link, link_st, path, st):
+                    clip_links.append((link, link_st))
+            except OSError:  # removed or replaced by the user
+                continue
+
+        try:
+            self.delete(path)
+        except OSError as e:
+            failed[folder] = index + 1
+            return path, 0, str(e)
+        self._forget_clip(folder, index)
+
+        freed = 0
+        links_left = st.st_nlink - 1
+        for link, link_st in clip_links:
+            try:
+                self.delete(link)
+            except OSError:
+                continue
+            if stat.S_ISLNK(link_st.st_mode):
+                continue
+            if (link_st.st_dev, link_st.st_ino) == (st.st_dev, st.st_ino):
+                links_left -= 1
+            else:  # copy
+                freed += link_st.st_size
+        if links_left <= 0:  # no other hard links keep the data on the disk
+            freed += st.st_size
+
+        self.deleted_count += 1
+        self.freed_bytes += freed
+        return path, freed, None
+
+    def _forget_clip(self, folder: str, index: int):
+        mtime, path, size = self._folders[folder].pop(index)
+        self._totals[folder] -= size
+        self._clips.discard(path)
+        self._links.pop(path, None)
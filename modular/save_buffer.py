@@ -12,56 +12,414 @@
 #  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 #  GNU Affero General Public License for more details.
 
-from .globals import VARIABLES, CONSTANTS, PN, ClipNamingModes
-from .obs_related import get_last_replay_file_name, get_base_path
-from .clipname_gen import gen_clip_base_name, gen_filename, ensure_unique_filename
-from .tech import _print, create_hard_link
+from .globals import VARIABLES, CONSTANTS, PN, ClipNamingModes, PopupPathDisplayModes
+from .obs_related import get_last_replay_file_name, get_base_path, get_replay_buffer_max_time
+from .clipname_gen import gen_clip_base_name, gen_filename, reserve_unique_filename, get_clip_executable_path
+from .filename_template import compile_filename_template
+from .obs_related import get_current_scene_name
+from .script_helpers import notify, get_pythonw_path
+from .clip_finalizer import ClipSaveJob
+from .tech import _print
+from .file_mover import move_file
+from .clip_journal import ClipJournal
+from .clip_index import ClipRecord
+from .retention import RetentionPolicy, parse_retention_policy
 
+from datetime import datetime
 from pathlib import Path
 import obspython as obs
 import os
+import time
+import traceback
 
 
-def move_clip_file(mode: ClipNamingModes | None = None) -> tuple[str, Path]:
+def create_clip_save_job(mode: ClipNamingModes | None = None) -> ClipSaveJob:
+    """
+    Collects everything that is needed to name the clip at the moment of saving.
+    Should be called in the OBS thread, the job itself is finalized by `finalize_clip`.
+
+    :param mode: Clip naming mode. If None, the mode is fetched from the script config.
+    """
     old_file_path = get_last_replay_file_name()
     _print(f"Old clip file path: {old_file_path}")
 
-    clip_name = gen_clip_base_name(mode)
-    ext = old_file_path.split(".")[-1]
-    filename_template = obs.obs_data_get_string(VARIABLES.script_settings,
-                                                PN.PROP_CLIPS_FILENAME_TEMPLATE)
-    filename = gen_filename(clip_name, filename_template) + f".{ext}"
+    settings = VARIABLES.settings
+    mode = ClipNamingModes(settings.clips_naming_mode if mode is None else mode)
+    filename_template = settings.clips_filename_template
+    compiled_template = compile_filename_template(filename_template)
+
+    executable_path = None
+    if mode is not ClipNamingModes.CURRENT_SCENE or compiled_template.uses("%EXE"):
+        executable_path = get_clip_executable_path(mode)
+
+    scene_name = ""
+    if mode is ClipNamingModes.CURRENT_SCENE or compiled_template.uses("%SCENE"):
+        scene_name = get_current_scene_name()
+
+    duration = None
+    if VARIABLES.replay_buffer_started_at is not None:
+        duration = min(get_replay_buffer_max_time(), time.monotonic() - VARIABLES.replay_buffer_started_at)
+
+    # OBS config is read here, in the OBS thread, the job is finalized in the worker thread.
+    clips_base_path = Path(settings.clips_base_path) if settings.clips_base_path else get_base_path()
+    python_exe = get_pythonw_path() if settings.popup_notifications else None
+
+    return ClipSaveJob(old_file_path=old_file_path,
+                       mode=mode,
+                       filename_template=filename_template,
+                       executable_path=executable_path,
+                       scene_name=scene_name,
+                       save_time=datetime.now(),
+                       settings=settings,
+                       duration=duration,
+                       clips_base_path=clips_base_path,
+                       python_exe=python_exe)
+
+
+def move_clip_file(job: ClipSaveJob, timings: dict[str, float]) -> tuple[str, Path, Path | None]:
+    """
+    Renames and moves the clip, creates a link for it.
+
+    :param job: Clip save job.
+    :param timings: Dict where time (in ms) of each stage is written to.
+    :return: Clip name, new clip path and link path (None if the link is not created).
+    """
+    tracer = VARIABLES.tracer
+    with tracer.span("naming", timings):
+        with tracer.span("gen_clip_base_name"):
+            clip_name = gen_clip_base_name(job.mode, job.executable_path, job.scene_name)
+        ext = job.old_file_path.split(".")[-1]
+        VARIABLES.clip_counter += 1
+        with tracer.span("gen_filename"):
+            filename = gen_filename(clip_name, job.filename_template, job.save_time,
+                                    scene=job.scene_name,
+                                    exe=job.executable_path.stem if job.executable_path else "",
+                                    counter=VARIABLES.clip_counter) + f".{ext}"
+
+    with tracer.span("reserve", timings):
+        settings = job.settings
+        new_folder = job.clips_base_path
+        if settings.clips_save_to_folder:
+            new_folder = new_folder / clip_name
+
+        os.makedirs(str(new_folder), exist_ok=True)
+        new_path = new_folder / filename
+        new_path = reserve_unique_filename(new_path)
+        _print(f"New clip file path: {new_path}")
+
+    journal = VARIABLES.clip_journal
+    links_folder = settings.clips_links_folder_path if settings.clips_create_links else None
+    with tracer.span("journal", timings):
+        entry_id = journal.begin(job.old_file_path, new_path, links_folder,
+                                 alias=clip_name,
+                                 exe_path=str(job.executable_path) if job.executable_path else None,
+                                 scene=job.scene_name or None,
+                                 mode=job.mode.name,
+                                 saved_at=job.save_time.timestamp(),
+                                 duration=job.duration) if journal else None
+
+    with tracer.span("move", timings):
+        with VARIABLES.filename_reserver.changing(new_folder):
+            try:
+                method = move_file(job.old_file_path, new_path)
+            except:
+                VARIABLES.filename_reserver.release(new_path)
+                if journal:
+                    journal.step(entry_id, ClipJournal.FAILED)
+                raise
+            if journal:
+                journal.step(entry_id, ClipJournal.MOVED)
+            _print(f"Clip file successfully moved ({method}).")
+            os.utime(new_folder)
+
+    link_path = None
+    if links_folder:
+        with tracer.span("link", timings):
+            if (link_path := reserve_clip_link(new_path, links_folder)) is not None:
+                if journal:
+                    journal.step(entry_id, ClipJournal.LINKING, link=str(link_path))
+                link_path = create_clip_link(new_path, link_path)
+        if link_path is not None and settings.retention:
+            VARIABLES.retention.note_link(link_path, new_path)
+    if journal:
+        journal.step(entry_id, ClipJournal.DONE)
+    return clip_name, new_path, link_path
+
+
+def reserve_clip_link(clip_path: Path, links_folder: str | Path) -> Path | None:
+    """
+    Reserves a unique link name for the clip in the links folder. Errors are only logged: the clip is already saved.
+
+    :return: Reserved link path or None if the name is not reserved.
+    """
+    try:
+        os.makedirs(links_folder, exist_ok=True)
+        return VARIABLES.filename_reserver.reserve(Path(links_folder) / clip_path.name)
+    except:
+        _print("An error occurred while reserving clip link name.")
+        _print(traceback.format_exc())
+        return None
+
+
+def create_clip_link(clip_path: Path, link_path: Path) -> Path | None:
+    """
+    Creates a link for the clip at the reserved link path. Errors are only logged: the clip is already saved.
+
+    :return: Link path or None if the link is not created.
+    """
+    try:
+        link_path, strategy = VARIABLES.link_creator.create(clip_path, link_path.parent, link_path)
+        _print(f"Clip link created ({strategy}): {link_path}")
+        return link_path
+    except:
+        _print("An error occurred while creating clip link.")
+        _print(traceback.format_exc())
+        return None
+
+
+def is_clip_link_created(clip_path: Path, link_path: Path) -> bool:
+    """
+    Checks whether the link (symlink, hard link or a complete copy) of the clip is created at the reserved path.
+    """
+    try:
+        if link_path.is_symlink():
+            return Path(os.readlink(link_path)) == clip_path
+        return link_path.samefile(clip_path) or link_path.stat().st_size == clip_path.stat().st_size
+    except OSError:
+        return False
+
+
+def recover_clip_moves(journal: ClipJournal, entries: list[dict]) -> int:
+    """
+    Finishes clip moves that were interrupted (OBS crash, script unload) according to the journal:
+    moves the clip to its reserved path if it's still at the old path (or was copied partially),
+    creates missing links at their reserved paths, removes empty reserved files of clips that are lost.
+    Recovered clips are added to the clips index (and the retention engine).
 
-    new_folder = Path(get_base_path(script_settings=VARIABLES.script_settings))
-    if obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_CLIPS_SAVE_TO_FOLDER):
-        new_folder = new_folder / clip_name
+    :param journal: Clip journal.
+    :param entries: Pending journal entries (see `ClipJournal.pending`).
+    :return: Amount of processed entries.
+    """
+    for entry in entries:
+        src, dst = Path(entry["src"]), Path(entry["dst"])
+        _print(f"Recovering interrupted clip move ({entry['step']}): {src} -> {dst}")
+
+        if entry["step"] == ClipJournal.PLANNED:
+            try:
+                if src.exists():
+                    # dst is the reserved (empty) file or a partial copy.
+                    method = move_file(src, dst)
+                    _print(f"Clip file moved ({method}).")
+                elif not dst.exists() or not dst.stat().st_size:
+                    raise FileNotFoundError(f"Neither {src} nor {dst} contains the clip.")
+                journal.step(entry["id"], ClipJournal.MOVED)
+            except:
+                _print("Cannot recover clip move.")
+                _print(traceback.format_exc())
+                try:
+                    if not dst.stat().st_size:
+                        os.remove(dst)
+                except OSError:
+                    pass
+                journal.step(entry["id"], ClipJournal.FAILED)
+                continue
 
-    os.makedirs(str(new_folder), exist_ok=True)
-    new_path = new_folder / filename
-    new_path = ensure_unique_filename(new_path)
-    _print(f"New clip file path: {new_path}")
+        link_path = None
+        if entry["step"] == ClipJournal.LINKING:
+            link_path = Path(entry["link"])
+            if dst.exists() and not is_clip_link_created(dst, link_path):
+                link_path = create_clip_link(dst, link_path)
+            elif not dst.exists() and not link_path.is_symlink() and link_path.exists() and not link_path.stat().st_size:
+                VARIABLES.filename_reserver.release(link_path)  # empty reserved file (a copy can be the last one)
+        elif entry["links_folder"] and dst.exists():
+            if (link_path := reserve_clip_link(dst, entry["links_folder"])) is not None:
+                journal.step(entry["id"], ClipJournal.LINKING, link=str(link_path))
+                link_path = create_clip_link(dst, link_path)
+        journal.step(entry["id"], ClipJournal.DONE)
 
-    os.rename(old_file_path, str(new_path))
-    _print("Clip file successfully moved.")
-    os.utime(new_folder)
+        if dst.exists():
+            try:
+                index_recovered_clip(entry, dst, link_path)
+            except:
+                _print("An error occurred while indexing the recovered clip.")
+                _print(traceback.format_exc())
+    return len(entries)
 
-    if obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_CLIPS_CREATE_LINKS):
-        links_folder = obs.obs_data_get_string(VARIABLES.script_settings, PN.PROP_CLIPS_LINKS_FOLDER_PATH)
-        create_hard_link(new_path, links_folder)
-    return clip_name, new_path
+
+def index_recovered_clip(entry: dict, path: Path, link_path: Path | None):
+    """
+    Adds the clip moved by `recover_clip_moves` to the clips index and the retention engine.
+
+    :param entry: Journal entry (with the clip naming info written by `move_clip_file`).
+    :param path: Clip path.
+    :param link_path: Clip link path (None if there is no link).
+    """
+    stat = path.stat()
+    if VARIABLES.clip_index is not None:
+        VARIABLES.clip_index.add(ClipRecord(path=str(path),
+                                            alias=entry.get("alias"),
+                                            exe_path=entry.get("exe_path"),
+                                            scene=entry.get("scene"),
+                                            mode=entry.get("mode"),
+                                            saved_at=entry.get("saved_at") or stat.st_mtime,
+                                            size=stat.st_size,
+                                            mtime_ns=stat.st_mtime_ns,
+                                            duration=entry.get("duration"),
+                                            link=str(link_path) if link_path else None))
+
+    if VARIABLES.settings is not None and VARIABLES.settings.retention and entry.get("mode"):
+        VARIABLES.retention.note_clip(path)
+        if link_path is not None:
+            VARIABLES.retention.note_link(link_path, path)
+
+
+def finish_interrupted_clip_moves(journal: ClipJournal, entries: list[dict]):
+    """
+    Recovers interrupted clip moves and compacts the journal.
+    Called by the clip finalizer worker (before any clip saved after script loading is finalized),
+    so copying clips between disks doesn't block OBS.
+    """
+    if entries:
+        recover_clip_moves(journal, entries)
+        _print(f"{len(entries)} interrupted clip moves processed.")
+    journal.compact()
+
+
+def index_clip(job: ClipSaveJob, clip_name: str, path: Path, link_path: Path | None):
+    """
+    Queues the clip record to the clips index.
+    """
+    stat = path.stat()
+    VARIABLES.clip_index.add(ClipRecord(path=str(path),
+                                        alias=clip_name,
+                                        exe_path=str(job.executable_path) if job.executable_path else None,
+                                        scene=job.scene_name or None,
+                                        mode=job.mode.name,
+                                        saved_at=job.save_time.timestamp(),
+                                        size=stat.st_size,
+                                        mtime_ns=stat.st_mtime_ns,
+                                        duration=job.duration,
+                                        link=str(link_path) if link_path else None))
+
+
+def load_retention_clips() -> list[tuple[str, float, int, str | None]]:
+    """
+    Returns clips saved by the script (clips index records with the naming mode) for the retention engine.
+    Called by the clip finalizer worker.
+    """
+    if VARIABLES.clip_index is None:
+        return []
+    rows = VARIABLES.clip_index.query("SELECT path, mtime_ns, size, link FROM clips WHERE mode IS NOT NULL")
+    return [(path, mtime_ns / 1e9, size, link) for path, mtime_ns, size, link in rows]
+
+
+def configure_retention(settings):
+    """
+    Applies retention settings to the retention engine. Invalid folder policies are skipped.
+    Should be called in the OBS thread.
+
+    :param settings: Script settings snapshot.
+    """
+    if not settings.retention:
+        VARIABLES.retention.reset()  # clips saved while retention is disabled are not tracked
+        return
+
+    folder_policies = {}
+    for row in settings.retention_policies:
+        try:
+            name, policy = parse_retention_policy(row)
+            folder_policies[name] = policy
+        except ValueError as e:
+            _print(f"Retention policy is skipped: {e}")
+
+    global_policy = RetentionPolicy(max_age=settings.retention_max_age * 86400,
+                                    max_bytes=settings.retention_max_size * 1024 ** 3,
+                                    max_count=settings.retention_max_count)
+    root = Path(settings.clips_base_path) if settings.clips_base_path else get_base_path()
+    VARIABLES.retention.configure(root, global_policy, folder_policies)
+
+
+def apply_retention(path: Path):
+    """
+    Adds the new clip to the retention engine and deletes clips that exceed the limits.
+    Called by the clip finalizer worker.
+    """
+    VARIABLES.retention.note_clip(path)
+    deleted = []
+    for clip_path, freed, error in VARIABLES.retention.enforce():
+        if error:
+            _print(f"Cannot delete old clip {clip_path}: {error}")
+        else:
+            _print(f"Old clip deleted ({freed / 1024 ** 2:.1f} MB freed): {clip_path}")
+            deleted.append(clip_path)
+
+    if deleted and VARIABLES.clip_index is not None:
+        VARIABLES.clip_index.remove(deleted)
+
+
+def finalize_clip(job: ClipSaveJob):
+    """
+    Moves the clip and notifies about the result. Called by the clip finalizer worker.
+    """
+    timings = {}
+
+    with VARIABLES.tracer.span("finalize_clip"):
+        try:
+            clip_name, path, link_path = move_clip_file(job, timings)
+            success = True
+        except:
+            _print("An error occurred while moving file to the new destination.")
+            _print(traceback.format_exc())
+            path, success = Path(), False
+
+        if success and VARIABLES.clip_index is not None:
+            with VARIABLES.tracer.span("index", timings):
+                try:
+                    index_clip(job, clip_name, path, link_path)
+                except:
+                    _print("An error occurred while indexing the clip.")
+                    _print(traceback.format_exc())
+
+        if success and job.settings.retention:
+            with VARIABLES.tracer.span("retention", timings):
+                try:
+                    apply_retention(path)
+                except:
+                    _print("An error occurred while applying clips retention.")
+                    _print(traceback.format_exc())
+
+        with VARIABLES.tracer.span("notify", timings):
+            notify(success, path, job.settings, job.python_exe)
+    _print("Clip finalization timings: " + ", ".join(f"{stage} {ms:.1f} ms" for stage, ms in timings.items()))
 
 
 def save_buffer_with_force_mode(mode: ClipNamingModes):
     """
-    Sends a request to save the replay buffer and setting a specific clip naming mode.
+    Queues a request to save the replay buffer with a specific clip naming mode.
+    Repeated presses of the same hotkey within the coalesce window are merged into one save.
     Can only be called using hotkeys.
     """
     if not obs.obs_frontend_replay_buffer_active():
         return
 
-    if CONSTANTS.CLIPS_FORCE_MODE_LOCK.locked():
+    if not VARIABLES.save_requests.add(mode):
+        _print(f"Save request ({mode.name}) merged with the previous one.")
         return
+    send_next_save_request()
+
+
+def send_next_save_request():
+    """
+    Asks OBS to save the replay buffer for the next queued request, if no other request is waiting for its clip.
+    OBS merges save calls made before the previous clip is written, so requests are sent one by one:
+    the next one is sent from replay buffer saved event callback, or by the scheduler when the sent one times out.
+    """
+    request = VARIABLES.save_requests.send_next()
+    if request is not None:
+        _print(f"Saving replay buffer ({request.mode.name})...")
+        obs.obs_frontend_replay_buffer_save()
 
-    CONSTANTS.CLIPS_FORCE_MODE_LOCK.acquire()
-    VARIABLES.force_mode = mode
-    obs.obs_frontend_replay_buffer_save()
+    if (timeout := VARIABLES.save_requests.next_timeout()) is not None:
+        VARIABLES.scheduler.add_once(send_next_save_request, int(timeout * 1000) + 1)
+    else:
+        VARIABLES.scheduler.remove(send_next_save_request)
@@ -0,0 +1,119 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from collections import deque
+from typing import Any
+import time
+
+
+class SaveRequest:
+    __slots__ = ("mode", "created_at", "sent_at")
+
+    def __init__(self, mode: Any, created_at: float):
+        """
+        :param mode: Clip naming mode requested by hotkey.
+        :param created_at: `time.monotonic()` of the request.
+        """
+        self.mode = mode
+        self.created_at = created_at
+        self.sent_at: float | None = None  # `time.monotonic()` of the save call, None if it's not sent yet
+
+
+class SaveRequestQueue:
+    """
+    Queue of replay buffer save requests made by the script hotkeys.
+
+    OBS merges save calls that come before the previous save is written, so only one request is sent
+    to OBS at a time (see `send_next`), the next one is sent after `OBS_FRONTEND_EVENT_REPLAY_BUFFER_SAVED`.
+    The saved event is matched with the sent request only. If no request is sent,
+    the clip was saved by something else (OBS hotkey, another plugin) and pending requests are kept for their clips.
+    Repeated requests with the same mode within `coalesce_window` are merged into one save.
+    A sent request that didn't get its clip within `timeout` is dropped (e.g. if OBS ignored the save).
+    """
+    def __init__(self, coalesce_window: float = 0.5, timeout: float = 30):
+        """
+        :param coalesce_window: Time (in seconds) within which the same requests are merged.
+        :param timeout: Time (in seconds) after which a sent request is dropped.
+        """
+        self.coalesce_window = coalesce_window
+        self.timeout = timeout
+        self.coalesced = 0
+        self.timed_out = 0
+        self._requests: deque[SaveRequest] = deque()  # the first one is sent if its `sent_at` is set
+
+    def add(self, mode: Any) -> bool:
+        """
+        Adds a save request.
+
+        :return: False if the request was merged with the previous one.
+        """
+        now = time.monotonic()
+        if self._requests:
+            last = self._requests[-1]
+            if last.mode == mode and now - last.created_at < self.coalesce_window:
+                self.coalesced += 1
+                return False
+
+        self._requests.append(SaveRequest(mode, now))
+        return True
+
+    def send_next(self) -> SaveRequest | None:
+        """
+        Marks the oldest pending request as sent if no request is sent yet (or the sent one timed out).
+
+        :return: Request to save the buffer for, None if there is nothing to send now.
+        """
+        now = time.monotonic()
+        self._drop_stale(now)
+        if not self._requests or self._requests[0].sent_at is not None:
+            return None
+        self._requests[0].sent_at = now
+        return self._requests[0]
+
+    def pop(self) -> SaveRequest | None:
+        """
+        Returns the sent request for the saved clip.
+        If no request is sent (the clip was saved not by the script hotkeys), returns None.
+        """
+        self._drop_stale(time.monotonic())
+        if not self._requests or self._requests[0].sent_at is None:
+            return None
+        return self._requests.popleft()
+
+    def unsend(self):
+        """
+        Returns the sent request to the pending ones, so it's sent again by `send_next`
+        (e.g. if replay buffering was stopped before the clip was saved).
+        """
+        if self._requests:
+            self._requests[0].sent_at = None
+
+    def next_timeout(self) -> float | None:
+        """
+        Returns time (in seconds) until the sent request times out, or None if no request is sent.
+        """
+        if not self._requests or self._requests[0].sent_at is None:
+            return None
+        return max(0.0, self._requests[0].sent_at + self.timeout - time.monotonic())
+
+    def clear(self):
+        self._requests.clear()
+
+    def _drop_stale(self, now: float):
+        if self._requests and self._requests[0].sent_at is not None and now - self._requests[0].sent_at > self.timeout:
+            self._requests.popleft()
+            self.timed_out += 1
+
+    def __len__(self):
+        return len(self._requests)
@@ -0,0 +1,212 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from .logs import _print
+
+from threading import Lock, RLock
+from typing import Any, Callable
+import heapq
+import itertools
+import time
+import traceback
+
+
+class SchedulerTaskStats:
+    """
+    Run time and lateness (in seconds) of all jobs with the same callback.
+    """
+    __slots__ = ("runs", "total_run_time", "max_run_time", "max_lateness")
+
+    def __init__(self):
+        self.runs = 0
+        self.total_run_time = 0.0
+        self.max_run_time = 0.0
+        self.max_lateness = 0.0
+
+    def record(self, run_time: float, lateness: float):
+        self.runs += 1
+        self.total_run_time += run_time
+        self.max_run_time = max(self.max_run_time, run_time)
+        self.max_lateness = max(self.max_lateness, lateness)
+
+
+class SchedulerJob:
+    __slots__ = ("callback", "deadline", "interval", "cancelled", "stats")
+
+    def __init__(self,
+                 callback: Callable[[], Any],
+                 deadline: float,
+                 interval: float | None,
+                 stats: SchedulerTaskStats):
+        """
+        :param callback: Function to call.
+        :param deadline: `time.monotonic()` time of the next call.
+        :param interval: Interval (in seconds) of a repeating job. None for one-shot jobs.
+        :param stats: Stats of the task.
+        """
+        self.callback = callback
+        self.deadline = deadline
+        self.interval = interval
+        self.cancelled = False
+        self.stats = stats
+
+
+class Scheduler:
+    """
+    Min-heap of timed jobs driven by an OBS timer (which calls `tick`).
+
+    Works like `obs.timer_add` / `obs.timer_remove`: a callback can be scheduled only once,
+    adding it again reschedules it. Jobs can be one-shot or repeating.
+    Removed jobs are only marked as cancelled and are skipped when they come up in the heap.
+    `on_change` is called after jobs are added or removed and after each tick, so the driver can re-arm its timer
+    (see `timer_interval`). Jobs are added from several threads (OBS UI and timers), but `on_change` is never run
+    by two threads at once and never waits: if it's already running, the running thread calls it once more.
+    """
+    def __init__(self):
+        self.on_change: Callable[[], Any] | None = None
+        self._lock = RLock()
+        self._change_lock = Lock()
+        self._changed = False
+        self._heap: list[tuple[float, int, SchedulerJob]] = []
+        self._jobs: dict[Callable, SchedulerJob] = {}
+        self._seq = itertools.count()
+        self.stats: dict[str, SchedulerTaskStats] = {}  # {callback name: stats}
+
+    def add(self, callback: Callable[[], Any], delay: int, repeat: bool = True):
+        """
+        Schedules the callback.
+
+        :param callback: Function to call.
+        :param delay: Delay (in ms) before the first call, also the interval for repeating jobs.
+        :param repeat: Whether to call the callback every `delay` ms or once.
+        """
+        delay = delay / 1000
+        with self._lock:
+            self.remove(callback)
+            name = getattr(callback, "__name__", repr(callback))
+            stats = self.stats.setdefault(name, SchedulerTaskStats())
+            job = SchedulerJob(callback, time.monotonic() + delay, delay if repeat else None, stats)
+            self._jobs[callback] = job
+            heapq.heappush(self._heap, (job.deadline, next(self._seq), job))
+        self._notify_change()
+
+    def add_once(self, callback: Callable[[], Any], delay: int):
+        self.add(callback, delay, repeat=False)
+
+    def remove(self, callback: Callable[[], Any]):
+        with self._lock:
+            if (job := self._jobs.pop(callback, None)) is None:
+                return
+            job.cancelled = True
+        self._notify_change()
+
+    def clear(self):
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancelled = True
+            self._jobs.clear()
+            self._heap.clear()
+        self._notify_change()
+
+    def next_delay(self) -> float | None:
+        """
+        Returns time (in seconds) until the nearest job deadline, or None if there are no jobs.
+        """
+        with self._lock:
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def timer_interval(self, fine: int, coarse: int) -> int | None:
+        """
+        Returns the interval (in ms) of the timer that should drive the scheduler:
+        None if there are no jobs, `fine` if a job is due within `coarse` / 2 ms, `coarse` otherwise.
+        """
+        delay = self.next_delay()
+        if delay is None:
+            return None
+        return fine if delay < coarse / 2000 else coarse
+
+    def _notify_change(self):
+        self._changed = True
+        while self._changed:
+            if not self._change_lock.acquire(blocking=False):
+                return  # the thread that holds the lock sees `_changed` and calls `on_change` again
+            try:
+                self._changed = False
+                if self.on_change is not None:
+                    self.on_change()
+            finally:
+                self._change_lock.release()
+
+    def is_scheduled(self, callback: Callable[[], Any]) -> bool:
+        return callback in self._jobs
+
+    def tick(self, tolerance: float = 0.0):
+        """
+        Runs all jobs whose deadline has come.
+        Callbacks are called without holding the lock, so they can add and remove jobs.
+
+        :param tolerance: Repeating jobs whose deadline comes within this time (in seconds) are run too
+            (used with a coarse timer, so they are not delayed by a whole timer interval).
+            One-shot jobs are never run early: the fine timer is used when one of them is near
+            (see `timer_interval`).
+        """
+        now = time.monotonic()
+        due = []
+        not_due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now + tolerance:
+                item = heapq.heappop(self._heap)
+                deadline, _, job = item
+                if job.cancelled:
+                    continue
+                if job.interval is None and deadline > now:
+                    not_due.append(item)
+                    continue
+                due.append((job, deadline))
+                if job.interval is None:  # removed from `_jobs` right before it's run
+                    continue
+
+                job.deadline += job.interval
+                if job.deadline <= now:  # too late, don't try to catch up
+                    job.deadline = now + job.interval
+                heapq.heappush(self._heap, (job.deadline, next(self._seq), job))
+            for item in not_due:
+                heapq.heappush(self._heap, item)
+
+        for job, deadline in due:
+            with self._lock:
+                if job.cancelled or self._jobs.get(job.callback) is not job:  # removed by one of the previous callbacks
+                    continue
+                if job.interval is None:
+                    del self._jobs[job.callback]
+
+            start = time.monotonic()
+            lateness = max(0.0, start - deadline)  # repeating jobs can be run a bit early
+            try:
+                job.callback()
+            except:
+                _print(traceback.format_exc())
+            job.stats.record(time.monotonic() - start, lateness)
+        self._notify_change()
+
+    def format_stats(self) -> str:
+        return ", ".join(f"{name}: {stats.runs} runs, "
+                         f"avg {stats.total_run_time / stats.runs * 1000:.2f} ms, "
+                         f"max {stats.max_run_time * 1000:.2f} ms, "
+                         f"max lateness {stats.max_lateness * 1000:.1f} ms"
+                         for name, stats in self.stats.items() if stats.runs)
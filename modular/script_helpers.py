@@ -14,24 +14,44 @@
 
 from .globals import (VARIABLES, CONSTANTS, PN)
 
-from .exceptions import AliasInvalidFormat, AliasInvalidCharacters, AliasPathAlreadyExists
+from .exceptions import (AliasParsingError, AliasInvalidFormat, AliasInvalidCharacters, AliasPathAlreadyExists,
+                         AliasInvalidPattern)
 from .globals import ConfigTypes, PopupPathDisplayModes
+from .alias_index import AliasIndex
+from .settings_snapshot import ScriptSettings
 from .obs_related import get_obs_config
 from .tech import play_sound, _print
 
-from pathlib import Path
+from pathlib import Path, PurePath
 import os
+import re
 import obspython as obs
-import subprocess
 
 
-def notify(success: bool, clip_path: Path, path_display_mode: PopupPathDisplayModes):
+def get_pythonw_path() -> str:
+    """
+    Returns the path of pythonw.exe OBS uses (from OBS config). Should be called in the OBS thread.
+    """
+    return os.path.join(get_obs_config("Python", "Path64bit", str, ConfigTypes.USER), "pythonw.exe")
+
+
+def notify(success: bool,
+           clip_path: Path,
+           settings: ScriptSettings | None = None,
+           python_exe: str | None = None):
     """
     Plays and shows success / failure notification if it's enabled in notifications settings.
+
+    :param settings: Settings snapshot. If None, the current one is used.
+    :param python_exe: pythonw.exe path for popup notifications.
+        If None, it's taken from OBS config (so it must be passed when called outside the OBS thread).
     """
-    sound_notifications = obs.obs_data_get_bool(VARIABLES.script_settings, PN.GR_SOUND_NOTIFICATION_SETTINGS)
-    popup_notifications = obs.obs_data_get_bool(VARIABLES.script_settings, PN.GR_POPUP_NOTIFICATION_SETTINGS)
-    python_exe = os.path.join(get_obs_config("Python", "Path64bit", str, ConfigTypes.USER), "pythonw.exe")
+    settings = settings or VARIABLES.settings
+    path_display_mode = settings.popup_path_display_mode
+    popup_notifications = settings.popup_notifications and (settings.popup_on_success if success
+                                                             else settings.popup_on_failure)
+    if popup_notifications and python_exe is None:
+        python_exe = get_pythonw_path()
 
     if path_display_mode == PopupPathDisplayModes.JUST_FILE:
         clip_path = clip_path.name
@@ -41,51 +61,147 @@ def notify(success: bool, clip_path: Path, path_display_mode: PopupPathDisplayMo
         clip_path = Path(clip_path.parent.name) / clip_path.name
 
     if success:
-        if sound_notifications and obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_NOTIFY_CLIPS_ON_SUCCESS):
-            path = obs.obs_data_get_string(VARIABLES.script_settings, PN.PROP_NOTIFY_CLIPS_ON_SUCCESS_PATH)
-            play_sound(path)
+        if settings.sound_notifications and settings.notify_on_success:
+            play_sound(settings.notify_on_success_path)
 
-        if popup_notifications and obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_POPUP_CLIPS_ON_SUCCESS):
-            subprocess.Popen([python_exe, __file__, "Clip saved", f"Clip saved to {clip_path}"])
+        if popup_notifications:
+            VARIABLES.notification_daemon.send(python_exe, "Clip saved", f"Clip saved to {clip_path}")
     else:
-        if sound_notifications and obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_NOTIFY_CLIPS_ON_FAILURE):
-            path = obs.obs_data_get_string(VARIABLES.script_settings, PN.PROP_NOTIFY_CLIPS_ON_FAILURE_PATH)
-            play_sound(path)
+        if settings.sound_notifications and settings.notify_on_failure:
+            play_sound(settings.notify_on_failure_path)
 
-        if popup_notifications and obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_POPUP_CLIPS_ON_FAILURE):
-            subprocess.Popen([python_exe, __file__, "Clip not saved", f"More in the logs.", "#C00000"])
+        if popup_notifications:
+            VARIABLES.notification_daemon.send(python_exe, "Clip not saved", f"More in the logs.", "#C00000")
 
 
-def load_aliases(script_settings_dict: dict):
+def parse_alias(value: str, index: int) -> tuple[Path | str, str]:
     """
-    Loads aliases to `VARIABLES.aliases`.
+    Parses alias row `path > name`.
     Raises exception if path or name are invalid.
 
+    :param value: Alias row.
+    :param index: Alias index (used for exceptions).
+    :return: (`Path` for path aliases or pattern string for pattern aliases, name)
+    """
+    # Clip name cannot contain ">", so the last one is the separator (regex patterns may contain ">").
+    spl = value.rsplit(">", 1)
+    try:
+        path, name = spl[0].strip(), spl[1].strip()
+    except IndexError:
+        raise AliasInvalidFormat(index)
+
+    if any(i in name for i in CONSTANTS.FILENAME_PROHIBITED_CHARS):
+        raise AliasInvalidCharacters(index)
+
+    if AliasIndex.is_pattern(path):
+        if not path.startswith("re:"):
+            path = os.path.expandvars(path)
+            if any(i in path for i in CONSTANTS.PATTERN_PROHIBITED_CHARS):
+                raise AliasInvalidCharacters(index)
+
+        try:
+            AliasIndex.compile_pattern(path)
+        except re.error:
+            raise AliasInvalidPattern(index)
+        return path, name
+
+    path = os.path.expandvars(path)
+    if any(i in path for i in CONSTANTS.PATH_PROHIBITED_CHARS):
+        raise AliasInvalidCharacters(index)
+    return Path(path), name
+
+
+def update_aliases(values: list[str]) -> list[AliasParsingError]:
+    """
+    Incrementally updates `VARIABLES.aliases`, `VARIABLES.alias_patterns` and the aliases index.
+
+    New alias rows are compared with the previously loaded ones,
+    only changed rows are parsed and re-indexed.
+    Invalid rows are skipped. If several rows have the same path (paths are compared as the aliases index does,
+    case-insensitively), the first one wins (as in a full reload).
+
+    :param values: Alias rows (`path > name`).
+    :return: Errors of the invalid rows (indexes are indexes in `values`).
+    """
+    old_rows = VARIABLES.alias_rows
+    start = 0
+    while start < min(len(old_rows), len(values)) and old_rows[start][0] == values[start]:
+        start += 1
+
+    old_end, new_end = len(old_rows), len(values)
+    while old_end > start and new_end > start and old_rows[old_end - 1][0] == values[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+
+    patterns_changed = False
+    for _, key, _ in old_rows[start:old_end]:
+        if isinstance(key, PurePath):
+            del VARIABLES.aliases[key]
+            VARIABLES.aliases_index.remove(key)
+        else:
+            del VARIABLES.alias_patterns[key]
+            patterns_changed = True
+
+    # Unchanged rows after the changed ones: {key: index in `values`}.
+    suffix_indexes = {key: new_end + offset for offset, (_, key, _) in enumerate(old_rows[old_end:])}
+    dropped_keys = set()
+
+    new_rows = []
+    errors = []
+    for index in range(start, new_end):
+        try:
+            key, name = parse_alias(values[index], index)
+            if isinstance(key, Path):
+                key = AliasIndex.normalize_path(key)  # the trie is case-insensitive on every platform
+            if key in suffix_indexes and key not in dropped_keys:
+                # The changed row is above the unchanged row with the same path, so the unchanged row loses.
+                dropped_keys.add(key)
+                errors.append(AliasPathAlreadyExists(suffix_indexes[key]))
+            elif key in VARIABLES.aliases or key in VARIABLES.alias_patterns:
+                raise AliasPathAlreadyExists(index)
+        except AliasParsingError as e:
+            errors.append(e)
+            continue
+
+        if isinstance(key, PurePath):
+            VARIABLES.aliases[key] = name
+            VARIABLES.aliases_index.add(key, name)
+        else:
+            VARIABLES.alias_patterns[key] = name
+            patterns_changed = True
+        new_rows.append((values[index], key, name))
+
+    VARIABLES.alias_rows = (old_rows[:start] + new_rows +
+                            [row for row in old_rows[old_end:] if row[1] not in dropped_keys])
+    errors.sort(key=lambda e: e.index)
+    if patterns_changed:
+        # Patterns priority depends on their order in the list, so their order is taken from the rows.
+        VARIABLES.aliases_index.set_patterns({key: name for _, key, name in VARIABLES.alias_rows
+                                              if isinstance(key, str)})
+    return errors
+
+
+def load_aliases(script_settings_dict: dict) -> list[AliasParsingError]:
+    """
+    Loads aliases to `VARIABLES.aliases` and `VARIABLES.alias_patterns` from scratch.
+    Invalid aliases are skipped.
+
     :param script_settings_dict: Script settings as dict.
+    :return: Errors of the invalid aliases.
     """
     _print("Loading aliases...")
 
-    new_aliases = {}
     aliases_list = script_settings_dict.get(PN.PROP_ALIASES_LIST)
     if aliases_list is None:
         aliases_list = CONSTANTS.DEFAULT_ALIASES
 
-    for index, i in enumerate(aliases_list):
-        value = i.get("value")
-        spl = value.split(">", 1)
-        try:
-            path, name = spl[0].strip(), spl[1].strip()
-        except IndexError:
-            raise AliasInvalidFormat(index)
-
-        path = os.path.expandvars(path)
-        if any(i in path for i in CONSTANTS.PATH_PROHIBITED_CHARS) or any(i in name for i in CONSTANTS.FILENAME_PROHIBITED_CHARS):
-            raise AliasInvalidCharacters(index)
-
-        if Path(path) in new_aliases.keys():
-            raise AliasPathAlreadyExists(index)
-
-        new_aliases[Path(path)] = name
+    VARIABLES.aliases = {}
+    VARIABLES.alias_patterns = {}
+    VARIABLES.alias_rows = []
+    VARIABLES.aliases_index = AliasIndex()
+    errors = update_aliases([i.get("value") for i in aliases_list])
 
-    VARIABLES.aliases = new_aliases
-    _print(f"{len(VARIABLES.aliases)} aliases are loaded.")
+    for error in errors:
+        _print(f"Alias #{error.index + 1} is invalid ({type(error).__name__}), skipping.")
+    _print(f"{len(VARIABLES.aliases)} aliases and {len(VARIABLES.alias_patterns)} alias patterns are loaded.")
+    return errors
@@ -0,0 +1,110 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from .globals import PN, ClipNamingModes, PopupPathDisplayModes
+
+from typing import Any
+import obspython as obs
+
+
+def get_obs_data_strings(data: Any, name: str) -> tuple[str, ...]:
+    """
+    Returns values of the editable list.
+    """
+    array = obs.obs_data_get_array(data, name)
+    if array is None:
+        return ()
+
+    values = []
+    for index in range(obs.obs_data_array_count(array)):
+        item = obs.obs_data_array_item(array, index)
+        values.append(obs.obs_data_get_string(item, "value"))
+        obs.obs_data_release(item)
+    obs.obs_data_array_release(array)
+    return tuple(values)
+
+
+class ScriptSettings:
+    """
+    Immutable snapshot of the script settings.
+
+    Built once in `script_load` / `script_update`, so saving a clip doesn't touch OBS data,
+    and worker threads can read the settings safely (the snapshot is replaced, never changed).
+    If the settings are unchanged (same OBS data JSON), the previous snapshot is kept (see `from_obs_data_if_changed`).
+    """
+    __slots__ = ("clips_base_path", "clips_naming_mode", "clips_filename_template", "clips_save_to_folder",
+                 "clips_create_links", "clips_links_folder_path",
+                 "sound_notifications", "notify_on_success", "notify_on_success_path",
+                 "notify_on_failure", "notify_on_failure_path",
+                 "popup_notifications", "popup_on_success", "popup_on_failure", "popup_path_display_mode",
+                 "retention", "retention_max_age", "retention_max_size", "retention_max_count",
+                 "retention_policies",
+                 "restart_buffer", "restart_buffer_loop", "save_coalesce_window", "tracing",
+                 "data_json")
+
+    def __init__(self, **values: Any):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    @classmethod
+    def from_obs_data_if_changed(cls, data: Any, previous: "ScriptSettings | None") -> "ScriptSettings":
+        """
+        Returns `previous` if the settings in OBS data object are the same, otherwise reads the new snapshot.
+        """
+        data_json = obs.obs_data_get_json(data)
+        if previous is not None and previous.data_json == data_json:
+            return previous
+        return cls.from_obs_data(data, data_json)
+
+    @classmethod
+    def from_obs_data(cls, data: Any, data_json: str | None = None) -> "ScriptSettings":
+        """
+        Reads the script settings from OBS data object.
+
+        :param data_json: OBS data as JSON (if it's already known).
+        """
+        return cls(
+            clips_base_path=obs.obs_data_get_string(data, PN.PROP_CLIPS_BASE_PATH),
+            clips_naming_mode=ClipNamingModes(obs.obs_data_get_int(data, PN.PROP_CLIPS_NAMING_MODE)),
+            clips_filename_template=obs.obs_data_get_string(data, PN.PROP_CLIPS_FILENAME_TEMPLATE),
+            clips_save_to_folder=obs.obs_data_get_bool(data, PN.PROP_CLIPS_SAVE_TO_FOLDER),
+            clips_create_links=obs.obs_data_get_bool(data, PN.PROP_CLIPS_CREATE_LINKS),
+            clips_links_folder_path=obs.obs_data_get_string(data, PN.PROP_CLIPS_LINKS_FOLDER_PATH),
+
+            sound_notifications=obs.obs_data_get_bool(data, PN.GR_SOUND_NOTIFICATION_SETTINGS),
+            notify_on_success=obs.obs_data_get_bool(data, PN.PROP_NOTIFY_CLIPS_ON_SUCCESS),
+            notify_on_success_path=obs.obs_data_get_string(data, PN.PROP_NOTIFY_CLIPS_ON_SUCCESS_PATH),
+            notify_on_failure=obs.obs_data_get_bool(data, PN.PROP_NOTIFY_CLIPS_ON_FAILURE),
+            notify_on_failure_path=obs.obs_data_get_string(data, PN.PROP_NOTIFY_CLIPS_ON_FAILURE_PATH),
+
+            popup_notifications=obs.obs_data_get_bool(data, PN.GR_POPUP_NOTIFICATION_SETTINGS),
+            popup_on_success=obs.obs_data_get_bool(data, PN.PROP_POPUP_CLIPS_ON_SUCCESS),
+            popup_on_failure=obs.obs_data_get_bool(data, PN.PROP_POPUP_CLIPS_ON_FAILURE),
+            popup_path_display_mode=PopupPathDisplayModes(obs.obs_data_get_int(data, PN.PROP_POPUP_PATH_DISPLAY_MODE)),
+
+            retention=obs.obs_data_get_bool(data, PN.GR_RETENTION_SETTINGS),
+            retention_max_age=obs.obs_data_get_int(data, PN.PROP_RETENTION_MAX_AGE),
+            retention_max_size=obs.obs_data_get_int(data, PN.PROP_RETENTION_MAX_SIZE),
+            retention_max_count=obs.obs_data_get_int(data, PN.PROP_RETENTION_MAX_COUNT),
+            retention_policies=get_obs_data_strings(data, PN.PROP_RETENTION_POLICIES),
+
+            restart_buffer=obs.obs_data_get_bool(data, PN.PROP_RESTART_BUFFER),
+            restart_buffer_loop=obs.obs_data_get_int(data, PN.PROP_RESTART_BUFFER_LOOP),
+            save_coalesce_window=obs.obs_data_get_int(data, PN.PROP_SAVE_COALESCE_WINDOW),
+            tracing=obs.obs_data_get_bool(data, PN.PROP_TRACING),
+            data_json=obs.obs_data_get_json(data) if data_json is None else data_json,
+        )
@@ -12,38 +12,24 @@
 #  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 #  GNU Affero General Public License for more details.
 
-from .globals import user32
+from .globals import CONSTANTS, VARIABLES
+from .logs import _print
 
-import ctypes
-from ctypes import wintypes
-import winsound
 from pathlib import Path
 from datetime import datetime
-from contextlib import suppress
 import os
 
-GetTickCount64 = ctypes.windll.kernel32.GetTickCount64
-GetTickCount64.restype = ctypes.c_ulonglong
 
+# Platform primitives are bound to the backend methods once, on script load,
+# so the calls from timers don't pay for any dispatching.
+# See platform_backends.py for their descriptions.
+get_active_window_pid = CONSTANTS.PLATFORM_BACKEND.get_active_window_pid
+get_time_since_last_input = CONSTANTS.PLATFORM_BACKEND.get_time_since_last_input
+play_sound = CONSTANTS.PLATFORM_BACKEND.play_sound
 
-class LASTINPUTINFO(ctypes.Structure):
-    _fields_ = [("cbSize", wintypes.UINT),
-                ("dwTime", wintypes.DWORD)]
-
-
-def _print(*values, sep: str | None = None, end: str | None = None, file=None, flush: bool = False):
-    str_time = datetime.now().strftime(f"%d.%m.%Y %H:%M:%S")
-    print(f"[{str_time}]", *values, sep=sep, end=end, file=file, flush=flush)
-
-
-def get_active_window_pid() -> int | None:
-    """
-    Gets process ID of the current active window.
-    """
-    hwnd = user32.GetForegroundWindow()
-    pid = wintypes.DWORD()
-    user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
-    return pid.value
+# Gets path of process's executable as a raw string (without creating `Path` object).
+# Paths are cached by process identity, so repeated calls for the same process are cheap.
+get_executable_path_str = VARIABLES.exe_path_cache.get
 
 
 def get_executable_path(pid: int) -> Path:
@@ -53,53 +39,32 @@ def get_executable_path(pid: int) -> Path:
     :param pid: process ID.
     :return: Executable path.
     """
-    process_handle = ctypes.windll.kernel32.OpenProcess(0x0400 | 0x0010, False, pid)
-    # PROCESS_QUERY_INFORMATION | PROCESS_VM_READ
-
-    if not process_handle:
-        raise OSError(f"Process {pid} does not exist.")
-
-    filename_buffer = ctypes.create_unicode_buffer(260)  # Windows path is 260 characters max.
-    result = ctypes.windll.psapi.GetModuleFileNameExW(process_handle, None, filename_buffer, 260)
-    ctypes.windll.kernel32.CloseHandle(process_handle)
-    if result:
-        return Path(filename_buffer.value)
-    else:
-        raise RuntimeError(f"Cannot get executable path for process {pid}.")
-
-
-def play_sound(path: str | Path):
-    """
-    Plays sound using windows engine.
-
-    :param path: path to sound (.wav)
-    """
-    with suppress(Exception):
-        winsound.PlaySound(str(path), winsound.SND_ASYNC)
+    return Path(get_executable_path_str(pid))
 
 
-def get_time_since_last_input() -> int:
+def get_script_data_dir() -> Path:
     """
-    Gets the time (in seconds) since the last mouse or keyboard input.
+    Returns the folder for the script files (traces, etc.) and creates it if it doesn't exist.
+    Can be overridden with SMART_REPLAYS_DATA_DIR environment variable.
     """
-    last_input_info = LASTINPUTINFO()
-    last_input_info.cbSize = ctypes.sizeof(LASTINPUTINFO)
+    if path := os.getenv("SMART_REPLAYS_DATA_DIR"):
+        data_dir = Path(path)
+    elif os.name == "nt":
+        data_dir = Path(os.getenv("APPDATA") or Path.home()) / "smart_replays"
+    else:
+        data_dir = Path(os.getenv("XDG_DATA_HOME") or Path.home() / ".local" / "share") / "smart_replays"
 
-    if ctypes.windll.user32.GetLastInputInfo(ctypes.byref(last_input_info)):
-        current_time = GetTickCount64()
-        idle_time_ms = current_time - last_input_info.dwTime
-        return idle_time_ms // 1000
-    return 0
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
 
 
-def create_hard_link(file_path: Path | str, links_folder: Path | str) -> None:
+def export_trace() -> Path:
     """
-    Creates a hard link for `file_path`.
+    Exports recorded trace spans to the script data folder.
 
-    :param file_path: Original file path.
-    :param links_folder: Folder where the link will be created.
+    :return: Trace file path.
     """
-    link_path = Path(links_folder) / Path(file_path).name
-
-    os.makedirs(str(links_folder), exist_ok=True)
-    os.link(str(file_path), link_path)
+    path = get_script_data_dir() / f"trace_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
+    count = VARIABLES.tracer.export(path)
+    _print(f"{count} trace spans exported to {path}.")
+    return path
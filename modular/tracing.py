@@ -0,0 +1,104 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+from collections import deque
+from pathlib import Path
+from typing import Any
+import json
+import os
+import threading
+import time
+
+
+class NoopSpan:
+    """
+    Span that does nothing. A single instance is shared, so disabled tracing costs one attribute check.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class TraceSpan:
+    __slots__ = ("tracer", "name", "timings", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, timings: dict[str, float] | None, args: dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.timings = timings
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        duration = time.perf_counter_ns() - self.start
+        if self.timings is not None:
+            self.timings[self.name] = duration / 1_000_000
+        if self.tracer.enabled:
+            self.tracer.events.append((self.name, self.start, duration, threading.get_ident(), self.args))
+        return False
+
+
+class Tracer:
+    """
+    Records spans (`time.perf_counter_ns`) and exports them in Chrome trace event format
+    (can be opened in chrome://tracing or https://ui.perfetto.dev).
+    """
+    def __init__(self, enabled: bool = False, max_events: int = 100_000):
+        """
+        :param enabled: Whether to record spans.
+        :param max_events: Max amount of recorded spans, the oldest ones are dropped.
+        """
+        self.enabled = enabled
+        self.events: deque[tuple[str, int, int, int, dict[str, Any]]] = deque(maxlen=max_events)
+
+    def span(self, name: str, timings: dict[str, float] | None = None, **args: Any) -> TraceSpan | NoopSpan:
+        """
+        Returns a context manager that records the time of its block.
+
+        :param name: Span name.
+        :param timings: Optional dict where span time (in ms) is written to (even if tracing is disabled).
+        :param args: Additional span info.
+        """
+        if not self.enabled and timings is None:
+            return NOOP_SPAN
+        return TraceSpan(self, name, timings, args)
+
+    def export(self, path: str | Path) -> int:
+        """
+        Writes recorded spans to the file in Chrome trace event format.
+
+        :return: Amount of exported spans.
+        """
+        pid = os.getpid()
+        events = [{"name": name, "ph": "X", "ts": start / 1000, "dur": duration / 1000,
+                   "pid": pid, "tid": tid, "args": args}
+                  for name, start, duration, tid, args in list(self.events)]
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+    def clear(self):
+        self.events.clear()
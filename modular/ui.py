@@ -12,9 +12,10 @@
 #  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 #  GNU Affero General Public License for more details.
 
-import tkinter as tk
-from tkinter import font as f
-
+from queue import Queue, Empty
+from threading import Thread
+import itertools
+import json
 import time
 import sys
 
@@ -23,15 +24,94 @@ import sys
 #
 # You can run this script to show notification:
 # python smart_replays.py <Notification Title> <Notification Text> <Notification Color>
+#
+# Or to run the notification process, that reads notifications from stdin (JSON lines):
+# python smart_replays.py --daemon
+#
+# tkinter is imported only here (see `load_tkinter`), OBS never needs it.
+tk = None
+f = None
+
+
+def load_tkinter():
+    """
+    Imports tkinter on first use.
+    """
+    global tk, f
+    if tk is None:
+        import tkinter
+        from tkinter import font
+        tk, f = tkinter, font
+
+
+def ease_linear(t: float) -> float:
+    return t
+
+
+def ease_out_cubic(t: float) -> float:
+    return 1 - (1 - t) ** 3
+
+
+def ease_in_cubic(t: float) -> float:
+    return t ** 3
+
+
+class Animation:
+    FPS = 60
+
+    def __init__(self,
+                 widget: "tk.Misc",
+                 start_value: float,
+                 end_value: float,
+                 duration: int,
+                 on_step,
+                 easing=ease_out_cubic,
+                 on_finish_callback=None):
+        """
+        Time based animation.
+        Calls `on_step(value)` at most `FPS` times per second, so it takes a bounded amount of redraws
+        (duration * FPS / 1000) regardless of the distance and CPU speed.
+
+        :param widget: any widget (used for scheduling with `after`)
+        :param start_value: start value
+        :param end_value: end value
+        :param duration: animation duration (in ms)
+        :param on_step: callback function that applies the current value
+        :param easing: easing function (maps 0..1 progress to 0..1 value)
+        :param on_finish_callback: callback function when animation is finished
+        """
+        self.widget = widget
+        self.start_value = start_value
+        self.end_value = end_value
+        self.duration = duration
+        self.on_step = on_step
+        self.easing = easing
+        self.on_finish_callback = on_finish_callback
+        self.start_time = 0.0
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.step()
+
+    def step(self):
+        elapsed = (time.perf_counter() - self.start_time) * 1000
+        progress = min(elapsed / self.duration, 1) if self.duration > 0 else 1
+        self.on_step(self.start_value + (self.end_value - self.start_value) * self.easing(progress))
+
+        if progress < 1:
+            self.widget.after(round(1000 / self.FPS), self.step)
+        elif self.on_finish_callback:
+            self.on_finish_callback()
+
+
 class ScrollingText:
     def __init__(self,
-                 canvas: tk.Canvas,
+                 canvas: "tk.Canvas",
                  text,
                  visible_area_width,
                  start_pos,
                  font,
-                 delay: int = 10,
-                 speed=1,
+                 speed=200,
                  on_finish_callback=None):
         """
         Scrolling text widget.
@@ -41,8 +121,7 @@ class ScrollingText:
         :param visible_area_width: width of the visible area of the text
         :param start_pos: text's start position (most likely padding from left border)
         :param font: font
-        :param delay: Delay between text moves (in ms)
-        :param speed: scrolling speed
+        :param speed: scrolling speed (in pixels per second)
         :param on_finish_callback: callback function when text animation is finished
         """
 
@@ -51,7 +130,6 @@ class ScrollingText:
         self.area_width = visible_area_width
         self.start_pos = start_pos
         self.font = font
-        self.delay = delay
         self.speed = speed
         self.on_finish_callback = on_finish_callback
 
@@ -62,35 +140,58 @@ class ScrollingText:
         self.text_curr_pos = start_pos
 
     def update_scroll(self):
-        if self.text_curr_pos + self.text_width > self.area_width:
-            self.canvas.move(self.text_id, -self.speed, 0)
-            self.text_curr_pos -= self.speed
-
-            self.canvas.after(self.delay, self.update_scroll)
-        else:
+        distance = self.text_curr_pos + self.text_width - self.area_width
+        if distance <= 0:
             if self.on_finish_callback:
                 self.on_finish_callback()
+            return
+
+        Animation(widget=self.canvas,
+                  start_value=self.text_curr_pos,
+                  end_value=self.text_curr_pos - distance,
+                  duration=round(distance / self.speed * 1000),
+                  on_step=self.move_text,
+                  easing=ease_linear,
+                  on_finish_callback=self.on_finish_callback).start()
+
+    def move_text(self, pos: float):
+        pos = round(pos)
+        self.canvas.move(self.text_id, pos - self.text_curr_pos, 0)
+        self.text_curr_pos = pos
 
 
 class NotificationWindow:
     def __init__(self,
                  title: str,
                  message: str,
-                 primary_color: str = "#78B900"):
+                 primary_color: str = "#78B900",
+                 root: "tk.Tk | None" = None,
+                 slot: int = 0,
+                 on_close_callback=None):
+        """
+        :param root: Tk root to create the window in. If None, the window creates and destroys its own root.
+        :param slot: Position of the window in the notifications stack (0 is the top one).
+        :param on_close_callback: callback function when the window is closed
+        """
+        load_tkinter()
         self.title = title
         self.message = message
         self.primary_color = primary_color
         self.bg_color = "#000000"
+        self.on_close_callback = on_close_callback
 
-        self.root = tk.Tk()
-        self.root.withdraw()
-        self.window = tk.Toplevel(bg="#000001")
+        self.own_root = root is None
+        self.root = tk.Tk() if self.own_root else root
+        if self.own_root:
+            self.root.withdraw()
+        self.window = tk.Toplevel(self.root, bg="#000001")
         self.window.overrideredirect(True)
         self.window.attributes("-topmost", True, "-alpha", 0.99, "-transparentcolor", "#000001")
 
         self.scr_w, self.scr_h = self.window.winfo_screenwidth(), self.window.winfo_screenheight()
         self.wnd_w, self.wnd_h = round(self.scr_w / 6.4), round(self.scr_h / 12)
-        self.wnd_x, self.wnd_y = self.scr_w - self.wnd_w, round(self.scr_h / 10)
+        self.wnd_x = self.scr_w - self.wnd_w
+        self.wnd_y = round(self.scr_h / 10) + slot * round(self.wnd_h * 1.1)
         self.title_font_size = round(self.wnd_h / 5)
         self.message_font_size = round(self.wnd_h / 8)
         self.second_frame_padding_x = round(self.wnd_w / 40)
@@ -131,47 +232,129 @@ class NotificationWindow:
                                      visible_area_width=self.wnd_w - self.second_frame_padding_x,
                                      start_pos=self.second_frame_padding_x + self.message_right_padding,
                                      font=font,
-                                     delay=10,
-                                     speed=2,
+                                     speed=200,
                                      on_finish_callback=self.on_text_anim_finished_callback)
 
 
-    def animate_frame(self, frame: tk.Frame, target_w, delay: float = 0.00001, speed: int = 3):
-        init_w, init_h = frame.winfo_width(), self.wnd_h
-        speed = speed if init_w < target_w else -speed
-
-        for curr_w in range(init_w, target_w, speed):
+    def animate_frame(self,
+                      frame: "tk.Frame",
+                      init_w: int,
+                      target_w: int,
+                      duration: int = 250,
+                      easing=ease_out_cubic,
+                      on_finish_callback=None):
+        def set_width(curr_w: float):
+            curr_w = max(round(curr_w), 1)
             frame.config(width=curr_w)
-            frame.place(x=self.wnd_w-curr_w, y=0)
-            frame.update()
-            time.sleep(delay)
+            frame.place(x=self.wnd_w - curr_w, y=0)
 
-        if frame.winfo_width() != target_w:
-            frame.config(width=target_w)
-            frame.place(x=self.wnd_w - target_w, y=0)
-            frame.update()
+        Animation(widget=frame,
+                  start_value=init_w,
+                  end_value=target_w,
+                  duration=duration,
+                  on_step=set_width,
+                  easing=easing,
+                  on_finish_callback=on_finish_callback).start()
 
     def show(self):
-        self.animate_frame(self.first_frame, self.wnd_w)
-        time.sleep(0.1)
-        self.second_frame.lift()
-        self.animate_frame(self.second_frame, self.wnd_w - self.second_frame_padding_x)
-        self.root.after(1000, self.message.update_scroll)
-        self.root.mainloop()
+        def show_second_frame():
+            self.second_frame.lift()
+            self.animate_frame(self.second_frame, 1, self.wnd_w - self.second_frame_padding_x,
+                               on_finish_callback=lambda: self.root.after(1000, self.message.update_scroll))
+
+        self.animate_frame(self.first_frame, 1, self.wnd_w,
+                           on_finish_callback=lambda: self.root.after(100, show_second_frame))
+        if self.own_root:
+            self.root.mainloop()
 
     def close(self):
-        self.animate_frame(self.second_frame, 0)
-        time.sleep(0.1)
-        self.animate_frame(self.first_frame, 0)
-        self.window.destroy()
-        self.root.destroy()
+        def hide_first_frame():
+            self.animate_frame(self.first_frame, self.wnd_w, 0, easing=ease_in_cubic, on_finish_callback=destroy)
+
+        def destroy():
+            self.window.destroy()
+            if self.on_close_callback:
+                self.on_close_callback()
+            if self.own_root:
+                self.root.destroy()
+
+        self.animate_frame(self.second_frame, self.wnd_w - self.second_frame_padding_x, 0, easing=ease_in_cubic,
+                           on_finish_callback=lambda: self.root.after(100, hide_first_frame))
 
     def on_text_anim_finished_callback(self):
-        time.sleep(2.5)
-        self.close()
+        self.root.after(2500, self.close)
+
+
+class NotificationDaemon:
+    """
+    Long-lived notification process.
+    Reads notifications from stdin (JSON lines) and shows them stacked, using a single Tk root.
+    Exits when stdin is closed or after `IDLE_TIMEOUT` seconds without notifications.
+    """
+    IDLE_TIMEOUT = 60  # s
+    POLL_INTERVAL = 50  # ms
+
+    def __init__(self):
+        load_tkinter()
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.queue: Queue[dict | None] = Queue()
+        self.windows: dict[int, NotificationWindow] = {}  # {stack slot: window}
+        self.stdin_closed = False
+        self.last_activity = time.monotonic()
+        Thread(target=self.read_messages, daemon=True).start()
+
+    def read_messages(self):
+        for line in sys.stdin.buffer:
+            try:
+                self.queue.put(json.loads(line))
+            except ValueError:
+                continue
+        self.queue.put(None)
+
+    def poll(self):
+        while True:
+            try:
+                message = self.queue.get_nowait()
+            except Empty:
+                break
+
+            if message is None:
+                self.stdin_closed = True
+            else:
+                self.show_notification(message)
+
+        if not self.windows and (self.stdin_closed or time.monotonic() - self.last_activity > self.IDLE_TIMEOUT):
+            self.root.destroy()
+            return
+        self.root.after(self.POLL_INTERVAL, self.poll)
+
+    def show_notification(self, message: dict):
+        slot = next(i for i in itertools.count() if i not in self.windows)
+        window = NotificationWindow(message.get("title", ""),
+                                    message.get("message", ""),
+                                    message.get("color", "#76B900"),
+                                    root=self.root,
+                                    slot=slot,
+                                    on_close_callback=lambda: self.on_window_closed(slot))
+        self.windows[slot] = window
+        self.last_activity = time.monotonic()
+        window.show()
+
+    def on_window_closed(self, slot: int):
+        self.windows.pop(slot, None)
+        self.last_activity = time.monotonic()
+
+    def run(self):
+        self.root.after(0, self.poll)
+        self.root.mainloop()
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == "--daemon":
+        NotificationDaemon().run()
+        sys.exit(0)
+
     t = sys.argv[1] if len(sys.argv) > 1 else "Test Title"
     m = sys.argv[2] if len(sys.argv) > 2 else "Test Message"
     color = sys.argv[3] if len(sys.argv) > 3 else "#76B900"
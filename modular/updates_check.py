@@ -14,12 +14,13 @@
 
 from .tech import _print
 
-from urllib.request import urlopen
 import json
 import traceback
 
 
 def get_latest_release_tag() -> dict | None:  # todo: for future updates
+    from urllib.request import urlopen
+
     url = "https://api.github.com/repos/qvvonk/smart_replays/releases/latest"
 
     try:
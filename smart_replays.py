@@ -12,208 +12,2716 @@
 #  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 #  GNU Affero General Public License for more details.
 
-import tkinter as tk
+import itertools
+import json
 import time
 import sys
 import ctypes
+import os
 import re
-import json
 import traceback
-import webbrowser
-import os
-import winsound
-import subprocess
-from tkinter import font as f
-from enum import Enum
-from threading import Lock
+import heapq
+import threading
+import errno
+import stat
+from datetime import datetime
+from queue import Queue
+from queue import Empty
 from threading import Thread
+from threading import Lock
+from threading import RLock
+from array import array
 from pathlib import Path
-from collections import deque
-from collections import defaultdict
-from urllib.request import urlopen
-from datetime import datetime
+from pathlib import PureWindowsPath
+from pathlib import PurePath
 from ctypes import wintypes
 from contextlib import suppress
+from contextlib import contextmanager
+from collections import OrderedDict
+from collections import deque
+from collections import defaultdict
 from typing import Any
+from typing import Callable
+from typing import Hashable
+from typing import Iterable
+from bisect import insort
+from enum import Enum
+from functools import lru_cache
+from functools import partial
+
+if __name__ != '__main__':
+    import obspython as obs
+
+
+# -------------------- logs.py --------------------
+def _print(*values, sep: str | None = None, end: str | None = None, file=None, flush: bool = False):
+    str_time = datetime.now().strftime(f"%d.%m.%Y %H:%M:%S")
+    print(f"[{str_time}]", *values, sep=sep, end=end, file=file, flush=flush)
+
+
+# -------------------- ui.py --------------------
+# This part of the script uses only when it is run as a main program, not imported by OBS.
+#
+# You can run this script to show notification:
+# python smart_replays.py <Notification Title> <Notification Text> <Notification Color>
+#
+# Or to run the notification process, that reads notifications from stdin (JSON lines):
+# python smart_replays.py --daemon
+#
+# tkinter is imported only here (see `load_tkinter`), OBS never needs it.
+tk = None
+f = None
+
+
+def load_tkinter():
+    """
+    Imports tkinter on first use.
+    """
+    global tk, f
+    if tk is None:
+        import tkinter
+        from tkinter import font
+        tk, f = tkinter, font
+
+
+def ease_linear(t: float) -> float:
+    return t
+
+
+def ease_out_cubic(t: float) -> float:
+    return 1 - (1 - t) ** 3
+
+
+def ease_in_cubic(t: float) -> float:
+    return t ** 3
+
+
+class Animation:
+    FPS = 60
+
+    def __init__(self,
+                 widget: "tk.Misc",
+                 start_value: float,
+                 end_value: float,
+                 duration: int,
+                 on_step,
+                 easing=ease_out_cubic,
+                 on_finish_callback=None):
+        """
+        Time based animation.
+        Calls `on_step(value)` at most `FPS` times per second, so it takes a bounded amount of redraws
+        (duration * FPS / 1000) regardless of the distance and CPU speed.
+
+        :param widget: any widget (used for scheduling with `after`)
+        :param start_value: start value
+        :param end_value: end value
+        :param duration: animation duration (in ms)
+        :param on_step: callback function that applies the current value
+        :param easing: easing function (maps 0..1 progress to 0..1 value)
+        :param on_finish_callback: callback function when animation is finished
+        """
+        self.widget = widget
+        self.start_value = start_value
+        self.end_value = end_value
+        self.duration = duration
+        self.on_step = on_step
+        self.easing = easing
+        self.on_finish_callback = on_finish_callback
+        self.start_time = 0.0
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.step()
+
+    def step(self):
+        elapsed = (time.perf_counter() - self.start_time) * 1000
+        progress = min(elapsed / self.duration, 1) if self.duration > 0 else 1
+        self.on_step(self.start_value + (self.end_value - self.start_value) * self.easing(progress))
+
+        if progress < 1:
+            self.widget.after(round(1000 / self.FPS), self.step)
+        elif self.on_finish_callback:
+            self.on_finish_callback()
+
+
+class ScrollingText:
+    def __init__(self,
+                 canvas: "tk.Canvas",
+                 text,
+                 visible_area_width,
+                 start_pos,
+                 font,
+                 speed=200,
+                 on_finish_callback=None):
+        """
+        Scrolling text widget.
+
+        :param canvas: canvas
+        :param text: text
+        :param visible_area_width: width of the visible area of the text
+        :param start_pos: text's start position (most likely padding from left border)
+        :param font: font
+        :param speed: scrolling speed (in pixels per second)
+        :param on_finish_callback: callback function when text animation is finished
+        """
+
+        self.canvas = canvas
+        self.text = text
+        self.area_width = visible_area_width
+        self.start_pos = start_pos
+        self.font = font
+        self.speed = speed
+        self.on_finish_callback = on_finish_callback
+
+        self.text_width = font.measure(text)
+        self.text_height = font.metrics("ascent") + font.metrics("descent")
+        self.text_id = self.canvas.create_text(0, round(self.text_height / 2),
+                                               anchor=tk.NW, text=self.text, font=self.font, fill="#ffffff")
+        self.text_curr_pos = start_pos
+
+    def update_scroll(self):
+        distance = self.text_curr_pos + self.text_width - self.area_width
+        if distance <= 0:
+            if self.on_finish_callback:
+                self.on_finish_callback()
+            return
+
+        Animation(widget=self.canvas,
+                  start_value=self.text_curr_pos,
+                  end_value=self.text_curr_pos - distance,
+                  duration=round(distance / self.speed * 1000),
+                  on_step=self.move_text,
+                  easing=ease_linear,
+                  on_finish_callback=self.on_finish_callback).start()
+
+    def move_text(self, pos: float):
+        pos = round(pos)
+        self.canvas.move(self.text_id, pos - self.text_curr_pos, 0)
+        self.text_curr_pos = pos
+
+
+class NotificationWindow:
+    def __init__(self,
+                 title: str,
+                 message: str,
+                 primary_color: str = "#78B900",
+                 root: "tk.Tk | None" = None,
+                 slot: int = 0,
+                 on_close_callback=None):
+        """
+        :param root: Tk root to create the window in. If None, the window creates and destroys its own root.
+        :param slot: Position of the window in the notifications stack (0 is the top one).
+        :param on_close_callback: callback function when the window is closed
+        """
+        load_tkinter()
+        self.title = title
+        self.message = message
+        self.primary_color = primary_color
+        self.bg_color = "#000000"
+        self.on_close_callback = on_close_callback
+
+        self.own_root = root is None
+        self.root = tk.Tk() if self.own_root else root
+        if self.own_root:
+            self.root.withdraw()
+        self.window = tk.Toplevel(self.root, bg="#000001")
+        self.window.overrideredirect(True)
+        self.window.attributes("-topmost", True, "-alpha", 0.99, "-transparentcolor", "#000001")
+
+        self.scr_w, self.scr_h = self.window.winfo_screenwidth(), self.window.winfo_screenheight()
+        self.wnd_w, self.wnd_h = round(self.scr_w / 6.4), round(self.scr_h / 12)
+        self.wnd_x = self.scr_w - self.wnd_w
+        self.wnd_y = round(self.scr_h / 10) + slot * round(self.wnd_h * 1.1)
+        self.title_font_size = round(self.wnd_h / 5)
+        self.message_font_size = round(self.wnd_h / 8)
+        self.second_frame_padding_x = round(self.wnd_w / 40)
+        self.message_right_padding = round(self.wnd_w / 40)
+        self.content_frame_padding_x, self.content_frame_padding_y = (round(self.wnd_w / 40),
+                                                                      round(self.wnd_h / 12))
+
+        self.window.geometry(f"{self.wnd_w}x{self.wnd_h}+{self.wnd_x}+{self.wnd_y}")
+
+        self.first_frame = tk.Frame(self.window, bg=self.primary_color, bd=0, width=1, height=self.wnd_h)
+        self.first_frame.place(x=self.wnd_w-1, y=0)
+
+        self.second_frame = tk.Frame(self.window, bg=self.bg_color, bd=0, width=1, height=self.wnd_h)
+        self.second_frame.pack_propagate(False)
+        self.second_frame.place(x=self.wnd_w-1, y=0)
+
+        self.content_frame = tk.Frame(self.second_frame, bg=self.bg_color, bd=0, height=self.wnd_h)
+        self.content_frame.pack(fill=tk.X,
+                                padx=self.content_frame_padding_x,
+                                pady=self.content_frame_padding_y)
+
+
+        self.title_label = tk.Label(self.content_frame,
+                                    text=self.title,
+                                    font=("Bahnschrift", self.title_font_size, "bold"),
+                                    bg=self.bg_color,
+                                    fg=self.primary_color)
+        self.title_label.pack(anchor=tk.W)
+
+
+        self.canvas = tk.Canvas(self.content_frame, bg=self.bg_color, highlightthickness=0)
+        self.canvas.pack()
+        self.canvas.update()
+
+        font = f.Font(family="Cascadia Mono", size=self.message_font_size)
+        self.message = ScrollingText(canvas=self.canvas,
+                                     text=message,
+                                     visible_area_width=self.wnd_w - self.second_frame_padding_x,
+                                     start_pos=self.second_frame_padding_x + self.message_right_padding,
+                                     font=font,
+                                     speed=200,
+                                     on_finish_callback=self.on_text_anim_finished_callback)
+
+
+    def animate_frame(self,
+                      frame: "tk.Frame",
+                      init_w: int,
+                      target_w: int,
+                      duration: int = 250,
+                      easing=ease_out_cubic,
+                      on_finish_callback=None):
+        def set_width(curr_w: float):
+            curr_w = max(round(curr_w), 1)
+            frame.config(width=curr_w)
+            frame.place(x=self.wnd_w - curr_w, y=0)
+
+        Animation(widget=frame,
+                  start_value=init_w,
+                  end_value=target_w,
+                  duration=duration,
+                  on_step=set_width,
+                  easing=easing,
+                  on_finish_callback=on_finish_callback).start()
+
+    def show(self):
+        def show_second_frame():
+            self.second_frame.lift()
+            self.animate_frame(self.second_frame, 1, self.wnd_w - self.second_frame_padding_x,
+                               on_finish_callback=lambda: self.root.after(1000, self.message.update_scroll))
+
+        self.animate_frame(self.first_frame, 1, self.wnd_w,
+                           on_finish_callback=lambda: self.root.after(100, show_second_frame))
+        if self.own_root:
+            self.root.mainloop()
+
+    def close(self):
+        def hide_first_frame():
+            self.animate_frame(self.first_frame, self.wnd_w, 0, easing=ease_in_cubic, on_finish_callback=destroy)
+
+        def destroy():
+            self.window.destroy()
+            if self.on_close_callback:
+                self.on_close_callback()
+            if self.own_root:
+                self.root.destroy()
+
+        self.animate_frame(self.second_frame, self.wnd_w - self.second_frame_padding_x, 0, easing=ease_in_cubic,
+                           on_finish_callback=lambda: self.root.after(100, hide_first_frame))
+
+    def on_text_anim_finished_callback(self):
+        self.root.after(2500, self.close)
+
+
+class NotificationDaemon:
+    """
+    Long-lived notification process.
+    Reads notifications from stdin (JSON lines) and shows them stacked, using a single Tk root.
+    Exits when stdin is closed or after `IDLE_TIMEOUT` seconds without notifications.
+    """
+    IDLE_TIMEOUT = 60  # s
+    POLL_INTERVAL = 50  # ms
+
+    def __init__(self):
+        load_tkinter()
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.queue: Queue[dict | None] = Queue()
+        self.windows: dict[int, NotificationWindow] = {}  # {stack slot: window}
+        self.stdin_closed = False
+        self.last_activity = time.monotonic()
+        Thread(target=self.read_messages, daemon=True).start()
+
+    def read_messages(self):
+        for line in sys.stdin.buffer:
+            try:
+                self.queue.put(json.loads(line))
+            except ValueError:
+                continue
+        self.queue.put(None)
+
+    def poll(self):
+        while True:
+            try:
+                message = self.queue.get_nowait()
+            except Empty:
+                break
+
+            if message is None:
+                self.stdin_closed = True
+            else:
+                self.show_notification(message)
+
+        if not self.windows and (self.stdin_closed or time.monotonic() - self.last_activity > self.IDLE_TIMEOUT):
+            self.root.destroy()
+            return
+        self.root.after(self.POLL_INTERVAL, self.poll)
+
+    def show_notification(self, message: dict):
+        slot = next(i for i in itertools.count() if i not in self.windows)
+        window = NotificationWindow(message.get("title", ""),
+                                    message.get("message", ""),
+                                    message.get("color", "#76B900"),
+                                    root=self.root,
+                                    slot=slot,
+                                    on_close_callback=lambda: self.on_window_closed(slot))
+        self.windows[slot] = window
+        self.last_activity = time.monotonic()
+        window.show()
+
+    def on_window_closed(self, slot: int):
+        self.windows.pop(slot, None)
+        self.last_activity = time.monotonic()
+
+    def run(self):
+        self.root.after(0, self.poll)
+        self.root.mainloop()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == "--daemon":
+        NotificationDaemon().run()
+        sys.exit(0)
+
+    t = sys.argv[1] if len(sys.argv) > 1 else "Test Title"
+    m = sys.argv[2] if len(sys.argv) > 2 else "Test Message"
+    color = sys.argv[3] if len(sys.argv) > 3 else "#76B900"
+    NotificationWindow(t, m, color).show()
+    sys.exit(0)
+
+
+# -------------------- exe_history.py --------------------
+class ExeInterner:
+    """
+    Interning table of executable paths.
+
+    Every unique executable path gets a small int ID, so the history stores integers
+    instead of thousands of `Path` objects. `Path` object is created only once per executable.
+    """
+    def __init__(self):
+        self._ids: dict[str, int] = {}  # {path/to/executable: ID}
+        self._paths: list[Path] = []  # ID -> Path(path/to/executable)
+
+    def intern(self, path: str | Path) -> int:
+        """
+        Returns ID of the executable path. Assigns a new one if the path is not interned yet.
+        """
+        path = str(path)
+        exe_id = self._ids.get(path)
+        if exe_id is None:
+            exe_id = len(self._paths)
+            self._ids[path] = exe_id
+            self._paths.append(Path(path))
+        return exe_id
+
+    def get_path(self, exe_id: int) -> Path:
+        return self._paths[exe_id]
+
+    def __len__(self):
+        return len(self._paths)
+
+
+class ExeHistory:
+    """
+    Sliding window of the executables (interned IDs) that were active during the replay buffer recording.
+
+    Works like `deque(maxlen=...)`, but also keeps per-executable counts up to date on every append / evict,
+    so the most recorded executable is available without scanning the window.
+
+    Samples are stored as a run-length encoded timeline: consecutive samples of the same executable
+    are merged into one run `(executable ID, start tick, duration)`, so memory usage depends on the amount
+    of app switches rather than on the buffer length.
+    Runs are kept in a ring of compact `array`s that grows only when it's full.
+    """
+    INITIAL_CAPACITY = 16
+
+    def __init__(self, maxlen: int):
+        """
+        :param maxlen: Max amount of samples in the window (replay buffer length in seconds).
+        """
+        self.maxlen = max(maxlen, 0)
+        self._capacity = self.INITIAL_CAPACITY
+        self._run_exes = array('I', [0]) * self._capacity
+        self._run_starts = array('I', [0]) * self._capacity
+        self._run_durations = array('I', [0]) * self._capacity
+        self._head = 0  # ring index of the oldest run
+        self._runs_amount = 0
+        self._length = 0
+        self._tick = 0  # tick of the next sample
+        self._counts = array('I')  # executable ID -> samples amount
+        self._last_seen = array('I')  # executable ID -> tick of the latest sample
+        self._buckets: dict[int, dict[int, None]] = {}  # {samples amount: {executable ID: None}} (ordered set)
+        self._max_count = 0
+
+    def append(self, exe_id: int):
+        """
+        Adds a new sample to the window. If the window is full, the oldest sample is evicted.
+        """
+        if not self.maxlen:
+            return
+
+        if self._length == self.maxlen:
+            self._evict_oldest()
+
+        last = (self._head + self._runs_amount - 1) % self._capacity
+        if self._runs_amount and self._run_exes[last] == exe_id:
+            self._run_durations[last] += 1
+        else:
+            if self._runs_amount == self._capacity:
+                self._grow()
+            index = (self._head + self._runs_amount) % self._capacity
+            self._run_exes[index] = exe_id
+            self._run_starts[index] = self._tick
+            self._run_durations[index] = 1
+            self._runs_amount += 1
+
+        self._increment(exe_id)
+        self._last_seen[exe_id] = self._tick
+        self._tick += 1
+        self._length += 1
+
+    def most_common(self) -> int | None:
+        """
+        Returns the executable ID with the most samples in the window.
+        If several executables have the same amount of samples, returns the one that was active most recently.
+        """
+        if not self._max_count:
+            return None
+        top = self._buckets[self._max_count]
+        if len(top) == 1:
+            return next(iter(top))
+        return max(top, key=self._last_seen.__getitem__)
+
+    def count(self, exe_id: int) -> int:
+        return self._counts[exe_id] if exe_id < len(self._counts) else 0
+
+    def runs(self) -> list[tuple[int, int, int]]:
+        """
+        Returns the timeline as a list of runs `(executable ID, start tick, duration)`, oldest first.
+        """
+        result = []
+        for i in range(self._runs_amount):
+            index = (self._head + i) % self._capacity
+            result.append((self._run_exes[index], self._run_starts[index], self._run_durations[index]))
+        return result
+
+    def clear(self):
+        self._head = 0
+        self._runs_amount = 0
+        self._length = 0
+        self._tick = 0
+        self._counts = array('I')
+        self._last_seen = array('I')
+        self._buckets.clear()
+        self._max_count = 0
+
+    def _grow(self):
+        order = [(self._head + i) % self._capacity for i in range(self._runs_amount)]
+        extra = array('I', [0]) * self._capacity
+        self._run_exes = array('I', (self._run_exes[i] for i in order)) + extra
+        self._run_starts = array('I', (self._run_starts[i] for i in order)) + extra
+        self._run_durations = array('I', (self._run_durations[i] for i in order)) + extra
+        self._head = 0
+        self._capacity *= 2
+
+    def _evict_oldest(self):
+        exe_id = self._run_exes[self._head]
+        self._run_starts[self._head] += 1
+        self._run_durations[self._head] -= 1
+        if not self._run_durations[self._head]:
+            self._head = (self._head + 1) % self._capacity
+            self._runs_amount -= 1
+        self._length -= 1
+        self._decrement(exe_id)
+
+    def _increment(self, exe_id: int):
+        if exe_id >= len(self._counts):
+            self._counts.extend([0] * (exe_id + 1 - len(self._counts)))
+            self._last_seen.extend([0] * (exe_id + 1 - len(self._last_seen)))
+
+        old_count = self._counts[exe_id]
+        new_count = old_count + 1
+        self._counts[exe_id] = new_count
+
+        if old_count:
+            self._remove_from_bucket(exe_id, old_count)
+        self._buckets.setdefault(new_count, {})[exe_id] = None
+
+        if new_count > self._max_count:
+            self._max_count = new_count
+
+    def _decrement(self, exe_id: int):
+        old_count = self._counts[exe_id]
+        new_count = old_count - 1
+        self._counts[exe_id] = new_count
+        self._remove_from_bucket(exe_id, old_count)
+
+        if new_count:
+            self._buckets.setdefault(new_count, {})[exe_id] = None
+
+        # Counts change by one at a time, so if the top bucket is gone, the next one is exactly one below.
+        if old_count == self._max_count and old_count not in self._buckets:
+            self._max_count = new_count
+
+    def _remove_from_bucket(self, exe_id: int, count: int):
+        bucket = self._buckets[count]
+        del bucket[exe_id]
+        if not bucket:
+            del self._buckets[count]
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return bool(self._length)
+
+
+# -------------------- platform_backends.py --------------------
+# Every backend implements the same set of primitives:
+#   get_active_window_pid() -> int
+#   get_process_start_time(pid) -> int
+#   get_executable_path(pid) -> str
+#   get_time_since_last_input() -> int
+#   play_sound(path)
+#
+# The backend is selected once, when the script is loaded, and its bound methods are used directly
+# (see tech.py), so per-sample calls don't pay for any dispatching.
+class WindowsBackend:
+    """
+    Platform primitives using WinAPI.
+    """
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    PROCESS_QUERY_INFORMATION = 0x0400
+    PROCESS_VM_READ = 0x0010
+
+    class LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.UINT),
+                    ("dwTime", wintypes.DWORD)]
+
+    def __init__(self):
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        self.psapi = ctypes.windll.psapi
+        self.kernel32.GetTickCount64.restype = ctypes.c_ulonglong
+
+    def get_active_window_pid(self) -> int:
+        """
+        Gets process ID of the current active window.
+        """
+        hwnd = self.user32.GetForegroundWindow()
+        pid = wintypes.DWORD()
+        self.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        return pid.value
+
+    def get_process_start_time(self, pid: int) -> int:
+        """
+        Gets process creation time (FILETIME as int). Together with PID it identifies the process.
+
+        :param pid: process ID.
+        """
+        process_handle = self.kernel32.OpenProcess(self.PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not process_handle:
+            raise OSError(f"Process {pid} does not exist.")
+
+        creation_time, exit_time, kernel_time, user_time = (wintypes.FILETIME() for _ in range(4))
+        result = self.kernel32.GetProcessTimes(process_handle,
+                                               ctypes.byref(creation_time),
+                                               ctypes.byref(exit_time),
+                                               ctypes.byref(kernel_time),
+                                               ctypes.byref(user_time))
+        self.kernel32.CloseHandle(process_handle)
+        if not result:
+            raise RuntimeError(f"Cannot get creation time for process {pid}.")
+        return (creation_time.dwHighDateTime << 32) | creation_time.dwLowDateTime
+
+    def get_executable_path(self, pid: int) -> str:
+        """
+        Gets path of process's executable.
+
+        :param pid: process ID.
+        """
+        process_handle = self.kernel32.OpenProcess(self.PROCESS_QUERY_INFORMATION | self.PROCESS_VM_READ,
+                                                   False, pid)
+        if not process_handle:
+            raise OSError(f"Process {pid} does not exist.")
+
+        filename_buffer = ctypes.create_unicode_buffer(260)  # Windows path is 260 characters max.
+        result = self.psapi.GetModuleFileNameExW(process_handle, None, filename_buffer, 260)
+        self.kernel32.CloseHandle(process_handle)
+        if result:
+            return filename_buffer.value
+        else:
+            raise RuntimeError(f"Cannot get executable path for process {pid}.")
+
+    def get_time_since_last_input(self) -> int:
+        """
+        Gets the time (in seconds) since the last mouse or keyboard input.
+        """
+        last_input_info = self.LASTINPUTINFO()
+        last_input_info.cbSize = ctypes.sizeof(self.LASTINPUTINFO)
+
+        if self.user32.GetLastInputInfo(ctypes.byref(last_input_info)):
+            current_time = self.kernel32.GetTickCount64()
+            idle_time_ms = current_time - last_input_info.dwTime
+            return idle_time_ms // 1000
+        return 0
+
+    def play_sound(self, path: str | Path):
+        """
+        Plays sound using windows engine.
+
+        :param path: path to sound (.wav)
+        """
+        import winsound
+
+        with suppress(Exception):
+            winsound.PlaySound(str(path), winsound.SND_ASYNC)
+
+
+class LinuxBackend:
+    """
+    Platform primitives using /proc.
+    Only process lookups are supported, active window and input tracking are not available.
+    """
+    def get_active_window_pid(self) -> int:
+        raise OSError("Active window lookup is not supported on this platform.")
+
+    def get_process_start_time(self, pid: int) -> int:
+        """
+        Gets process start time (in clock ticks since boot). Together with PID it identifies the process.
+
+        :param pid: process ID.
+        """
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read()
+        except FileNotFoundError:
+            raise OSError(f"Process {pid} does not exist.")
+
+        # Process name (2nd field) can contain spaces and brackets, so fields are counted from the last ')'.
+        # starttime is the 22nd field, i.e. the 20th one after the process name.
+        return int(stat[stat.rindex(b")") + 2:].split()[19])
+
+    def get_executable_path(self, pid: int) -> str:
+        """
+        Gets path of process's executable.
+
+        :param pid: process ID.
+        """
+        try:
+            return os.readlink(f"/proc/{pid}/exe")
+        except FileNotFoundError:
+            raise OSError(f"Process {pid} does not exist.")
+        except PermissionError:
+            raise RuntimeError(f"Cannot get executable path for process {pid}.")
+
+    def get_time_since_last_input(self) -> int:
+        return 0
+
+    def play_sound(self, path: str | Path):
+        pass
+
+
+class SyntheticBackend:
+    """
+    Deterministic backend for benchmarks and debugging.
+
+    Simulates a set of processes and switches the active one in a fixed order
+    every `switch_every` calls of `get_active_window_pid`.
+    """
+    def __init__(self,
+                 executables: list[str] | tuple[str, ...] = ("C:\\Windows\\explorer.exe",
+                                                            "C:\\Games\\Game\\game.exe",
+                                                            "C:\\Program Files\\Browser\\browser.exe"),
+                 switch_every: int = 60,
+                 idle_time: int = 0):
+        """
+        :param executables: Executable paths of the simulated processes. PIDs are assigned as 1000, 1001, ...
+        :param switch_every: Amount of active window lookups after which the next process becomes active.
+        :param idle_time: Value returned by `get_time_since_last_input`.
+        """
+        self.processes = {1000 + index: path for index, path in enumerate(executables)}
+        self.pids = list(self.processes)
+        self.switch_every = max(switch_every, 1)
+        self.idle_time = idle_time
+        self.calls = 0
+        self.played_sounds: list[str] = []
+
+    def get_active_window_pid(self) -> int:
+        pid = self.pids[(self.calls // self.switch_every) % len(self.pids)]
+        self.calls += 1
+        return pid
+
+    def get_process_start_time(self, pid: int) -> int:
+        if pid not in self.processes:
+            raise OSError(f"Process {pid} does not exist.")
+        return pid
+
+    def get_executable_path(self, pid: int) -> str:
+        if pid not in self.processes:
+            raise OSError(f"Process {pid} does not exist.")
+        return self.processes[pid]
+
+    def get_time_since_last_input(self) -> int:
+        return self.idle_time
+
+    def play_sound(self, path: str | Path):
+        self.played_sounds.append(str(path))
+
+
+def get_platform_backend() -> WindowsBackend | LinuxBackend | SyntheticBackend:
+    """
+    Returns backend for the current platform.
+    The backend can be overridden with SMART_REPLAYS_BACKEND environment variable (windows / linux / synthetic).
+    """
+    backends = {
+        "windows": WindowsBackend,
+        "linux": LinuxBackend,
+        "synthetic": SyntheticBackend
+    }
+
+    name = os.getenv("SMART_REPLAYS_BACKEND", "").lower()
+    if name not in backends:
+        name = "windows" if sys.platform == "win32" else "linux"
+    return backends[name]()
+
+
+# -------------------- exe_path_cache.py --------------------
+class ExePathCache:
+    """
+    Bounded LRU cache of process executable paths.
+
+    Entries are keyed by (PID, process start time), so a reused PID never returns a stale path,
+    and repeated lookups of the same process cost one cheap identity check instead of a full path query.
+    """
+    def __init__(self, backend: Any, maxsize: int = 64):
+        """
+        :param backend: Platform backend with `get_process_start_time(pid)` and `get_executable_path(pid)` methods.
+        :param maxsize: Max amount of cached processes.
+        """
+        self.backend = backend
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[tuple[int, int], str] = OrderedDict()
+
+    def get(self, pid: int) -> str:
+        """
+        Returns path of process's executable.
+
+        :param pid: process ID.
+        """
+        key = (pid, self.backend.get_process_start_time(pid))
+        path = self._cache.get(key)
+        if path is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return path
+
+        self.misses += 1
+        path = self.backend.get_executable_path(pid)
+        self._cache[key] = path
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return path
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+
+# -------------------- alias_index.py --------------------
+PATTERN_GROUP_PREFIX = "_smart_replays_pattern_"  # names of the groups patterns are wrapped with
+LEADING_GLOBAL_FLAGS_RE = re.compile(r"\(\?([aiLmsux]+)\)")
+NUMBERED_BACKREFERENCE_RE = re.compile(r"(?:^|[^\\])(?:\\\\)*\\[1-9]|\(\?\(\d+\)")
+
+
+class AliasTrieNode:
+    __slots__ = ("children", "alias")
+
+    def __init__(self):
+        self.children: dict[str, AliasTrieNode] = {}
+        self.alias: str | None = None
+
+
+class AliasIndex:
+    """
+    Case-insensitive trie of path components for aliases lookup.
+
+    Finds the alias of the executable itself or of its closest parent folder (longest prefix)
+    in a single walk. Results are memoized per executable path.
+
+    Also supports wildcard (`*\\steamapps\\common\\*\\*.exe`) and regex (`re:...`) patterns.
+    All patterns are compiled into one regex, the first matching pattern (in the order they were added) wins.
+    If the patterns cannot be combined (e.g. several regex patterns use the same group name),
+    they are checked one by one.
+    Patterns are checked only if there is no path alias for the executable.
+
+    Aliases are changed in the OBS thread and matched in the clip finalizer thread,
+    so all the methods are guarded with one lock.
+    """
+    def __init__(self, aliases: dict[Path, str] | None = None, patterns: dict[str, str] | None = None):
+        """
+        :param aliases: {Path(path/to/executable/or/folder): alias}
+        :param patterns: {pattern: alias}
+        """
+        self._root = AliasTrieNode()
+        self._patterns: list[tuple[str, str]] = []  # [(regex source, alias), ...]
+        self._pattern_sources: dict[str, str] = {}  # {pattern: regex source}
+        self._matcher: re.Pattern | None = None
+        self._pattern_matchers: list[re.Pattern] = []  # used if patterns cannot be combined into one regex
+        self._compiled = False
+        self._memo: dict[str, str | None] = {}  # {path/to/executable: alias}
+        self._lock = Lock()
+        for path, alias in (aliases or {}).items():
+            self.add(path, alias)
+        for pattern, alias in (patterns or {}).items():
+            self.add_pattern(pattern, alias)
+        self._compile_patterns()
+
+    @staticmethod
+    def split_path(path: str | Path) -> list[str]:
+        """
+        Splits path into normalized (case-folded) components.
+        """
+        return [part for part in str(path).replace("/", "\\").casefold().split("\\") if part]
+
+    @classmethod
+    def normalize_path(cls, path: str | Path) -> PureWindowsPath:
+        """
+        Normalizes path the way the trie does, so paths that lead to the same trie node are equal.
+        """
+        return PureWindowsPath("\\".join(cls.split_path(path)))
+
+    @staticmethod
+    def is_pattern(path: str) -> bool:
+        """
+        Checks whether the alias path is a wildcard or regex pattern.
+        """
+        return path.startswith("re:") or "*" in path or "?" in path
+
+    @staticmethod
+    def compile_pattern(pattern: str) -> str:
+        """
+        Converts wildcard or regex (`re:` prefix) pattern to regex source.
+        `*` matches any characters within one path component, `**` matches any characters,
+        `**\\` matches zero or more folders, `?` matches one character.
+        Wildcard patterns without a drive (e.g. `*\\steamapps\\*.exe`) match the end of the path at any depth.
+        Leading global flags of regex patterns (`(?i)...`) are turned into scoped flags (`(?i:...)`).
+        Raises `re.error` if the pattern is invalid or cannot be combined with other patterns
+        (global flags not at the start, numbered backreferences, reserved group names).
+        """
+        if pattern.startswith("re:"):
+            source = pattern[3:]
+            if match := LEADING_GLOBAL_FLAGS_RE.match(source):
+                source = f"(?{match.group(1)}:{source[match.end():]})"
+            # Group numbers change when patterns are combined, so numbered references would refer to other groups.
+            if NUMBERED_BACKREFERENCE_RE.search(source):
+                raise re.error("numbered backreferences are not supported, use named groups")
+            if any(name.startswith(PATTERN_GROUP_PREFIX) for name in re.compile(source, re.IGNORECASE).groupindex):
+                raise re.error(f"group names starting with {PATTERN_GROUP_PREFIX} are reserved")
+        else:
+            is_absolute = re.match(r"[a-zA-Z]:|[\\/]", pattern) is not None
+            source = "" if is_absolute else r"(?:.*\\)?"
+            i = 0
+            while i < len(pattern):
+                char = pattern[i]
+                if pattern.startswith(("**\\", "**/"), i):
+                    source += r"(?:.*\\)?"
+                    i += 2
+                elif pattern.startswith("**", i):
+                    source += ".*"
+                    i += 1
+                elif char == "*":
+                    source += r"[^\\]*"
+                elif char == "?":
+                    source += r"[^\\]"
+                elif char in "\\/":
+                    source += r"\\"
+                else:
+                    source += re.escape(char)
+                i += 1
+
+        re.compile(AliasIndex.wrap_pattern(source, 0), re.IGNORECASE)
+        return source
+
+    @staticmethod
+    def wrap_pattern(source: str, index: int) -> str:
+        """
+        Wraps pattern regex source with the named group it's combined with other patterns in.
+        """
+        return f"(?P<{PATTERN_GROUP_PREFIX}{index}>{source})"
+
+    def add_pattern(self, pattern: str, alias: str):
+        with self._lock:
+            self._add_pattern(pattern, alias)
+
+    def _add_pattern(self, pattern: str, alias: str):
+        if pattern not in self._pattern_sources:
+            self._pattern_sources[pattern] = self.compile_pattern(pattern)
+        self._patterns.append((self._pattern_sources[pattern], alias))
+        self._compiled = False
+        self._memo.clear()
+
+    def set_patterns(self, patterns: dict[str, str]):
+        """
+        Replaces all patterns and recompiles the matcher.
+        Patterns that were already added before are not converted again.
+
+        :param patterns: {pattern: alias}
+        """
+        with self._lock:
+            self._patterns = []
+            self._pattern_sources = {pattern: self._pattern_sources[pattern]
+                                     for pattern in patterns if pattern in self._pattern_sources}
+            for pattern, alias in patterns.items():
+                self._add_pattern(pattern, alias)
+            self._memo.clear()  # `_add_pattern` is not called if all patterns were removed
+            self._compile_patterns()
+
+    def add(self, path: str | Path, alias: str):
+        with self._lock:
+            node = self._root
+            for part in self.split_path(path):
+                node = node.children.setdefault(part, AliasTrieNode())
+            node.alias = alias
+            self._memo.clear()
+
+    def remove(self, path: str | Path):
+        with self._lock:
+            node = self._root
+            for part in self.split_path(path):
+                node = node.children.get(part)
+                if node is None:
+                    return
+            node.alias = None
+            self._memo.clear()
+
+    def match(self, executable_path: str | Path) -> str | None:
+        """
+        Returns alias of the executable or of its closest parent folder. If there is no alias, returns None.
+        """
+        key = str(executable_path)
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+
+            alias = None
+            node = self._root
+            for part in self.split_path(key):
+                node = node.children.get(part)
+                if node is None:
+                    break
+                if node.alias is not None:
+                    alias = node.alias
+
+            if alias is None and self._patterns:
+                alias = self._match_pattern(key)
+
+            self._memo[key] = alias
+            return alias
+
+    def _compile_patterns(self):
+        try:
+            self._matcher = re.compile("|".join(self.wrap_pattern(source, index)
+                                                for index, (source, _) in enumerate(self._patterns)),
+                                       re.IGNORECASE)
+            self._pattern_matchers = []
+        except re.error:
+            self._matcher = None
+            self._pattern_matchers = [re.compile(source, re.IGNORECASE) for source, _ in self._patterns]
+        self._compiled = True
+
+    def _match_pattern(self, executable_path: str) -> str | None:
+        if not self._compiled:
+            self._compile_patterns()
+
+        executable_path = executable_path.replace("/", "\\")
+        if self._matcher is None:
+            for matcher, (_, alias) in zip(self._pattern_matchers, self._patterns):
+                if matcher.fullmatch(executable_path):
+                    return alias
+            return None
+
+        match = self._matcher.fullmatch(executable_path)
+        if match is None:
+            return None
+        return self._patterns[int(match.lastgroup[len(PATTERN_GROUP_PREFIX):])][1]
+
+
+# -------------------- filename_reserver.py --------------------
+class FolderListing:
+    __slots__ = ("mtime_ns", "names", "counters")
+
+    def __init__(self, mtime_ns: int | None, names: set[str]):
+        self.mtime_ns = mtime_ns  # folder modification time the listing is valid for (None if there is no folder)
+        self.names = names  # {casefolded file name, ...}
+        self.counters: dict[tuple[str, str], int] = {}  # {(stem, suffix): next number to try}
+
+
+class FilenameReserver:
+    """
+    Allocates unique file names: `name.ext`, `name (1).ext`, `name (2).ext`, etc. (the lowest free number).
+
+    Each folder is listed with a single `os.scandir`, after that the names that are already taken
+    and the next number to try for every name are kept in memory, so allocation doesn't check names one by one.
+    The listing is only reused while the folder modification time is the one seen after the last reservation,
+    so names freed by deletion (by the user or the retention) are reused, as if the folder was checked every time.
+    Changes made by the script itself (replacing a reserved file with the clip) are marked with `changing`,
+    so saving clips into the same folder doesn't list it again.
+    At most `max_folders` listings are kept (least recently used ones are dropped).
+    The name is reserved by creating an empty file exclusively (O_CREAT | O_EXCL), so two saves
+    can never get the same name, even if files were added to the folder by someone else.
+    """
+    def __init__(self, max_folders: int = 32):
+        self.max_folders = max_folders
+        self._lock = Lock()
+        self._listings: OrderedDict[str, FolderListing] = OrderedDict()  # {folder: listing}
+
+    def reserve(self, file_path: str | Path) -> Path:
+        """
+        Reserves a unique file name by creating an empty file.
+        The caller should replace the file (`os.replace`) or remove it.
+
+        :param file_path: Desired file path.
+        :return: Reserved file path.
+        """
+        file_path = Path(file_path)
+        folder, stem, suffix = str(file_path.parent), file_path.stem, file_path.suffix
+        key = (stem.casefold(), suffix.casefold())
+
+        with self._lock:
+            listing = self._get_listing(folder)
+            counter = listing.counters.get(key, 0)
+
+            while True:
+                name = f"{stem}{suffix}" if not counter else f"{stem} ({counter}){suffix}"
+                counter += 1
+                if name.casefold() in listing.names:
+                    continue
+
+                path = file_path.parent / name
+                try:
+                    os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+                except FileExistsError:
+                    listing.names.add(name.casefold())
+                    continue
+
+                listing.names.add(name.casefold())
+                listing.counters[key] = counter
+                listing.mtime_ns = self._get_mtime(folder)  # changed by the file just created
+                return path
+
+    def release(self, file_path: str | Path):
+        """
+        Removes the reserved file (if it still exists).
+        """
+        file_path = Path(file_path)
+        with self._lock:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            if (listing := self._listings.get(str(file_path.parent))) is not None:
+                listing.names.discard(file_path.name.casefold())
+                listing.counters.clear()  # the freed number can be lower than the next ones
+
+    @contextmanager
+    def changing(self, folder: str | Path):
+        """
+        Marks the changes made to the folder within the block (e.g. replacing reserved files) as known,
+        so the folder listing stays valid. If the folder was changed by something else before the block
+        (or other names were reserved in it during the block), it will be listed again as usual.
+        """
+        folder = str(folder)
+        with self._lock:
+            listing = self._listings.get(folder)
+            valid = listing is not None and listing.mtime_ns is not None and listing.mtime_ns == self._get_mtime(folder)
+            mtime_ns = listing.mtime_ns if valid else None
+        try:
+            yield
+        finally:
+            if mtime_ns is not None:
+                with self._lock:
+                    if self._listings.get(folder) is listing and listing.mtime_ns == mtime_ns:
+                        listing.mtime_ns = self._get_mtime(folder)
+
+    @staticmethod
+    def _get_mtime(folder: str) -> int | None:
+        try:
+            return os.stat(folder).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _get_listing(self, folder: str) -> FolderListing:
+        mtime_ns = self._get_mtime(folder)
+        listing = self._listings.get(folder)
+        if listing is not None and listing.mtime_ns == mtime_ns:
+            self._listings.move_to_end(folder)
+            return listing
+
+        # The folder was changed by something else: list it again, numbers are searched from the start.
+        try:
+            with os.scandir(folder) as entries:
+                names = {entry.name.casefold() for entry in entries}
+        except FileNotFoundError:
+            names = set()
+        listing = self._listings[folder] = FolderListing(mtime_ns, names)
+        self._listings.move_to_end(folder)
+        while len(self._listings) > self.max_folders:
+            self._listings.popitem(last=False)
+        return listing
+
+
+# -------------------- clip_finalizer.py --------------------
+class ClipSaveJob:
+    """
+    Everything that is needed to name and move a saved clip.
+    Collected in the OBS thread at the moment of saving, so the clip is named after the moment it was saved,
+    not after the moment it was finalized.
+    """
+    __slots__ = ("old_file_path", "mode", "filename_template", "executable_path", "scene_name", "save_time",
+                 "settings", "duration", "clips_base_path", "python_exe")
+
+    def __init__(self,
+                 old_file_path: str,
+                 mode: Any,
+                 filename_template: str,
+                 executable_path: Path | None,
+                 scene_name: str,
+                 save_time: datetime,
+                 settings: Any = None,
+                 duration: float | None = None,
+                 clips_base_path: Path | None = None,
+                 python_exe: str | None = None):
+        """
+        :param old_file_path: Path of the clip saved by OBS.
+        :param mode: Clip naming mode.
+        :param filename_template: Clip file name template.
+        :param executable_path: Executable the clip is related to (None if it's not needed).
+        :param scene_name: Current scene name.
+        :param save_time: Clip saving time.
+        :param settings: Script settings snapshot at the moment of saving.
+        :param duration: Approximate clip duration in seconds (None if unknown).
+        :param clips_base_path: Clips base folder (resolved in the OBS thread).
+        :param python_exe: pythonw.exe path for popup notifications (None if they are disabled).
+        """
+        self.old_file_path = old_file_path
+        self.mode = mode
+        self.filename_template = filename_template
+        self.executable_path = executable_path
+        self.scene_name = scene_name
+        self.save_time = save_time
+        self.settings = settings
+        self.duration = duration
+        self.clips_base_path = clips_base_path
+        self.python_exe = python_exe
+
+
+class ClipFinalizer:
+    """
+    Background worker with a jobs queue.
+    Finalizes saved clips (file system work and notifications) off the OBS main thread.
+
+    The queue is unbounded: jobs are submitted from the OBS thread, which must never wait,
+    and a clip saved by OBS must never be left unnamed. If jobs pile up (e.g. clips are copied to a slow disk),
+    `submit` reports the backlog so it can be shown in the logs.
+    If the worker is still busy when `stop` times out, it keeps running, and `start` doesn't start another one
+    (the running worker takes the new jobs instead of stopping).
+    """
+    def __init__(self, handler: Callable[[ClipSaveJob], Any], backlog_warning: int = 16):
+        """
+        :param handler: Function that finalizes the clip. Called in the worker thread.
+        :param backlog_warning: Amount of queued jobs from which `submit` reports the backlog.
+        """
+        self.handler = handler
+        self.backlog_warning = backlog_warning
+        self._queue: Queue[ClipSaveJob | Callable[[], Any] | int] = Queue()  # int: stop request ID
+        self._thread: Thread | None = None
+        self._stop_id: int | None = None  # ID of the last stop request (None if started again after it)
+        self._stop_counter = 0
+        self._lock = Lock()
+
+    def start(self):
+        with self._lock:
+            self._stop_id = None
+            if self._thread is not None:
+                return
+            self._thread = Thread(target=self._run, name="SmartReplaysClipFinalizer", daemon=True)
+            self._thread.start()
+
+    def submit(self, job: ClipSaveJob | Callable[[], Any]) -> bool:
+        """
+        Adds job (or a function, which is called in the worker thread in order with the jobs) to the queue.
+        Never blocks.
+
+        :return: False if there are `backlog_warning` or more jobs waiting in the queue.
+        """
+        self.start()
+        self._queue.put_nowait(job)
+        return self._queue.qsize() < self.backlog_warning
+
+    def stop(self, timeout: float = 5):
+        """
+        Finishes queued jobs and stops the worker.
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stop_counter += 1
+            self._stop_id = stop_id = self._stop_counter
+        self._queue.put(stop_id)
+        thread.join(timeout)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if isinstance(job, int):
+                with self._lock:
+                    if job == self._stop_id:  # the last stop request, and not started again after it
+                        self._thread = None
+                        break
+                continue
+
+            try:
+                if isinstance(job, ClipSaveJob):
+                    self.handler(job)
+                else:
+                    job()
+            except:
+                _print(traceback.format_exc())
+
+
+# -------------------- save_requests.py --------------------
+class SaveRequest:
+    __slots__ = ("mode", "created_at", "sent_at")
+
+    def __init__(self, mode: Any, created_at: float):
+        """
+        :param mode: Clip naming mode requested by hotkey.
+        :param created_at: `time.monotonic()` of the request.
+        """
+        self.mode = mode
+        self.created_at = created_at
+        self.sent_at: float | None = None  # `time.monotonic()` of the save call, None if it's not sent yet
+
+
+class SaveRequestQueue:
+    """
+    Queue of replay buffer save requests made by the script hotkeys.
+
+    OBS merges save calls that come before the previous save is written, so only one request is sent
+    to OBS at a time (see `send_next`), the next one is sent after `OBS_FRONTEND_EVENT_REPLAY_BUFFER_SAVED`.
+    The saved event is matched with the sent request only. If no request is sent,
+    the clip was saved by something else (OBS hotkey, another plugin) and pending requests are kept for their clips.
+    Repeated requests with the same mode within `coalesce_window` are merged into one save.
+    A sent request that didn't get its clip within `timeout` is dropped (e.g. if OBS ignored the save).
+    """
+    def __init__(self, coalesce_window: float = 0.5, timeout: float = 30):
+        """
+        :param coalesce_window: Time (in seconds) within which the same requests are merged.
+        :param timeout: Time (in seconds) after which a sent request is dropped.
+        """
+        self.coalesce_window = coalesce_window
+        self.timeout = timeout
+        self.coalesced = 0
+        self.timed_out = 0
+        self._requests: deque[SaveRequest] = deque()  # the first one is sent if its `sent_at` is set
+
+    def add(self, mode: Any) -> bool:
+        """
+        Adds a save request.
+
+        :return: False if the request was merged with the previous one.
+        """
+        now = time.monotonic()
+        if self._requests:
+            last = self._requests[-1]
+            if last.mode == mode and now - last.created_at < self.coalesce_window:
+                self.coalesced += 1
+                return False
+
+        self._requests.append(SaveRequest(mode, now))
+        return True
+
+    def send_next(self) -> SaveRequest | None:
+        """
+        Marks the oldest pending request as sent if no request is sent yet (or the sent one timed out).
+
+        :return: Request to save the buffer for, None if there is nothing to send now.
+        """
+        now = time.monotonic()
+        self._drop_stale(now)
+        if not self._requests or self._requests[0].sent_at is not None:
+            return None
+        self._requests[0].sent_at = now
+        return self._requests[0]
+
+    def pop(self) -> SaveRequest | None:
+        """
+        Returns the sent request for the saved clip.
+        If no request is sent (the clip was saved not by the script hotkeys), returns None.
+        """
+        self._drop_stale(time.monotonic())
+        if not self._requests or self._requests[0].sent_at is None:
+            return None
+        return self._requests.popleft()
+
+    def unsend(self):
+        """
+        Returns the sent request to the pending ones, so it's sent again by `send_next`
+        (e.g. if replay buffering was stopped before the clip was saved).
+        """
+        if self._requests:
+            self._requests[0].sent_at = None
+
+    def next_timeout(self) -> float | None:
+        """
+        Returns time (in seconds) until the sent request times out, or None if no request is sent.
+        """
+        if not self._requests or self._requests[0].sent_at is None:
+            return None
+        return max(0.0, self._requests[0].sent_at + self.timeout - time.monotonic())
+
+    def clear(self):
+        self._requests.clear()
+
+    def _drop_stale(self, now: float):
+        if self._requests and self._requests[0].sent_at is not None and now - self._requests[0].sent_at > self.timeout:
+            self._requests.popleft()
+            self.timed_out += 1
+
+    def __len__(self):
+        return len(self._requests)
+
+
+# -------------------- scheduler.py --------------------
+class SchedulerTaskStats:
+    """
+    Run time and lateness (in seconds) of all jobs with the same callback.
+    """
+    __slots__ = ("runs", "total_run_time", "max_run_time", "max_lateness")
+
+    def __init__(self):
+        self.runs = 0
+        self.total_run_time = 0.0
+        self.max_run_time = 0.0
+        self.max_lateness = 0.0
+
+    def record(self, run_time: float, lateness: float):
+        self.runs += 1
+        self.total_run_time += run_time
+        self.max_run_time = max(self.max_run_time, run_time)
+        self.max_lateness = max(self.max_lateness, lateness)
+
+
+class SchedulerJob:
+    __slots__ = ("callback", "deadline", "interval", "cancelled", "stats")
+
+    def __init__(self,
+                 callback: Callable[[], Any],
+                 deadline: float,
+                 interval: float | None,
+                 stats: SchedulerTaskStats):
+        """
+        :param callback: Function to call.
+        :param deadline: `time.monotonic()` time of the next call.
+        :param interval: Interval (in seconds) of a repeating job. None for one-shot jobs.
+        :param stats: Stats of the task.
+        """
+        self.callback = callback
+        self.deadline = deadline
+        self.interval = interval
+        self.cancelled = False
+        self.stats = stats
+
+
+class Scheduler:
+    """
+    Min-heap of timed jobs driven by an OBS timer (which calls `tick`).
+
+    Works like `obs.timer_add` / `obs.timer_remove`: a callback can be scheduled only once,
+    adding it again reschedules it. Jobs can be one-shot or repeating.
+    Removed jobs are only marked as cancelled and are skipped when they come up in the heap.
+    `on_change` is called after jobs are added or removed and after each tick, so the driver can re-arm its timer
+    (see `timer_interval`). Jobs are added from several threads (OBS UI and timers), but `on_change` is never run
+    by two threads at once and never waits: if it's already running, the running thread calls it once more.
+    """
+    def __init__(self):
+        self.on_change: Callable[[], Any] | None = None
+        self._lock = RLock()
+        self._change_lock = Lock()
+        self._changed = False
+        self._heap: list[tuple[float, int, SchedulerJob]] = []
+        self._jobs: dict[Callable, SchedulerJob] = {}
+        self._seq = itertools.count()
+        self.stats: dict[str, SchedulerTaskStats] = {}  # {callback name: stats}
+
+    def add(self, callback: Callable[[], Any], delay: int, repeat: bool = True):
+        """
+        Schedules the callback.
+
+        :param callback: Function to call.
+        :param delay: Delay (in ms) before the first call, also the interval for repeating jobs.
+        :param repeat: Whether to call the callback every `delay` ms or once.
+        """
+        delay = delay / 1000
+        with self._lock:
+            self.remove(callback)
+            name = getattr(callback, "__name__", repr(callback))
+            stats = self.stats.setdefault(name, SchedulerTaskStats())
+            job = SchedulerJob(callback, time.monotonic() + delay, delay if repeat else None, stats)
+            self._jobs[callback] = job
+            heapq.heappush(self._heap, (job.deadline, next(self._seq), job))
+        self._notify_change()
+
+    def add_once(self, callback: Callable[[], Any], delay: int):
+        self.add(callback, delay, repeat=False)
+
+    def remove(self, callback: Callable[[], Any]):
+        with self._lock:
+            if (job := self._jobs.pop(callback, None)) is None:
+                return
+            job.cancelled = True
+        self._notify_change()
+
+    def clear(self):
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancelled = True
+            self._jobs.clear()
+            self._heap.clear()
+        self._notify_change()
+
+    def next_delay(self) -> float | None:
+        """
+        Returns time (in seconds) until the nearest job deadline, or None if there are no jobs.
+        """
+        with self._lock:
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def timer_interval(self, fine: int, coarse: int) -> int | None:
+        """
+        Returns the interval (in ms) of the timer that should drive the scheduler:
+        None if there are no jobs, `fine` if a job is due within `coarse` / 2 ms, `coarse` otherwise.
+        """
+        delay = self.next_delay()
+        if delay is None:
+            return None
+        return fine if delay < coarse / 2000 else coarse
+
+    def _notify_change(self):
+        self._changed = True
+        while self._changed:
+            if not self._change_lock.acquire(blocking=False):
+                return  # the thread that holds the lock sees `_changed` and calls `on_change` again
+            try:
+                self._changed = False
+                if self.on_change is not None:
+                    self.on_change()
+            finally:
+                self._change_lock.release()
+
+    def is_scheduled(self, callback: Callable[[], Any]) -> bool:
+        return callback in self._jobs
+
+    def tick(self, tolerance: float = 0.0):
+        """
+        Runs all jobs whose deadline has come.
+        Callbacks are called without holding the lock, so they can add and remove jobs.
+
+        :param tolerance: Repeating jobs whose deadline comes within this time (in seconds) are run too
+            (used with a coarse timer, so they are not delayed by a whole timer interval).
+            One-shot jobs are never run early: the fine timer is used when one of them is near
+            (see `timer_interval`).
+        """
+        now = time.monotonic()
+        due = []
+        not_due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now + tolerance:
+                item = heapq.heappop(self._heap)
+                deadline, _, job = item
+                if job.cancelled:
+                    continue
+                if job.interval is None and deadline > now:
+                    not_due.append(item)
+                    continue
+                due.append((job, deadline))
+                if job.interval is None:  # removed from `_jobs` right before it's run
+                    continue
+
+                job.deadline += job.interval
+                if job.deadline <= now:  # too late, don't try to catch up
+                    job.deadline = now + job.interval
+                heapq.heappush(self._heap, (job.deadline, next(self._seq), job))
+            for item in not_due:
+                heapq.heappush(self._heap, item)
+
+        for job, deadline in due:
+            with self._lock:
+                if job.cancelled or self._jobs.get(job.callback) is not job:  # removed by one of the previous callbacks
+                    continue
+                if job.interval is None:
+                    del self._jobs[job.callback]
+
+            start = time.monotonic()
+            lateness = max(0.0, start - deadline)  # repeating jobs can be run a bit early
+            try:
+                job.callback()
+            except:
+                _print(traceback.format_exc())
+            job.stats.record(time.monotonic() - start, lateness)
+        self._notify_change()
+
+    def format_stats(self) -> str:
+        return ", ".join(f"{name}: {stats.runs} runs, "
+                         f"avg {stats.total_run_time / stats.runs * 1000:.2f} ms, "
+                         f"max {stats.max_run_time * 1000:.2f} ms, "
+                         f"max lateness {stats.max_lateness * 1000:.1f} ms"
+                         for name, stats in self.stats.items() if stats.runs)
+
+
+# -------------------- notification_client.py --------------------
+class NotificationDaemonClient:
+    """
+    Sends pop-up notifications to the long-lived notification process (`smart_replays.py --daemon`).
+
+    The process is started on the first notification and restarted if it has exited
+    (e.g. after its idle timeout). Notifications are sent as JSON lines over its stdin.
+    If the process cannot be started (or exits right away), the notification is shown
+    by a separate one-shot process, as before the notification process existed.
+    """
+    def __init__(self, script_path: str):
+        """
+        :param script_path: Path of the script file that runs the notification process.
+        """
+        self.script_path = script_path
+        self.starts = 0
+        self.fallbacks = 0
+        self._process: "subprocess.Popen | None" = None
+        self._lock = Lock()
+
+    def send(self, python_exe: str, title: str, message: str, color: str = "#76B900"):
+        """
+        Shows a notification. Starts the notification process if it's not running.
+
+        :param python_exe: Python executable to run the notification process with.
+        """
+        import subprocess
+
+        data = (json.dumps({"title": title, "message": message, "color": color}) + "\n").encode("utf-8")
+
+        with self._lock:
+            for _ in range(2):  # the process may exit right before writing, then it's restarted once
+                try:
+                    if self._process is None or self._process.poll() is not None:
+                        self._process = subprocess.Popen([python_exe, self.script_path, "--daemon"],
+                                                         stdin=subprocess.PIPE)
+                        self.starts += 1
+
+                    self._process.stdin.write(data)
+                    self._process.stdin.flush()
+                    return
+                except OSError:
+                    self._process = None
+
+            self.fallbacks += 1
+        subprocess.Popen([python_exe, self.script_path, title, message, color])
+
+    def stop(self):
+        """
+        Closes the notification process stdin. The process exits after showing queued notifications.
+        """
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                try:
+                    self._process.stdin.close()
+                except OSError:
+                    pass
+            self._process = None
+
+
+# -------------------- config_cache.py --------------------
+class ConfigCache:
+    """
+    Cache of OBS config values.
+
+    Keys are tuples, which second item is the config section name: (config type, section, param, value type),
+    so the values can be invalidated per section.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._values: dict[tuple[Hashable, ...], Any] = {}
+        self._generation = 0  # increased on every invalidation
+        self._lock = Lock()
+
+    def get(self, key: tuple[Hashable, ...], loader: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value. If it's not cached, loads it with `loader` and caches it.
+        """
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                return self._values[key]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+        with self._lock:
+            if generation == self._generation:  # don't cache the value if it was invalidated while loading
+                self._values[key] = value
+        return value
+
+    def invalidate(self, sections: Iterable[str] | None = None):
+        """
+        Removes cached values.
+
+        :param sections: Config sections to invalidate. If None, invalidates everything.
+        """
+        with self._lock:
+            self._generation += 1
+            if sections is None:
+                self._values.clear()
+                return
+
+            sections = set(sections)
+            for key in [key for key in self._values if key[1] in sections]:
+                del self._values[key]
+
+
+# -------------------- tracing.py --------------------
+class NoopSpan:
+    """
+    Span that does nothing. A single instance is shared, so disabled tracing costs one attribute check.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class TraceSpan:
+    __slots__ = ("tracer", "name", "timings", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, timings: dict[str, float] | None, args: dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.timings = timings
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        duration = time.perf_counter_ns() - self.start
+        if self.timings is not None:
+            self.timings[self.name] = duration / 1_000_000
+        if self.tracer.enabled:
+            self.tracer.events.append((self.name, self.start, duration, threading.get_ident(), self.args))
+        return False
+
+
+class Tracer:
+    """
+    Records spans (`time.perf_counter_ns`) and exports them in Chrome trace event format
+    (can be opened in chrome://tracing or https://ui.perfetto.dev).
+    """
+    def __init__(self, enabled: bool = False, max_events: int = 100_000):
+        """
+        :param enabled: Whether to record spans.
+        :param max_events: Max amount of recorded spans, the oldest ones are dropped.
+        """
+        self.enabled = enabled
+        self.events: deque[tuple[str, int, int, int, dict[str, Any]]] = deque(maxlen=max_events)
+
+    def span(self, name: str, timings: dict[str, float] | None = None, **args: Any) -> TraceSpan | NoopSpan:
+        """
+        Returns a context manager that records the time of its block.
+
+        :param name: Span name.
+        :param timings: Optional dict where span time (in ms) is written to (even if tracing is disabled).
+        :param args: Additional span info.
+        """
+        if not self.enabled and timings is None:
+            return NOOP_SPAN
+        return TraceSpan(self, name, timings, args)
+
+    def export(self, path: str | Path) -> int:
+        """
+        Writes recorded spans to the file in Chrome trace event format.
+
+        :return: Amount of exported spans.
+        """
+        pid = os.getpid()
+        events = [{"name": name, "ph": "X", "ts": start / 1000, "dur": duration / 1000,
+                   "pid": pid, "tid": tid, "args": args}
+                  for name, start, duration, tid, args in list(self.events)]
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+    def clear(self):
+        self.events.clear()
+
+
+# -------------------- file_mover.py --------------------
+COPY_CHUNK_SIZE = 8 * 1024 * 1024  # bytes
+
+
+def is_same_device(src: str | Path, dst_folder: str | Path) -> bool:
+    """
+    Checks whether the file and the folder are on the same device (so the file can be renamed into the folder).
+    """
+    return os.stat(src).st_dev == os.stat(dst_folder).st_dev
+
+
+def copy_file_data(src: str | Path, dst: str | Path, chunk_size: int = COPY_CHUNK_SIZE) -> int:
+    """
+    Copies file data and permission bits chunk by chunk and flushes it to the disk (fsync).
+    Uses zero-copy `os.copy_file_range` / `os.sendfile` where available, otherwise plain reads and writes.
+    If the destination file size doesn't match the source file size after copying, raises OSError.
+
+    :param src: Source file path.
+    :param dst: Destination file path (overwritten if exists).
+    :param chunk_size: Max amount of bytes copied at once.
+    :return: Amount of copied bytes.
+    """
+    fd_in = os.open(src, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        stat = os.fstat(fd_in)
+        size = stat.st_size
+        mode = stat.st_mode & 0o777
+        fd_out = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), mode)
+        try:
+            if hasattr(os, "fchmod"):  # the destination can be an existing (reserved) file with other permissions
+                os.fchmod(fd_out, mode)
+            copied = 0
+            if hasattr(os, "copy_file_range"):
+                try:
+                    while copied < size:
+                        n = os.copy_file_range(fd_in, fd_out, min(chunk_size, size - copied), copied, copied)
+                        if not n:
+                            break
+                        copied += n
+                except OSError:  # not supported for these file systems, try the next method
+                    pass
+
+            if copied < size and hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+                try:
+                    os.lseek(fd_out, copied, os.SEEK_SET)
+                    while copied < size:
+                        n = os.sendfile(fd_out, fd_in, copied, min(chunk_size, size - copied))
+                        if not n:
+                            break
+                        copied += n
+                except OSError:
+                    pass
+
+            if copied < size:
+                os.lseek(fd_in, copied, os.SEEK_SET)
+                os.lseek(fd_out, copied, os.SEEK_SET)
+                while chunk := os.read(fd_in, chunk_size):
+                    view = memoryview(chunk)
+                    while view:
+                        view = view[os.write(fd_out, view):]
+                    copied += len(chunk)
+
+            os.fsync(fd_out)
+            if os.fstat(fd_out).st_size != size:
+                raise OSError(f"Copied file size mismatch: {src} -> {dst}.")
+        finally:
+            os.close(fd_out)
+        os.utime(dst, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    finally:
+        os.close(fd_in)
+    return copied
+
+
+def move_file(src: str | Path, dst: str | Path, chunk_size: int = COPY_CHUNK_SIZE) -> str:
+    """
+    Moves the file. If the destination is on the same device, renames the file,
+    otherwise copies it (see `copy_file_data`) and removes the source file.
+
+    :param src: Source file path.
+    :param dst: Destination file path (replaced if exists).
+    :param chunk_size: Max amount of bytes copied at once.
+    :return: Used method: "rename" or "copy".
+    """
+    if is_same_device(src, Path(dst).parent):
+        try:
+            os.replace(src, dst)
+            return "rename"
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+
+    copy_file_data(src, dst, chunk_size)
+    os.remove(src)
+    return "copy"
+
+
+# -------------------- link_strategies.py --------------------
+class LinkCreator:
+    """
+    Creates "links" to clips in the links folder using the first strategy that works:
+    hard link -> reflink (copy-on-write clone, Linux FICLONE) -> symbolic link -> copy.
+
+    The strategy that worked is cached per (clip device, links folder device),
+    so in the common case creating a link costs one syscall.
+    The cache only moves to a fallback strategy if the previous ones failed because of the devices
+    (not supported, cross-device, not permitted), not because of the file itself.
+    Link names are reserved with `FilenameReserver`, so existing files are never overwritten.
+    """
+    HARDLINK = "hardlink"
+    REFLINK = "reflink"
+    SYMLINK = "symlink"
+    COPY = "copy"
+    STRATEGIES = (HARDLINK, REFLINK, SYMLINK, COPY)
+
+    FICLONE = 0x40049409  # linux/fs.h
+    DEVICE_ERRNOS = {errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOSYS, errno.ENOTTY}
+    ERROR_PRIVILEGE_NOT_HELD = 1314  # Windows: symbolic links require a privilege
+
+    def __init__(self, reserver: FilenameReserver):
+        self.reserver = reserver
+        self._strategies: dict[tuple[int, int], str] = {}  # {(clip device, links folder device): strategy}
+        self._lock = Lock()
+        self._tmp_counter = itertools.count()
+
+    @classmethod
+    def is_device_error(cls, error: OSError) -> bool:
+        """
+        Checks whether the error means the strategy doesn't work for these devices at all.
+        """
+        return error.errno in cls.DEVICE_ERRNOS or getattr(error, "winerror", None) == cls.ERROR_PRIVILEGE_NOT_HELD
+
+    def create(self,
+               file_path: str | Path,
+               links_folder: str | Path,
+               link_path: str | Path | None = None) -> tuple[Path, str]:
+        """
+        Creates a link for `file_path` in `links_folder`.
+        If all strategies fail, raises OSError (and releases the link path).
+
+        :param link_path: Already reserved link path. If None, a unique name in `links_folder` is reserved.
+        :return: Link path and the strategy used.
+        """
+        file_path, links_folder = Path(file_path), Path(links_folder)
+        os.makedirs(links_folder, exist_ok=True)
+        devices = (os.stat(file_path).st_dev, os.stat(links_folder).st_dev)
+
+        with self._lock:
+            cached = self._strategies.get(devices)
+        strategies = self.STRATEGIES if cached is None else self.STRATEGIES[self.STRATEGIES.index(cached):]
+
+        link_path = Path(link_path) if link_path else self.reserver.reserve(links_folder / file_path.name)
+        errors: list[tuple[str, OSError]] = []
+        for strategy in strategies:
+            try:
+                with self.reserver.changing(link_path.parent):
+                    getattr(self, f"_create_{strategy}")(file_path, link_path)
+            except OSError as e:
+                errors.append((strategy, e))
+                continue
+
+            # Per-file errors (e.g. a locked file) don't make the fallback the strategy for these devices.
+            if strategy != cached and all(self.is_device_error(e) for _, e in errors):
+                with self._lock:
+                    self._strategies[devices] = strategy
+            return link_path, strategy
+
+        self.reserver.release(link_path)
+        raise OSError(f"Cannot create link for {file_path} ({'; '.join(f'{s}: {e}' for s, e in errors)}).")
+
+    def _replace_with(self, link_path: Path, create):
+        """
+        Creates a link with a unique temporary name and atomically replaces the reserved (empty) file with it.
+        """
+        tmp_path = link_path.with_name(f".{link_path.name}.{os.getpid()}-{next(self._tmp_counter)}.tmp")
+        create(tmp_path)
+        try:
+            os.replace(tmp_path, link_path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+
+    def _create_hardlink(self, file_path: Path, link_path: Path):
+        self._replace_with(link_path, lambda tmp_path: os.link(file_path, tmp_path))
+
+    def _create_reflink(self, file_path: Path, link_path: Path):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOTSUP, "Reflinks are only supported on Linux.")
+
+        import fcntl
+
+        with open(file_path, "rb") as src, open(link_path, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), self.FICLONE, src.fileno())
+        st = os.stat(file_path)
+        os.utime(link_path, ns=(st.st_atime_ns, st.st_mtime_ns))  # as copies, so retention can recognize it
+
+    def _create_symlink(self, file_path: Path, link_path: Path):
+        self._replace_with(link_path, lambda tmp_path: os.symlink(file_path, tmp_path))
+
+    def _create_copy(self, file_path: Path, link_path: Path):
+        copy_file_data(file_path, link_path)
+
 
-if __name__ != '__main__':
-    import obspython as obs
+# -------------------- clip_journal.py --------------------
+class ClipJournal:
+    """
+    Append-only write-ahead journal of clip moves (JSON lines, every line is fsynced).
 
+    Every clip move is an entry with steps:
+    PLANNED (source, destination and links folder are known) -> MOVED -> LINKING (link path is reserved)
+    -> DONE (link is created), or PLANNED -> FAILED.
+    Entries that are not DONE / FAILED after a crash are returned by `pending` and can be finished.
+    The journal is rewritten with pending entries only (compacted) every `compact_every` finished entries.
+    """
+    PLANNED = "planned"
+    MOVED = "moved"
+    LINKING = "linking"
+    DONE = "done"
+    FAILED = "failed"
+    FINISHED_STEPS = (DONE, FAILED)
+
+    def __init__(self, path: str | Path, compact_every: int = 500):
+        """
+        :param path: Journal file path.
+        :param compact_every: Amount of finished entries after which the journal is compacted.
+        """
+        self.path = Path(path)
+        self.compact_every = compact_every
+        self.errors = 0
+        self._finished_since_compact = 0
+        self._lock = Lock()
+        self._entries, last_id = self._read()  # {entry id: last record}, only pending ones
+        self._next_id = last_id + 1  # finished entries can still be in the journal (e.g. if compaction failed)
+        self._fd: int | None = None
+
+    def _read(self) -> tuple[dict[int, dict[str, Any]], int]:
+        """
+        Reads the journal.
 
-# -------------------- ui.py --------------------
-# This part of the script uses only when it is run as a main program, not imported by OBS.
-#
-# You can run this script to show notification:
-# python smart_replays.py <Notification Title> <Notification Text> <Notification Color>
-class ScrollingText:
-    def __init__(self,
-                 canvas: tk.Canvas,
-                 text,
-                 visible_area_width,
-                 start_pos,
-                 font,
-                 delay: int = 10,
-                 speed=1,
-                 on_finish_callback=None):
+        :return: Pending entries and the highest entry ID in the journal (0 if it's empty).
         """
-        Scrolling text widget.
+        entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:  # the last line can be incomplete after a crash
+                        continue
+                    entries[record["id"]] = {**entries.get(record["id"], {}), **record}
+        except FileNotFoundError:
+            pass
+        return ({entry_id: record for entry_id, record in entries.items()
+                 if record["step"] not in self.FINISHED_STEPS},
+                max(entries, default=0))
+
+    def _write(self, record: dict[str, Any]) -> bool:
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0))
+            os.write(self._fd, (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            os.fsync(self._fd)
+            return True
+        except OSError:
+            self.errors += 1
+            return False
+
+    def begin(self, src: str | Path, dst: str | Path, links_folder: str | Path | None, **data: Any) -> int:
+        """
+        Writes PLANNED step of a new entry.
 
-        :param canvas: canvas
-        :param text: text
-        :param visible_area_width: width of the visible area of the text
-        :param start_pos: text's start position (most likely padding from left border)
-        :param font: font
-        :param delay: Delay between text moves (in ms)
-        :param speed: scrolling speed
-        :param on_finish_callback: callback function when text animation is finished
+        :param src: Clip file path (saved by OBS).
+        :param dst: Reserved clip destination path.
+        :param links_folder: Folder for the clip link (None if links are disabled).
+        :param data: Additional entry fields (e.g. clip naming info to index the recovered clip).
+        :return: Entry ID.
+        """
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            record = {"id": entry_id, "step": self.PLANNED, "src": str(src), "dst": str(dst),
+                      "links_folder": str(links_folder) if links_folder else None, **data}
+            self._entries[entry_id] = record
+            self._write(record)
+        return entry_id
+
+    def step(self, entry_id: int, step: str, **data: str):
         """
+        Writes the next step of the entry.
 
-        self.canvas = canvas
-        self.text = text
-        self.area_width = visible_area_width
-        self.start_pos = start_pos
-        self.font = font
-        self.delay = delay
-        self.speed = speed
-        self.on_finish_callback = on_finish_callback
+        :param data: Additional entry fields (e.g. `link` for LINKING step).
+        """
+        with self._lock:
+            if entry_id not in self._entries:
+                return
+            self._write({"id": entry_id, "step": step, **data})
+            if step in self.FINISHED_STEPS:
+                del self._entries[entry_id]
+                self._finished_since_compact += 1
+                if self._finished_since_compact >= self.compact_every:
+                    self._compact()
+            else:
+                self._entries[entry_id].update(step=step, **data)
 
-        self.text_width = font.measure(text)
-        self.text_height = font.metrics("ascent") + font.metrics("descent")
-        self.text_id = self.canvas.create_text(0, round(self.text_height / 2),
-                                               anchor=tk.NW, text=self.text, font=self.font, fill="#ffffff")
-        self.text_curr_pos = start_pos
+    def pending(self) -> list[dict[str, Any]]:
+        """
+        Returns unfinished entries (records with the fields of PLANNED step and the last step).
+        """
+        with self._lock:
+            return [dict(record) for record in self._entries.values()]
 
-    def update_scroll(self):
-        if self.text_curr_pos + self.text_width > self.area_width:
-            self.canvas.move(self.text_id, -self.speed, 0)
-            self.text_curr_pos -= self.speed
+    def compact(self):
+        with self._lock:
+            self._compact()
 
-            self.canvas.after(self.delay, self.update_scroll)
-        else:
-            if self.on_finish_callback:
-                self.on_finish_callback()
+    def _compact(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in self._entries.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._close()
+            os.replace(tmp_path, self.path)
+            self._finished_since_compact = 0
+        except OSError:
+            self.errors += 1
+
+    def close(self):
+        with self._lock:
+            self._close()
 
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+# -------------------- clip_index.py --------------------
+CLIP_EXTENSIONS = (".mkv", ".mp4", ".mov", ".flv", ".ts")
+
+
+class ClipRecord:
+    """
+    A row of the clips index.
+    """
+    __slots__ = ("path", "alias", "exe_path", "scene", "mode", "saved_at", "size", "mtime_ns", "duration", "link")
 
-class NotificationWindow:
     def __init__(self,
-                 title: str,
-                 message: str,
-                 primary_color: str = "#78B900"):
-        self.title = title
-        self.message = message
-        self.primary_color = primary_color
-        self.bg_color = "#000000"
+                 path: str,
+                 alias: str | None,
+                 exe_path: str | None,
+                 scene: str | None,
+                 mode: str | None,
+                 saved_at: float,
+                 size: int,
+                 mtime_ns: int,
+                 duration: float | None,
+                 link: str | None = None):
+        """
+        :param path: Clip file path.
+        :param alias: Clip name (alias, executable name or scene name).
+        :param exe_path: Executable the clip is related to.
+        :param scene: Scene name at the moment of saving.
+        :param mode: Clip naming mode name.
+        :param saved_at: Saving time (unix timestamp).
+        :param size: File size in bytes.
+        :param mtime_ns: File modification time (used by reconciliation).
+        :param duration: Clip duration in seconds (approximate).
+        :param link: Path of the clip link (in the links folder).
+        """
+        self.path = path
+        self.alias = alias
+        self.exe_path = exe_path
+        self.scene = scene
+        self.mode = mode
+        self.saved_at = saved_at
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.duration = duration
+        self.link = link
+
+    def as_tuple(self) -> tuple:
+        return tuple(getattr(self, i) for i in self.__slots__)
+
+
+class ClipIndex:
+    """
+    SQLite index of saved clips.
 
-        self.root = tk.Tk()
-        self.root.withdraw()
-        self.window = tk.Toplevel(bg="#000001")
-        self.window.overrideredirect(True)
-        self.window.attributes("-topmost", True, "-alpha", 0.99, "-transparentcolor", "#000001")
+    Records are written by a background thread in batched transactions
+    (everything added within `flush_interval`, up to `batch_size` records, is one transaction),
+    so saving a clip only puts a record in the queue.
+    `sqlite3` is imported in the worker thread, not at script load.
+    """
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    path TEXT PRIMARY KEY,
+    alias TEXT,
+    exe_path TEXT,
+    scene TEXT,
+    mode TEXT,
+    saved_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    duration REAL,
+    link TEXT
+);
+CREATE INDEX IF NOT EXISTS clips_alias_saved_at ON clips (alias, saved_at);
+CREATE INDEX IF NOT EXISTS clips_exe_path ON clips (exe_path);
+CREATE INDEX IF NOT EXISTS clips_saved_at ON clips (saved_at);
+"""
+
+    def __init__(self, path: str | Path, batch_size: int = 64, flush_interval: float = 0.5):
+        """
+        :param path: Database file path.
+        :param batch_size: Max amount of records written in one transaction.
+        :param flush_interval: Max time (in seconds) a record waits for other records before being written.
+        """
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Queue[ClipRecord | tuple | None] = Queue()
+        self._thread: Thread | None = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = Thread(target=self._run, name="SmartReplaysClipIndex", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """
+        Writes queued records and stops the worker.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
 
-        self.scr_w, self.scr_h = self.window.winfo_screenwidth(), self.window.winfo_screenheight()
-        self.wnd_w, self.wnd_h = round(self.scr_w / 6.4), round(self.scr_h / 12)
-        self.wnd_x, self.wnd_y = self.scr_w - self.wnd_w, round(self.scr_h / 10)
-        self.title_font_size = round(self.wnd_h / 5)
-        self.message_font_size = round(self.wnd_h / 8)
-        self.second_frame_padding_x = round(self.wnd_w / 40)
-        self.message_right_padding = round(self.wnd_w / 40)
-        self.content_frame_padding_x, self.content_frame_padding_y = (round(self.wnd_w / 40),
-                                                                      round(self.wnd_h / 12))
+    def add(self, record: ClipRecord):
+        self.start()
+        self._queue.put(record)
 
-        self.window.geometry(f"{self.wnd_w}x{self.wnd_h}+{self.wnd_x}+{self.wnd_y}")
+    def remove(self, paths: list[str | Path]):
+        """
+        Queues removing of the records of deleted clips.
+        """
+        self.start()
+        self._queue.put(("remove", [str(i) for i in paths]))
 
-        self.first_frame = tk.Frame(self.window, bg=self.primary_color, bd=0, width=1, height=self.wnd_h)
-        self.first_frame.place(x=self.wnd_w-1, y=0)
+    def reconcile(self,
+                  roots: list[str | Path],
+                  exclude: list[str | Path] = (),
+                  on_done: Callable[[dict[str, Any]], Any] | None = None):
+        """
+        Queues re-syncing of the index with the clip files:
+        new files are added, changed files (size / mtime) are updated, records of removed files are deleted.
+        Files with unchanged size and mtime are not touched.
+
+        New files are searched only in the clip folders - subfolders of `roots` (recursively).
+        Loose files in `roots` are never added: a clips folder can be the OBS recording folder,
+        so they can be recordings. Already indexed clips outside the clip folders are only checked.
+        The clip name of new files is unknown (folder names don't have to be clip names), so it's NULL.
+
+        :param roots: Clips base folders.
+        :param exclude: Folders to skip (e.g. links folder).
+        :param on_done: Called in the worker thread with reconciliation stats.
+        """
+        self.start()
+        self._queue.put(("reconcile", [str(i) for i in roots], [str(i) for i in exclude], on_done))
 
-        self.second_frame = tk.Frame(self.window, bg=self.bg_color, bd=0, width=1, height=self.wnd_h)
-        self.second_frame.pack_propagate(False)
-        self.second_frame.place(x=self.wnd_w-1, y=0)
+    def query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        """
+        Executes a read query in the calling thread (using a separate connection).
+        """
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        import sqlite3
+
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(self.SCHEMA)
+        if "link" not in {row[1] for row in conn.execute("PRAGMA table_info(clips)")}:  # created by older versions
+            try:
+                conn.execute("ALTER TABLE clips ADD COLUMN link TEXT")
+            except sqlite3.OperationalError:  # added by another connection
+                pass
+        return conn
+
+    def _run(self):
+        try:
+            conn = self._connect()
+        except:
+            _print(traceback.format_exc())
+            return
+
+        running = True
+        while running:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while items[-1] is not None and len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except Empty:
+                    break
+
+            records = []
+            for item in items:
+                if item is None:
+                    running = False
+                elif isinstance(item, ClipRecord):
+                    records.append(item)
+                else:
+                    self._write(conn, records)
+                    records = []
+                    try:
+                        if item[0] == "remove":
+                            with conn:
+                                conn.executemany("DELETE FROM clips WHERE path = ?", [(i,) for i in item[1]])
+                        else:
+                            _, roots, exclude, on_done = item
+                            stats = self._reconcile(conn, roots, exclude)
+                            if on_done is not None:
+                                on_done(stats)
+                    except:
+                        _print(traceback.format_exc())
+            self._write(conn, records)
+        conn.close()
+
+    @staticmethod
+    def _write(conn, records: list[ClipRecord]):
+        if not records:
+            return
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [i.as_tuple() for i in records])
+        except:
+            _print(traceback.format_exc())
+
+    @staticmethod
+    def _scan(root: str, exclude: set[str]):
+        """
+        Yields clip files in the subfolders of the root (recursively). Files in the root itself are skipped.
+        """
+        folders = [root]
+        while folders:
+            folder = folders.pop()
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if os.path.normcase(entry.path) not in exclude:
+                                folders.append(entry.path)
+                        elif (folder != root and entry.name.lower().endswith(CLIP_EXTENSIONS)
+                              and entry.is_file(follow_symlinks=False)):
+                            yield entry
+            except OSError:
+                continue
+
+    def _reconcile(self, conn, roots: list[str], exclude: list[str]) -> dict[str, Any]:
+        start = time.perf_counter()
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in conn.execute("SELECT path, size, mtime_ns FROM clips")}
+        exclude = {os.path.normcase(os.path.abspath(i)) for i in exclude}
+
+        seen = set()
+        new, changed, removed = [], [], []
+        for root in roots:
+            for entry in self._scan(os.path.abspath(root), exclude):
+                seen.add(entry.path)
+                stat = entry.stat(follow_symlinks=False)
+                state = known.get(entry.path)
+                if state is None:
+                    new.append(ClipRecord(path=entry.path, alias=None, exe_path=None, scene=None, mode=None,
+                                          saved_at=stat.st_mtime, size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                                          duration=None))
+                elif state != (stat.st_size, stat.st_mtime_ns):
+                    changed.append((stat.st_size, stat.st_mtime_ns, entry.path))
+
+        # Indexed clips that are not in the clip folders (e.g. saved without a folder).
+        for path, state in known.items():
+            if path in seen:
+                continue
+            try:
+                stat = os.stat(path, follow_symlinks=False)
+            except FileNotFoundError:
+                removed.append((path,))
+                continue
+            except OSError:
+                continue
+            if state != (stat.st_size, stat.st_mtime_ns):
+                changed.append((stat.st_size, stat.st_mtime_ns, path))
+
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             [i.as_tuple() for i in new])
+            conn.executemany("UPDATE clips SET size = ?, mtime_ns = ? WHERE path = ?", changed)
+            conn.executemany("DELETE FROM clips WHERE path = ?", removed)
+
+        return {"scanned": len(seen), "added": len(new), "updated": len(changed), "removed": len(removed),
+                "time": time.perf_counter() - start}
+
+
+# -------------------- retention.py --------------------
+SIZE_UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+RETENTION_TOKEN_RE = re.compile(r"^(\d+(?:\.\d+)?)(d|KB|MB|GB|TB)?$", re.IGNORECASE)
+
+
+class RetentionPolicy:
+    """
+    Clips retention limits. 0 means no limit.
+    """
+    __slots__ = ("max_age", "max_bytes", "max_count")
 
-        self.content_frame = tk.Frame(self.second_frame, bg=self.bg_color, bd=0, height=self.wnd_h)
-        self.content_frame.pack(fill=tk.X,
-                                padx=self.content_frame_padding_x,
-                                pady=self.content_frame_padding_y)
+    def __init__(self, max_age: float = 0, max_bytes: int = 0, max_count: int = 0):
+        """
+        :param max_age: Max clip age in seconds.
+        :param max_bytes: Max total size of clips in bytes.
+        :param max_count: Max amount of clips in a folder.
+        """
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.max_count = max_count
 
+    def __bool__(self):
+        return bool(self.max_age or self.max_bytes or self.max_count)
 
-        self.title_label = tk.Label(self.content_frame,
-                                    text=self.title,
-                                    font=("Bahnschrift", self.title_font_size, "bold"),
-                                    bg=self.bg_color,
-                                    fg=self.primary_color)
-        self.title_label.pack(anchor=tk.W)
+    def __repr__(self):
+        return f"RetentionPolicy(max_age={self.max_age}, max_bytes={self.max_bytes}, max_count={self.max_count})"
 
 
-        self.canvas = tk.Canvas(self.content_frame, bg=self.bg_color, highlightthickness=0)
-        self.canvas.pack()
-        self.canvas.update()
+def parse_retention_policy(row: str) -> tuple[str, RetentionPolicy]:
+    """
+    Parses a folder policy row: `<clip name> > <limits>`, where limits are separated by spaces:
+    `30d` - max age in days, `20GB` (KB, MB, GB, TB) - max total size, `100` - max amount of clips.
+    If the row is invalid, raises ValueError.
 
-        font = f.Font(family="Cascadia Mono", size=self.message_font_size)
-        self.message = ScrollingText(canvas=self.canvas,
-                                     text=message,
-                                     visible_area_width=self.wnd_w - self.second_frame_padding_x,
-                                     start_pos=self.second_frame_padding_x + self.message_right_padding,
-                                     font=font,
-                                     delay=10,
-                                     speed=2,
-                                     on_finish_callback=self.on_text_anim_finished_callback)
+    :return: Clip name (folder name) and the policy.
+    """
+    name, sep, limits = row.rpartition(">")
+    name = name.strip()
+    if not sep or not name or not limits.strip():
+        raise ValueError(f"Invalid retention policy format: {row}.")
+
+    policy = RetentionPolicy()
+    for token in limits.split():
+        match = RETENTION_TOKEN_RE.match(token)
+        if match is None:
+            raise ValueError(f"Invalid retention limit: {token}.")
+        value, unit = float(match.group(1)), (match.group(2) or "").upper()
+        if unit == "D":
+            policy.max_age = value * 86400
+        elif unit:
+            policy.max_bytes = int(value * SIZE_UNITS[unit])
+        else:
+            policy.max_count = int(value)
+    return name, policy
 
 
-    def animate_frame(self, frame: tk.Frame, target_w, delay: float = 0.00001, speed: int = 3):
-        init_w, init_h = frame.winfo_width(), self.wnd_h
-        speed = speed if init_w < target_w else -speed
+class RetentionEngine:
+    """
+    Deletes the oldest clips when folder or global limits are exceeded.
+
+    Only clips saved by the script are tracked: the clips folder can be the OBS recording folder,
+    so it's never scanned. The engine is seeded once (on the first `enforce`) with `load_clips` (the clips index),
+    then it's kept up to date with `note_clip` / `note_link`, so it keeps running per-folder totals.
+    Links are tracked by the clip they were made for and deleted together with the clip:
+    a hard link (or a copy) left in the links folder would keep the clip data on the disk.
+    A link is deleted only if it's still a link of the clip (a symlink to the clip, the same file or a copy).
+    The newest clip of each folder is never deleted.
+    Clips that cannot be deleted (e.g. opened in a player) stay tracked and are retried on the next `enforce`.
+    """
+    def __init__(self,
+                 delete: Callable[[str], object] = os.remove,
+                 load_clips: Callable[[], Iterable[tuple[str, float, int, str | None]]] | None = None):
+        """
+        :param delete: Function that deletes a file.
+        :param load_clips: Returns clips saved before: [(clip path, mtime, size, link path or None), ...].
+        """
+        self.delete = delete
+        self.load_clips = load_clips
+        self.root: str | None = None
+        self.global_policy = RetentionPolicy()
+        self.folder_policies: dict[str, RetentionPolicy] = {}
+        self.deleted_count = 0
+        self.freed_bytes = 0
+
+        self._lock = Lock()
+        self._loaded = False
+        self._clips: set[str] = set()
+        self._folders: dict[str, list[tuple[float, str, int]]] = {}  # {folder: [(mtime, path, size), ...] (oldest first)}
+        self._totals: dict[str, int] = {}  # {folder: total size}
+        self._links: dict[str, list[str]] = {}  # {clip path: [link path, ...]}
+
+    def configure(self,
+                  root: str | Path,
+                  global_policy: RetentionPolicy,
+                  folder_policies: dict[str, RetentionPolicy]):
+        """
+        Sets the clips folder and the policies. If the folder is changed, clips are reloaded on the next `enforce`.
 
-        for curr_w in range(init_w, target_w, speed):
-            frame.config(width=curr_w)
-            frame.place(x=self.wnd_w-curr_w, y=0)
-            frame.update()
-            time.sleep(delay)
+        :param root: Clips folder. Clips outside of it are not deleted.
+        :param global_policy: Max age and max amount of clips in a folder (used if the folder has no own limits)
+            and max total size of all clips.
+        :param folder_policies: Policies of clip folders {folder name: policy}.
+        """
+        root = os.path.abspath(root)
+        with self._lock:
+            if root != self.root:
+                self.root = root
+                self._reset()
+            self.global_policy = global_policy
+            self.folder_policies = folder_policies
+
+    def reset(self):
+        """
+        Forgets tracked clips, they are reloaded on the next `enforce`.
+        Should be called when clips are saved without `note_clip` (e.g. retention is disabled).
+        """
+        with self._lock:
+            self._reset()
 
-        if frame.winfo_width() != target_w:
-            frame.config(width=target_w)
-            frame.place(x=self.wnd_w - target_w, y=0)
-            frame.update()
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._totals.values())
 
-    def show(self):
-        self.animate_frame(self.first_frame, self.wnd_w)
-        time.sleep(0.1)
-        self.second_frame.lift()
-        self.animate_frame(self.second_frame, self.wnd_w - self.second_frame_padding_x)
-        self.root.after(1000, self.message.update_scroll)
-        self.root.mainloop()
+    def folder_policy(self, folder: str) -> RetentionPolicy:
+        own = self.folder_policies.get(os.path.basename(folder), RetentionPolicy())
+        return RetentionPolicy(max_age=own.max_age or self.global_policy.max_age,
+                               max_bytes=own.max_bytes,
+                               max_count=own.max_count or self.global_policy.max_count)
 
-    def close(self):
-        self.animate_frame(self.second_frame, 0)
-        time.sleep(0.1)
-        self.animate_frame(self.first_frame, 0)
-        self.window.destroy()
-        self.root.destroy()
+    def note_clip(self, path: str | Path):
+        """
+        Adds a new clip to the folder totals.
+        """
+        st = os.stat(path)
+        with self._lock:
+            self._add_clip(os.path.abspath(path), st.st_mtime, st.st_size)
 
-    def on_text_anim_finished_callback(self):
-        time.sleep(2.5)
-        self.close()
+    def note_link(self, link_path: str | Path, clip_path: str | Path):
+        """
+        Adds a new link of the clip.
+        """
+        with self._lock:
+            self._add_link(os.path.abspath(link_path), os.path.abspath(clip_path))
 
+    def enforce(self, now: float | None = None) -> list[tuple[str, int, str | None]]:
+        """
+        Deletes the oldest clips until every limit is met.
 
-if __name__ == '__main__':
-    t = sys.argv[1] if len(sys.argv) > 1 else "Test Title"
-    m = sys.argv[2] if len(sys.argv) > 2 else "Test Message"
-    color = sys.argv[3] if len(sys.argv) > 3 else "#76B900"
-    NotificationWindow(t, m, color).show()
-    sys.exit(0)
+        :param now: Current time (unix timestamp).
+        :return: [(deleted clip path, freed bytes, error or None), ...]
+        """
+        now = time.time() if now is None else now
+        results = []
+        with self._lock:
+            if self.root is None:
+                return results
+            if not self._loaded:
+                self._load()
+
+            failed: dict[str, int] = {}  # {folder: amount of the oldest clips that cannot be deleted now}
+            for folder, entries in self._folders.items():
+                policy = self.folder_policy(folder)
+                # Clips that cannot be deleted stay in the folder, so only removed clips count towards the limit.
+                over_count = len(entries) - policy.max_count if policy.max_count else 0
+                while len(entries) - failed.get(folder, 0) > 1 and (
+                        (policy.max_age and now - entries[failed.get(folder, 0)][0] > policy.max_age) or
+                        over_count > 0 or
+                        (policy.max_bytes and self._totals[folder] > policy.max_bytes)):
+                    result = self._delete_oldest(folder, failed)
+                    results.append(result)
+                    if result[2] is None:
+                        over_count -= 1
+
+            if max_bytes := self.global_policy.max_bytes:
+                while self.total_bytes > max_bytes:
+                    candidates = [(entries[failed.get(folder, 0)][0], folder) for folder, entries in self._folders.items()
+                                  if len(entries) - failed.get(folder, 0) > 1]
+                    if not candidates:
+                        break
+                    results.append(self._delete_oldest(min(candidates)[1], failed))
+        return results
+
+    def _reset(self):
+        self._loaded = False
+        self._clips.clear()
+        self._folders.clear()
+        self._totals.clear()
+        self._links.clear()
+
+    def _load(self):
+        if self.load_clips is not None:
+            for path, mtime, size, link in self.load_clips():
+                path = os.path.abspath(path)
+                self._add_clip(path, mtime, size)
+                if link:
+                    self._add_link(os.path.abspath(link), path)
+        self._loaded = True
+
+    def _add_clip(self, path: str, mtime: float, size: int):
+        folder = os.path.dirname(path)
+        if path in self._clips or not os.path.normcase(folder + os.sep).startswith(os.path.normcase(self.root + os.sep)):
+            return
+        self._clips.add(path)
+        insort(self._folders.setdefault(folder, []), (mtime, path, size))
+        self._totals[folder] = self._totals.get(folder, 0) + size
+
+    def _add_link(self, link_path: str, clip_path: str):
+        links = self._links.setdefault(clip_path, [])
+        if link_path not in links:
+            links.append(link_path)
+
+    @staticmethod
+    def _is_link_of(link_path: str, link_st: os.stat_result, clip_path: str, clip_st: os.stat_result) -> bool:
+        """
+        Checks whether the file is still a link of the clip: a symlink to it, the same file (hard link) or a copy.
+        Copies (and reflinks) are made with the clip modification time, so a file is a copy only if both
+        its size and modification time match the clip (with FAT 2 seconds precision).
+        """
+        if stat.S_ISLNK(link_st.st_mode):
+            target = os.path.join(os.path.dirname(link_path), os.readlink(link_path))
+            return os.path.normcase(os.path.abspath(target)) == os.path.normcase(clip_path)
+        if not stat.S_ISREG(link_st.st_mode):
+            return False
+        if (link_st.st_dev, link_st.st_ino) == (clip_st.st_dev, clip_st.st_ino):
+            return True
+        return link_st.st_size == clip_st.st_size and abs(link_st.st_mtime - clip_st.st_mtime) <= 2
+
+    def _delete_oldest(self, folder: str, failed: dict[str, int]) -> tuple[str, int, str | None]:
+        """
+        Deletes the oldest clip of the folder (skipping the ones that failed to be deleted) and its links.
+        If the clip cannot be deleted (e.g. it's opened in a player), it's kept tracked
+        and skipped until the next `enforce`.
+
+        :param failed: {folder: amount of the oldest clips that cannot be deleted now}, updated on failure.
+        :return: Clip path, freed bytes and error (None if the clip is deleted).
+        """
+        index = failed.get(folder, 0)
+        mtime, path, size = self._folders[folder][index]
 
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:  # deleted by the user
+            self._forget_clip(folder, index)
+            return path, 0, None
+        except OSError as e:
+            failed[folder] = index + 1
+            return path, 0, str(e)
+
+        clip_links = []
+        for link in self._links.get(path, []):
+            try:
+                link_st = os.lstat(link)
+                if self._is_link_of(link, link_st, path, st):
+                    clip_links.append((link, link_st))
+            except OSError:  # removed or replaced by the user
+                continue
 
-# -------------------- globals.py --------------------
-user32 = ctypes.windll.user32
+        try:
+            self.delete(path)
+        except OSError as e:
+            failed[folder] = index + 1
+            return path, 0, str(e)
+        self._forget_clip(folder, index)
+
+        freed = 0
+        links_left = st.st_nlink - 1
+        for link, link_st in clip_links:
+            try:
+                self.delete(link)
+            except OSError:
+                continue
+            if stat.S_ISLNK(link_st.st_mode):
+                continue
+            if (link_st.st_dev, link_st.st_ino) == (st.st_dev, st.st_ino):
+                links_left -= 1
+            else:  # copy
+                freed += link_st.st_size
+        if links_left <= 0:  # no other hard links keep the data on the disk
+            freed += st.st_size
+
+        self.deleted_count += 1
+        self.freed_bytes += freed
+        return path, freed, None
+
+    def _forget_clip(self, folder: str, index: int):
+        mtime, path, size = self._folders[folder].pop(index)
+        self._totals[folder] -= size
+        self._clips.discard(path)
+        self._links.pop(path, None)
 
 
+# -------------------- globals.py --------------------
 class CONSTANTS:
     VERSION = "1.0.8.2"
     OBS_VERSION_STRING = obs.obs_get_version_string()
     OBS_VERSION_RE = re.compile(r'(\d+)\.(\d+)\.(\d+)')
     OBS_VERSION = [int(i) for i in OBS_VERSION_RE.match(OBS_VERSION_STRING).groups()]
-    CLIPS_FORCE_MODE_LOCK = Lock()
     VIDEOS_FORCE_MODE_LOCK = Lock()
+    PLATFORM_BACKEND = get_platform_backend()
     FILENAME_PROHIBITED_CHARS = r'/\:"<>*?|%'
     PATH_PROHIBITED_CHARS = r'"<>*?|%'
+    PATTERN_PROHIBITED_CHARS = r'"<>|%'
+    SAVE_REQUEST_TIMEOUT = 30  # seconds
+    SCHEDULER_TICK = 50  # ms, used while a job is due within SCHEDULER_COARSE_TICK / 2
+    SCHEDULER_COARSE_TICK = 1000  # ms
+    SCRIPT_LOAD_TIME_BUDGET = 50  # ms
+    TRACE_ENV_ENABLED = bool(os.getenv("SMART_REPLAYS_TRACE"))
+    CLIP_JOURNAL_FILENAME = "clip_journal.jsonl"
+    CLIP_JOURNAL_COMPACT_EVERY = 500  # finished clip moves
+    CLIP_INDEX_FILENAME = "clips.sqlite3"
+    LAZY_MODULES = ("tkinter", "urllib.request", "webbrowser", "subprocess", "winsound", "sqlite3")  # imported on first use
+    RESTART_TIMEOUT = 10  # seconds
+    OUTPUT_CONFIG_SECTIONS = ("Output", "SimpleOutput", "AdvOut")
+    RESTART_RETRY_MIN_DELAY = 50  # ms
+    RESTART_RETRY_MAX_DELAY = 1000  # ms
     DEFAULT_FILENAME_FORMAT = "%NAME_%d.%m.%Y_%H-%M-%S"
     DEFAULT_ALIASES = (
         {"value": "C:\\Windows\\explorer.exe > Desktop", "selected": False, "hidden": False},
@@ -223,13 +2731,39 @@ class CONSTANTS:
 
 class VARIABLES:
     update_available: bool = False
-    clip_exe_history: deque[Path, ...] | None = None
+    obs_config_cache: ConfigCache = ConfigCache()
+    tracer: Tracer = Tracer(enabled=CONSTANTS.TRACE_ENV_ENABLED)
+    exe_path_cache: ExePathCache = ExePathCache(CONSTANTS.PLATFORM_BACKEND)
+    exe_interner: ExeInterner = ExeInterner()
+    clip_exe_history: ExeHistory | None = None  # history of interned executable IDs
     video_exe_history: defaultdict[Path, int] | None = None  # {Path(path/to/executable): active_seconds_amount
     exe_path_on_video_stopping_event: Path | None = None
-    aliases: dict[Path, str] = {}
+    aliases: dict[PurePath, str] = {}  # {AliasIndex.normalize_path(path): alias}
+    alias_patterns: dict[str, str] = {}
+    alias_rows: list[tuple[str, PurePath | str, str]] = []  # [(alias row, normalized path or pattern, name), ...]
+    aliases_index: AliasIndex = AliasIndex()
     script_settings = None
+    settings = None  # ScriptSettings snapshot, rebuilt in script_load / script_update
     hotkey_ids: dict = {}
-    force_mode = None
+    scheduler: Scheduler = Scheduler()
+    scheduler_timer = None  # OBS timer callback that currently drives the scheduler
+    save_requests: SaveRequestQueue = SaveRequestQueue(timeout=CONSTANTS.SAVE_REQUEST_TIMEOUT)
+    filename_reserver: FilenameReserver = FilenameReserver()
+    link_creator: LinkCreator = LinkCreator(filename_reserver)
+    clip_journal: ClipJournal | None = None
+    clip_index: ClipIndex | None = None
+    retention: RetentionEngine = RetentionEngine()
+    clip_finalizer: ClipFinalizer | None = None
+    notification_daemon: NotificationDaemonClient = NotificationDaemonClient(__file__)
+    clip_counter: int = 0  # amount of clips saved since the script was loaded (%COUNTER)
+    restart_deadline: float | None = None  # time.monotonic() deadline of the restart in progress
+    replay_buffer_started_at: float | None = None  # time.monotonic() of the last replay buffer start
+    restart_stopped_at: float | None = None
+    restart_start_on_stop: bool = False  # the restart timed out while stopping, start the buffer when it's stopped
+    restart_retry_delay: int = CONSTANTS.RESTART_RETRY_MIN_DELAY
+    restart_count: int = 0
+    last_restart_gap: float | None = None  # stop -> start gap of the last restart (ms)
+    max_restart_gap: float = 0
 
 
 class ConfigTypes(Enum):
@@ -264,6 +2798,7 @@ class PropertiesNames:
     GR_SOUND_NOTIFICATION_SETTINGS = "sound_notification_settings"
     GR_POPUP_NOTIFICATION_SETTINGS = "popup_notification_settings"
     GR_ALIASES_SETTINGS = "aliases_settings"
+    GR_RETENTION_SETTINGS = "retention_settings"
     GR_OTHER_SETTINGS = "other_settings"
 
     # Clips path settings
@@ -319,10 +2854,23 @@ class PropertiesNames:
     PROP_ALIASES_IMPORT_PATH = "aliases_import_path"
     BTN_ALIASES_IMPORT = "aliases_import_btn"
 
+    # Retention settings
+    TXT_RETENTION_DESC = "retention_desc"
+    PROP_RETENTION_MAX_AGE = "retention_max_age"
+    PROP_RETENTION_MAX_SIZE = "retention_max_size"
+    PROP_RETENTION_MAX_COUNT = "retention_max_count"
+    PROP_RETENTION_POLICIES = "retention_policies"
+    TXT_RETENTION_POLICIES_ERR = "retention_policies_err"
+
     # Other section
     PROP_RESTART_BUFFER = "restart_buffer"
     PROP_RESTART_BUFFER_LOOP = "restart_buffer_loop"
     TXT_RESTART_BUFFER_LOOP = "restart_buffer_loop_desc"
+    PROP_SAVE_COALESCE_WINDOW = "save_coalesce_window"
+    TXT_SAVE_COALESCE_WINDOW = "save_coalesce_window_desc"
+    PROP_TRACING = "tracing"
+    BTN_EXPORT_TRACE = "export_trace_btn"
+    BTN_RECONCILE_CLIP_INDEX = "reconcile_clip_index_btn"
 
     # Hotkeys
     HK_SAVE_BUFFER_MODE_1 = "save_buffer_force_mode_1"
@@ -366,8 +2914,109 @@ class AliasInvalidFormat(AliasParsingError):
     """
 
 
+class AliasInvalidPattern(AliasInvalidFormat):
+    """
+    Exception raised when an alias wildcard or regex pattern cannot be compiled.
+    """
+
+
+# -------------------- settings_snapshot.py --------------------
+def get_obs_data_strings(data: Any, name: str) -> tuple[str, ...]:
+    """
+    Returns values of the editable list.
+    """
+    array = obs.obs_data_get_array(data, name)
+    if array is None:
+        return ()
+
+    values = []
+    for index in range(obs.obs_data_array_count(array)):
+        item = obs.obs_data_array_item(array, index)
+        values.append(obs.obs_data_get_string(item, "value"))
+        obs.obs_data_release(item)
+    obs.obs_data_array_release(array)
+    return tuple(values)
+
+
+class ScriptSettings:
+    """
+    Immutable snapshot of the script settings.
+
+    Built once in `script_load` / `script_update`, so saving a clip doesn't touch OBS data,
+    and worker threads can read the settings safely (the snapshot is replaced, never changed).
+    If the settings are unchanged (same OBS data JSON), the previous snapshot is kept (see `from_obs_data_if_changed`).
+    """
+    __slots__ = ("clips_base_path", "clips_naming_mode", "clips_filename_template", "clips_save_to_folder",
+                 "clips_create_links", "clips_links_folder_path",
+                 "sound_notifications", "notify_on_success", "notify_on_success_path",
+                 "notify_on_failure", "notify_on_failure_path",
+                 "popup_notifications", "popup_on_success", "popup_on_failure", "popup_path_display_mode",
+                 "retention", "retention_max_age", "retention_max_size", "retention_max_count",
+                 "retention_policies",
+                 "restart_buffer", "restart_buffer_loop", "save_coalesce_window", "tracing",
+                 "data_json")
+
+    def __init__(self, **values: Any):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    @classmethod
+    def from_obs_data_if_changed(cls, data: Any, previous: "ScriptSettings | None") -> "ScriptSettings":
+        """
+        Returns `previous` if the settings in OBS data object are the same, otherwise reads the new snapshot.
+        """
+        data_json = obs.obs_data_get_json(data)
+        if previous is not None and previous.data_json == data_json:
+            return previous
+        return cls.from_obs_data(data, data_json)
+
+    @classmethod
+    def from_obs_data(cls, data: Any, data_json: str | None = None) -> "ScriptSettings":
+        """
+        Reads the script settings from OBS data object.
+
+        :param data_json: OBS data as JSON (if it's already known).
+        """
+        return cls(
+            clips_base_path=obs.obs_data_get_string(data, PN.PROP_CLIPS_BASE_PATH),
+            clips_naming_mode=ClipNamingModes(obs.obs_data_get_int(data, PN.PROP_CLIPS_NAMING_MODE)),
+            clips_filename_template=obs.obs_data_get_string(data, PN.PROP_CLIPS_FILENAME_TEMPLATE),
+            clips_save_to_folder=obs.obs_data_get_bool(data, PN.PROP_CLIPS_SAVE_TO_FOLDER),
+            clips_create_links=obs.obs_data_get_bool(data, PN.PROP_CLIPS_CREATE_LINKS),
+            clips_links_folder_path=obs.obs_data_get_string(data, PN.PROP_CLIPS_LINKS_FOLDER_PATH),
+
+            sound_notifications=obs.obs_data_get_bool(data, PN.GR_SOUND_NOTIFICATION_SETTINGS),
+            notify_on_success=obs.obs_data_get_bool(data, PN.PROP_NOTIFY_CLIPS_ON_SUCCESS),
+            notify_on_success_path=obs.obs_data_get_string(data, PN.PROP_NOTIFY_CLIPS_ON_SUCCESS_PATH),
+            notify_on_failure=obs.obs_data_get_bool(data, PN.PROP_NOTIFY_CLIPS_ON_FAILURE),
+            notify_on_failure_path=obs.obs_data_get_string(data, PN.PROP_NOTIFY_CLIPS_ON_FAILURE_PATH),
+
+            popup_notifications=obs.obs_data_get_bool(data, PN.GR_POPUP_NOTIFICATION_SETTINGS),
+            popup_on_success=obs.obs_data_get_bool(data, PN.PROP_POPUP_CLIPS_ON_SUCCESS),
+            popup_on_failure=obs.obs_data_get_bool(data, PN.PROP_POPUP_CLIPS_ON_FAILURE),
+            popup_path_display_mode=PopupPathDisplayModes(obs.obs_data_get_int(data, PN.PROP_POPUP_PATH_DISPLAY_MODE)),
+
+            retention=obs.obs_data_get_bool(data, PN.GR_RETENTION_SETTINGS),
+            retention_max_age=obs.obs_data_get_int(data, PN.PROP_RETENTION_MAX_AGE),
+            retention_max_size=obs.obs_data_get_int(data, PN.PROP_RETENTION_MAX_SIZE),
+            retention_max_count=obs.obs_data_get_int(data, PN.PROP_RETENTION_MAX_COUNT),
+            retention_policies=get_obs_data_strings(data, PN.PROP_RETENTION_POLICIES),
+
+            restart_buffer=obs.obs_data_get_bool(data, PN.PROP_RESTART_BUFFER),
+            restart_buffer_loop=obs.obs_data_get_int(data, PN.PROP_RESTART_BUFFER_LOOP),
+            save_coalesce_window=obs.obs_data_get_int(data, PN.PROP_SAVE_COALESCE_WINDOW),
+            tracing=obs.obs_data_get_bool(data, PN.PROP_TRACING),
+            data_json=obs.obs_data_get_json(data) if data_json is None else data_json,
+        )
+
+
 # -------------------- updates_check.py --------------------
 def get_latest_release_tag() -> dict | None:  # todo: for future updates
+    from urllib.request import urlopen
+
     url = "https://api.github.com/repos/qvvonk/smart_replays/releases/latest"
 
     try:
@@ -393,6 +3042,12 @@ def check_updates(current_version: str):  # todo: for future updates
 variables_tip = """<table>
 <tr><th align='left'>%NAME</th><td> - name of the clip.</td></tr>
 
+<tr><th align='left'>%SCENE</th><td> - name of the current scene.</td></tr>
+
+<tr><th align='left'>%EXE</th><td> - name of the executable (.exe file name without extension).</td></tr>
+
+<tr><th align='left'>%COUNTER</th><td> - number of the clip since the script was loaded.</td></tr>
+
 <tr><th align='left'>%a</th><td> - Weekday as locale’s abbreviated name.<br/>
 Example: Sun, Mon, …, Sat (en_US); So, Mo, …, Sa (de_DE)</td></tr>
 
@@ -471,9 +3126,9 @@ def setup_clip_paths_settings(group_obj):
     t = obs.obs_properties_add_text(
         props=group_obj,
         name=PN.TXT_CLIPS_BASE_PATH_WARNING,
-        description="The path must be on the same disk as the path for OBS records "
+        description="The path is not on the same disk as the path for OBS records "
                     "(File -> Settings -> Output -> Recording -> Recording Path).\n"
-                    "Otherwise, the script will not be able to move the clip to the correct folder.",
+                    "Clips will be copied to this disk, which takes longer than moving (OBS is not blocked).",
         type=obs.OBS_TEXT_INFO
     )
 
@@ -555,9 +3210,9 @@ def setup_clip_paths_settings(group_obj):
     links_path_warn = obs.obs_properties_add_text(
         props=group_obj,
         name=PN.TXT_CLIPS_LINKS_FOLDER_PATH_WARNING,
-        description="The path must be on the same disk as the path for OBS records "
-                    "(File -> Settings -> Output -> Recording -> Recording Path).\n"
-                    "Otherwise, the script will not be able to create link to the file.",
+        description="Hard links can only be created on the same disk as the clips. "
+                    "Otherwise, the script creates a copy-on-write clone (if the file system supports it), "
+                    "a symbolic link or a copy of the clip.",
         type=obs.OBS_TEXT_INFO
     )
     obs.obs_property_text_set_info_type(links_path_warn, obs.OBS_TEXT_INFO_WARNING)
@@ -763,7 +3418,10 @@ def setup_aliases_settings(group_obj):
     <div style="font-size: 14px">
     <span style="color: red">Invalid format.<br></span>
     <span style="color: orange">Required format: DISK:\\path\\to\\folder\\or\\executable > ClipName<br></span>
-    <span style="color: lightgreen">Example: C:\\Program Files\\Minecraft > Minecraft</span>
+    <span style="color: lightgreen">Example: C:\\Program Files\\Minecraft > Minecraft</span><br>
+    <span style="color: orange">Wildcard pattern: <code style="color: cyan">*</code> - any characters inside one folder name, <code style="color: cyan">**</code> - any characters, <code style="color: cyan">?</code> - one character.<br></span>
+    <span style="color: lightgreen">Example: *\\steamapps\\common\\*\\*.exe > SteamGames<br></span>
+    <span style="color: orange">Regex pattern: re:regular expression > ClipName</span>
     </div>""",
         type=obs.OBS_TEXT_INFO
     )
@@ -785,7 +3443,9 @@ def setup_aliases_settings(group_obj):
         props=group_obj,
         name="temp",
         description="Format:  DISK:\\path\\to\\folder\\or\\executable > ClipName\n"
-                    f"Example: {sys.executable} > OBS",
+                    f"Example: {sys.executable} > OBS\n"
+                    "Wildcard and regex patterns are also supported: *\\steamapps\\common\\*\\*.exe > SteamGames, "
+                    "re:.*\\\\Epic Games\\\\.* > EpicGames",
         type=obs.OBS_TEXT_INFO
     )
     obs.obs_property_text_set_info_type(t, obs.OBS_TEXT_INFO_WARNING)
@@ -826,6 +3486,75 @@ def setup_aliases_settings(group_obj):
     obs.obs_property_set_modified_callback(aliases_list, update_aliases_callback)
 
 
+def setup_retention_settings(group_obj):
+    obs.obs_properties_add_text(
+        props=group_obj,
+        name=PN.TXT_RETENTION_DESC,
+        description="The oldest clips are deleted after saving a new clip if the limits are exceeded "
+                    "(0 - no limit). Clip links are deleted together with the clips. "
+                    "The newest clip of each folder is never deleted.",
+        type=obs.OBS_TEXT_INFO
+    )
+
+    obs.obs_properties_add_int(
+        props=group_obj,
+        name=PN.PROP_RETENTION_MAX_AGE,
+        description="Max clip age (days)",
+        min=0, max=36500,
+        step=1
+    )
+
+    obs.obs_properties_add_int(
+        props=group_obj,
+        name=PN.PROP_RETENTION_MAX_SIZE,
+        description="Max total size of all clips (GB)",
+        min=0, max=1000000,
+        step=1
+    )
+
+    obs.obs_properties_add_int(
+        props=group_obj,
+        name=PN.PROP_RETENTION_MAX_COUNT,
+        description="Max amount of clips in a folder",
+        min=0, max=1000000,
+        step=1
+    )
+
+    err_text = obs.obs_properties_add_text(
+        props=group_obj,
+        name=PN.TXT_RETENTION_POLICIES_ERR,
+        description="""
+    <div style="font-size: 14px">
+    <span style="color: red">Invalid format.<br></span>
+    <span style="color: orange">Required format: ClipName > limits<br></span>
+    <span style="color: lightgreen">Example: Valorant > 7d 20GB 100</span>
+    </div>""",
+        type=obs.OBS_TEXT_INFO
+    )
+    obs.obs_property_set_visible(err_text, False)
+
+    policies_list = obs.obs_properties_add_editable_list(
+        props=group_obj,
+        name=PN.PROP_RETENTION_POLICIES,
+        description="",
+        type=obs.OBS_EDITABLE_LIST_TYPE_STRINGS,
+        filter=None,
+        default_path=None
+    )
+
+    obs.obs_properties_add_text(
+        props=group_obj,
+        name="retention_policies_format",
+        description="Own limits of clip folders: ClipName > limits\n"
+                    "Limits: 30d - max age (days), 20GB - max folder size (KB, MB, GB, TB), 100 - max amount of clips.\n"
+                    "Example: Valorant > 7d 20GB 100",
+        type=obs.OBS_TEXT_INFO
+    )
+
+    # ----- Callbacks -----
+    obs.obs_property_set_modified_callback(policies_list, update_retention_policies_callback)
+
+
 def setup_other_settings(group_obj):
     obs.obs_properties_add_text(
         props=group_obj,
@@ -850,45 +3579,87 @@ To disable scheduled restarts, set the value to 0.""",
         description="Restart replay buffer after clip saving"
     )
 
+    obs.obs_properties_add_text(
+        props=group_obj,
+        name=PN.TXT_SAVE_COALESCE_WINDOW,
+        description="""Repeated presses of the same save hotkey within this time are merged into one clip.
+Presses of different hotkeys are never merged: each of them saves its own clip.""",
+        type=obs.OBS_TEXT_INFO
+    )
+
+    obs.obs_properties_add_int(
+        props=group_obj,
+        name=PN.PROP_SAVE_COALESCE_WINDOW,
+        description="Merge hotkey presses within (ms)",
+        min=0, max=5000,
+        step=50
+    )
 
-def script_properties():
-    p = obs.obs_properties_create()  # main properties object
+    obs.obs_properties_add_bool(
+        props=group_obj,
+        name=PN.PROP_TRACING,
+        description="Record performance trace (also enabled by SMART_REPLAYS_TRACE environment variable)"
+    )
 
-    # ----- Ungrouped properties -----
-    # Updates text
-    t = obs.obs_properties_add_text(p, 'check_updates', 'New update available', obs.OBS_TEXT_INFO)
-    obs.obs_property_set_visible(t, VARIABLES.update_available)
+    obs.obs_properties_add_button(
+        group_obj,
+        PN.BTN_EXPORT_TRACE,
+        "Export performance trace",
+        export_trace_callback,
+    )
 
-    # Like btn
     obs.obs_properties_add_button(
-        p,
-        "like_btn",
-        "🌟 Like this script? Star it! 🌟",
-        open_github_callback
+        group_obj,
+        PN.BTN_RECONCILE_CLIP_INDEX,
+        "Reconcile clips index",
+        reconcile_clip_index_callback,
     )
 
-    # ----- Groups -----
-    clip_path_gr = obs.obs_properties_create()
-    # video_path_gr = obs.obs_properties_create()  # todo: for future updates
-    notification_gr = obs.obs_properties_create()
-    popup_gr = obs.obs_properties_create()
-    aliases_gr = obs.obs_properties_create()
-    other_gr = obs.obs_properties_create()
-
-    obs.obs_properties_add_group(p, PN.GR_CLIPS_PATH_SETTINGS, "Clip path settings", obs.OBS_GROUP_NORMAL, clip_path_gr)
-    # obs.obs_properties_add_group(p, PN.GR_VIDEOS_PATH_SETTINGS, "Video path settings", obs.OBS_GROUP_NORMAL, video_path_gr)   # todo: for future updates
-    obs.obs_properties_add_group(p, PN.GR_SOUND_NOTIFICATION_SETTINGS, "Sound notifications", obs.OBS_GROUP_CHECKABLE, notification_gr)
-    obs.obs_properties_add_group(p, PN.GR_POPUP_NOTIFICATION_SETTINGS, "Popup notifications", obs.OBS_GROUP_CHECKABLE, popup_gr)
-    obs.obs_properties_add_group(p, PN.GR_ALIASES_SETTINGS, "Aliases", obs.OBS_GROUP_NORMAL, aliases_gr)
-    obs.obs_properties_add_group(p, PN.GR_OTHER_SETTINGS, "Other", obs.OBS_GROUP_NORMAL, other_gr)
-
-    # ------ Setup properties ------
-    setup_clip_paths_settings(clip_path_gr)
-    # setup_video_paths_settings(video_path_gr)   # todo: for future updates
-    setup_notifications_settings(notification_gr)
-    setup_popup_notification_settings(popup_gr)
-    setup_aliases_settings(aliases_gr)
-    setup_other_settings(other_gr)
+
+def script_properties():
+    with VARIABLES.tracer.span("script_properties"):
+        # Output settings could be changed in OBS settings since the last time.
+        VARIABLES.obs_config_cache.invalidate(CONSTANTS.OUTPUT_CONFIG_SECTIONS)
+        p = obs.obs_properties_create()  # main properties object
+
+        # ----- Ungrouped properties -----
+        # Updates text
+        t = obs.obs_properties_add_text(p, 'check_updates', 'New update available', obs.OBS_TEXT_INFO)
+        obs.obs_property_set_visible(t, VARIABLES.update_available)
+
+        # Like btn
+        obs.obs_properties_add_button(
+            p,
+            "like_btn",
+            "🌟 Like this script? Star it! 🌟",
+            open_github_callback
+        )
+
+        # ----- Groups -----
+        clip_path_gr = obs.obs_properties_create()
+        # video_path_gr = obs.obs_properties_create()  # todo: for future updates
+        notification_gr = obs.obs_properties_create()
+        popup_gr = obs.obs_properties_create()
+        aliases_gr = obs.obs_properties_create()
+        retention_gr = obs.obs_properties_create()
+        other_gr = obs.obs_properties_create()
+
+        obs.obs_properties_add_group(p, PN.GR_CLIPS_PATH_SETTINGS, "Clip path settings", obs.OBS_GROUP_NORMAL, clip_path_gr)
+        # obs.obs_properties_add_group(p, PN.GR_VIDEOS_PATH_SETTINGS, "Video path settings", obs.OBS_GROUP_NORMAL, video_path_gr)   # todo: for future updates
+        obs.obs_properties_add_group(p, PN.GR_SOUND_NOTIFICATION_SETTINGS, "Sound notifications", obs.OBS_GROUP_CHECKABLE, notification_gr)
+        obs.obs_properties_add_group(p, PN.GR_POPUP_NOTIFICATION_SETTINGS, "Popup notifications", obs.OBS_GROUP_CHECKABLE, popup_gr)
+        obs.obs_properties_add_group(p, PN.GR_ALIASES_SETTINGS, "Aliases", obs.OBS_GROUP_NORMAL, aliases_gr)
+        obs.obs_properties_add_group(p, PN.GR_RETENTION_SETTINGS, "Clips retention", obs.OBS_GROUP_CHECKABLE, retention_gr)
+        obs.obs_properties_add_group(p, PN.GR_OTHER_SETTINGS, "Other", obs.OBS_GROUP_NORMAL, other_gr)
+
+        # ------ Setup properties ------
+        setup_clip_paths_settings(clip_path_gr)
+        # setup_video_paths_settings(video_path_gr)   # todo: for future updates
+        setup_notifications_settings(notification_gr)
+        setup_popup_notification_settings(popup_gr)
+        setup_aliases_settings(aliases_gr)
+        setup_retention_settings(retention_gr)
+        setup_other_settings(other_gr)
 
     return p
 
@@ -900,59 +3671,92 @@ def script_properties():
 # data: script settings
 # Usually I don't use `data`, cuz we have script_settings global variable.
 def open_github_callback(*args):
+    import webbrowser
+
     webbrowser.open("https://github.com/qvvonk/smart_replays", 1)
 
 
+def export_trace_callback(*args):
+    """
+    Exports recorded trace spans (Chrome trace event format) to the script data folder.
+    """
+    export_trace()
+
+
+def reconcile_clip_index_callback(*args):
+    """
+    Re-syncs the clips index with the clip folders (in the background).
+    """
+    if VARIABLES.clip_index is None:
+        return
+
+    base_path = Path(VARIABLES.settings.clips_base_path) if VARIABLES.settings.clips_base_path else get_base_path()
+    exclude = [VARIABLES.settings.clips_links_folder_path] if VARIABLES.settings.clips_links_folder_path else []
+
+    def on_done(stats):
+        _print(f"Clips index reconciled in {stats['time']:.2f} s: {stats['scanned']} files scanned, "
+               f"{stats['added']} added, {stats['updated']} updated, {stats['removed']} removed.")
+
+    _print(f"Reconciling clips index with {base_path}...")
+    VARIABLES.clip_index.reconcile([base_path], exclude, on_done)
+
+
 def update_aliases_callback(p, prop, data):
     """
     Checks the list of aliases and updates aliases menu (shows / hides error texts).
+    Only changed aliases are validated, invalid ones are removed from the list.
     """
     invalid_format_err_text = obs.obs_properties_get(p, PN.TXT_ALIASES_INVALID_FORMAT)
     invalid_chars_err_text = obs.obs_properties_get(p, PN.TXT_ALIASES_INVALID_CHARACTERS)
     path_exists_err_text = obs.obs_properties_get(p, PN.TXT_ALIASES_PATH_EXISTS)
 
-    settings_json: dict = json.loads(obs.obs_data_get_json(data))
-    if not settings_json:
+    aliases_array = obs.obs_data_get_array(data, PN.PROP_ALIASES_LIST)
+    if aliases_array is None:
         return False
 
-    try:
-        load_aliases(settings_json)
-        obs.obs_property_set_visible(invalid_format_err_text, False)
-        obs.obs_property_set_visible(invalid_chars_err_text, False)
-        obs.obs_property_set_visible(path_exists_err_text, False)
-        return True
+    values = []
+    for index in range(obs.obs_data_array_count(aliases_array)):
+        alias_data = obs.obs_data_array_item(aliases_array, index)
+        values.append(obs.obs_data_get_string(alias_data, "value"))
+        obs.obs_data_release(alias_data)
 
-    except AliasInvalidCharacters as e:
-        obs.obs_property_set_visible(invalid_format_err_text, False)
-        obs.obs_property_set_visible(invalid_chars_err_text, True)
-        obs.obs_property_set_visible(path_exists_err_text, False)
-        index = e.index
+    errors = update_aliases(values)
+    # If error in parsing
+    for error in reversed(errors):
+        obs.obs_data_array_erase(aliases_array, error.index)
+    obs.obs_data_array_release(aliases_array)
+
+    error = errors[0] if errors else None
+    obs.obs_property_set_visible(invalid_format_err_text, isinstance(error, AliasInvalidFormat))
+    obs.obs_property_set_visible(invalid_chars_err_text, isinstance(error, AliasInvalidCharacters))
+    obs.obs_property_set_visible(path_exists_err_text, isinstance(error, AliasPathAlreadyExists))
+    return True
 
-    except AliasInvalidFormat as e:
-        obs.obs_property_set_visible(invalid_format_err_text, True)
-        obs.obs_property_set_visible(invalid_chars_err_text, False)
-        obs.obs_property_set_visible(path_exists_err_text, False)
-        index = e.index
 
-    except AliasPathAlreadyExists as e:
-        obs.obs_property_set_visible(invalid_format_err_text, False)
-        obs.obs_property_set_visible(invalid_chars_err_text, False)
-        obs.obs_property_set_visible(path_exists_err_text, True)
-        index = e.index
+def update_retention_policies_callback(p, prop, data):
+    """
+    Checks the list of retention policies. Invalid ones are removed from the list, error text is shown.
+    """
+    err_text = obs.obs_properties_get(p, PN.TXT_RETENTION_POLICIES_ERR)
 
-    except AliasParsingError as e:
-        index = e.index
+    policies_array = obs.obs_data_get_array(data, PN.PROP_RETENTION_POLICIES)
+    if policies_array is None:
+        return False
 
-    # If error in parsing
-    settings_json[PN.PROP_ALIASES_LIST].pop(index)
-    new_aliases_array = obs.obs_data_array_create()
+    invalid = []
+    for index in range(obs.obs_data_array_count(policies_array)):
+        policy_data = obs.obs_data_array_item(policies_array, index)
+        try:
+            parse_retention_policy(obs.obs_data_get_string(policy_data, "value"))
+        except ValueError:
+            invalid.append(index)
+        obs.obs_data_release(policy_data)
 
-    for index, alias in enumerate(settings_json[PN.PROP_ALIASES_LIST]):
-        alias_data = obs.obs_data_create_from_json(json.dumps(alias))
-        obs.obs_data_array_insert(new_aliases_array, index, alias_data)
+    for index in reversed(invalid):
+        obs.obs_data_array_erase(policies_array, index)
+    obs.obs_data_array_release(policies_array)
 
-    obs.obs_data_set_array(data, PN.PROP_ALIASES_LIST, new_aliases_array)
-    obs.obs_data_array_release(new_aliases_array)
+    obs.obs_property_set_visible(err_text, bool(invalid))
     return True
 
 
@@ -964,7 +3768,7 @@ def check_filename_template_callback(p, prop, data):
     error_text = obs.obs_properties_get(p, PN.TXT_CLIPS_FILENAME_TEMPLATE_ERR)
 
     try:
-        gen_filename("clipname", obs.obs_data_get_string(data, PN.PROP_CLIPS_FILENAME_TEMPLATE))
+        compile_filename_template(obs.obs_data_get_string(data, PN.PROP_CLIPS_FILENAME_TEMPLATE))
         obs.obs_property_set_visible(error_text, False)
     except:
         obs.obs_property_set_visible(error_text, True)
@@ -984,7 +3788,7 @@ def update_links_path_prop_visibility(p, prop, data):
 def check_clips_links_folder_path_callback(p, prop, data):
     """
     Checks clips links folder path is in the same disk as OBS recordings path.
-    If it's not - sets OBS records path as base path for clips + '_links' and shows warning.
+    If it's not - shows warning (hard links are not possible, so other link types or copies are created).
     """
     warn_text = obs.obs_properties_get(p, PN.TXT_CLIPS_LINKS_FOLDER_PATH_WARNING)
 
@@ -992,12 +3796,9 @@ def check_clips_links_folder_path_callback(p, prop, data):
     curr_path = Path(obs.obs_data_get_string(data, PN.PROP_CLIPS_LINKS_FOLDER_PATH))
 
     if not len(curr_path.parts) or obs_records_path.parts[0] == curr_path.parts[0]:
-        obs.obs_property_text_set_info_type(warn_text, obs.OBS_TEXT_INFO_WARNING)
+        obs.obs_property_text_set_info_type(warn_text, obs.OBS_TEXT_INFO_NORMAL)
     else:
-        obs.obs_property_text_set_info_type(warn_text, obs.OBS_TEXT_INFO_ERROR)
-        obs.obs_data_set_string(data,
-                                PN.PROP_CLIPS_LINKS_FOLDER_PATH,
-                                str(obs_records_path / '_links'))
+        obs.obs_property_text_set_info_type(warn_text, obs.OBS_TEXT_INFO_WARNING)
     return True
 
 
@@ -1020,19 +3821,15 @@ def update_notifications_menu_callback(p, prop, data):
 def check_base_path_callback(p, prop, data):
     """
     Checks base path is in the same disk as OBS recordings path.
-    If it's not - sets OBS records path as base path for clips and shows warning.
+    If it's not - shows warning (clips will be copied to the other disk instead of moving, which takes longer).
     """
     warn_text = obs.obs_properties_get(p, PN.TXT_CLIPS_BASE_PATH_WARNING)
 
     obs_records_path = Path(get_base_path())
     curr_path = Path(obs.obs_data_get_string(data, PN.PROP_CLIPS_BASE_PATH))
 
-    if not len(curr_path.parts) or obs_records_path.parts[0] == curr_path.parts[0]:
-        obs.obs_property_text_set_info_type(warn_text, obs.OBS_TEXT_INFO_WARNING)
-    else:
-        obs.obs_property_text_set_info_type(warn_text, obs.OBS_TEXT_INFO_ERROR)
-        obs.obs_data_set_string(data, PN.PROP_CLIPS_BASE_PATH, str(obs_records_path))
-        print("WARN")
+    same_disk = not len(curr_path.parts) or obs_records_path.parts[0] == curr_path.parts[0]
+    obs.obs_property_set_visible(warn_text, not same_disk)
     return True
 
 
@@ -1077,28 +3874,16 @@ def export_aliases_to_json_callback(*args):
 
 
 # -------------------- tech.py --------------------
-GetTickCount64 = ctypes.windll.kernel32.GetTickCount64
-GetTickCount64.restype = ctypes.c_ulonglong
-
-
-class LASTINPUTINFO(ctypes.Structure):
-    _fields_ = [("cbSize", wintypes.UINT),
-                ("dwTime", wintypes.DWORD)]
-
-
-def _print(*values, sep: str | None = None, end: str | None = None, file=None, flush: bool = False):
-    str_time = datetime.now().strftime(f"%d.%m.%Y %H:%M:%S")
-    print(f"[{str_time}]", *values, sep=sep, end=end, file=file, flush=flush)
-
+# Platform primitives are bound to the backend methods once, on script load,
+# so the calls from timers don't pay for any dispatching.
+# See platform_backends.py for their descriptions.
+get_active_window_pid = CONSTANTS.PLATFORM_BACKEND.get_active_window_pid
+get_time_since_last_input = CONSTANTS.PLATFORM_BACKEND.get_time_since_last_input
+play_sound = CONSTANTS.PLATFORM_BACKEND.play_sound
 
-def get_active_window_pid() -> int | None:
-    """
-    Gets process ID of the current active window.
-    """
-    hwnd = user32.GetForegroundWindow()
-    pid = wintypes.DWORD()
-    user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
-    return pid.value
+# Gets path of process's executable as a raw string (without creating `Path` object).
+# Paths are cached by process identity, so repeated calls for the same process are cheap.
+get_executable_path_str = VARIABLES.exe_path_cache.get
 
 
 def get_executable_path(pid: int) -> Path:
@@ -1108,73 +3893,193 @@ def get_executable_path(pid: int) -> Path:
     :param pid: process ID.
     :return: Executable path.
     """
-    process_handle = ctypes.windll.kernel32.OpenProcess(0x0400 | 0x0010, False, pid)
-    # PROCESS_QUERY_INFORMATION | PROCESS_VM_READ
+    return Path(get_executable_path_str(pid))
 
-    if not process_handle:
-        raise OSError(f"Process {pid} does not exist.")
 
-    filename_buffer = ctypes.create_unicode_buffer(260)  # Windows path is 260 characters max.
-    result = ctypes.windll.psapi.GetModuleFileNameExW(process_handle, None, filename_buffer, 260)
-    ctypes.windll.kernel32.CloseHandle(process_handle)
-    if result:
-        return Path(filename_buffer.value)
+def get_script_data_dir() -> Path:
+    """
+    Returns the folder for the script files (traces, etc.) and creates it if it doesn't exist.
+    Can be overridden with SMART_REPLAYS_DATA_DIR environment variable.
+    """
+    if path := os.getenv("SMART_REPLAYS_DATA_DIR"):
+        data_dir = Path(path)
+    elif os.name == "nt":
+        data_dir = Path(os.getenv("APPDATA") or Path.home()) / "smart_replays"
     else:
-        raise RuntimeError(f"Cannot get executable path for process {pid}.")
+        data_dir = Path(os.getenv("XDG_DATA_HOME") or Path.home() / ".local" / "share") / "smart_replays"
 
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
 
-def play_sound(path: str | Path):
+
+def export_trace() -> Path:
     """
-    Plays sound using windows engine.
+    Exports recorded trace spans to the script data folder.
 
-    :param path: path to sound (.wav)
+    :return: Trace file path.
     """
-    with suppress(Exception):
-        winsound.PlaySound(str(path), winsound.SND_ASYNC)
+    path = get_script_data_dir() / f"trace_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
+    count = VARIABLES.tracer.export(path)
+    _print(f"{count} trace spans exported to {path}.")
+    return path
 
 
-def get_time_since_last_input() -> int:
+# -------------------- filename_template.py --------------------
+class FilenameTemplate:
     """
-    Gets the time (in seconds) since the last mouse or keyboard input.
+    File name template parsed into a list of parts: literal chunks, strftime chunks and script variables.
+
+    The template is parsed and validated once, rendering just joins the parts.
+    strftime directives are validated by the platform's strftime, so platform-specific directives and flags
+    (`%#d` on Windows, `%-d`, `%e` on Linux / macOS) are accepted where they work, as with plain strftime.
+    If the template is invalid, raises ValueError.
+    If the template generates names with prohibited characters, raises SyntaxError.
     """
-    last_input_info = LASTINPUTINFO()
-    last_input_info.cbSize = ctypes.sizeof(LASTINPUTINFO)
+    TOKENS = ("%NAME", "%SCENE", "%EXE", "%COUNTER")
+    STRFTIME_FLAGS = "#-_0^"  # Windows (#) and glibc / BSD (-_0^) directive modifiers
+
+    LITERAL = 0
+    STRFTIME = 1
+    TOKEN = 2
+
+    def __init__(self, template: str):
+        if not template:
+            raise ValueError
+
+        self.template = template
+        self.parts: list[tuple[int, str]] = []  # [(part type, value), ...]
+        self.tokens: set[str] = set()
+
+        chunk = ""
+        chunk_has_directives = False
+        i = 0
+        while i < len(template):
+            token = next((t for t in self.TOKENS if template.startswith(t, i)), None)
+            if token is not None:
+                self._add_chunk(chunk, chunk_has_directives)
+                chunk, chunk_has_directives = "", False
+                self.parts.append((self.TOKEN, token))
+                self.tokens.add(token)
+                i += len(token)
+                continue
+
+            if template[i] == "%":
+                end = i + 2 if template.startswith(tuple(self.STRFTIME_FLAGS), i + 1) else i + 1
+                if template.startswith("%%", i):
+                    directive = "%%"
+                elif end < len(template) and template[end].isascii() and template[end].isalpha():
+                    directive = template[i:end + 1]
+                    self._check_directive(directive)
+                else:
+                    raise ValueError
+                chunk += directive
+                chunk_has_directives = True
+                i += len(directive)
+                continue
+
+            chunk += template[i]
+            i += 1
+        self._add_chunk(chunk, chunk_has_directives)
+
+    @staticmethod
+    def _check_directive(directive: str):
+        """
+        Raises ValueError if the platform's strftime doesn't support the directive
+        (it raises an error or leaves the directive as is).
+        """
+        try:
+            value = datetime.now().strftime(directive)
+        except Exception as e:
+            raise ValueError from e
+        if value == directive:
+            raise ValueError
+
+    def _add_chunk(self, chunk: str, has_directives: bool):
+        if not chunk:
+            return
+
+        if has_directives:
+            try:
+                sample = datetime.now().strftime(chunk)
+            except Exception as e:
+                raise ValueError from e
+            self.parts.append((self.STRFTIME, chunk))
+        else:
+            sample = chunk
+            self.parts.append((self.LITERAL, chunk))
 
-    if ctypes.windll.user32.GetLastInputInfo(ctypes.byref(last_input_info)):
-        current_time = GetTickCount64()
-        idle_time_ms = current_time - last_input_info.dwTime
-        return idle_time_ms // 1000
-    return 0
+        if any(i in sample for i in CONSTANTS.FILENAME_PROHIBITED_CHARS):
+            raise SyntaxError
 
+    def uses(self, token: str) -> bool:
+        return token in self.tokens
 
-def create_hard_link(file_path: Path | str, links_folder: Path | str) -> None:
-    """
-    Creates a hard link for `file_path`.
+    def render(self,
+               dt: datetime | None = None,
+               name: str = "",
+               scene: str = "",
+               exe: str = "",
+               counter: int = 0) -> str:
+        """
+        Generates a file name.
+        If a variable value contains prohibited characters, raises SyntaxError.
+
+        :param dt: Optional datetime object; uses current time if None.
+        :param name: %NAME value.
+        :param scene: %SCENE value.
+        :param exe: %EXE value.
+        :param counter: %COUNTER value.
+        """
+        dt = dt or datetime.now()
+        values = {"%NAME": name, "%SCENE": scene, "%EXE": exe, "%COUNTER": str(counter)}
+
+        result = []
+        for part_type, value in self.parts:
+            if part_type == self.LITERAL:
+                result.append(value)
+            elif part_type == self.STRFTIME:
+                result.append(dt.strftime(value))
+            else:
+                value = values[value]
+                if any(i in value for i in CONSTANTS.FILENAME_PROHIBITED_CHARS):
+                    raise SyntaxError
+                result.append(value)
+        return "".join(result)
 
-    :param file_path: Original file path.
-    :param links_folder: Folder where the link will be created.
-    """
-    link_path = Path(links_folder) / Path(file_path).name
 
-    os.makedirs(str(links_folder), exist_ok=True)
-    os.link(str(file_path), link_path)
+@lru_cache(maxsize=32)
+def compile_filename_template(template: str) -> FilenameTemplate:
+    """
+    Returns compiled file name template. Compiled templates are cached per template string.
+    """
+    return FilenameTemplate(template)
 
 
 # -------------------- obs_related.py --------------------
 def get_obs_config(section_name: str | None = None,
                    param_name: str | None = None,
                    value_type: type[str, int, bool, float] = str,
-                   config_type: ConfigTypes = ConfigTypes.PROFILE):
+                   config_type: ConfigTypes = ConfigTypes.PROFILE,
+                   use_cache: bool = True):
     """
     Gets a value from OBS config.
     If the value is not set, it will use the default value. If there is no default value, it will return NULL.
     If section_name or param_name are not specified, returns OBS config obj.
 
+    Values are cached in `VARIABLES.obs_config_cache` (it's invalidated on profile change and output start).
+
     :param section_name: Section name. If not specified, returns the OBS config.
     :param param_name: Parameter name. If not specified, returns the OBS config.
     :param value_type: Type of value (str, int, bool, float).
     :param config_type: Which config search in? (global / profile / user (obs v31 or higher)
+    :param use_cache: Whether to use cached value.
     """
+    if section_name and param_name and use_cache:
+        return VARIABLES.obs_config_cache.get(
+            (config_type, section_name, param_name, value_type),
+            lambda: get_obs_config(section_name, param_name, value_type, config_type, use_cache=False)
+        )
+
     if config_type is ConfigTypes.PROFILE:
         cfg = obs.obs_frontend_get_profile_config()
     elif config_type is ConfigTypes.APP:
@@ -1257,30 +4162,141 @@ def get_base_path(script_settings: Any | None = None) -> Path:
         return Path(get_obs_config("AdvOut", "RecFilePath"))
 
 
-def restart_replay_buffering():
+def restart_replay_buffering() -> bool:
     """
     Restarts replay buffering, obviously -_-
+
+    Only stops replay buffering here, it is started again when OBS reports it stopped
+    (see `start_replay_buffering_after_restart`). Only one restart can be in progress.
+    If the restart isn't finished within `CONSTANTS.RESTART_TIMEOUT` seconds, it's cancelled
+    and replay buffering is started one last time (see `restart_replay_buffering_timeout_callback`).
+
+    Called directly from scheduler jobs (OBS timer callbacks), not from a separate thread:
+    replay buffering used to get stuck at stopping because the callback waited for the output to stop,
+    blocking the thread that stops it. Here nothing waits: stopping is only requested,
+    and starting is done by a later job after OBS reports the buffer stopped.
+
+    :return: False if another restart is already in progress.
     """
+    if VARIABLES.restart_deadline is not None:
+        _print("Replay buffering restart is already in progress.")
+        return False
+
+    VARIABLES.restart_deadline = time.monotonic() + CONSTANTS.RESTART_TIMEOUT
+    VARIABLES.restart_stopped_at = None
+    VARIABLES.restart_start_on_stop = False
+    VARIABLES.restart_retry_delay = CONSTANTS.RESTART_RETRY_MIN_DELAY
+    VARIABLES.scheduler.add_once(restart_replay_buffering_timeout_callback, CONSTANTS.RESTART_TIMEOUT * 1000)
+
     _print("Stopping replay buffering...")
-    replay_output = obs.obs_frontend_get_replay_buffer_output()
     obs.obs_frontend_replay_buffer_stop()
+    return True
+
+
+def start_replay_buffering_after_restart():
+    """
+    Starts replay buffering stopped by `restart_replay_buffering`.
+    Scheduled (once) by replay buffer stopped event callback. If the output is not ready yet,
+    retries itself by the scheduler with exponential backoff.
+    """
+    VARIABLES.scheduler.remove(start_replay_buffering_after_restart)
+    if VARIABLES.restart_deadline is None:
+        if VARIABLES.restart_start_on_stop:
+            VARIABLES.restart_start_on_stop = False
+            _print("Replay buffering stopped after the restart timeout. Starting replay buffering...")
+            obs.obs_frontend_replay_buffer_start()
+        return
+
+    if VARIABLES.restart_stopped_at is None:
+        VARIABLES.restart_stopped_at = time.monotonic()
+        _print("Replay buffering stopped.")
+
+    replay_output = obs.obs_frontend_get_replay_buffer_output()
+    can_start = obs.obs_output_can_begin_data_capture(replay_output, 0)
+    obs.obs_output_release(replay_output)
+
+    if not can_start:
+        delay = VARIABLES.restart_retry_delay
+        VARIABLES.restart_retry_delay = min(delay * 2, CONSTANTS.RESTART_RETRY_MAX_DELAY)
+        _print(f"Replay buffer output is not ready yet. Next try in {delay} ms.")
+        VARIABLES.scheduler.add_once(start_replay_buffering_after_restart, delay)
+        return
 
-    while not obs.obs_output_can_begin_data_capture(replay_output, 0):
-        time.sleep(0.1)
-    _print("Replay buffering stopped.")
     _print("Starting replay buffering...")
     obs.obs_frontend_replay_buffer_start()
-    _print("Replay buffering started.")
+
+
+def finish_replay_buffering_restart():
+    """
+    Finishes the restart in progress and measures stop -> start gap.
+    Called from replay buffer started event callback.
+    """
+    VARIABLES.restart_start_on_stop = False
+    if VARIABLES.restart_deadline is None:
+        return
+
+    VARIABLES.scheduler.remove(restart_replay_buffering_timeout_callback)
+    if VARIABLES.restart_stopped_at is not None:
+        gap = (time.monotonic() - VARIABLES.restart_stopped_at) * 1000
+        VARIABLES.last_restart_gap = gap
+        VARIABLES.max_restart_gap = max(VARIABLES.max_restart_gap, gap)
+        VARIABLES.restart_count += 1
+        _print(f"Replay buffering restarted. Stop -> start gap: {gap:.1f} ms "
+               f"(max {VARIABLES.max_restart_gap:.1f} ms, {VARIABLES.restart_count} restarts).")
+    VARIABLES.restart_deadline = None
+    VARIABLES.restart_stopped_at = None
+
+
+def restart_replay_buffering_timeout_callback():
+    """
+    Cancels the restart in progress if it wasn't finished in time
+    and makes the last attempt to start replay buffering, so the restart never leaves it stopped:
+    if it's still stopping, it's started when OBS reports it stopped.
+
+    This callback is only called by the scheduler (once).
+    """
+    VARIABLES.scheduler.remove(start_replay_buffering_after_restart)
+    if VARIABLES.restart_deadline is None:
+        return
+
+    stage = "stopping" if VARIABLES.restart_stopped_at is None else "starting"
+    _print(f"Replay buffering restart timed out at {stage} stage.")
+    VARIABLES.restart_deadline = None
+    VARIABLES.restart_stopped_at = None
+
+    if obs.obs_frontend_replay_buffer_active():
+        _print("Replay buffering is still stopping, it will be started when it's stopped.")
+        VARIABLES.restart_start_on_stop = True
+    else:
+        _print("Starting replay buffering (last attempt)...")
+        obs.obs_frontend_replay_buffer_start()
 
 
 # -------------------- script_helpers.py --------------------
-def notify(success: bool, clip_path: Path, path_display_mode: PopupPathDisplayModes):
+def get_pythonw_path() -> str:
+    """
+    Returns the path of pythonw.exe OBS uses (from OBS config). Should be called in the OBS thread.
+    """
+    return os.path.join(get_obs_config("Python", "Path64bit", str, ConfigTypes.USER), "pythonw.exe")
+
+
+def notify(success: bool,
+           clip_path: Path,
+           settings: ScriptSettings | None = None,
+           python_exe: str | None = None):
     """
     Plays and shows success / failure notification if it's enabled in notifications settings.
+
+    :param settings: Settings snapshot. If None, the current one is used.
+    :param python_exe: pythonw.exe path for popup notifications.
+        If None, it's taken from OBS config (so it must be passed when called outside the OBS thread).
     """
-    sound_notifications = obs.obs_data_get_bool(VARIABLES.script_settings, PN.GR_SOUND_NOTIFICATION_SETTINGS)
-    popup_notifications = obs.obs_data_get_bool(VARIABLES.script_settings, PN.GR_POPUP_NOTIFICATION_SETTINGS)
-    python_exe = os.path.join(get_obs_config("Python", "Path64bit", str, ConfigTypes.USER), "pythonw.exe")
+    settings = settings or VARIABLES.settings
+    path_display_mode = settings.popup_path_display_mode
+    popup_notifications = settings.popup_notifications and (settings.popup_on_success if success
+                                                             else settings.popup_on_failure)
+    if popup_notifications and python_exe is None:
+        python_exe = get_pythonw_path()
 
     if path_display_mode == PopupPathDisplayModes.JUST_FILE:
         clip_path = clip_path.name
@@ -1290,88 +4306,198 @@ def notify(success: bool, clip_path: Path, path_display_mode: PopupPathDisplayMo
         clip_path = Path(clip_path.parent.name) / clip_path.name
 
     if success:
-        if sound_notifications and obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_NOTIFY_CLIPS_ON_SUCCESS):
-            path = obs.obs_data_get_string(VARIABLES.script_settings, PN.PROP_NOTIFY_CLIPS_ON_SUCCESS_PATH)
-            play_sound(path)
+        if settings.sound_notifications and settings.notify_on_success:
+            play_sound(settings.notify_on_success_path)
 
-        if popup_notifications and obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_POPUP_CLIPS_ON_SUCCESS):
-            subprocess.Popen([python_exe, __file__, "Clip saved", f"Clip saved to {clip_path}"])
+        if popup_notifications:
+            VARIABLES.notification_daemon.send(python_exe, "Clip saved", f"Clip saved to {clip_path}")
     else:
-        if sound_notifications and obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_NOTIFY_CLIPS_ON_FAILURE):
-            path = obs.obs_data_get_string(VARIABLES.script_settings, PN.PROP_NOTIFY_CLIPS_ON_FAILURE_PATH)
-            play_sound(path)
+        if settings.sound_notifications and settings.notify_on_failure:
+            play_sound(settings.notify_on_failure_path)
 
-        if popup_notifications and obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_POPUP_CLIPS_ON_FAILURE):
-            subprocess.Popen([python_exe, __file__, "Clip not saved", f"More in the logs.", "#C00000"])
+        if popup_notifications:
+            VARIABLES.notification_daemon.send(python_exe, "Clip not saved", f"More in the logs.", "#C00000")
 
 
-def load_aliases(script_settings_dict: dict):
+def parse_alias(value: str, index: int) -> tuple[Path | str, str]:
     """
-    Loads aliases to `VARIABLES.aliases`.
+    Parses alias row `path > name`.
     Raises exception if path or name are invalid.
 
+    :param value: Alias row.
+    :param index: Alias index (used for exceptions).
+    :return: (`Path` for path aliases or pattern string for pattern aliases, name)
+    """
+    # Clip name cannot contain ">", so the last one is the separator (regex patterns may contain ">").
+    spl = value.rsplit(">", 1)
+    try:
+        path, name = spl[0].strip(), spl[1].strip()
+    except IndexError:
+        raise AliasInvalidFormat(index)
+
+    if any(i in name for i in CONSTANTS.FILENAME_PROHIBITED_CHARS):
+        raise AliasInvalidCharacters(index)
+
+    if AliasIndex.is_pattern(path):
+        if not path.startswith("re:"):
+            path = os.path.expandvars(path)
+            if any(i in path for i in CONSTANTS.PATTERN_PROHIBITED_CHARS):
+                raise AliasInvalidCharacters(index)
+
+        try:
+            AliasIndex.compile_pattern(path)
+        except re.error:
+            raise AliasInvalidPattern(index)
+        return path, name
+
+    path = os.path.expandvars(path)
+    if any(i in path for i in CONSTANTS.PATH_PROHIBITED_CHARS):
+        raise AliasInvalidCharacters(index)
+    return Path(path), name
+
+
+def update_aliases(values: list[str]) -> list[AliasParsingError]:
+    """
+    Incrementally updates `VARIABLES.aliases`, `VARIABLES.alias_patterns` and the aliases index.
+
+    New alias rows are compared with the previously loaded ones,
+    only changed rows are parsed and re-indexed.
+    Invalid rows are skipped. If several rows have the same path (paths are compared as the aliases index does,
+    case-insensitively), the first one wins (as in a full reload).
+
+    :param values: Alias rows (`path > name`).
+    :return: Errors of the invalid rows (indexes are indexes in `values`).
+    """
+    old_rows = VARIABLES.alias_rows
+    start = 0
+    while start < min(len(old_rows), len(values)) and old_rows[start][0] == values[start]:
+        start += 1
+
+    old_end, new_end = len(old_rows), len(values)
+    while old_end > start and new_end > start and old_rows[old_end - 1][0] == values[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+
+    patterns_changed = False
+    for _, key, _ in old_rows[start:old_end]:
+        if isinstance(key, PurePath):
+            del VARIABLES.aliases[key]
+            VARIABLES.aliases_index.remove(key)
+        else:
+            del VARIABLES.alias_patterns[key]
+            patterns_changed = True
+
+    # Unchanged rows after the changed ones: {key: index in `values`}.
+    suffix_indexes = {key: new_end + offset for offset, (_, key, _) in enumerate(old_rows[old_end:])}
+    dropped_keys = set()
+
+    new_rows = []
+    errors = []
+    for index in range(start, new_end):
+        try:
+            key, name = parse_alias(values[index], index)
+            if isinstance(key, Path):
+                key = AliasIndex.normalize_path(key)  # the trie is case-insensitive on every platform
+            if key in suffix_indexes and key not in dropped_keys:
+                # The changed row is above the unchanged row with the same path, so the unchanged row loses.
+                dropped_keys.add(key)
+                errors.append(AliasPathAlreadyExists(suffix_indexes[key]))
+            elif key in VARIABLES.aliases or key in VARIABLES.alias_patterns:
+                raise AliasPathAlreadyExists(index)
+        except AliasParsingError as e:
+            errors.append(e)
+            continue
+
+        if isinstance(key, PurePath):
+            VARIABLES.aliases[key] = name
+            VARIABLES.aliases_index.add(key, name)
+        else:
+            VARIABLES.alias_patterns[key] = name
+            patterns_changed = True
+        new_rows.append((values[index], key, name))
+
+    VARIABLES.alias_rows = (old_rows[:start] + new_rows +
+                            [row for row in old_rows[old_end:] if row[1] not in dropped_keys])
+    errors.sort(key=lambda e: e.index)
+    if patterns_changed:
+        # Patterns priority depends on their order in the list, so their order is taken from the rows.
+        VARIABLES.aliases_index.set_patterns({key: name for _, key, name in VARIABLES.alias_rows
+                                              if isinstance(key, str)})
+    return errors
+
+
+def load_aliases(script_settings_dict: dict) -> list[AliasParsingError]:
+    """
+    Loads aliases to `VARIABLES.aliases` and `VARIABLES.alias_patterns` from scratch.
+    Invalid aliases are skipped.
+
     :param script_settings_dict: Script settings as dict.
+    :return: Errors of the invalid aliases.
     """
     _print("Loading aliases...")
 
-    new_aliases = {}
     aliases_list = script_settings_dict.get(PN.PROP_ALIASES_LIST)
     if aliases_list is None:
         aliases_list = CONSTANTS.DEFAULT_ALIASES
 
-    for index, i in enumerate(aliases_list):
-        value = i.get("value")
-        spl = value.split(">", 1)
-        try:
-            path, name = spl[0].strip(), spl[1].strip()
-        except IndexError:
-            raise AliasInvalidFormat(index)
+    VARIABLES.aliases = {}
+    VARIABLES.alias_patterns = {}
+    VARIABLES.alias_rows = []
+    VARIABLES.aliases_index = AliasIndex()
+    errors = update_aliases([i.get("value") for i in aliases_list])
+
+    for error in errors:
+        _print(f"Alias #{error.index + 1} is invalid ({type(error).__name__}), skipping.")
+    _print(f"{len(VARIABLES.aliases)} aliases and {len(VARIABLES.alias_patterns)} alias patterns are loaded.")
+    return errors
 
-        path = os.path.expandvars(path)
-        if any(i in path for i in CONSTANTS.PATH_PROHIBITED_CHARS) or any(i in name for i in CONSTANTS.FILENAME_PROHIBITED_CHARS):
-            raise AliasInvalidCharacters(index)
 
-        if Path(path) in new_aliases.keys():
-            raise AliasPathAlreadyExists(index)
+# -------------------- clipname_gen.py --------------------
+def get_clip_executable_path(mode: ClipNamingModes) -> Path:
+    """
+    Returns the executable the clip is related to:
+    the one that was active most of the time during the clip recording for MOST_RECORDED_PROCESS mode,
+    the one of an active window for other modes.
 
-        new_aliases[Path(path)] = name
+    :param mode: Clip naming mode.
+    """
+    if mode is ClipNamingModes.MOST_RECORDED_PROCESS and VARIABLES.clip_exe_history:
+        return VARIABLES.exe_interner.get_path(VARIABLES.clip_exe_history.most_common())
 
-    VARIABLES.aliases = new_aliases
-    _print(f"{len(VARIABLES.aliases)} aliases are loaded.")
+    pid = get_active_window_pid()
+    executable_path = get_executable_path(pid)
+    _print(f"Current active window process ID: {pid}")
+    _print(f"Current active window executable: {executable_path}")
+    return executable_path
 
 
-# -------------------- clipname_gen.py --------------------
-def gen_clip_base_name(mode: ClipNamingModes | None = None) -> str:
+def gen_clip_base_name(mode: ClipNamingModes | None = None,
+                       executable_path: Path | None = None,
+                       scene_name: str | None = None) -> str:
     """
     Generates the base name of the clip based on the selected naming mode.
     It does NOT generate a new path for the clip or filename, only its base name.
 
     :param mode: Clip naming mode. If None, the mode is fetched from the script config.
                  If a value is provided, it overrides the configs value.
+    :param executable_path: Executable the clip is related to (see `get_clip_executable_path`).
+                            If None, it is fetched when needed.
+    :param scene_name: Current scene name. If None, it is fetched when needed.
     :return: The base name of the clip based on the selected naming mode.
     """
     _print("Generating clip base name...")
-    mode = obs.obs_data_get_int(VARIABLES.script_settings, PN.PROP_CLIPS_NAMING_MODE) if mode is None else mode
-    mode = ClipNamingModes(mode)
+    mode = ClipNamingModes(VARIABLES.settings.clips_naming_mode if mode is None else mode)
 
     if mode in [ClipNamingModes.CURRENT_PROCESS, ClipNamingModes.MOST_RECORDED_PROCESS]:
         if mode is ClipNamingModes.CURRENT_PROCESS:
             _print("Clip file name depends on the name of an active app (.exe file name) at the moment of clip saving.")
-            pid = get_active_window_pid()
-            executable_path = get_executable_path(pid)
-            _print(f"Current active window process ID: {pid}")
-            _print(f"Current active window executable: {executable_path}")
-
         else:
             _print("Clip file name depends on the name of an app (.exe file name) "
                    "that was active most of the time during the clip recording.")
-            if VARIABLES.clip_exe_history:
-                executable_path = max(VARIABLES.clip_exe_history, key=VARIABLES.clip_exe_history.count)
-            else:
-                executable_path = get_executable_path(get_active_window_pid())
+        executable_path = executable_path or get_clip_executable_path(mode)
 
         _print(f'Searching for {executable_path} in aliases list...')
-        if alias := get_alias(executable_path, VARIABLES.aliases):
+        if alias := get_alias(executable_path, VARIABLES.aliases_index):
             _print(f'Alias found: {alias}.')
             return alias
         else:
@@ -1381,122 +4507,453 @@ def gen_clip_base_name(mode: ClipNamingModes | None = None) -> str:
 
     else:
         _print("Clip filename depends on the name of the current scene name.")
-        return get_current_scene_name()
+        return scene_name or get_current_scene_name()
 
 
-def get_alias(executable_path: str | Path, aliases_dict: dict[Path, str]) -> str | None:
+def get_alias(executable_path: str | Path, aliases_index: AliasIndex) -> str | None:
     """
-    Retrieves an alias for the given executable path from the provided dictionary.
+    Retrieves an alias for the given executable path from the provided aliases index.
 
-    The function first checks if the exact `executable_path` exists in `aliases_dict`.
-    If not, it searches for the closest parent directory that is present in the dictionary.
+    If the exact `executable_path` has an alias, returns it.
+    If not, returns the alias of the closest parent directory that is present in the index.
 
     :param executable_path: A file path or string representing the executable.
-    :param aliases_dict: A dictionary where keys are `Path` objects representing executable file paths
-                         or directories, and values are their corresponding aliases.
+    :param aliases_index: Aliases index built by `load_aliases`.
     :return: The corresponding alias if found, otherwise `None`.
     """
-    exe_path = Path(executable_path)
-    if exe_path in aliases_dict:
-        return aliases_dict[exe_path]
-
-    for parent in exe_path.parents:
-        if parent in aliases_dict:
-            return aliases_dict[parent]
-
+    return aliases_index.match(executable_path)
 
 
-def gen_filename(base_name: str, template: str, dt: datetime | None = None) -> str:
+def gen_filename(base_name: str,
+                 template: str,
+                 dt: datetime | None = None,
+                 scene: str = "",
+                 exe: str = "",
+                 counter: int = 0) -> str:
     """
     Generates a file name based on the template.
     If the template is invalid or formatting fails, raises ValueError.
     If the generated name contains prohibited characters, raises SyntaxError.
 
-    :param base_name: Base name for the file.
+    :param base_name: Base name for the file (%NAME).
     :param template: Template for generating the file name.
     :param dt: Optional datetime object; uses current time if None.
+    :param scene: Current scene name (%SCENE).
+    :param exe: Executable name (%EXE).
+    :param counter: Clip number (%COUNTER).
     :return: Formatted file name.
     """
-    if not template:
-        raise ValueError
-
-    dt = dt or datetime.now()
-    filename = template.replace("%NAME", base_name)
-
     try:
-        filename = dt.strftime(filename)
-    except Exception as e:
+        compiled_template = compile_filename_template(template)
+    except ValueError:
         _print(f"An error occurred while generating the file name using the template {template}.")
         _print(traceback.format_exc())
-        raise ValueError from e
+        raise
+    return compiled_template.render(dt, name=base_name, scene=scene, exe=exe, counter=counter)
 
-    if any(i in filename for i in CONSTANTS.FILENAME_PROHIBITED_CHARS):
-        raise SyntaxError
-    return filename
 
-
-def ensure_unique_filename(file_path: str | Path) -> Path:
+def reserve_unique_filename(file_path: str | Path) -> Path:
     """
-    Generates a unique filename by adding a numerical suffix if the file already exists.
+    Reserves a unique filename by adding a numerical suffix if the file already exists.
+    The name is reserved by creating an empty file, which should be replaced with the clip.
 
     :param file_path: A string or Path object representing the target file.
     :return: A unique Path object with a modified name if necessary.
     """
-    file_path = Path(file_path)
-    parent, stem, suffix = file_path.parent, file_path.stem, file_path.suffix
-    counter = 1
-
-    while file_path.exists():
-        file_path = parent / f"{stem} ({counter}){suffix}"
-        counter += 1
-
-    return file_path
+    return VARIABLES.filename_reserver.reserve(file_path)
 
 
 # -------------------- save_buffer.py --------------------
-def move_clip_file(mode: ClipNamingModes | None = None) -> tuple[str, Path]:
+def create_clip_save_job(mode: ClipNamingModes | None = None) -> ClipSaveJob:
+    """
+    Collects everything that is needed to name the clip at the moment of saving.
+    Should be called in the OBS thread, the job itself is finalized by `finalize_clip`.
+
+    :param mode: Clip naming mode. If None, the mode is fetched from the script config.
+    """
     old_file_path = get_last_replay_file_name()
     _print(f"Old clip file path: {old_file_path}")
 
-    clip_name = gen_clip_base_name(mode)
-    ext = old_file_path.split(".")[-1]
-    filename_template = obs.obs_data_get_string(VARIABLES.script_settings,
-                                                PN.PROP_CLIPS_FILENAME_TEMPLATE)
-    filename = gen_filename(clip_name, filename_template) + f".{ext}"
+    settings = VARIABLES.settings
+    mode = ClipNamingModes(settings.clips_naming_mode if mode is None else mode)
+    filename_template = settings.clips_filename_template
+    compiled_template = compile_filename_template(filename_template)
+
+    executable_path = None
+    if mode is not ClipNamingModes.CURRENT_SCENE or compiled_template.uses("%EXE"):
+        executable_path = get_clip_executable_path(mode)
+
+    scene_name = ""
+    if mode is ClipNamingModes.CURRENT_SCENE or compiled_template.uses("%SCENE"):
+        scene_name = get_current_scene_name()
+
+    duration = None
+    if VARIABLES.replay_buffer_started_at is not None:
+        duration = min(get_replay_buffer_max_time(), time.monotonic() - VARIABLES.replay_buffer_started_at)
+
+    # OBS config is read here, in the OBS thread, the job is finalized in the worker thread.
+    clips_base_path = Path(settings.clips_base_path) if settings.clips_base_path else get_base_path()
+    python_exe = get_pythonw_path() if settings.popup_notifications else None
+
+    return ClipSaveJob(old_file_path=old_file_path,
+                       mode=mode,
+                       filename_template=filename_template,
+                       executable_path=executable_path,
+                       scene_name=scene_name,
+                       save_time=datetime.now(),
+                       settings=settings,
+                       duration=duration,
+                       clips_base_path=clips_base_path,
+                       python_exe=python_exe)
+
+
+def move_clip_file(job: ClipSaveJob, timings: dict[str, float]) -> tuple[str, Path, Path | None]:
+    """
+    Renames and moves the clip, creates a link for it.
+
+    :param job: Clip save job.
+    :param timings: Dict where time (in ms) of each stage is written to.
+    :return: Clip name, new clip path and link path (None if the link is not created).
+    """
+    tracer = VARIABLES.tracer
+    with tracer.span("naming", timings):
+        with tracer.span("gen_clip_base_name"):
+            clip_name = gen_clip_base_name(job.mode, job.executable_path, job.scene_name)
+        ext = job.old_file_path.split(".")[-1]
+        VARIABLES.clip_counter += 1
+        with tracer.span("gen_filename"):
+            filename = gen_filename(clip_name, job.filename_template, job.save_time,
+                                    scene=job.scene_name,
+                                    exe=job.executable_path.stem if job.executable_path else "",
+                                    counter=VARIABLES.clip_counter) + f".{ext}"
+
+    with tracer.span("reserve", timings):
+        settings = job.settings
+        new_folder = job.clips_base_path
+        if settings.clips_save_to_folder:
+            new_folder = new_folder / clip_name
+
+        os.makedirs(str(new_folder), exist_ok=True)
+        new_path = new_folder / filename
+        new_path = reserve_unique_filename(new_path)
+        _print(f"New clip file path: {new_path}")
+
+    journal = VARIABLES.clip_journal
+    links_folder = settings.clips_links_folder_path if settings.clips_create_links else None
+    with tracer.span("journal", timings):
+        entry_id = journal.begin(job.old_file_path, new_path, links_folder,
+                                 alias=clip_name,
+                                 exe_path=str(job.executable_path) if job.executable_path else None,
+                                 scene=job.scene_name or None,
+                                 mode=job.mode.name,
+                                 saved_at=job.save_time.timestamp(),
+                                 duration=job.duration) if journal else None
+
+    with tracer.span("move", timings):
+        with VARIABLES.filename_reserver.changing(new_folder):
+            try:
+                method = move_file(job.old_file_path, new_path)
+            except:
+                VARIABLES.filename_reserver.release(new_path)
+                if journal:
+                    journal.step(entry_id, ClipJournal.FAILED)
+                raise
+            if journal:
+                journal.step(entry_id, ClipJournal.MOVED)
+            _print(f"Clip file successfully moved ({method}).")
+            os.utime(new_folder)
+
+    link_path = None
+    if links_folder:
+        with tracer.span("link", timings):
+            if (link_path := reserve_clip_link(new_path, links_folder)) is not None:
+                if journal:
+                    journal.step(entry_id, ClipJournal.LINKING, link=str(link_path))
+                link_path = create_clip_link(new_path, link_path)
+        if link_path is not None and settings.retention:
+            VARIABLES.retention.note_link(link_path, new_path)
+    if journal:
+        journal.step(entry_id, ClipJournal.DONE)
+    return clip_name, new_path, link_path
+
+
+def reserve_clip_link(clip_path: Path, links_folder: str | Path) -> Path | None:
+    """
+    Reserves a unique link name for the clip in the links folder. Errors are only logged: the clip is already saved.
+
+    :return: Reserved link path or None if the name is not reserved.
+    """
+    try:
+        os.makedirs(links_folder, exist_ok=True)
+        return VARIABLES.filename_reserver.reserve(Path(links_folder) / clip_path.name)
+    except:
+        _print("An error occurred while reserving clip link name.")
+        _print(traceback.format_exc())
+        return None
+
+
+def create_clip_link(clip_path: Path, link_path: Path) -> Path | None:
+    """
+    Creates a link for the clip at the reserved link path. Errors are only logged: the clip is already saved.
+
+    :return: Link path or None if the link is not created.
+    """
+    try:
+        link_path, strategy = VARIABLES.link_creator.create(clip_path, link_path.parent, link_path)
+        _print(f"Clip link created ({strategy}): {link_path}")
+        return link_path
+    except:
+        _print("An error occurred while creating clip link.")
+        _print(traceback.format_exc())
+        return None
+
+
+def is_clip_link_created(clip_path: Path, link_path: Path) -> bool:
+    """
+    Checks whether the link (symlink, hard link or a complete copy) of the clip is created at the reserved path.
+    """
+    try:
+        if link_path.is_symlink():
+            return Path(os.readlink(link_path)) == clip_path
+        return link_path.samefile(clip_path) or link_path.stat().st_size == clip_path.stat().st_size
+    except OSError:
+        return False
+
 
-    new_folder = Path(get_base_path(script_settings=VARIABLES.script_settings))
-    if obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_CLIPS_SAVE_TO_FOLDER):
-        new_folder = new_folder / clip_name
+def recover_clip_moves(journal: ClipJournal, entries: list[dict]) -> int:
+    """
+    Finishes clip moves that were interrupted (OBS crash, script unload) according to the journal:
+    moves the clip to its reserved path if it's still at the old path (or was copied partially),
+    creates missing links at their reserved paths, removes empty reserved files of clips that are lost.
+    Recovered clips are added to the clips index (and the retention engine).
+
+    :param journal: Clip journal.
+    :param entries: Pending journal entries (see `ClipJournal.pending`).
+    :return: Amount of processed entries.
+    """
+    for entry in entries:
+        src, dst = Path(entry["src"]), Path(entry["dst"])
+        _print(f"Recovering interrupted clip move ({entry['step']}): {src} -> {dst}")
+
+        if entry["step"] == ClipJournal.PLANNED:
+            try:
+                if src.exists():
+                    # dst is the reserved (empty) file or a partial copy.
+                    method = move_file(src, dst)
+                    _print(f"Clip file moved ({method}).")
+                elif not dst.exists() or not dst.stat().st_size:
+                    raise FileNotFoundError(f"Neither {src} nor {dst} contains the clip.")
+                journal.step(entry["id"], ClipJournal.MOVED)
+            except:
+                _print("Cannot recover clip move.")
+                _print(traceback.format_exc())
+                try:
+                    if not dst.stat().st_size:
+                        os.remove(dst)
+                except OSError:
+                    pass
+                journal.step(entry["id"], ClipJournal.FAILED)
+                continue
+
+        link_path = None
+        if entry["step"] == ClipJournal.LINKING:
+            link_path = Path(entry["link"])
+            if dst.exists() and not is_clip_link_created(dst, link_path):
+                link_path = create_clip_link(dst, link_path)
+            elif not dst.exists() and not link_path.is_symlink() and link_path.exists() and not link_path.stat().st_size:
+                VARIABLES.filename_reserver.release(link_path)  # empty reserved file (a copy can be the last one)
+        elif entry["links_folder"] and dst.exists():
+            if (link_path := reserve_clip_link(dst, entry["links_folder"])) is not None:
+                journal.step(entry["id"], ClipJournal.LINKING, link=str(link_path))
+                link_path = create_clip_link(dst, link_path)
+        journal.step(entry["id"], ClipJournal.DONE)
+
+        if dst.exists():
+            try:
+                index_recovered_clip(entry, dst, link_path)
+            except:
+                _print("An error occurred while indexing the recovered clip.")
+                _print(traceback.format_exc())
+    return len(entries)
+
+
+def index_recovered_clip(entry: dict, path: Path, link_path: Path | None):
+    """
+    Adds the clip moved by `recover_clip_moves` to the clips index and the retention engine.
+
+    :param entry: Journal entry (with the clip naming info written by `move_clip_file`).
+    :param path: Clip path.
+    :param link_path: Clip link path (None if there is no link).
+    """
+    stat = path.stat()
+    if VARIABLES.clip_index is not None:
+        VARIABLES.clip_index.add(ClipRecord(path=str(path),
+                                            alias=entry.get("alias"),
+                                            exe_path=entry.get("exe_path"),
+                                            scene=entry.get("scene"),
+                                            mode=entry.get("mode"),
+                                            saved_at=entry.get("saved_at") or stat.st_mtime,
+                                            size=stat.st_size,
+                                            mtime_ns=stat.st_mtime_ns,
+                                            duration=entry.get("duration"),
+                                            link=str(link_path) if link_path else None))
+
+    if VARIABLES.settings is not None and VARIABLES.settings.retention and entry.get("mode"):
+        VARIABLES.retention.note_clip(path)
+        if link_path is not None:
+            VARIABLES.retention.note_link(link_path, path)
+
+
+def finish_interrupted_clip_moves(journal: ClipJournal, entries: list[dict]):
+    """
+    Recovers interrupted clip moves and compacts the journal.
+    Called by the clip finalizer worker (before any clip saved after script loading is finalized),
+    so copying clips between disks doesn't block OBS.
+    """
+    if entries:
+        recover_clip_moves(journal, entries)
+        _print(f"{len(entries)} interrupted clip moves processed.")
+    journal.compact()
+
+
+def index_clip(job: ClipSaveJob, clip_name: str, path: Path, link_path: Path | None):
+    """
+    Queues the clip record to the clips index.
+    """
+    stat = path.stat()
+    VARIABLES.clip_index.add(ClipRecord(path=str(path),
+                                        alias=clip_name,
+                                        exe_path=str(job.executable_path) if job.executable_path else None,
+                                        scene=job.scene_name or None,
+                                        mode=job.mode.name,
+                                        saved_at=job.save_time.timestamp(),
+                                        size=stat.st_size,
+                                        mtime_ns=stat.st_mtime_ns,
+                                        duration=job.duration,
+                                        link=str(link_path) if link_path else None))
+
+
+def load_retention_clips() -> list[tuple[str, float, int, str | None]]:
+    """
+    Returns clips saved by the script (clips index records with the naming mode) for the retention engine.
+    Called by the clip finalizer worker.
+    """
+    if VARIABLES.clip_index is None:
+        return []
+    rows = VARIABLES.clip_index.query("SELECT path, mtime_ns, size, link FROM clips WHERE mode IS NOT NULL")
+    return [(path, mtime_ns / 1e9, size, link) for path, mtime_ns, size, link in rows]
+
+
+def configure_retention(settings):
+    """
+    Applies retention settings to the retention engine. Invalid folder policies are skipped.
+    Should be called in the OBS thread.
+
+    :param settings: Script settings snapshot.
+    """
+    if not settings.retention:
+        VARIABLES.retention.reset()  # clips saved while retention is disabled are not tracked
+        return
+
+    folder_policies = {}
+    for row in settings.retention_policies:
+        try:
+            name, policy = parse_retention_policy(row)
+            folder_policies[name] = policy
+        except ValueError as e:
+            _print(f"Retention policy is skipped: {e}")
+
+    global_policy = RetentionPolicy(max_age=settings.retention_max_age * 86400,
+                                    max_bytes=settings.retention_max_size * 1024 ** 3,
+                                    max_count=settings.retention_max_count)
+    root = Path(settings.clips_base_path) if settings.clips_base_path else get_base_path()
+    VARIABLES.retention.configure(root, global_policy, folder_policies)
+
+
+def apply_retention(path: Path):
+    """
+    Adds the new clip to the retention engine and deletes clips that exceed the limits.
+    Called by the clip finalizer worker.
+    """
+    VARIABLES.retention.note_clip(path)
+    deleted = []
+    for clip_path, freed, error in VARIABLES.retention.enforce():
+        if error:
+            _print(f"Cannot delete old clip {clip_path}: {error}")
+        else:
+            _print(f"Old clip deleted ({freed / 1024 ** 2:.1f} MB freed): {clip_path}")
+            deleted.append(clip_path)
+
+    if deleted and VARIABLES.clip_index is not None:
+        VARIABLES.clip_index.remove(deleted)
 
-    os.makedirs(str(new_folder), exist_ok=True)
-    new_path = new_folder / filename
-    new_path = ensure_unique_filename(new_path)
-    _print(f"New clip file path: {new_path}")
 
-    os.rename(old_file_path, str(new_path))
-    _print("Clip file successfully moved.")
-    os.utime(new_folder)
+def finalize_clip(job: ClipSaveJob):
+    """
+    Moves the clip and notifies about the result. Called by the clip finalizer worker.
+    """
+    timings = {}
 
-    if obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_CLIPS_CREATE_LINKS):
-        links_folder = obs.obs_data_get_string(VARIABLES.script_settings, PN.PROP_CLIPS_LINKS_FOLDER_PATH)
-        create_hard_link(new_path, links_folder)
-    return clip_name, new_path
+    with VARIABLES.tracer.span("finalize_clip"):
+        try:
+            clip_name, path, link_path = move_clip_file(job, timings)
+            success = True
+        except:
+            _print("An error occurred while moving file to the new destination.")
+            _print(traceback.format_exc())
+            path, success = Path(), False
+
+        if success and VARIABLES.clip_index is not None:
+            with VARIABLES.tracer.span("index", timings):
+                try:
+                    index_clip(job, clip_name, path, link_path)
+                except:
+                    _print("An error occurred while indexing the clip.")
+                    _print(traceback.format_exc())
+
+        if success and job.settings.retention:
+            with VARIABLES.tracer.span("retention", timings):
+                try:
+                    apply_retention(path)
+                except:
+                    _print("An error occurred while applying clips retention.")
+                    _print(traceback.format_exc())
+
+        with VARIABLES.tracer.span("notify", timings):
+            notify(success, path, job.settings, job.python_exe)
+    _print("Clip finalization timings: " + ", ".join(f"{stage} {ms:.1f} ms" for stage, ms in timings.items()))
 
 
 def save_buffer_with_force_mode(mode: ClipNamingModes):
     """
-    Sends a request to save the replay buffer and setting a specific clip naming mode.
+    Queues a request to save the replay buffer with a specific clip naming mode.
+    Repeated presses of the same hotkey within the coalesce window are merged into one save.
     Can only be called using hotkeys.
     """
     if not obs.obs_frontend_replay_buffer_active():
         return
 
-    if CONSTANTS.CLIPS_FORCE_MODE_LOCK.locked():
+    if not VARIABLES.save_requests.add(mode):
+        _print(f"Save request ({mode.name}) merged with the previous one.")
         return
+    send_next_save_request()
+
 
-    CONSTANTS.CLIPS_FORCE_MODE_LOCK.acquire()
-    VARIABLES.force_mode = mode
-    obs.obs_frontend_replay_buffer_save()
+def send_next_save_request():
+    """
+    Asks OBS to save the replay buffer for the next queued request, if no other request is waiting for its clip.
+    OBS merges save calls made before the previous clip is written, so requests are sent one by one:
+    the next one is sent from replay buffer saved event callback, or by the scheduler when the sent one times out.
+    """
+    request = VARIABLES.save_requests.send_next()
+    if request is not None:
+        _print(f"Saving replay buffer ({request.mode.name})...")
+        obs.obs_frontend_replay_buffer_save()
+
+    if (timeout := VARIABLES.save_requests.next_timeout()) is not None:
+        VARIABLES.scheduler.add_once(send_next_save_request, int(timeout * 1000) + 1)
+    else:
+        VARIABLES.scheduler.remove(send_next_save_request)
 
 
 # -------------------- obs_events_callbacks.py --------------------
@@ -1508,14 +4965,20 @@ def on_buffer_recording_started_callback(event):
     if event is not obs.OBS_FRONTEND_EVENT_REPLAY_BUFFER_STARTED:
         return
 
+    VARIABLES.replay_buffer_started_at = time.monotonic()
+
     # Reset and restart exe history
-    VARIABLES.clip_exe_history = deque([], maxlen=get_replay_buffer_max_time())
-    _print(f"Exe history deque created. Maxlen={VARIABLES.clip_exe_history.maxlen}.")
-    obs.timer_add(append_clip_exe_history, 1000)
+    VARIABLES.clip_exe_history = ExeHistory(maxlen=get_replay_buffer_max_time())
+    _print(f"Exe history created. Maxlen={VARIABLES.clip_exe_history.maxlen}.")
+    VARIABLES.scheduler.add(append_clip_exe_history, 1000)
 
     # Start replay buffer auto restart loop.
-    if restart_loop_time := obs.obs_data_get_int(VARIABLES.script_settings, PN.PROP_RESTART_BUFFER_LOOP):
-        obs.timer_add(restart_replay_buffering_callback, restart_loop_time * 1000)
+    if restart_loop_time := VARIABLES.settings.restart_buffer_loop:
+        VARIABLES.scheduler.add_once(restart_replay_buffering_callback, restart_loop_time * 1000)
+
+    finish_replay_buffering_restart()
+    if VARIABLES.save_requests:  # hotkeys pressed while replay buffering was restarting
+        send_next_save_request()
 
 
 def on_buffer_recording_stopped_callback(event):
@@ -1526,54 +4989,90 @@ def on_buffer_recording_stopped_callback(event):
     if event is not obs.OBS_FRONTEND_EVENT_REPLAY_BUFFER_STOPPED:
         return
 
-    obs.timer_remove(append_clip_exe_history)
-    obs.timer_remove(restart_replay_buffering_callback)
+    VARIABLES.replay_buffer_started_at = None
+    VARIABLES.scheduler.remove(append_clip_exe_history)
+    VARIABLES.scheduler.remove(restart_replay_buffering_callback)
     VARIABLES.clip_exe_history.clear()
+    VARIABLES.scheduler.remove(send_next_save_request)
+    if VARIABLES.restart_deadline is not None or VARIABLES.restart_start_on_stop:
+        VARIABLES.save_requests.unsend()  # the clip is not saved, the request is sent again after the restart
+    else:
+        VARIABLES.save_requests.clear()
+    _print(f"Exe path cache stats: {VARIABLES.exe_path_cache.hits} hits, {VARIABLES.exe_path_cache.misses} misses.")
+    _print(f"OBS config cache stats: {VARIABLES.obs_config_cache.hits} hits, "
+           f"{VARIABLES.obs_config_cache.misses} misses.")
+    _print(f"Scheduler stats: {VARIABLES.scheduler.format_stats()}")
+
+    # Start replay buffering again if it was stopped by the script restart.
+    # It's started by a one-shot timer, not inside this event callback (OBS can hang in "stopping" state).
+    if VARIABLES.restart_deadline is not None or VARIABLES.restart_start_on_stop:
+        if VARIABLES.restart_deadline is not None and VARIABLES.restart_stopped_at is None:
+            VARIABLES.restart_stopped_at = time.monotonic()
+            _print("Replay buffering stopped.")
+        VARIABLES.scheduler.add_once(start_replay_buffering_after_restart, 0)
 
 
 def on_buffer_save_callback(event):
+    """
+    Collects clip info and passes the clip to the finalizer worker.
+    File system work and notifications are done off the OBS thread.
+    """
     if event is not obs.OBS_FRONTEND_EVENT_REPLAY_BUFFER_SAVED:
         return
 
-    path_display_type = obs.obs_data_get_int(VARIABLES.script_settings,
-                                             PN.PROP_POPUP_PATH_DISPLAY_MODE)
-    path_display_type = PopupPathDisplayModes(path_display_type)
-
     _print(f"{'SAVING BUFFER':->50}")
 
+    request = VARIABLES.save_requests.pop()
     try:
-        clip_name, path = move_clip_file(mode=VARIABLES.force_mode)
-        if obs.obs_data_get_bool(VARIABLES.script_settings, PN.PROP_RESTART_BUFFER):
-            # IMPORTANT
-            # I don't know why, but it seems like stopping and starting replay buffering should be in the separate thread.
-            # Otherwise it can "stuck" on stopping.
-            Thread(target=restart_replay_buffering, daemon=True).start()
-
-        if VARIABLES.force_mode:
-            VARIABLES.force_mode = None
-            CONSTANTS.CLIPS_FORCE_MODE_LOCK.release()
-
-        notify(True, path, path_display_mode=path_display_type)
+        with VARIABLES.tracer.span("create_clip_save_job"):
+            job = create_clip_save_job(mode=request.mode if request else None)
     except:
-        _print("An error occurred while moving file to the new destination.")
+        _print("An error occurred while collecting clip info.")
         _print(traceback.format_exc())
-        notify(False, Path(), path_display_mode=path_display_type)
+        notify(False, Path())
+        job = None
+
+    send_next_save_request()  # the info of this clip is already collected
+
+    if job is not None:
+        if VARIABLES.settings.restart_buffer and not VARIABLES.save_requests:
+            # The buffer is stopped by a one-shot timer, not inside this event callback.
+            # Restarted only after the last queued clip is saved, so queued requests are not lost.
+            # Doesn't wait for the clip to be moved: OBS has already written the file, the restart doesn't touch it.
+            VARIABLES.scheduler.add_once(restart_replay_buffering_after_save, 0)
+
+        # Never finalized in the OBS thread: moving the clip can take long (copying to another disk).
+        if not VARIABLES.clip_finalizer.submit(job):
+            _print("WARNING: many clips are waiting to be finalized (renamed and moved), it can take a while.")
     _print("-" * 50)
 
 
+def on_config_changed_callback(event):
+    """
+    Invalidates cached OBS config values.
+    Everything is invalidated on profile change, output settings are invalidated when an output is starting
+    (OBS applies changed output settings on start).
+    """
+    if event in (obs.OBS_FRONTEND_EVENT_PROFILE_CHANGED, obs.OBS_FRONTEND_EVENT_PROFILE_RENAMED):
+        VARIABLES.obs_config_cache.invalidate()
+        _print("Profile changed, OBS config cache is cleared.")
+    elif event in (obs.OBS_FRONTEND_EVENT_REPLAY_BUFFER_STARTING, obs.OBS_FRONTEND_EVENT_RECORDING_STARTING):
+        VARIABLES.obs_config_cache.invalidate(CONSTANTS.OUTPUT_CONFIG_SECTIONS)
+
+
 def on_video_recording_started_callback(event):  # todo: for future updates
     if event is not obs.OBS_FRONTEND_EVENT_RECORDING_STARTED:
         return
 
     VARIABLES.video_exe_history = defaultdict(int)
-    obs.timer_add(append_video_exe_history, 1000)
+    VARIABLES.scheduler.add(append_video_exe_history, 1000)
 
 
 def on_video_recording_stopping_callback(event):  # todo: for future updates
     if event is not obs.OBS_FRONTEND_EVENT_RECORDING_STOPPING:
         return
 
-    obs.timer_remove(append_video_exe_history)
+    VARIABLES.scheduler.remove(append_video_exe_history)
 
 
 def on_video_recording_stopped_callback(event):  # todo: for future updates
@@ -1584,14 +5083,62 @@ def on_video_recording_stopped_callback(event):  # todo: for future updates
 
 
 # -------------------- other_callbacks.py --------------------
+def scheduler_tick_callback():
+    """
+    Runs scheduled script jobs. OBS timer, used while a job is due soon.
+    The timer is re-armed by the scheduler (see `update_scheduler_timer`).
+    """
+    VARIABLES.scheduler.tick()
+
+
+def scheduler_coarse_tick_callback():
+    """
+    Runs scheduled script jobs. OBS timer, used while no job is due soon.
+    """
+    VARIABLES.scheduler.tick(tolerance=CONSTANTS.SCHEDULER_COARSE_TICK / 2000)
+
+
+def update_scheduler_timer():
+    """
+    Switches the OBS timer that drives the scheduler depending on the nearest job deadline:
+    no timer if there are no jobs, fine timer if a job is due soon, coarse timer otherwise.
+    Called by the scheduler (`Scheduler.on_change`) after jobs are added or removed, and after each tick.
+    The scheduler never runs it in two threads at once, so only one OBS timer is armed.
+    """
+    interval = VARIABLES.scheduler.timer_interval(CONSTANTS.SCHEDULER_TICK, CONSTANTS.SCHEDULER_COARSE_TICK)
+    if interval is None:
+        timer = None
+    elif interval == CONSTANTS.SCHEDULER_TICK:
+        timer = scheduler_tick_callback
+    else:
+        timer = scheduler_coarse_tick_callback
+
+    if timer is VARIABLES.scheduler_timer:
+        return
+    stop_scheduler_timer()
+    if timer is not None:
+        obs.timer_add(timer, interval)
+        VARIABLES.scheduler_timer = timer
+
+
+def stop_scheduler_timer():
+    if VARIABLES.scheduler_timer is not None:
+        obs.timer_remove(VARIABLES.scheduler_timer)
+        VARIABLES.scheduler_timer = None
+
+
 def restart_replay_buffering_callback():
     """
-    Restarts replay buffering and adds itself to obs timer.
+    Restarts replay buffering or reschedules itself.
 
-    This callback is only called by the obs timer.
+    This callback is only called by the scheduler (once).
     """
     _print("Restart replay buffering callback.")
-    obs.timer_remove(restart_replay_buffering_callback)
+
+    if VARIABLES.save_requests:
+        _print("Queued clips are not saved yet. Next call in 2s.")
+        VARIABLES.scheduler.add_once(restart_replay_buffering_callback, 2000)
+        return
 
     replay_length = get_replay_buffer_max_time()
     last_input_time = get_time_since_last_input()
@@ -1600,24 +5147,33 @@ def restart_replay_buffering_callback():
         next_call = next_call if next_call >= 2000 else 2000
 
         _print(f"Replay length ({replay_length}s) is greater then time since last input ({last_input_time}s). Next call in {next_call / 1000}s.")
-        obs.timer_add(restart_replay_buffering_callback, next_call)
+        VARIABLES.scheduler.add_once(restart_replay_buffering_callback, next_call)
         return
 
-    # IMPORTANT
-    # I don't know why, but it seems like stopping and starting replay buffering should be in the separate thread.
-    # Otherwise it can "stuck" at stopping state.
-    Thread(target=restart_replay_buffering, daemon=True).start()
+    restart_replay_buffering()
     # I don't re-add this callback to timer again, cz it will be automatically added in on buffering start callback.
 
 
+def restart_replay_buffering_after_save():
+    """
+    Restarts replay buffering after clip saving.
+    Skipped if a clip was requested after the saved one: the restart is scheduled again when that clip is saved.
+
+    This callback is only called by the scheduler (once).
+    """
+    if VARIABLES.save_requests:
+        return
+    restart_replay_buffering()
+
+
 def append_clip_exe_history():
     """
     Adds current active executable path in clip exe history.
     """
     with suppress(Exception):
         pid = get_active_window_pid()
-        exe = get_executable_path(pid)
-        VARIABLES.clip_exe_history.appendleft(exe)
+        exe_id = VARIABLES.exe_interner.intern(get_executable_path_str(pid))
+        VARIABLES.clip_exe_history.append(exe_id)
 
 
 def append_video_exe_history():
@@ -1672,6 +5228,7 @@ def script_defaults(s):
 
     obs.obs_data_set_default_int(s, PN.PROP_RESTART_BUFFER_LOOP, 3600)
     obs.obs_data_set_default_bool(s, PN.PROP_RESTART_BUFFER, True)
+    obs.obs_data_set_default_int(s, PN.PROP_SAVE_COALESCE_WINDOW, 500)
 
     arr = obs.obs_data_array_create()
     for index, i in enumerate(CONSTANTS.DEFAULT_ALIASES):
@@ -1682,10 +5239,40 @@ def script_defaults(s):
     _print("The default values are set.")
 
 
+def apply_script_settings(settings):
+    """
+    Rebuilds the settings snapshot and applies the settings that are kept outside of it.
+    Nothing is rebuilt if the settings are unchanged.
+    """
+    VARIABLES.script_settings = settings
+    snapshot = ScriptSettings.from_obs_data_if_changed(settings, VARIABLES.settings)
+    if snapshot is VARIABLES.settings:
+        return
+    VARIABLES.settings = snapshot
+    VARIABLES.save_requests.coalesce_window = VARIABLES.settings.save_coalesce_window / 1000
+    VARIABLES.tracer.enabled = CONSTANTS.TRACE_ENV_ENABLED or VARIABLES.settings.tracing
+    configure_retention(VARIABLES.settings)
+
+
+def load_clip_journal():
+    """
+    Opens the clip moves journal. Interrupted moves are finished (and the journal is compacted)
+    by the clip finalizer worker, so it must be started already.
+    """
+    try:
+        journal = ClipJournal(get_script_data_dir() / CONSTANTS.CLIP_JOURNAL_FILENAME,
+                              compact_every=CONSTANTS.CLIP_JOURNAL_COMPACT_EVERY)
+        VARIABLES.clip_journal = journal
+        VARIABLES.clip_finalizer.submit(partial(finish_interrupted_clip_moves, journal, journal.pending()))
+    except:
+        _print("An error occurred while loading clip journal. Clip moves won't be journaled.")
+        _print(traceback.format_exc())
+
+
 def script_update(settings):
     _print("Updating script...")
 
-    VARIABLES.script_settings = settings
+    apply_script_settings(settings)
     _print(obs.obs_data_get_json(VARIABLES.script_settings))
     _print("Script updated")
 
@@ -1701,30 +5288,60 @@ def script_save(settings):
 
 def script_load(script_settings):
     _print("Loading script...")
-    VARIABLES.script_settings = script_settings
-    # VARIABLES.update_available = check_updates(CONSTANTS.VERSION)  # todo: for future updates
-
-    json_settings = json.loads(obs.obs_data_get_json(script_settings))
-    load_aliases(json_settings)
-
-    obs.obs_frontend_add_event_callback(on_buffer_save_callback)
-    obs.obs_frontend_add_event_callback(on_buffer_recording_started_callback)
-    obs.obs_frontend_add_event_callback(on_buffer_recording_stopped_callback)
-
-    # obs.obs_frontend_add_event_callback(on_video_recording_started_callback)  # todo: for future updates
-    # obs.obs_frontend_add_event_callback(on_video_recording_stopping_callback)  # todo: for future updates
-    # obs.obs_frontend_add_event_callback(on_video_recording_stopped_callback)  # todo: for future updates
-    load_hotkeys()
-
-    if obs.obs_frontend_replay_buffer_active():
-        on_buffer_recording_started_callback(obs.OBS_FRONTEND_EVENT_REPLAY_BUFFER_STARTED)
-
-    _print("Script loaded.")
+    timings = {}
+    with VARIABLES.tracer.span("script_load", timings):
+        apply_script_settings(script_settings)
+        # VARIABLES.update_available = check_updates(CONSTANTS.VERSION)  # todo: for future updates
+
+        json_settings = json.loads(obs.obs_data_get_json(script_settings))
+        with VARIABLES.tracer.span("load_aliases"):
+            load_aliases(json_settings)
+
+        VARIABLES.clip_index = ClipIndex(get_script_data_dir() / CONSTANTS.CLIP_INDEX_FILENAME)
+        VARIABLES.retention.load_clips = load_retention_clips
+
+        VARIABLES.clip_finalizer = ClipFinalizer(finalize_clip)
+        VARIABLES.clip_finalizer.start()
+        with VARIABLES.tracer.span("load_clip_journal"):
+            load_clip_journal()
+        VARIABLES.scheduler.on_change = update_scheduler_timer
+        update_scheduler_timer()
+
+        obs.obs_frontend_add_event_callback(on_buffer_save_callback)
+        obs.obs_frontend_add_event_callback(on_buffer_recording_started_callback)
+        obs.obs_frontend_add_event_callback(on_buffer_recording_stopped_callback)
+        obs.obs_frontend_add_event_callback(on_config_changed_callback)
+
+        # obs.obs_frontend_add_event_callback(on_video_recording_started_callback)  # todo: for future updates
+        # obs.obs_frontend_add_event_callback(on_video_recording_stopping_callback)  # todo: for future updates
+        # obs.obs_frontend_add_event_callback(on_video_recording_stopped_callback)  # todo: for future updates
+        with VARIABLES.tracer.span("load_hotkeys"):
+            load_hotkeys()
+
+        if obs.obs_frontend_replay_buffer_active():
+            on_buffer_recording_started_callback(obs.OBS_FRONTEND_EVENT_REPLAY_BUFFER_STARTED)
+
+    load_time = timings["script_load"]
+    _print(f"Script loaded in {load_time:.1f} ms (budget {CONSTANTS.SCRIPT_LOAD_TIME_BUDGET} ms).")
+    if load_time > CONSTANTS.SCRIPT_LOAD_TIME_BUDGET:
+        _print("WARNING: script loading took longer than expected.")
+    if loaded := [i for i in CONSTANTS.LAZY_MODULES if i in sys.modules]:
+        _print(f"Lazy modules already imported: {', '.join(loaded)}.")
 
 
 def script_unload():
-    obs.timer_remove(append_clip_exe_history)
-    obs.timer_remove(restart_replay_buffering_callback)
+    VARIABLES.scheduler.on_change = None
+    VARIABLES.scheduler.clear()
+    stop_scheduler_timer()
+    if VARIABLES.clip_finalizer is not None:
+        VARIABLES.clip_finalizer.stop()
+    if VARIABLES.clip_journal is not None:
+        VARIABLES.clip_journal.close()
+    if VARIABLES.clip_index is not None:
+        VARIABLES.clip_index.stop()
+    VARIABLES.notification_daemon.stop()
+    if VARIABLES.tracer.events:
+        export_trace()
 
     _print("Script unloaded.")
 
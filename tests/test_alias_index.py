@@ -0,0 +1,143 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the aliases index.
+#
+# Usage: python -m unittest discover tests
+
+import re
+import sys
+import unittest
+from pathlib import Path
+from threading import Thread
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular.alias_index import AliasIndex
+
+
+class AliasTrieTest(unittest.TestCase):
+    def setUp(self):
+        self.index = AliasIndex({Path("C:\\Games"): "Games",
+                                 Path("C:\\Games\\Counter-Strike 2"): "CS2",
+                                 Path("C:\\Games\\Counter-Strike 2\\bin\\cs2.exe"): "CS2 exe"})
+
+    def test_closest_parent_wins(self):
+        self.assertEqual(self.index.match("C:\\Games\\Counter-Strike 2\\bin\\cs2.exe"), "CS2 exe")
+        self.assertEqual(self.index.match("C:\\Games\\Counter-Strike 2\\bin\\other.exe"), "CS2")
+        self.assertEqual(self.index.match("C:\\Games\\Other\\game.exe"), "Games")
+        self.assertIsNone(self.index.match("D:\\Games\\game.exe"))
+
+    def test_case_and_separators_are_ignored(self):
+        self.assertEqual(self.index.match("c:/games/COUNTER-STRIKE 2/game.exe"), "CS2")
+
+    def test_prefix_of_component_is_not_matched(self):
+        self.assertIsNone(self.index.match("C:\\GamesOld\\game.exe"))
+
+    def test_add_and_remove(self):
+        self.assertEqual(self.index.match("C:\\Games\\Other\\game.exe"), "Games")  # memoized
+
+        self.index.add("C:\\Games\\Other", "Other")
+        self.assertEqual(self.index.match("C:\\Games\\Other\\game.exe"), "Other")
+
+        self.index.remove("C:\\Games\\Other")
+        self.index.remove("C:\\Missing\\Folder")
+        self.assertEqual(self.index.match("C:\\Games\\Other\\game.exe"), "Games")
+
+
+class AliasPatternsTest(unittest.TestCase):
+    def test_wildcards(self):
+        index = AliasIndex(patterns={"*\\steamapps\\common\\*\\*.exe": "Steam",
+                                     "D:\\Tools\\**.exe": "Tools",
+                                     "C:\\app?.exe": "App"})
+
+        self.assertEqual(index.match("E:\\Lib\\steamapps\\common\\Game\\game.exe"), "Steam")
+        self.assertIsNone(index.match("E:\\Lib\\steamapps\\common\\Game\\bin\\game.exe"))  # `*` is one component
+        self.assertEqual(index.match("d:/tools/a/b/tool.EXE"), "Tools")  # `**` crosses components
+        self.assertEqual(index.match("C:\\app1.exe"), "App")
+        self.assertIsNone(index.match("C:\\app12.exe"))
+        self.assertIsNone(index.match("X:\\D:\\Tools\\tool.exe"))  # absolute patterns match from the start
+
+    def test_any_folders_wildcard_matches_no_folders(self):
+        index = AliasIndex(patterns={"D:\\Games\\**\\*.exe": "Games"})
+
+        self.assertEqual(index.match("D:\\Games\\x.exe"), "Games")
+        self.assertEqual(index.match("D:\\Games\\a\\b\\x.exe"), "Games")
+        self.assertIsNone(index.match("D:\\GamesOld\\x.exe"))
+
+    def test_first_pattern_wins(self):
+        index = AliasIndex(patterns={"re:.*\\\\game\\.exe": "First", "*.exe": "Second"})
+
+        self.assertEqual(index.match("C:\\game.exe"), "First")
+        self.assertEqual(index.match("C:\\other.exe"), "Second")
+
+    def test_path_alias_has_priority(self):
+        index = AliasIndex({Path("C:\\Games"): "Games"}, {"*.exe": "Any"})
+
+        self.assertEqual(index.match("C:\\Games\\game.exe"), "Games")
+        self.assertEqual(index.match("C:\\Other\\game.exe"), "Any")
+
+    def test_regex_flags_are_scoped(self):
+        index = AliasIndex(patterns={"re:(?s).*x": "Dotall", "re:C:\\\\(?P<name>\\w+)\\.exe": "Named"})
+
+        self.assertIsNotNone(index._matcher)  # combined into one regex
+        self.assertEqual(index.match("C:\\app.exe"), "Named")
+        self.assertEqual(index.match("C:\\app.x"), "Dotall")
+
+    def test_patterns_that_cannot_be_combined_are_checked_one_by_one(self):
+        index = AliasIndex(patterns={"re:(?P<name>a).*": "First", "re:(?P<name>b).*": "Second"})
+
+        self.assertIsNone(index._matcher)
+        self.assertEqual(index.match("b.exe"), "Second")
+        self.assertIsNone(index.match("c.exe"))
+
+    def test_invalid_patterns(self):
+        for pattern in ("re:(", "re:(a)\\1", "re:a(?i)b", "re:(?P<_smart_replays_pattern_0>a)"):
+            with self.subTest(pattern=pattern), self.assertRaises(re.error):
+                AliasIndex.compile_pattern(pattern)
+
+    def test_patterns_replaced_while_matching(self):
+        long_patterns = {f"C:\\app{i}.exe": f"App {i}" for i in range(50)}
+        errors = []
+
+        def match_apps():
+            try:
+                for i in range(2000):
+                    index.match(f"C:\\app{i % 50}.exe")
+                    index._memo.clear()
+            except Exception as e:
+                errors.append(e)
+
+        index = AliasIndex(patterns=long_patterns)
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, switch_interval)
+        thread = Thread(target=match_apps)
+        thread.start()
+        for i in range(200):
+            index.set_patterns(long_patterns if i % 2 else {"C:\\app0.exe": "App 0"})
+        thread.join()
+
+        self.assertEqual(errors, [])
+
+    def test_set_patterns(self):
+        index = AliasIndex(patterns={"*.exe": "Any"})
+        self.assertEqual(index.match("C:\\game.exe"), "Any")
+
+        index.set_patterns({"re:.*game.*": "Game", "*.exe": "Any"})
+        self.assertEqual(index.match("C:\\game.exe"), "Game")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of incremental aliases updating.
+# `obspython` is only available inside OBS, so it's replaced with a mock.
+#
+# Usage: python -m unittest discover tests
+
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SMART_REPLAYS_BACKEND", "synthetic")
+if "obspython" not in sys.modules:
+    sys.modules["obspython"] = mock.MagicMock(**{"obs_get_version_string.return_value": "30.1.2"})
+
+from modular import script_helpers
+from modular.alias_index import AliasIndex
+from modular.globals import VARIABLES, PN
+
+
+EXECUTABLES = ["C:\\Games\\Game\\game.exe",
+               "C:\\Games\\Other\\other.exe",
+               "D:\\steamapps\\common\\Tool\\tool.exe",
+               "C:\\Windows\\explorer.exe"]
+
+
+class UpdateAliasesTest(unittest.TestCase):
+    def setUp(self):
+        patches = [mock.patch.object(VARIABLES, "aliases", {}),
+                   mock.patch.object(VARIABLES, "alias_patterns", {}),
+                   mock.patch.object(VARIABLES, "alias_rows", []),
+                   mock.patch.object(VARIABLES, "aliases_index", AliasIndex()),
+                   mock.patch.object(script_helpers, "_print")]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    @staticmethod
+    def state() -> tuple:
+        return (dict(VARIABLES.aliases),
+                dict(VARIABLES.alias_patterns),
+                [row[1:] for row in VARIABLES.alias_rows],
+                [VARIABLES.aliases_index.match(exe) for exe in EXECUTABLES])
+
+    def assert_matches_full_reload(self, values: list[str]):
+        for exe in EXECUTABLES:  # fill the memo with the old results
+            VARIABLES.aliases_index.match(exe)
+        errors = [(type(e), e.index) for e in script_helpers.update_aliases(values)]
+        incremental = self.state()
+
+        full_errors = [(type(e), e.index) for e in script_helpers.load_aliases(
+            {PN.PROP_ALIASES_LIST: [{"value": value} for value in values]})]
+
+        self.assertEqual(incremental, self.state())
+        self.assertEqual(errors, full_errors)
+
+    def test_add_edit_remove(self):
+        steps = [
+            ["C:\\Games > Games"],
+            ["C:\\Games > Games", "C:\\Games\\Game\\game.exe > Game"],
+            ["C:\\Games > Games", "C:\\Games\\Game\\game.exe > Game", "*\\steamapps\\common\\*\\*.exe > Steam"],
+            ["re:.*\\.exe > Any", "C:\\Games > Games", "*\\steamapps\\common\\*\\*.exe > Steam"],
+            ["re:.*\\.exe > Any", "C:\\Games > Games 2", "*\\steamapps\\common\\*\\*.exe > Steam"],
+            ["re:.*\\.exe > Any", "C:\\Games > Games 2", "*\\steamapps\\common\\**.exe > Steam"],
+            ["C:\\Games > Games 2", "*\\steamapps\\common\\**.exe > Steam", "re:.*\\.exe > Any"],
+            ["C:\\Games > Games 2"],
+            [],
+        ]
+        for values in steps:
+            with self.subTest(values=values):
+                self.assert_matches_full_reload(values)
+
+    def test_duplicates_and_invalid_rows(self):
+        steps = [
+            ["C:\\Games > Games", "C:\\Windows > Windows"],
+            ["C:\\Windows > Other", "C:\\Games > Games", "C:\\Windows > Windows"],
+            ["C:\\Windows > Other", "invalid row", "C:\\Games > Games", "C:\\Windows > Windows"],
+            ["re:( > Broken", "re:.* > Any", "re:.* > Any 2"],
+            ["re:.* > Any 2"],
+        ]
+        for values in steps:
+            with self.subTest(values=values):
+                self.assert_matches_full_reload(values)
+
+    def test_paths_differing_in_case_are_duplicates(self):
+        steps = [
+            ["c:\\games > Lower", "C:/GAMES > Upper"],
+            ["C:/GAMES > Upper"],
+            ["c:\\games > Lower", "C:/GAMES > Upper"],
+            ["c:\\games > Lower"],
+        ]
+        for values in steps:
+            with self.subTest(values=values):
+                self.assert_matches_full_reload(values)
+                self.assertEqual(len(VARIABLES.aliases), 1)
+                self.assertIsNotNone(VARIABLES.aliases_index.match(EXECUTABLES[0]))
+
+    def test_removed_pattern_is_not_matched(self):
+        self.assert_matches_full_reload(["re:.*game\\.exe > Game"])
+        self.assertEqual(VARIABLES.aliases_index.match(EXECUTABLES[0]), "Game")
+
+        script_helpers.update_aliases([])
+
+        self.assertIsNone(VARIABLES.aliases_index.match(EXECUTABLES[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the notification animations.
+# tkinter widgets are replaced with a fake widget that runs `after` callbacks on a fake clock.
+#
+# Usage: python -m unittest discover tests
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular import ui
+from modular.ui import Animation, ScrollingText, ease_in_cubic, ease_linear, ease_out_cubic
+
+
+class FakeWidget:
+    def __init__(self, clock: list[float]):
+        self.clock = clock
+        self.scheduled = []  # [(delay in ms, callback), ...]
+
+    def after(self, delay: int, callback):
+        self.scheduled.append((delay, callback))
+
+    def run(self, frame_time: float | None = None) -> int:
+        """
+        Runs scheduled callbacks until there are none. Each one advances the clock by its delay
+        (or by `frame_time` ms, to simulate a slow machine).
+
+        :return: Amount of callbacks run.
+        """
+        runs = 0
+        while self.scheduled:
+            delay, callback = self.scheduled.pop(0)
+            self.clock[0] += (frame_time if frame_time is not None else delay) / 1000
+            callback()
+            runs += 1
+        return runs
+
+
+class AnimationTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = [0.0]
+        patch = mock.patch.object(ui.time, "perf_counter", side_effect=lambda: self.clock[0])
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.widget = FakeWidget(self.clock)
+        self.values = []
+        self.finished = mock.Mock()
+
+    def animation(self, start: float, end: float, duration: int, easing=ease_linear) -> Animation:
+        return Animation(widget=self.widget, start_value=start, end_value=end, duration=duration,
+                         on_step=self.values.append, easing=easing, on_finish_callback=self.finished)
+
+    def test_frames_are_bounded_by_duration(self):
+        for distance in (10, 1000, 100_000):
+            with self.subTest(distance=distance):
+                self.values.clear()
+                self.animation(0, distance, 250).start()
+                frames = self.widget.run() + 1
+
+                self.assertLessEqual(frames, 250 * Animation.FPS // 1000 + 2)
+                self.assertEqual(self.values[0], 0)
+                self.assertEqual(self.values[-1], distance)
+                self.assertEqual(self.values, sorted(self.values))
+
+    def test_slow_frames_dont_slow_down_the_animation(self):
+        self.animation(0, 100, 250).start()
+
+        self.assertEqual(self.widget.run(frame_time=100), 3)  # 100, 200, 300 (clamped) ms
+        self.assertEqual([round(value, 6) for value in self.values], [0, 40, 80, 100])
+        self.finished.assert_called_once()
+
+    def test_easing_is_applied_to_progress(self):
+        self.animation(10, 20, 100, easing=ease_out_cubic).start()
+        self.widget.run(frame_time=50)
+
+        self.assertEqual([round(value, 6) for value in self.values], [10, 10 + 10 * ease_out_cubic(0.5), 20])
+
+    def test_zero_duration(self):
+        self.animation(5, 50, 0).start()
+
+        self.assertEqual(self.values, [50])
+        self.assertEqual(self.widget.scheduled, [])
+        self.finished.assert_called_once()
+
+    def test_easings(self):
+        for easing in (ease_linear, ease_out_cubic, ease_in_cubic):
+            with self.subTest(easing=easing.__name__):
+                self.assertEqual((easing(0), easing(1)), (0, 1))
+        self.assertGreater(ease_out_cubic(0.5), 0.5)
+        self.assertLess(ease_in_cubic(0.5), 0.5)
+
+
+class ScrollingTextTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = [100.0]
+        patches = [mock.patch.object(ui.time, "perf_counter", side_effect=lambda: self.clock[0]),
+                   mock.patch.object(ui, "tk", mock.MagicMock())]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.canvas = FakeWidget(self.clock)
+        self.canvas.create_text = mock.Mock(return_value=1)
+        self.canvas.move = mock.Mock()
+        self.finished = mock.Mock()
+
+    def text(self, width: int) -> ScrollingText:
+        font = mock.Mock(**{"measure.return_value": width, "metrics.return_value": 10})
+        return ScrollingText(canvas=self.canvas, text="text", visible_area_width=300, start_pos=10,
+                             font=font, speed=200, on_finish_callback=self.finished)
+
+    def test_text_that_fits_is_not_scrolled(self):
+        self.text(200).update_scroll()
+
+        self.canvas.move.assert_not_called()
+        self.finished.assert_called_once()
+
+    def test_long_text_is_scrolled_to_its_end(self):
+        text = self.text(690)  # 400 px to scroll, 2 s at 200 px/s
+        text.update_scroll()
+        frames = self.canvas.run() + 1
+
+        self.assertEqual(text.text_curr_pos, 10 - 400)
+        self.assertEqual(sum(call.args[1] for call in self.canvas.move.call_args_list), -400)
+        self.assertLessEqual(frames, 2 * Animation.FPS + 2)
+        self.finished.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
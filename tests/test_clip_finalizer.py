@@ -0,0 +1,80 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the clip finalizer worker.
+#
+# Usage: python -m unittest discover tests
+
+import sys
+import unittest
+from pathlib import Path
+from threading import Event
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular import clip_finalizer
+from modular.clip_finalizer import ClipFinalizer
+
+
+class ClipFinalizerTest(unittest.TestCase):
+    def test_submit_never_drops_jobs(self):
+        started, busy = Event(), Event()
+        done = []
+        finalizer = ClipFinalizer(handler=mock.Mock(), backlog_warning=3)
+        finalizer.submit(lambda: (started.set(), busy.wait()))
+        started.wait()
+
+        results = [finalizer.submit(lambda i=i: done.append(i)) for i in range(5)]
+        busy.set()
+        finalizer.stop()
+
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertEqual(done, [0, 1, 2, 3, 4])
+
+    def test_busy_worker_is_not_restarted(self):
+        started, busy = Event(), Event()
+        done = []
+        finalizer = ClipFinalizer(handler=mock.Mock())
+        finalizer.submit(lambda: (started.set(), busy.wait()))
+        started.wait()
+
+        finalizer.stop(timeout=0.01)  # the worker is still busy
+        worker = finalizer._thread
+        finalizer.submit(lambda: done.append(1))
+        self.assertIs(finalizer._thread, worker)
+
+        busy.set()
+        finalizer.stop()
+        self.assertEqual(done, [1])
+        self.assertFalse(worker.is_alive())
+        self.assertIsNone(finalizer._thread)
+
+        finalizer.submit(lambda: done.append(2))  # started again after a complete stop
+        finalizer.stop()
+        self.assertEqual(done, [1, 2])
+
+    def test_errors_are_logged(self):
+        finalizer = ClipFinalizer(handler=mock.Mock())
+
+        with mock.patch.object(clip_finalizer, "_print") as log:
+            finalizer.submit(lambda: 1 / 0)
+            finalizer.stop()
+
+        [(text,), _] = log.call_args
+        self.assertIn("ZeroDivisionError", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
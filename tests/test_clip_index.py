@@ -0,0 +1,111 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the clips index reconciliation.
+#
+# Usage: python -m unittest discover tests
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from threading import Event
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular.clip_index import ClipIndex, ClipRecord
+
+
+class ClipIndexReconcileTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.root = self.tmp / "clips"
+        (self.root / "Game").mkdir(parents=True)
+        (self.root / "links").mkdir()
+        self.index = ClipIndex(self.tmp / "clips.db", flush_interval=0)
+
+    def tearDown(self):
+        self.index.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def clip(self, relative_path: str, data: bytes = b"clip") -> Path:
+        path = self.root / relative_path
+        path.write_bytes(data)
+        return path
+
+    def add(self, path: Path, alias: str):
+        stat = path.stat()
+        self.index.add(ClipRecord(path=str(path), alias=alias, exe_path=None, scene=None, mode=None,
+                                  saved_at=stat.st_mtime, size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                                  duration=None))
+
+    def reconcile(self) -> dict:
+        done = Event()
+        results = []
+        self.index.reconcile([self.root], exclude=[self.root / "links"],
+                             on_done=lambda stats: (results.append(stats), done.set()))
+        self.assertTrue(done.wait(5))
+        return results[0]
+
+    def rows(self) -> dict[str, tuple]:
+        return {Path(path).name: (alias, size) for path, alias, size in
+                self.index.query("SELECT path, alias, size FROM clips")}
+
+    def test_new_files_in_clip_folders_are_added(self):
+        self.clip("Game/clip.mkv")
+        (self.root / "Game" / "Nested").mkdir()
+        self.clip("Game/Nested/clip.MP4")
+        self.clip("Game/notes.txt")
+        self.clip("recording.mkv")  # loose files in the root can be recordings
+        self.clip("links/link.mkv")  # excluded folder
+
+        stats = self.reconcile()
+
+        self.assertEqual((stats["scanned"], stats["added"]), (2, 2))
+        self.assertEqual(self.rows(), {"clip.mkv": (None, 4), "clip.MP4": (None, 4)})
+
+    def test_known_clips_are_updated_and_removed(self):
+        unchanged, changed, removed = self.clip("Game/a.mkv"), self.clip("Game/b.mkv"), self.clip("Game/c.mkv")
+        outside = self.clip("saved without folder.mkv")
+        for path in (unchanged, changed, removed, outside):
+            self.add(path, "Game")
+
+        changed.write_bytes(b"longer clip")
+        os.remove(removed)
+        outside.write_bytes(b"longer clip")
+
+        stats = self.reconcile()
+
+        self.assertEqual((stats["added"], stats["updated"], stats["removed"]), (0, 2, 1))
+        self.assertEqual(self.rows(), {"a.mkv": ("Game", 4), "b.mkv": ("Game", 11),
+                                       "saved without folder.mkv": ("Game", 11)})
+
+    def test_reconciling_twice_changes_nothing(self):
+        self.clip("Game/clip.mkv")
+        self.reconcile()
+
+        stats = self.reconcile()
+
+        self.assertEqual((stats["scanned"], stats["added"], stats["updated"], stats["removed"]), (1, 0, 0, 0))
+
+    def test_missing_root(self):
+        shutil.rmtree(self.root)
+
+        self.assertEqual(self.reconcile()["scanned"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the clip moves journal.
+#
+# Usage: python -m unittest discover tests
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular import clip_journal
+from modular.clip_journal import ClipJournal
+
+
+class ClipJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.path = self.tmp / "journal.jsonl"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def open(self, compact_every: int = 500) -> ClipJournal:
+        journal = ClipJournal(self.path, compact_every=compact_every)
+        self.addCleanup(journal.close)
+        return journal
+
+    def test_pending_entries_are_recovered(self):
+        journal = self.open()
+        done = journal.begin("a.mkv", "clips/a.mkv", None)
+        journal.step(done, ClipJournal.MOVED)
+        journal.step(done, ClipJournal.DONE)
+        pending = journal.begin("b.mkv", "clips/b.mkv", "links", alias="Game")
+        journal.step(pending, ClipJournal.LINKING, link="links/b.mkv")
+        journal.close()
+
+        [entry] = self.open().pending()
+        self.assertEqual((entry["id"], entry["step"], entry["link"], entry["alias"]),
+                         (pending, ClipJournal.LINKING, "links/b.mkv", "Game"))
+
+    def test_ids_are_not_reused_if_compaction_failed(self):
+        journal = self.open(compact_every=1)
+        with mock.patch.object(clip_journal.os, "replace", side_effect=OSError("Access denied")):
+            first = journal.begin("a.mkv", "clips/a.mkv", None)
+            journal.step(first, ClipJournal.DONE)
+        self.assertEqual(journal.errors, 1)
+        journal.close()
+
+        journal = self.open()
+        second = journal.begin("b.mkv", "clips/b.mkv", None)
+        journal.close()
+
+        self.assertGreater(second, first)
+        [entry] = self.open().pending()
+        self.assertEqual((entry["id"], entry["src"]), (second, "b.mkv"))
+
+    def test_compaction_keeps_pending_entries_only(self):
+        journal = self.open(compact_every=2)
+        pending = journal.begin("a.mkv", "clips/a.mkv", None)
+        for name in ("b.mkv", "c.mkv"):
+            journal.step(journal.begin(name, f"clips/{name}", None), ClipJournal.FAILED)
+        journal.close()
+
+        self.assertEqual(len(self.path.read_text(encoding="utf-8").splitlines()), 1)
+        self.assertEqual([entry["id"] for entry in self.open().pending()], [pending])
+
+
+if __name__ == "__main__":
+    unittest.main()
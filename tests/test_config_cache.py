@@ -0,0 +1,116 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the OBS config values cache.
+# `obspython` is only available inside OBS, so it's replaced with a mock.
+#
+# Usage: python -m unittest discover tests
+
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SMART_REPLAYS_BACKEND", "synthetic")
+if "obspython" not in sys.modules:
+    sys.modules["obspython"] = mock.MagicMock(**{"obs_get_version_string.return_value": "30.1.2"})
+
+from modular import obs_events_callbacks, obs_related
+from modular.config_cache import ConfigCache
+from modular.globals import VARIABLES, ConfigTypes
+
+
+class ConfigCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = ConfigCache()
+        self.loader = mock.Mock(side_effect=["first", "second", "third"])
+
+    def test_hits_and_misses(self):
+        key = (ConfigTypes.PROFILE, "Output", "Mode", str)
+
+        self.assertEqual([self.cache.get(key, self.loader) for _ in range(3)], ["first"] * 3)
+        self.assertEqual(self.loader.call_count, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_invalidate_sections(self):
+        output, other = (ConfigTypes.PROFILE, "Output", "Mode", str), (ConfigTypes.USER, "Python", "Path64bit", str)
+        self.cache.get(output, self.loader)
+        self.cache.get(other, self.loader)
+
+        self.cache.invalidate(["Output", "AdvOut"])
+
+        self.assertEqual(self.cache.get(output, self.loader), "third")
+        self.assertEqual(self.cache.get(other, self.loader), "second")
+        self.assertEqual(self.cache.misses, 3)
+
+    def test_invalidate_everything(self):
+        key = (ConfigTypes.PROFILE, "Output", "Mode", str)
+        self.cache.get(key, self.loader)
+
+        self.cache.invalidate()
+
+        self.assertEqual(self.cache.get(key, self.loader), "second")
+
+    def test_value_invalidated_while_loading_is_not_cached(self):
+        key = (ConfigTypes.PROFILE, "Output", "Mode", str)
+
+        def load():
+            self.cache.invalidate()  # e.g. the profile is changed in the OBS thread
+            return "old"
+
+        self.assertEqual(self.cache.get(key, load), "old")
+        self.assertEqual(self.cache.get(key, self.loader), "first")
+
+
+class GetObsConfigTest(unittest.TestCase):
+    def setUp(self):
+        self.obs = mock.MagicMock(**{"config_get_string.side_effect": ["Simple", "Advanced"]})
+        patches = [mock.patch.object(obs_related, "obs", self.obs),
+                   mock.patch.object(obs_events_callbacks, "obs", self.obs),
+                   mock.patch.object(obs_events_callbacks, "_print"),
+                   mock.patch.object(VARIABLES, "obs_config_cache", ConfigCache())]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_values_are_read_once(self):
+        values = [obs_related.get_obs_config("Output", "Mode") for _ in range(3)]
+
+        self.assertEqual(values, ["Simple"] * 3)
+        self.assertEqual(self.obs.config_get_string.call_count, 1)
+
+    def test_cache_can_be_bypassed(self):
+        obs_related.get_obs_config("Output", "Mode")
+
+        self.assertEqual(obs_related.get_obs_config("Output", "Mode", use_cache=False), "Advanced")
+
+    def test_profile_change_invalidates_values(self):
+        obs_related.get_obs_config("Output", "Mode")
+
+        obs_events_callbacks.on_config_changed_callback(self.obs.OBS_FRONTEND_EVENT_PROFILE_CHANGED)
+
+        self.assertEqual(obs_related.get_obs_config("Output", "Mode"), "Advanced")
+
+    def test_other_events_dont_invalidate_values(self):
+        obs_related.get_obs_config("Output", "Mode")
+
+        obs_events_callbacks.on_config_changed_callback(self.obs.OBS_FRONTEND_EVENT_SCENE_CHANGED)
+
+        self.assertEqual(obs_related.get_obs_config("Output", "Mode"), "Simple")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the executables history window.
+#
+# Usage: python -m unittest discover tests
+
+import random
+import sys
+import unittest
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular.exe_history import ExeHistory, ExeInterner
+
+
+class ExeInternerTest(unittest.TestCase):
+    def test_same_path_gets_same_id(self):
+        interner = ExeInterner()
+
+        first = interner.intern("C:\\game.exe")
+        second = interner.intern(Path("C:\\other.exe"))
+
+        self.assertEqual(interner.intern(Path("C:\\game.exe")), first)
+        self.assertNotEqual(first, second)
+        self.assertEqual(interner.get_path(second), Path("C:\\other.exe"))
+        self.assertEqual(len(interner), 2)
+
+
+class ExeHistoryTest(unittest.TestCase):
+    def fill(self, history: ExeHistory, samples: list[int]) -> ExeHistory:
+        for exe_id in samples:
+            history.append(exe_id)
+        return history
+
+    def test_append_merges_runs(self):
+        history = self.fill(ExeHistory(maxlen=10), [0, 0, 1, 1, 1, 0])
+
+        self.assertEqual(history.runs(), [(0, 0, 2), (1, 2, 3), (0, 5, 1)])
+        self.assertEqual(len(history), 6)
+        self.assertEqual((history.count(0), history.count(1), history.count(7)), (3, 3, 0))
+
+    def test_oldest_samples_are_evicted(self):
+        history = self.fill(ExeHistory(maxlen=3), [0, 0, 1, 1, 2])
+
+        self.assertEqual(history.runs(), [(1, 2, 2), (2, 4, 1)])
+        self.assertEqual(len(history), 3)
+        self.assertEqual((history.count(0), history.count(1), history.count(2)), (0, 2, 1))
+        self.assertEqual(history.most_common(), 1)
+
+    def test_ring_grows_when_full(self):
+        samples = [i % 2 for i in range(ExeHistory.INITIAL_CAPACITY * 3)]
+        history = self.fill(ExeHistory(maxlen=ExeHistory.INITIAL_CAPACITY * 2), samples)
+
+        runs = history.runs()
+        self.assertEqual(len(runs), ExeHistory.INITIAL_CAPACITY * 2)
+        self.assertEqual(runs[0], (0, ExeHistory.INITIAL_CAPACITY, 1))
+        self.assertEqual(runs[-1], (1, len(samples) - 1, 1))
+
+    def test_tie_goes_to_most_recent_exe(self):
+        self.assertEqual(self.fill(ExeHistory(maxlen=10), [0, 0, 1, 1]).most_common(), 1)
+        self.assertEqual(self.fill(ExeHistory(maxlen=10), [1, 1, 0, 0]).most_common(), 0)
+        self.assertEqual(self.fill(ExeHistory(maxlen=10), [0, 1, 1, 0]).most_common(), 0)
+
+    def test_tie_after_eviction(self):
+        history = self.fill(ExeHistory(maxlen=4), [0, 0, 0, 1, 1, 2])  # window: 0, 1, 1, 2
+
+        self.assertEqual(history.most_common(), 1)
+        history.append(0)  # window: 1, 1, 2, 0
+        self.assertEqual(history.most_common(), 1)
+        history.append(2)  # window: 1, 2, 0, 2
+        self.assertEqual(history.most_common(), 2)
+
+    def test_matches_old_deque_approach(self):
+        rnd = random.Random(0)
+        history = ExeHistory(maxlen=50)
+        old_history = deque([], maxlen=50)
+        for _ in range(2000):
+            exe_id = rnd.randrange(4)
+            history.append(exe_id)
+            old_history.appendleft(exe_id)
+            self.assertEqual(history.most_common(), max(old_history, key=old_history.count))
+
+    def test_zero_maxlen(self):
+        history = self.fill(ExeHistory(maxlen=0), [0, 1, 1])
+
+        self.assertEqual(len(history), 0)
+        self.assertFalse(history)
+        self.assertEqual(history.runs(), [])
+        self.assertIsNone(history.most_common())
+
+    def test_clear(self):
+        history = self.fill(ExeHistory(maxlen=5), [0, 1, 1])
+
+        history.clear()
+
+        self.assertIsNone(history.most_common())
+        self.assertEqual(history.runs(), [])
+        self.assertEqual(history.count(1), 0)
+        history.append(2)
+        self.assertEqual(history.runs(), [(2, 0, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
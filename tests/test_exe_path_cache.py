@@ -0,0 +1,112 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the executable paths cache.
+#
+# Usage: python -m unittest discover tests
+
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular.exe_path_cache import ExePathCache
+from modular.platform_backends import LinuxBackend, SyntheticBackend
+
+
+class SyntheticExePathCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = SyntheticBackend(("C:\\a.exe", "C:\\b.exe", "C:\\c.exe"))
+        self.cache = ExePathCache(self.backend, maxsize=2)
+
+    def test_hits_and_misses(self):
+        with mock.patch.object(self.backend, "get_executable_path", wraps=self.backend.get_executable_path) as lookup:
+            paths = [self.cache.get(1000), self.cache.get(1000), self.cache.get(1001), self.cache.get(1000)]
+
+        self.assertEqual(paths, ["C:\\a.exe", "C:\\a.exe", "C:\\b.exe", "C:\\a.exe"])
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+        self.assertEqual(lookup.call_count, 2)
+
+    def test_reused_pid_is_looked_up_again(self):
+        self.assertEqual(self.cache.get(1000), "C:\\a.exe")
+
+        self.backend.processes[1000] = "C:\\new.exe"  # process 1000 exited, its PID is given to a new process
+        with mock.patch.object(self.backend, "get_process_start_time", return_value=5000):
+            self.assertEqual(self.cache.get(1000), "C:\\new.exe")
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_least_recently_used_process_is_evicted(self):
+        self.cache.get(1000)
+        self.cache.get(1001)
+        self.cache.get(1000)
+        self.cache.get(1002)  # evicts 1001
+
+        self.assertEqual(len(self.cache), 2)
+        self.cache.get(1000)
+        self.assertEqual(self.cache.hits, 2)
+        self.cache.get(1001)
+        self.assertEqual(self.cache.misses, 4)
+
+    def test_dead_process(self):
+        with self.assertRaises(OSError):
+            self.cache.get(1)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_clear(self):
+        self.cache.get(1000)
+        self.cache.get(1000)
+        self.cache.clear()
+
+        self.assertEqual((len(self.cache), self.cache.hits, self.cache.misses), (0, 0, 0))
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "/proc is only available on Linux")
+class LinuxExePathCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = LinuxBackend()
+        self.cache = ExePathCache(self.backend)
+
+    def test_proc_lookup(self):
+        process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        self.addCleanup(process.wait)
+        self.addCleanup(process.kill)
+
+        self.assertEqual(os.path.realpath(self.cache.get(process.pid)), os.path.realpath(sys.executable))
+        self.assertEqual(self.cache.get(process.pid), self.cache.get(process.pid))
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_reused_pid_is_looked_up_again(self):
+        pid = os.getpid()
+        self.cache.get(pid)
+        start_time = self.backend.get_process_start_time(pid)
+
+        with mock.patch.object(self.backend, "get_process_start_time", return_value=start_time + 1):
+            self.cache.get(pid)
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_exited_process(self):
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+
+        with self.assertRaises(OSError):
+            self.cache.get(process.pid)
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
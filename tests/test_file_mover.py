@@ -0,0 +1,105 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of moving and copying clip files.
+#
+# Usage: python -m unittest discover tests
+
+import errno
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular import file_mover
+from modular.file_mover import copy_file_data, move_file
+
+
+class FileMoverTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.src = self.tmp / "Replay.mkv"
+        self.data = os.urandom(100_000)
+        self.src.write_bytes(self.data)
+        os.utime(self.src, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))
+        self.dst = self.tmp / "Game" / "clip.mkv"
+        self.dst.parent.mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_same_device_is_renamed(self):
+        self.assertEqual(move_file(self.src, self.dst), "rename")
+
+        self.assertFalse(self.src.exists())
+        self.assertEqual(self.dst.read_bytes(), self.data)
+
+    def test_other_device_is_copied(self):
+        with mock.patch.object(file_mover, "is_same_device", return_value=False):
+            self.assertEqual(move_file(self.src, self.dst, chunk_size=4096), "copy")
+
+        self.assertFalse(self.src.exists())
+        self.assertEqual(self.dst.read_bytes(), self.data)
+        self.assertEqual(self.dst.stat().st_mtime_ns, 1_600_000_000_000_000_000)
+
+    def test_cross_device_rename_falls_back_to_copy(self):
+        error = OSError(errno.EXDEV, "Invalid cross-device link")
+        with mock.patch.object(file_mover.os, "replace", side_effect=error):
+            self.assertEqual(move_file(self.src, self.dst), "copy")
+
+        self.assertFalse(self.src.exists())
+        self.assertEqual(self.dst.read_bytes(), self.data)
+
+    def test_other_rename_errors_are_raised(self):
+        with mock.patch.object(file_mover.os, "replace", side_effect=PermissionError(errno.EACCES, "Denied")):
+            with self.assertRaises(PermissionError):
+                move_file(self.src, self.dst)
+
+        self.assertTrue(self.src.exists())
+
+    def test_reserved_file_is_overwritten(self):
+        self.dst.write_bytes(b"")
+        os.chmod(self.dst, 0o600)
+        os.chmod(self.src, 0o644)
+
+        self.assertEqual(copy_file_data(self.src, self.dst, chunk_size=4096), len(self.data))
+
+        self.assertEqual(self.dst.read_bytes(), self.data)
+        if hasattr(os, "fchmod"):
+            self.assertEqual(self.dst.stat().st_mode & 0o777, 0o644)
+
+    def test_fallback_to_plain_reads_and_writes(self):
+        unsupported = OSError(errno.ENOSYS, "Not supported")
+        with mock.patch.object(file_mover.os, "copy_file_range", side_effect=unsupported, create=True), \
+                mock.patch.object(file_mover.os, "sendfile", side_effect=unsupported, create=True):
+            self.assertEqual(copy_file_data(self.src, self.dst, chunk_size=4096), len(self.data))
+
+        self.assertEqual(self.dst.read_bytes(), self.data)
+
+    def test_failed_copy_keeps_the_source(self):
+        with mock.patch.object(file_mover, "is_same_device", return_value=False), \
+                mock.patch.object(file_mover.os, "fsync", side_effect=OSError(errno.ENOSPC, "No space left")):
+            with self.assertRaises(OSError):
+                move_file(self.src, self.dst)
+
+        self.assertEqual(self.src.read_bytes(), self.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of unique file names allocation.
+#
+# Usage: python -m unittest discover tests
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from threading import Thread
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular.filename_reserver import FilenameReserver
+
+
+class FilenameReserverTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = Path(tempfile.mkdtemp())
+        self.reserver = FilenameReserver()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def reserve(self, name: str = "clip.mkv") -> str:
+        return self.reserver.reserve(self.folder / name).name
+
+    def test_names_are_numbered(self):
+        (self.folder / "CLIP.mkv").touch()  # names are compared case-insensitively
+
+        self.assertEqual([self.reserve() for _ in range(3)], ["clip (1).mkv", "clip (2).mkv", "clip (3).mkv"])
+        self.assertEqual(self.reserve("other.mkv"), "other.mkv")
+        self.assertTrue((self.folder / "clip (3).mkv").is_file())
+
+    def test_missing_folder(self):
+        path = self.folder / "new" / "clip.mkv"
+        with self.assertRaises(FileNotFoundError):
+            self.reserver.reserve(path)
+
+        path.parent.mkdir()
+        self.assertEqual(self.reserver.reserve(path).name, "clip.mkv")
+
+    def test_files_created_by_others_are_skipped(self):
+        self.assertEqual(self.reserve(), "clip.mkv")
+        listing_mtime = os.stat(self.folder).st_mtime_ns
+        (self.folder / "clip (1).mkv").touch()  # created after the folder was listed
+        os.utime(self.folder, ns=(listing_mtime, listing_mtime))  # the listing is still considered valid
+
+        self.assertEqual(self.reserve(), "clip (2).mkv")
+
+    def test_freed_names_are_reused(self):
+        paths = [self.reserver.reserve(self.folder / "clip.mkv") for _ in range(3)]
+
+        self.reserver.release(paths[0])
+        self.assertEqual(self.reserve(), "clip.mkv")
+
+        os.remove(paths[1])  # deleted by the user
+        mtime = os.stat(self.folder).st_mtime_ns + 1_000_000_000  # in case the deletion is within the same tick
+        os.utime(self.folder, ns=(mtime, mtime))
+        self.assertEqual(self.reserve(), "clip (1).mkv")
+
+    def test_folder_is_listed_once_while_unchanged(self):
+        for i in range(3):
+            (self.folder / f"clip{i}.mkv").touch()
+
+        with mock.patch("modular.filename_reserver.os.scandir", wraps=os.scandir) as scandir:
+            self.reserve()
+            self.reserve()
+            mtime = os.stat(self.folder).st_mtime_ns + 1_000_000_000
+            os.utime(self.folder, ns=(mtime, mtime))  # changed by someone else
+            self.reserve()
+
+        self.assertEqual(scandir.call_count, 2)
+
+    def test_saving_clips_doesnt_list_folder_again(self):
+        for i in range(200):
+            (self.folder / f"old clip {i}.mkv").touch()
+        recordings = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, recordings, ignore_errors=True)
+
+        with mock.patch("modular.filename_reserver.os.scandir", wraps=os.scandir) as scandir:
+            for i in range(20):
+                path = self.reserver.reserve(self.folder / "clip.mkv")
+                recording = recordings / f"Replay {i}.mkv"
+                recording.write_bytes(b"clip")
+                with self.reserver.changing(self.folder):
+                    os.replace(recording, path)
+                    os.utime(self.folder)
+
+        self.assertEqual(scandir.call_count, 1)
+        self.assertEqual(self.reserve(), "clip (20).mkv")
+
+    def test_changes_by_others_before_saving_are_noticed(self):
+        path = self.reserver.reserve(self.folder / "clip.mkv")
+        (self.folder / "clip (1).mkv").touch()
+        mtime = os.stat(self.folder).st_mtime_ns + 1_000_000_000
+        os.utime(self.folder, ns=(mtime, mtime))
+
+        with mock.patch("modular.filename_reserver.os.scandir", wraps=os.scandir) as scandir:
+            with self.reserver.changing(self.folder):
+                path.write_bytes(b"clip")
+            self.assertEqual(self.reserve(), "clip (2).mkv")
+
+        self.assertEqual(scandir.call_count, 1)
+
+    def test_amount_of_listings_is_bounded(self):
+        reserver = FilenameReserver(max_folders=2)
+        for i in range(5):
+            (self.folder / str(i)).mkdir()
+            reserver.reserve(self.folder / str(i) / "clip.mkv")
+
+        self.assertEqual(len(reserver._listings), 2)
+
+    def test_concurrent_reservations(self):
+        (self.folder / "clip.mkv").write_bytes(b"old clip")
+        reservers = [FilenameReserver(), FilenameReserver()]  # the second one simulates another writer
+        results = [[] for _ in range(4)]
+
+        def save_clips(reserver: FilenameReserver, paths: list[Path]):
+            for _ in range(25):
+                paths.append(reserver.reserve(self.folder / "clip.mkv"))
+
+        threads = [Thread(target=save_clips, args=(reservers[i % 2], results[i])) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        paths = [path for thread_results in results for path in thread_results]
+        self.assertEqual(len(set(paths)), 100)
+        self.assertEqual(len(os.listdir(self.folder)), 101)
+        self.assertEqual((self.folder / "clip.mkv").read_bytes(), b"old clip")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of compiled file name templates.
+# `obspython` is only available inside OBS, so it's replaced with a mock.
+#
+# Usage: python -m unittest discover tests
+
+import os
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SMART_REPLAYS_BACKEND", "synthetic")
+if "obspython" not in sys.modules:
+    sys.modules["obspython"] = mock.MagicMock(**{"obs_get_version_string.return_value": "30.1.2"})
+
+from modular.filename_template import FilenameTemplate, compile_filename_template
+
+
+DT = datetime(2024, 3, 5, 7, 8, 9)
+
+
+class FilenameTemplateTest(unittest.TestCase):
+    def test_matches_strftime_rendering(self):
+        for template in ("%NAME_%d.%m.%Y_%H-%M-%S", "%NAME", "clip %j %Y%m%d", "%H%M%S_%NAME_%NAME", "plain"):
+            with self.subTest(template=template):
+                expected = DT.strftime(template.replace("%NAME", "Game"))
+                self.assertEqual(FilenameTemplate(template).render(DT, name="Game"), expected)
+
+    def test_script_variables(self):
+        template = FilenameTemplate("%NAME_%SCENE_%EXE_%COUNTER_%Y")
+
+        self.assertEqual(template.render(DT, name="Game", scene="Scene", exe="game", counter=3),
+                         "Game_Scene_game_3_2024")
+        self.assertTrue(template.uses("%EXE"))
+        self.assertFalse(FilenameTemplate("%NAME_%Y").uses("%SCENE"))
+
+    def test_invalid_templates(self):
+        for template in ("", "%NAME_%", "%NAME_%Q"):
+            with self.subTest(template=template), self.assertRaises(ValueError):
+                FilenameTemplate(template)
+
+        for template in ("%NAME/%Y", "%NAME_%%d"):
+            with self.subTest(template=template), self.assertRaises(SyntaxError):
+                FilenameTemplate(template)
+
+    def test_platform_specific_directives(self):
+        template = "%#d.%#m" if sys.platform == "win32" else "%-d.%-m %e"
+        expected = DT.strftime(template)
+
+        self.assertEqual(FilenameTemplate(template).render(DT), expected)
+        self.assertNotIn("%", expected)
+
+        for template in ("%-", "%#", "%-%"):
+            with self.subTest(template=template), self.assertRaises(ValueError):
+                FilenameTemplate(template)
+
+    def test_prohibited_characters_in_variables(self):
+        with self.assertRaises(SyntaxError):
+            FilenameTemplate("%NAME_%SCENE").render(DT, name="Game", scene="a:b")
+
+    def test_templates_are_cached(self):
+        compile_filename_template.cache_clear()
+
+        first = compile_filename_template("%NAME_%Y")
+        self.assertIs(compile_filename_template("%NAME_%Y"), first)
+        self.assertIsNot(compile_filename_template("%NAME_%m"), first)
+        self.assertEqual(compile_filename_template.cache_info().hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
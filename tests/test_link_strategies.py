@@ -0,0 +1,122 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of creating links to clips.
+#
+# Usage: python -m unittest discover tests
+
+import errno
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular.filename_reserver import FilenameReserver
+from modular.link_strategies import LinkCreator
+
+
+CROSS_DEVICE = OSError(errno.EXDEV, "Invalid cross-device link")
+ACCESS_DENIED = PermissionError(errno.EACCES, "Access denied")
+
+
+class LinkCreatorTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.clip = self.tmp / "clip.mkv"
+        self.clip.write_bytes(b"clip data")
+        self.links = self.tmp / "links"
+        self.creator = LinkCreator(FilenameReserver())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def patch(self, strategy: str, error: OSError):
+        return mock.patch.object(self.creator, f"_create_{strategy}", side_effect=error)
+
+    def test_hardlink(self):
+        link, strategy = self.creator.create(self.clip, self.links)
+
+        self.assertEqual(strategy, LinkCreator.HARDLINK)
+        self.assertEqual(link, self.links / "clip.mkv")
+        self.assertTrue(os.path.samefile(link, self.clip))
+        self.assertEqual(os.listdir(self.links), ["clip.mkv"])  # no temporary files left
+
+    def test_existing_files_are_not_overwritten(self):
+        self.links.mkdir()
+        (self.links / "clip.mkv").write_bytes(b"other")
+
+        link, _ = self.creator.create(self.clip, self.links)
+
+        self.assertEqual(link.name, "clip (1).mkv")
+        self.assertEqual((self.links / "clip.mkv").read_bytes(), b"other")
+
+    def test_fallback_is_cached_after_device_errors(self):
+        with self.patch("hardlink", CROSS_DEVICE) as hardlink, self.patch("reflink", CROSS_DEVICE):
+            _, strategy = self.creator.create(self.clip, self.links)
+            self.assertEqual(strategy, LinkCreator.SYMLINK)
+
+            link, strategy = self.creator.create(self.clip, self.links)
+            self.assertEqual(strategy, LinkCreator.SYMLINK)
+
+        self.assertEqual(hardlink.call_count, 1)  # not retried for the same devices
+        self.assertEqual(link.name, "clip (1).mkv")
+        self.assertEqual(link.resolve(), self.clip.resolve())
+
+    def test_per_file_errors_are_not_cached(self):
+        with self.patch("hardlink", ACCESS_DENIED), self.patch("reflink", CROSS_DEVICE):
+            _, strategy = self.creator.create(self.clip, self.links)
+        self.assertEqual(strategy, LinkCreator.SYMLINK)
+        self.assertEqual(self.creator._strategies, {})
+
+        _, strategy = self.creator.create(self.clip, self.links)
+        self.assertEqual(strategy, LinkCreator.HARDLINK)
+
+    def test_copy_is_the_last_resort(self):
+        with self.patch("hardlink", CROSS_DEVICE), self.patch("reflink", CROSS_DEVICE), \
+                self.patch("symlink", OSError(errno.EPERM, "Not permitted")):
+            link, strategy = self.creator.create(self.clip, self.links)
+
+        self.assertEqual(strategy, LinkCreator.COPY)
+        self.assertFalse(link.is_symlink())
+        self.assertEqual(link.read_bytes(), b"clip data")
+
+    def test_reserved_path_is_released_if_all_strategies_fail(self):
+        patches = [self.patch(strategy, CROSS_DEVICE) for strategy in LinkCreator.STRATEGIES]
+        for patch in patches:
+            patch.start()
+        try:
+            with self.assertRaises(OSError) as error:
+                self.creator.create(self.clip, self.links)
+        finally:
+            for patch in patches:
+                patch.stop()
+
+        self.assertIn("hardlink", str(error.exception))
+        self.assertEqual(os.listdir(self.links), [])
+        self.assertEqual(self.creator.create(self.clip, self.links)[0].name, "clip.mkv")
+
+    def test_device_errors(self):
+        self.assertTrue(LinkCreator.is_device_error(CROSS_DEVICE))
+        self.assertTrue(LinkCreator.is_device_error(OSError(errno.ENOTSUP, "Not supported")))
+        self.assertFalse(LinkCreator.is_device_error(ACCESS_DENIED))
+        self.assertFalse(LinkCreator.is_device_error(FileNotFoundError(errno.ENOENT, "No such file")))
+
+
+if __name__ == "__main__":
+    unittest.main()
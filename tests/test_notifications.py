@@ -0,0 +1,162 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the notification process and its client.
+# tkinter windows are replaced with mocks, the notification process is replaced with a script
+# that writes received notifications to a file.
+#
+# Usage: python -m unittest discover tests
+
+import io
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular import ui
+from modular.notification_client import NotificationDaemonClient
+
+
+FAKE_SCRIPT = """
+import sys
+
+with open(sys.argv[0] + ".out", "a") as f:
+    if sys.argv[1:] == ["--daemon"]:
+        for line in sys.stdin:
+            f.write(line)
+    else:
+        f.write("one-shot " + " ".join(sys.argv[1:]) + "\\n")
+"""
+
+
+class NotificationDaemonClientTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.script = self.tmp / "smart_replays.py"
+        self.script.write_text(FAKE_SCRIPT)
+        self.client = NotificationDaemonClient(str(self.script))
+
+    def tearDown(self):
+        self.client.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def stop_process(self):
+        process = self.client._process
+        self.client.stop()
+        process.wait(5)
+
+    def received(self) -> list[str]:
+        return (self.tmp / "smart_replays.py.out").read_text().splitlines()
+
+    def test_notifications_are_sent_to_one_process(self):
+        self.client.send(sys.executable, "Clip saved", "clip.mkv")
+        self.client.send(sys.executable, "Clip not saved", "More in the logs.", "#C00000")
+        self.stop_process()
+
+        self.assertEqual([json.loads(line) for line in self.received()],
+                         [{"title": "Clip saved", "message": "clip.mkv", "color": "#76B900"},
+                          {"title": "Clip not saved", "message": "More in the logs.", "color": "#C00000"}])
+        self.assertEqual((self.client.starts, self.client.fallbacks), (1, 0))
+
+    def test_exited_process_is_restarted(self):
+        self.client.send(sys.executable, "First", "")
+        self.stop_process()
+        self.client.send(sys.executable, "Second", "")
+        self.stop_process()
+
+        self.assertEqual([json.loads(line)["title"] for line in self.received()], ["First", "Second"])
+        self.assertEqual(self.client.starts, 2)
+
+    def test_fallback_if_process_cannot_be_started(self):
+        popen = subprocess.Popen
+        processes = []
+
+        def fake_popen(args, **kwargs):
+            if "--daemon" in args:
+                raise OSError("Cannot start the notification process.")
+            processes.append(popen(args, **kwargs))
+            return processes[-1]
+
+        with mock.patch("subprocess.Popen", side_effect=fake_popen):
+            self.client.send(sys.executable, "Clip saved", "clip.mkv")
+        processes[0].wait(5)
+
+        self.assertEqual(self.received(), ["one-shot Clip saved clip.mkv #76B900"])
+        self.assertEqual((self.client.starts, self.client.fallbacks), (0, 1))
+
+    def test_fallback_if_process_exits_right_away(self):
+        process = mock.Mock(**{"poll.return_value": None, "stdin.write.side_effect": BrokenPipeError()})
+        with mock.patch("subprocess.Popen", return_value=process) as started:
+            self.client.send(sys.executable, "Clip saved", "clip.mkv")
+
+        self.assertEqual([call.args[0][2:] for call in started.call_args_list],
+                         [["--daemon"], ["--daemon"], ["Clip saved", "clip.mkv", "#76B900"]])
+        self.assertEqual((self.client.starts, self.client.fallbacks), (2, 1))
+
+
+class NotificationDaemonTest(unittest.TestCase):
+    def setUp(self):
+        patches = [mock.patch.object(ui, "tk", mock.MagicMock()),
+                   mock.patch.object(ui, "NotificationWindow")]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        with mock.patch.object(ui, "Thread"):  # stdin is read in the tests
+            self.daemon = ui.NotificationDaemon()
+
+    def read(self, lines: list[str]):
+        with mock.patch.object(ui.sys, "stdin", mock.Mock(buffer=io.BytesIO("".join(lines).encode()))):
+            self.daemon.read_messages()
+
+    def test_notifications_are_stacked(self):
+        self.read(['{"title": "First", "message": "a"}\n',
+                   'not json\n',
+                   '{"title": "Second", "message": "b", "color": "#C00000"}\n'])
+        self.daemon.poll()
+
+        calls = ui.NotificationWindow.call_args_list
+        self.assertEqual([(call.args, call.kwargs["slot"]) for call in calls],
+                         [(("First", "a", "#76B900"), 0), (("Second", "b", "#C00000"), 1)])
+        self.daemon.root.destroy.assert_not_called()  # windows are still shown
+
+        calls[0].kwargs["on_close_callback"]()
+        self.daemon.show_notification({"title": "Third"})
+        self.assertEqual(ui.NotificationWindow.call_args.kwargs["slot"], 0)  # the freed slot is reused
+
+    def test_exits_when_stdin_is_closed_and_windows_are_closed(self):
+        self.read(['{"title": "First", "message": "a"}\n'])
+        self.daemon.poll()
+        ui.NotificationWindow.call_args.kwargs["on_close_callback"]()
+
+        self.daemon.poll()
+
+        self.daemon.root.destroy.assert_called_once()
+
+    def test_exits_after_idle_timeout(self):
+        self.daemon.poll()
+        self.daemon.root.destroy.assert_not_called()
+
+        self.daemon.last_activity -= ui.NotificationDaemon.IDLE_TIMEOUT + 1
+        self.daemon.poll()
+        self.daemon.root.destroy.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
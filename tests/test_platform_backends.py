@@ -0,0 +1,111 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the platform backends.
+#
+# Usage: python -m unittest discover tests
+
+import errno
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular import platform_backends
+from modular.platform_backends import LinuxBackend, SyntheticBackend, get_platform_backend
+
+
+class SyntheticBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = SyntheticBackend(("C:\\a.exe", "C:\\b.exe"), switch_every=2, idle_time=7)
+
+    def test_active_process_switches_in_order(self):
+        pids = [self.backend.get_active_window_pid() for _ in range(6)]
+
+        self.assertEqual(pids, [1000, 1000, 1001, 1001, 1000, 1000])
+        self.assertEqual([self.backend.get_executable_path(pid) for pid in pids[1:3]], ["C:\\a.exe", "C:\\b.exe"])
+
+    def test_unknown_process(self):
+        for method in (self.backend.get_executable_path, self.backend.get_process_start_time):
+            with self.subTest(method=method.__name__), self.assertRaises(OSError):
+                method(1)
+
+    def test_input_and_sounds(self):
+        self.backend.play_sound(Path("sound.wav"))
+
+        self.assertEqual(self.backend.get_time_since_last_input(), 7)
+        self.assertEqual(self.backend.played_sounds, ["sound.wav"])
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "/proc is only available on Linux")
+class LinuxBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = LinuxBackend()
+
+    def test_executable_path(self):
+        self.assertEqual(os.path.realpath(self.backend.get_executable_path(os.getpid())),
+                         os.path.realpath(sys.executable))
+
+    def test_start_time_identifies_process(self):
+        process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        self.addCleanup(process.wait)
+        self.addCleanup(process.kill)
+
+        start_time = self.backend.get_process_start_time(process.pid)
+        self.assertEqual(self.backend.get_process_start_time(process.pid), start_time)
+        self.assertGreaterEqual(start_time, self.backend.get_process_start_time(os.getpid()))
+
+    def test_process_name_with_spaces_and_brackets(self):
+        stat = b"42 (a) b (c)) S 1 42 42 0 -1 4194560 1 0 0 0 0 0 0 0 20 0 1 0 123456 1000 100"
+        with mock.patch("builtins.open", mock.mock_open(read_data=stat)):
+            self.assertEqual(self.backend.get_process_start_time(42), 123456)
+
+    def test_dead_process(self):
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+
+        for method in (self.backend.get_executable_path, self.backend.get_process_start_time):
+            with self.subTest(method=method.__name__), self.assertRaises(OSError):
+                method(process.pid)
+
+    def test_permission_denied(self):
+        error = PermissionError(errno.EACCES, "Permission denied")
+        with mock.patch.object(platform_backends.os, "readlink", side_effect=error):
+            with self.assertRaises(RuntimeError):
+                self.backend.get_executable_path(os.getpid())
+
+    def test_window_lookup_is_not_supported(self):
+        with self.assertRaises(OSError):
+            self.backend.get_active_window_pid()
+        self.assertEqual(self.backend.get_time_since_last_input(), 0)
+
+
+class GetPlatformBackendTest(unittest.TestCase):
+    def test_override(self):
+        for name, backend in (("synthetic", SyntheticBackend), ("LINUX", LinuxBackend)):
+            with self.subTest(name=name), mock.patch.dict(os.environ, {"SMART_REPLAYS_BACKEND": name}):
+                self.assertIsInstance(get_platform_backend(), backend)
+
+    def test_default(self):
+        with mock.patch.dict(os.environ, {"SMART_REPLAYS_BACKEND": "unknown"}), \
+                mock.patch.object(platform_backends.sys, "platform", "linux"):
+            self.assertIsInstance(get_platform_backend(), LinuxBackend)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,288 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the clips retention engine.
+#
+# Usage: python -m unittest discover tests
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular.file_mover import copy_file_data
+from modular.retention import RetentionEngine, RetentionPolicy, parse_retention_policy
+
+
+NOW = 1_700_000_000
+
+
+class RetentionEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.root = self.tmp / "clips"
+        self.links = self.root / "_links"
+        self.links.mkdir(parents=True)
+        self.saved = []  # clips "saved by the script" before the engine is loaded: [(path, mtime, size, link)]
+        self.engine = RetentionEngine(load_clips=lambda: self.saved)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def make_file(self, path: Path, size: int = 10, age_days: float = 0) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+        mtime = NOW - age_days * 86400
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def save_clip(self, name: str, size: int = 10, age_days: float = 0, link: Path | None = None) -> Path:
+        path = self.make_file(self.root / name, size, age_days)
+        self.saved.append((str(path), path.stat().st_mtime, size, str(link) if link else None))
+        return path
+
+    def configure(self, policy: RetentionPolicy, folder_policies: dict[str, RetentionPolicy] | None = None):
+        self.engine.configure(self.root, policy, folder_policies or {})
+
+    def test_oldest_clips_are_deleted_by_count(self):
+        clips = [self.save_clip(f"Game/clip{i}.mkv", age_days=3 - i) for i in range(3)]
+        self.configure(RetentionPolicy(max_count=1))
+
+        deleted = [path for path, freed, error in self.engine.enforce(NOW)]
+
+        self.assertEqual(deleted, [str(clips[0]), str(clips[1])])
+        self.assertEqual([i.exists() for i in clips], [False, False, True])
+
+    def test_loose_files_are_not_deleted(self):
+        recording = self.make_file(self.root / "2024-01-01 10-00-00.mkv", age_days=10)
+        user_file = self.make_file(self.root / "Game" / "my_video.mp4", age_days=10)
+        clips = [self.save_clip(f"Game/clip{i}.mkv", age_days=5 - i) for i in range(2)]
+        self.configure(RetentionPolicy(max_age=86400))
+
+        self.engine.enforce(NOW)
+
+        self.assertTrue(recording.exists())
+        self.assertTrue(user_file.exists())
+        self.assertFalse(clips[0].exists())
+        self.assertTrue(clips[1].exists())  # the newest clip of a folder is kept
+
+    def test_clips_outside_of_root_are_not_deleted(self):
+        other = self.make_file(self.tmp / "other" / "clip.mkv", age_days=10)
+        self.saved.append((str(other), other.stat().st_mtime, 10, None))
+        self.save_clip("Game/clip.mkv")
+        self.configure(RetentionPolicy(max_age=86400))
+
+        self.assertEqual(self.engine.enforce(NOW), [])
+        self.assertTrue(other.exists())
+
+    def test_noted_clip_is_counted_once(self):
+        clips = [self.save_clip(f"Game/clip{i}.mkv", age_days=2 - i) for i in range(2)]
+        self.configure(RetentionPolicy(max_count=2))
+        self.engine.note_clip(clips[1])  # already in the index
+
+        self.assertEqual(self.engine.enforce(NOW), [])
+        new = self.make_file(self.root / "Game" / "clip2.mkv")
+        self.engine.note_clip(new)
+        self.assertEqual([path for path, freed, error in self.engine.enforce(NOW)], [str(clips[0])])
+
+    def test_folder_policy_and_global_size(self):
+        game = [self.save_clip(f"Game/clip{i}.mkv", size=100, age_days=10 - i) for i in range(3)]
+        desktop = [self.save_clip(f"Desktop/clip{i}.mkv", size=100, age_days=20 - i) for i in range(2)]
+        self.configure(RetentionPolicy(max_bytes=300), {"Game": RetentionPolicy(max_count=2)})
+
+        self.engine.enforce(NOW)
+
+        self.assertEqual([i.exists() for i in game], [False, True, True])
+        self.assertEqual([i.exists() for i in desktop], [False, True])
+        self.assertEqual(self.engine.total_bytes, 300)
+
+    def test_hard_link_is_deleted(self):
+        link = self.links / "clip0.mkv"
+        clip = self.save_clip("Game/clip0.mkv", size=100, age_days=2, link=link)
+        os.link(clip, link)
+        self.save_clip("Game/clip1.mkv")
+        self.configure(RetentionPolicy(max_count=1))
+
+        [(path, freed, error)] = self.engine.enforce(NOW)
+
+        self.assertFalse(link.exists())
+        self.assertEqual(freed, 100)
+
+    def test_copy_is_deleted(self):
+        link = self.links / "clip0.mkv"
+        clip = self.save_clip("Game/clip0.mkv", size=100, age_days=2, link=link)
+        copy_file_data(clip, link)
+        self.save_clip("Game/clip1.mkv")
+        self.configure(RetentionPolicy(max_count=1))
+
+        [(path, freed, error)] = self.engine.enforce(NOW)
+
+        self.assertFalse(link.exists())
+        self.assertEqual(freed, 200)
+
+    def test_noted_link_is_deleted(self):
+        self.configure(RetentionPolicy(max_count=1))
+        self.engine.enforce(NOW)
+        clip = self.make_file(self.root / "Game" / "clip0.mkv", age_days=1)
+        link = self.links / "clip0 (2).mkv"
+        os.link(clip, link)
+        self.engine.note_clip(clip)
+        self.engine.note_link(link, clip)
+        self.engine.note_clip(self.make_file(self.root / "Game" / "clip1.mkv"))
+
+        self.engine.enforce(NOW)
+
+        self.assertFalse(link.exists())
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "symlinks are not supported")
+    def test_symlinks_of_other_files_are_kept(self):
+        link = self.links / "clip0.mkv"
+        clip = self.save_clip("Game/clip0.mkv", age_days=2, link=link)
+        other = self.make_file(self.tmp / "other" / "clip0.mkv")
+        try:
+            os.symlink(other, link)  # replaced by the user
+            os.symlink(clip, self.links / "foreign.mkv")  # not created by the script
+        except OSError:
+            self.skipTest("cannot create symlinks")
+        same_name = self.tmp / "other_links" / "clip0.mkv"
+        same_name.parent.mkdir()
+        os.symlink(other, same_name)
+        self.save_clip("Game/clip1.mkv")
+        self.configure(RetentionPolicy(max_count=1))
+
+        self.engine.enforce(NOW)
+
+        self.assertFalse(clip.exists())
+        self.assertTrue(os.path.lexists(link))
+        self.assertTrue(os.path.lexists(self.links / "foreign.mkv"))
+        self.assertTrue(os.path.lexists(same_name))
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "symlinks are not supported")
+    def test_symlink_to_clip_is_deleted(self):
+        link = self.links / "clip0.mkv"
+        clip = self.save_clip("Game/clip0.mkv", size=100, age_days=2, link=link)
+        try:
+            os.symlink(clip, link)
+        except OSError:
+            self.skipTest("cannot create symlinks")
+        self.save_clip("Game/clip1.mkv")
+        self.configure(RetentionPolicy(max_count=1))
+
+        [(path, freed, error)] = self.engine.enforce(NOW)
+
+        self.assertFalse(os.path.lexists(link))
+        self.assertEqual(freed, 100)
+
+    def test_replaced_link_file_is_kept(self):
+        link = self.links / "clip0.mkv"
+        self.save_clip("Game/clip0.mkv", size=100, age_days=2, link=link)
+        self.make_file(link, size=50)  # other file with the link name
+        self.save_clip("Game/clip1.mkv")
+        self.configure(RetentionPolicy(max_count=1))
+
+        self.engine.enforce(NOW)
+
+        self.assertTrue(link.exists())
+
+    def test_file_of_the_same_size_is_kept(self):
+        link = self.links / "clip0.mkv"
+        self.save_clip("Game/clip0.mkv", size=100, age_days=2, link=link)
+        self.make_file(link, size=100)  # other file with the link name and the same size
+        self.save_clip("Game/clip1.mkv")
+        self.configure(RetentionPolicy(max_count=1))
+
+        [(path, freed, error)] = self.engine.enforce(NOW)
+
+        self.assertTrue(link.exists())
+        self.assertEqual(freed, 100)
+
+    def test_clip_that_cannot_be_deleted_is_retried(self):
+        link = self.links / "clip0.mkv"
+        clips = [self.save_clip("Game/clip0.mkv", size=100, age_days=3, link=link),
+                 self.save_clip("Game/clip1.mkv", size=100, age_days=2),
+                 self.save_clip("Game/clip2.mkv", size=100, age_days=1)]
+        os.link(clips[0], link)
+        locked = {str(clips[0])}
+
+        def delete(path):
+            if path in locked:
+                raise PermissionError(f"{path} is opened")
+            os.remove(path)
+
+        self.engine.delete = delete
+        self.configure(RetentionPolicy(max_count=1))
+
+        results = self.engine.enforce(NOW)
+
+        self.assertEqual([(path, error is None) for path, freed, error in results],
+                         [(str(clips[0]), False), (str(clips[1]), True)])
+        self.assertEqual([i.exists() for i in clips], [True, False, True])
+        self.assertEqual(self.engine.total_bytes, 200)  # the locked clip is still counted
+
+        locked.clear()
+        self.assertEqual([(path, freed, error) for path, freed, error in self.engine.enforce(NOW)],
+                         [(str(clips[0]), 100, None)])
+        self.assertFalse(link.exists())
+        self.assertEqual(self.engine.total_bytes, 100)
+
+    def test_failed_deletions_dont_exceed_count_limit(self):
+        clips = [self.save_clip(f"Game/clip{i}.mkv", age_days=5 - i) for i in range(5)]
+        locked = {str(clips[0])}
+
+        def delete(path):
+            if path in locked:
+                raise PermissionError(f"{path} is opened")
+            os.remove(path)
+
+        self.engine.delete = delete
+        self.configure(RetentionPolicy(max_count=3))
+
+        results = self.engine.enforce(NOW)
+
+        self.assertEqual([(path, error is None) for path, freed, error in results],
+                         [(str(clips[0]), False), (str(clips[1]), True), (str(clips[2]), True)])
+        self.assertEqual([i.exists() for i in clips], [True, False, False, True, True])
+
+        locked.clear()
+        self.assertEqual(self.engine.enforce(NOW), [])  # the limit is met
+
+    def test_clips_are_reloaded_after_reset(self):
+        self.configure(RetentionPolicy(max_count=1))
+        self.engine.enforce(NOW)
+        clips = [self.save_clip(f"Game/clip{i}.mkv", age_days=2 - i) for i in range(2)]
+
+        self.assertEqual(self.engine.enforce(NOW), [])
+        self.engine.reset()
+        self.assertEqual([path for path, freed, error in self.engine.enforce(NOW)], [str(clips[0])])
+
+
+class ParseRetentionPolicyTest(unittest.TestCase):
+    def test_limits(self):
+        name, policy = parse_retention_policy("Counter-Strike 2 > 30d 1.5GB 100")
+
+        self.assertEqual(name, "Counter-Strike 2")
+        self.assertEqual((policy.max_age, policy.max_bytes, policy.max_count), (30 * 86400, int(1.5 * 1024 ** 3), 100))
+
+    def test_invalid_rows(self):
+        for row in ("Game", "> 30d", "Game > ", "Game > 30x"):
+            with self.subTest(row=row), self.assertRaises(ValueError):
+                parse_retention_policy(row)
+
+
+if __name__ == "__main__":
+    unittest.main()
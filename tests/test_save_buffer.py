@@ -0,0 +1,162 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of clip finalization (moving, linking, indexing).
+# `obspython` is only available inside OBS, so it's replaced with a mock.
+#
+# Usage: python -m unittest discover tests
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SMART_REPLAYS_BACKEND", "synthetic")
+if "obspython" not in sys.modules:
+    sys.modules["obspython"] = mock.MagicMock(**{"obs_get_version_string.return_value": "30.1.2"})
+
+from modular import save_buffer
+from modular.clip_finalizer import ClipSaveJob
+from modular.clip_journal import ClipJournal
+from modular.globals import VARIABLES, CONSTANTS, ClipNamingModes, PopupPathDisplayModes
+from modular.settings_snapshot import ScriptSettings
+
+
+def make_settings(**values) -> ScriptSettings:
+    defaults = dict(clips_base_path="", clips_naming_mode=ClipNamingModes.CURRENT_SCENE,
+                    clips_filename_template=CONSTANTS.DEFAULT_FILENAME_FORMAT, clips_save_to_folder=True,
+                    clips_create_links=False, clips_links_folder_path="",
+                    sound_notifications=False, notify_on_success=False, notify_on_success_path="",
+                    notify_on_failure=False, notify_on_failure_path="",
+                    popup_notifications=False, popup_on_success=False, popup_on_failure=False,
+                    popup_path_display_mode=PopupPathDisplayModes.FULL_PATH,
+                    retention=False, retention_max_age=0, retention_max_size=0, retention_max_count=0,
+                    retention_policies=[],
+                    restart_buffer=False, restart_buffer_loop=0, save_coalesce_window=0, tracing=False,
+                    data_json="{}")
+    return ScriptSettings(**{**defaults, **values})
+
+
+class FinalizeClipTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.base = self.tmp / "clips"
+        self.recording = self.tmp / "Replay 2024-01-01 10-00-00.mkv"
+        self.recording.write_bytes(b"x" * 100)
+        self.index = mock.Mock()
+
+        patches = [mock.patch.object(VARIABLES, "clip_journal", None),
+                   mock.patch.object(VARIABLES, "clip_index", self.index),
+                   mock.patch.object(save_buffer, "notify")]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.notify = save_buffer.notify
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def finalize(self, settings: ScriptSettings):
+        job = ClipSaveJob(old_file_path=str(self.recording),
+                          mode=ClipNamingModes.CURRENT_SCENE,
+                          filename_template=settings.clips_filename_template,
+                          executable_path=None,
+                          scene_name="Scene",
+                          save_time=datetime(2024, 1, 1, 10),
+                          settings=settings,
+                          clips_base_path=self.base)
+        save_buffer.finalize_clip(job)
+        (success, path, *_), _ = self.notify.call_args
+        return success, path
+
+    def test_links_disabled(self):
+        success, path = self.finalize(make_settings())
+
+        self.assertTrue(success)
+        self.assertTrue(path.is_file())
+        self.assertFalse(self.recording.exists())
+        self.assertEqual(path.parent, self.base / "Scene")
+        [(record,), _] = self.index.add.call_args
+        self.assertEqual((record.path, record.alias, record.mode, record.link),
+                         (str(path), "Scene", ClipNamingModes.CURRENT_SCENE.name, None))
+
+    def test_links_enabled(self):
+        links = self.tmp / "links"
+        success, path = self.finalize(make_settings(clips_create_links=True, clips_links_folder_path=str(links)))
+
+        self.assertTrue(success)
+        [link] = links.iterdir()
+        self.assertEqual(link.read_bytes(), path.read_bytes())
+        [(record,), _] = self.index.add.call_args
+        self.assertEqual(record.link, str(link))
+
+
+class RecoverClipMovesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.index = mock.Mock()
+        self.journal = ClipJournal(self.tmp / "journal.jsonl")
+
+        patches = [mock.patch.object(VARIABLES, "clip_journal", self.journal),
+                   mock.patch.object(VARIABLES, "clip_index", self.index),
+                   mock.patch.object(VARIABLES, "settings", make_settings()),
+                   mock.patch.object(save_buffer, "notify")]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_naming_info_is_journaled(self):
+        recording = self.tmp / "Replay.mkv"
+        recording.write_bytes(b"x" * 100)
+        job = ClipSaveJob(old_file_path=str(recording), mode=ClipNamingModes.CURRENT_SCENE,
+                          filename_template=CONSTANTS.DEFAULT_FILENAME_FORMAT, executable_path=None,
+                          scene_name="Scene", save_time=datetime(2024, 1, 1, 10), settings=make_settings(),
+                          duration=30, clips_base_path=self.tmp / "clips")
+
+        save_buffer.move_clip_file(job, {})
+
+        entry = json.loads(self.journal.path.read_text("utf-8").splitlines()[0])
+        self.assertEqual(entry["step"], ClipJournal.PLANNED)
+        self.assertEqual((entry["alias"], entry["scene"], entry["mode"], entry["duration"]),
+                         ("Scene", "Scene", ClipNamingModes.CURRENT_SCENE.name, 30))
+
+    def test_recovered_clip_is_indexed(self):
+        src, dst = self.tmp / "Replay.mkv", self.tmp / "Game" / "Game_1.mkv"
+        src.write_bytes(b"x" * 100)
+        dst.parent.mkdir()
+        dst.touch()  # reserved file
+        self.journal.begin(src, dst, None, alias="Game", exe_path="C:\\game.exe", scene="Scene",
+                           mode=ClipNamingModes.CURRENT_PROCESS.name, saved_at=1_700_000_000, duration=30)
+
+        self.assertEqual(save_buffer.recover_clip_moves(self.journal, self.journal.pending()), 1)
+
+        self.assertEqual(dst.stat().st_size, 100)
+        self.assertEqual(self.journal.pending(), [])
+        [(record,), _] = self.index.add.call_args
+        self.assertEqual((record.path, record.alias, record.mode, record.saved_at, record.size),
+                         (str(dst), "Game", ClipNamingModes.CURRENT_PROCESS.name, 1_700_000_000, 100))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the hotkey save requests queue.
+#
+# Usage: python -m unittest discover tests
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular.save_requests import SaveRequestQueue
+
+
+class SaveRequestQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patch = mock.patch("modular.save_requests.time.monotonic", side_effect=lambda: self.now)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.queue = SaveRequestQueue(coalesce_window=0.5, timeout=30)
+
+    def test_requests_are_sent_one_by_one(self):
+        self.assertTrue(self.queue.add("scene"))
+        self.assertTrue(self.queue.add("process"))
+
+        self.assertEqual(self.queue.send_next().mode, "scene")
+        self.assertIsNone(self.queue.send_next())  # waits for the first clip
+        self.assertEqual(self.queue.pop().mode, "scene")
+        self.assertEqual(self.queue.send_next().mode, "process")
+        self.assertEqual(self.queue.pop().mode, "process")
+        self.assertEqual(len(self.queue), 0)
+
+    def test_same_requests_are_coalesced(self):
+        self.assertTrue(self.queue.add("scene"))
+        self.now += 0.2
+        self.assertFalse(self.queue.add("scene"))
+        self.assertTrue(self.queue.add("process"))
+        self.now += 1
+        self.assertTrue(self.queue.add("process"))
+
+        self.assertEqual(len(self.queue), 3)
+        self.assertEqual(self.queue.coalesced, 1)
+
+    def test_external_save_keeps_pending_requests(self):
+        self.assertIsNone(self.queue.pop())  # nothing is requested
+
+        self.queue.add("scene")
+        self.assertIsNone(self.queue.pop())  # saved before the request is sent
+        self.queue.send_next()
+        self.assertEqual(self.queue.pop().mode, "scene")
+
+    def test_sent_request_times_out(self):
+        self.queue.add("scene")
+        self.queue.add("process")
+        self.queue.send_next()
+        self.now += 10
+        self.assertEqual(self.queue.next_timeout(), 20)
+
+        self.now += 21
+        self.assertEqual(self.queue.send_next().mode, "process")
+        self.assertEqual(self.queue.timed_out, 1)
+        self.assertEqual(self.queue.pop().mode, "process")
+
+    def test_pending_requests_do_not_time_out(self):
+        self.queue.add("scene")
+        self.now += 60
+
+        self.assertEqual(self.queue.send_next().mode, "scene")
+
+    def test_unsent_request_is_sent_again(self):
+        self.queue.add("scene")
+        self.queue.send_next()
+
+        self.queue.unsend()
+
+        self.assertIsNone(self.queue.next_timeout())
+        self.assertIsNone(self.queue.pop())
+        self.assertEqual(self.queue.send_next().mode, "scene")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the script jobs scheduler.
+#
+# Usage: python -m unittest discover tests
+
+import sys
+import unittest
+from pathlib import Path
+from threading import Thread
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular import scheduler
+from modular.scheduler import Scheduler
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patches = [mock.patch("modular.scheduler.time.monotonic", side_effect=lambda: self.now),
+                   mock.patch("modular.scheduler._print")]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.scheduler = Scheduler()
+        self.calls = []
+
+    def job(self, name: str):
+        def callback():
+            self.calls.append(name)
+        callback.__name__ = name
+        return callback
+
+    def test_jobs_run_in_deadline_order(self):
+        late, early, repeating = self.job("late"), self.job("early"), self.job("repeating")
+        self.scheduler.add_once(late, 300)
+        self.scheduler.add_once(early, 100)
+        self.scheduler.add(repeating, 200)
+
+        self.now += 0.05
+        self.scheduler.tick()
+        self.assertEqual(self.calls, [])
+
+        self.now += 0.5
+        self.scheduler.tick()
+        self.assertEqual(self.calls, ["early", "repeating", "late"])
+
+        self.now += 0.2
+        self.scheduler.tick()
+        self.assertEqual(self.calls, ["early", "repeating", "late", "repeating"])
+        self.assertFalse(self.scheduler.is_scheduled(early))
+        self.assertTrue(self.scheduler.is_scheduled(repeating))
+
+    def test_removed_job_is_not_run(self):
+        job = self.job("job")
+        self.scheduler.add_once(job, 100)
+
+        self.scheduler.remove(job)
+        self.now += 1
+        self.scheduler.tick()
+
+        self.assertEqual(self.calls, [])
+        self.assertIsNone(self.scheduler.next_delay())
+
+    def test_adding_again_reschedules(self):
+        job = self.job("job")
+        self.scheduler.add_once(job, 100)
+        self.scheduler.add_once(job, 500)
+
+        self.now += 0.2
+        self.scheduler.tick()
+        self.assertEqual(self.calls, [])
+        self.now += 0.3
+        self.scheduler.tick()
+        self.assertEqual(self.calls, ["job"])
+
+    def test_job_can_remove_another_job(self):
+        second = self.job("second")
+        self.scheduler.add_once(lambda: self.scheduler.remove(second), 100)
+        self.scheduler.add_once(second, 100)
+
+        self.now += 1
+        self.scheduler.tick()
+
+        self.assertEqual(self.calls, [])
+
+    def test_coarse_tick_tolerance(self):
+        self.scheduler.add(self.job("repeating"), 1000)
+        self.scheduler.add_once(self.job("once"), 1000)
+
+        self.now += 0.6
+        self.scheduler.tick(tolerance=0.5)
+        self.assertEqual(self.calls, ["repeating"])  # one-shot jobs are never run early
+        self.assertEqual(self.scheduler.stats["repeating"].max_lateness, 0.0)
+
+        self.now += 0.4
+        self.scheduler.tick(tolerance=0.5)
+        self.assertEqual(self.calls, ["repeating", "once"])
+
+    def test_callback_errors_are_logged(self):
+        self.scheduler.add_once(lambda: 1 / 0, 0)
+
+        self.scheduler.tick()
+
+        [(text,), _] = scheduler._print.call_args
+        self.assertIn("ZeroDivisionError", text)
+
+    def test_timer_interval(self):
+        self.assertIsNone(self.scheduler.timer_interval(50, 1000))
+
+        self.scheduler.add_once(self.job("far"), 5000)
+        self.assertEqual(self.scheduler.timer_interval(50, 1000), 1000)
+
+        self.scheduler.add_once(self.job("near"), 300)
+        self.assertEqual(self.scheduler.timer_interval(50, 1000), 50)
+
+    def test_on_change_is_called_on_changes_and_ticks(self):
+        on_change = self.scheduler.on_change = mock.Mock()
+        job = self.job("job")
+
+        self.scheduler.add_once(job, 100)
+        self.scheduler.remove(job)
+        self.scheduler.tick()
+
+        self.assertEqual(on_change.call_count, 3)
+
+    def test_on_change_is_not_run_concurrently(self):
+        delays = []
+
+        def on_change():
+            delays.append(round(self.scheduler.next_delay(), 3))
+            if len(delays) == 1:  # another thread adds a job while the timer is re-armed
+                thread = Thread(target=self.scheduler.add_once, args=(self.job("other"), 100))
+                thread.start()
+                thread.join()
+
+        self.scheduler.on_change = on_change
+        self.scheduler.add_once(self.job("job"), 5000)
+
+        self.assertEqual(delays, [5, 0.1])  # called once more by the first thread, with the new job
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the script settings snapshot.
+# `obspython` is only available inside OBS, so it's replaced with a mock,
+# OBS data objects are replaced with dicts.
+#
+# Usage: python -m unittest discover tests
+
+import json
+import os
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SMART_REPLAYS_BACKEND", "synthetic")
+if "obspython" not in sys.modules:
+    sys.modules["obspython"] = mock.MagicMock(**{"obs_get_version_string.return_value": "30.1.2"})
+
+from modular import obs_script_other, settings_snapshot
+from modular.globals import VARIABLES, PN, ClipNamingModes
+from modular.settings_snapshot import ScriptSettings
+
+
+def read_value(data: dict, name: str, default):
+    data["reads"] = data.get("reads", 0) + 1
+    return data.get(name, default)
+
+
+FAKE_OBS = SimpleNamespace(
+    obs_data_get_string=lambda data, name: read_value(data, name, ""),
+    obs_data_get_int=lambda data, name: read_value(data, name, 0),
+    obs_data_get_bool=lambda data, name: read_value(data, name, False),
+    obs_data_get_array=lambda data, name: None,
+    obs_data_get_json=lambda data: json.dumps({k: v for k, v in data.items() if k != "reads"}, sort_keys=True),
+)
+
+
+class ScriptSettingsTest(unittest.TestCase):
+    def setUp(self):
+        patch = mock.patch.object(settings_snapshot, "obs", FAKE_OBS)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_snapshot_reflects_settings(self):
+        settings = ScriptSettings.from_obs_data({PN.PROP_CLIPS_BASE_PATH: "D:\\Clips",
+                                                 PN.PROP_CLIPS_NAMING_MODE: ClipNamingModes.CURRENT_SCENE.value,
+                                                 PN.PROP_RETENTION_MAX_COUNT: 10})
+
+        self.assertEqual(settings.clips_base_path, "D:\\Clips")
+        self.assertIs(settings.clips_naming_mode, ClipNamingModes.CURRENT_SCENE)
+        self.assertEqual(settings.retention_max_count, 10)
+        self.assertEqual(settings.retention_policies, ())
+        with self.assertRaises(AttributeError):
+            settings.clips_base_path = "C:\\"
+
+    def test_snapshot_is_kept_while_settings_are_unchanged(self):
+        data = {PN.PROP_CLIPS_BASE_PATH: "D:\\Clips"}
+        first = ScriptSettings.from_obs_data_if_changed(data, None)
+        reads = data["reads"]
+
+        self.assertIs(ScriptSettings.from_obs_data_if_changed(data, first), first)
+        self.assertEqual(data["reads"], reads)  # OBS data is not read again
+
+        data[PN.PROP_CLIPS_BASE_PATH] = "E:\\Clips"
+        second = ScriptSettings.from_obs_data_if_changed(data, first)
+        self.assertIsNot(second, first)
+        self.assertEqual((first.clips_base_path, second.clips_base_path), ("D:\\Clips", "E:\\Clips"))
+
+
+class ApplyScriptSettingsTest(unittest.TestCase):
+    def setUp(self):
+        patches = [mock.patch.object(settings_snapshot, "obs", FAKE_OBS),
+                   mock.patch.object(VARIABLES, "settings", None),
+                   mock.patch.object(VARIABLES, "script_settings", None),
+                   mock.patch.object(VARIABLES.save_requests, "coalesce_window", VARIABLES.save_requests.coalesce_window),
+                   mock.patch.object(VARIABLES.tracer, "enabled", VARIABLES.tracer.enabled),
+                   mock.patch.object(obs_script_other, "configure_retention")]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_settings_are_applied_only_when_changed(self):
+        data = {PN.PROP_SAVE_COALESCE_WINDOW: 500}
+        obs_script_other.apply_script_settings(data)
+        first = VARIABLES.settings
+
+        obs_script_other.apply_script_settings(data)
+        self.assertIs(VARIABLES.settings, first)
+        obs_script_other.configure_retention.assert_called_once_with(first)
+
+        data[PN.PROP_SAVE_COALESCE_WINDOW] = 1000
+        obs_script_other.apply_script_settings(data)
+        self.assertEqual(VARIABLES.settings.save_coalesce_window, 1000)
+        self.assertEqual(VARIABLES.save_requests.coalesce_window, 1)
+        self.assertEqual(obs_script_other.configure_retention.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#  OBS Smart Replays is an OBS script that allows more flexible replay buffer management:
+#  set the clip name depending on the current window, set the file name format, etc.
+#  Copyright (C) 2024 qvvonk
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+
+# Behaviour tests of the performance tracer.
+#
+# Usage: python -m unittest discover tests
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modular import tracing
+from modular.tracing import NOOP_SPAN, Tracer
+
+
+class TracerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = iter(range(1_000_000, 100_000_000, 1_000_000))  # 1 ms per call
+        patch = mock.patch.object(tracing.time, "perf_counter_ns", side_effect=lambda: next(self.clock))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_spans_are_recorded(self):
+        tracer = Tracer(enabled=True)
+
+        with tracer.span("save", clip="clip.mkv"):
+            with tracer.span("move"):
+                pass
+
+        self.assertEqual([event[:3] for event in tracer.events],
+                         [("move", 2_000_000, 1_000_000), ("save", 1_000_000, 3_000_000)])
+        self.assertEqual(tracer.events[1][3], threading.get_ident())
+        self.assertEqual(tracer.events[1][4], {"clip": "clip.mkv"})
+
+    def test_span_is_recorded_on_error(self):
+        tracer = Tracer(enabled=True)
+
+        with self.assertRaises(ZeroDivisionError), tracer.span("save"):
+            1 / 0
+
+        self.assertEqual(len(tracer.events), 1)
+
+    def test_disabled_tracer_costs_nothing(self):
+        tracer = Tracer()
+
+        for _ in range(1000):
+            with tracer.span("save") as span:
+                self.assertIs(span, NOOP_SPAN)
+
+        self.assertEqual(len(tracer.events), 0)
+        tracing.time.perf_counter_ns.assert_not_called()
+
+    def test_timings_are_written_when_disabled(self):
+        tracer = Tracer()
+        timings = {}
+
+        with tracer.span("move", timings):
+            pass
+
+        self.assertEqual(timings, {"move": 1.0})
+        self.assertEqual(len(tracer.events), 0)
+
+    def test_oldest_spans_are_dropped(self):
+        tracer = Tracer(enabled=True, max_events=2)
+
+        for name in ("first", "second", "third"):
+            with tracer.span(name):
+                pass
+
+        self.assertEqual([event[0] for event in tracer.events], ["second", "third"])
+
+    def test_export(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        tracer = Tracer(enabled=True)
+        with tracer.span("save", clip="clip.mkv"):
+            pass
+
+        self.assertEqual(tracer.export(tmp / "trace.json"), 1)
+        tracer.clear()
+
+        trace = json.loads((tmp / "trace.json").read_text(encoding="utf-8"))
+        self.assertEqual(trace["traceEvents"], [{"name": "save", "ph": "X", "ts": 1000.0, "dur": 1000.0,
+                                                 "pid": os.getpid(), "tid": threading.get_ident(),
+                                                 "args": {"clip": "clip.mkv"}}])
+        self.assertEqual(len(tracer.events), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()